@@ -6,6 +6,7 @@ import tornado
 from tests import utils
 from tests.server.api.v1.utils import ServerTestCase
 
+from waterbutler.core import exceptions
 from waterbutler.auth.osf import settings
 from waterbutler.core.auth import AuthType
 from waterbutler.auth.osf.handler import OsfAuthHandler
@@ -104,3 +105,39 @@ class TestOsfAuthHandler(ServerTestCase):
                         'user_agent': None
                     }
                 }, cookie=None, view_only=None)
+
+    @tornado.testing.gen_test
+    async def test_caches_identical_lookups(self):
+        self.request.method = 'get'
+
+        first = await self.handler.get('test', 'test', self.request, path='/file')
+        second = await self.handler.get('test', 'test', self.request, path='/file')
+
+        assert first == second
+        assert first is not second
+        assert OsfAuthHandler.make_request.call_count == 1
+        assert self.handler.stats()['cache'] == {'size': 1, 'hits': 1, 'misses': 1}
+
+    @tornado.testing.gen_test
+    async def test_cache_key_differs_by_action_and_credentials(self):
+        self.request.method = 'get'
+        await self.handler.get('test', 'test', self.request)
+
+        self.request.method = 'delete'
+        await self.handler.get('test', 'test', self.request)
+
+        self.request.headers['Authorization'] = 'Bearer other'
+        await self.handler.get('test', 'test', self.request)
+
+        assert OsfAuthHandler.make_request.call_count == 3
+
+    @tornado.testing.gen_test
+    async def test_errors_are_not_cached(self):
+        self.request.method = 'get'
+        OsfAuthHandler.make_request.side_effect = exceptions.AuthError('nope', code=403)
+
+        for _ in range(2):
+            with pytest.raises(exceptions.AuthError):
+                await self.handler.get('test', 'test', self.request)
+
+        assert OsfAuthHandler.make_request.call_count == 2
@@ -6,8 +6,11 @@ settings.config['TASKS_CONFIG'] = {
     'CELERY_RESULT_BACKEND': 'redis://'
 }
 
+import pytest
 import aiohttpretty
 
+from waterbutler.core import cache
+
 
 def pytest_configure(config):
     config.addinivalue_line(
@@ -27,3 +30,11 @@ def pytest_runtest_teardown(item, nextitem):
     marker = item.get_marker('aiohttpretty')
     if marker is not None:
         aiohttpretty.deactivate()
+
+
+@pytest.yield_fixture(autouse=True)
+def path_id_cache():
+    """Start every test with an empty path id cache."""
+    cache._PATH_ID_CACHE = None
+    yield
+    cache._PATH_ID_CACHE = None
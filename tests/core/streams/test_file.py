@@ -1,4 +1,5 @@
 import os
+import tempfile
 
 import pytest
 
@@ -75,6 +76,43 @@ class TestFileStreamReader:
             at_eof = reader.at_eof()
             assert at_eof
 
+    @pytest.mark.asyncio
+    async def test_file_stream_reader_binary(self):
+        with open(DUMMY_FILE, 'rb') as fp:
+            fp.seek(3)
+            reader = streams.FileStreamReader(fp)
+            assert reader.size == 27
+
+            data = await reader.read(10)
+            assert data == b'abcdefghij'
+            assert fp.tell() == 0  # pread leaves the position alone
+
+            data = await reader.read()
+            assert data == b'klmnopqrstuvwxyz\n'
+            assert not reader.at_eof()
+
+            data = await reader.read()
+            assert data == b''
+            assert reader.at_eof()
+
+    @pytest.mark.asyncio
+    async def test_file_stream_reader_unflushed_write(self):
+        with tempfile.TemporaryFile() as fp:
+            fp.write(b'written but not yet flushed')
+            reader = streams.FileStreamReader(fp)
+
+            data = await reader.read()
+            assert data == b'written but not yet flushed'
+
+    @pytest.mark.asyncio
+    async def test_file_stream_reader_spooled(self):
+        with tempfile.SpooledTemporaryFile(mode='w+b') as fp:
+            fp.write(b'in memory')
+            reader = streams.FileStreamReader(fp)
+
+            data = await reader.read()
+            assert data == b'in memory'
+
 
 class TestPartialFileStreamReader:
 
@@ -133,3 +171,19 @@ class TestPartialFileStreamReader:
             assert data == b''
             at_eof = reader.at_eof()
             assert at_eof
+
+    @pytest.mark.asyncio
+    async def test_partial_file_stream_reader_binary(self):
+        with open(DUMMY_FILE, 'rb') as fp:
+            reader = streams.PartialFileStreamReader(fp, (2, 10))
+
+            data = await reader.read(4)
+            assert data == b'cdef'
+            assert reader.bytes_read == 4
+
+            data = await reader.read(500)
+            assert data == b'ghijk'
+
+            data = await reader.read(500)
+            assert data == b''
+            assert reader.at_eof()
@@ -1,7 +1,12 @@
+import asyncio
 from unittest import mock
 
 import pytest
 
+from waterbutler.core import streams
+from waterbutler.core import exceptions
+
+from tests.utils import MockCoroutine
 from tests.core.streams.fixtures import (mock_content_eof, MockResponseNoContent,
                                          mock_content, MockResponseNoContentLength,
                                          mock_response_stream_reader, MockResponse,
@@ -36,3 +41,99 @@ class TestResponseStreamReader:
         assert (await mock_response_stream_reader_no_content.read()) is None
         mock_response_stream_reader_no_content.feed_eof.assert_called_once_with()
         MockResponseNoContent.release.assert_called_once_with()
+
+
+class RangeResponse:
+    """Enough of an aiohttp response to serve a slice of ``data``."""
+
+    def __init__(self, data, start, end, status=206):
+        self.status = status
+        self.body = data[start:end + 1]
+        self.headers = {
+            'Content-Type': 'text/plain',
+            'Content-Range': 'bytes {}-{}/{}'.format(start, end, len(data)),
+        }
+        self.content = asyncio.StreamReader()
+        self.content.feed_data(self.body)
+        self.content.feed_eof()
+        self.release = MockCoroutine()
+        self.close = mock.Mock()
+
+    async def read(self):
+        return self.body
+
+
+def make_range_stream(data, chunk_size, concurrency):
+    calls = []
+
+    async def fetch(start, end):
+        calls.append((start, end))
+        await asyncio.sleep(0)
+        return RangeResponse(data, start, end)
+
+    first = RangeResponse(data, 0, chunk_size - 1)
+    stream = streams.ParallelRangeStream(fetch, first, len(data), chunk_size, concurrency)
+    return stream, calls
+
+
+class TestParallelRangeStream:
+
+    @pytest.mark.asyncio
+    async def test_reassembles_in_order(self):
+        data = bytes(range(256)) * 4
+        stream, calls = make_range_stream(data, chunk_size=100, concurrency=3)
+
+        assert stream.size == len(data)
+        assert not stream.partial
+        assert stream.content_type == 'text/plain'
+
+        read = b''
+        while not stream.at_eof():
+            read += await stream.read(33)
+
+        assert read == data
+        assert calls == [(i, min(i + 99, len(data) - 1)) for i in range(100, len(data), 100)]
+
+    @pytest.mark.asyncio
+    async def test_read_all(self):
+        data = b'abcdefghijklmnopqrstuvwxyz'
+        stream, _ = make_range_stream(data, chunk_size=5, concurrency=2)
+
+        assert await stream.read() == data
+        assert stream.at_eof()
+
+    @pytest.mark.asyncio
+    async def test_bounded_segments(self):
+        data = b'x' * 100
+        stream, calls = make_range_stream(data, chunk_size=10, concurrency=3)
+        await asyncio.sleep(0)
+
+        # The first segment streams from the initial response, two more are prefetched
+        assert len(calls) == 2
+
+        await stream.read(10)
+        await stream.read(10)
+        await asyncio.sleep(0)
+        assert len(calls) == 3
+
+    @pytest.mark.asyncio
+    async def test_single_segment(self):
+        data = b'small'
+        stream, calls = make_range_stream(data, chunk_size=10, concurrency=3)
+
+        assert await stream.read(100) == data
+        assert stream.at_eof()
+        assert calls == []
+
+    @pytest.mark.asyncio
+    async def test_short_segment(self):
+        data = b'abcdefghij'
+
+        async def fetch(start, end):
+            return RangeResponse(data, start, end - 1)
+
+        stream = streams.ParallelRangeStream(fetch, RangeResponse(data, 0, 4), len(data), 5, 2)
+
+        assert await stream.read(5) == b'abcde'
+        with pytest.raises(exceptions.DownloadError):
+            await stream.read(5)
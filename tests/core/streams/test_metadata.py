@@ -0,0 +1,116 @@
+import hashlib
+from unittest import mock
+
+import pytest
+
+from waterbutler.core import streams
+from waterbutler.core.streams import settings
+from waterbutler.core.streams import metadata
+
+
+@pytest.fixture
+def small_chunks(monkeypatch):
+    monkeypatch.setattr(settings, 'HASH_OFFLOAD_BYTES', 10)
+    monkeypatch.setattr(settings, 'HASH_BACKLOG_BYTES', 40)
+
+
+DATA = b''.join(bytes([i % 256]) * 7 for i in range(100))
+
+
+class TestMultiHashStreamWriter:
+
+    @pytest.mark.asyncio
+    async def test_digests(self, small_chunks):
+        hashes = streams.MultiHashStreamWriter('md5', 'sha1', 'sha256')
+
+        for start in range(0, len(DATA), 7):
+            hashes.write(DATA[start:start + 7])
+        await hashes.finish()
+
+        for name in ('md5', 'sha1', 'sha256'):
+            assert hashes.hexdigest(name) == hashlib.new(name, DATA).hexdigest()
+            assert hashes.digest(name) == hashlib.new(name, DATA).digest()
+
+    @pytest.mark.asyncio
+    async def test_stream_writers(self, small_chunks):
+        stream = streams.StringStream(DATA)
+        hashes = streams.MultiHashStreamWriter('md5', 'sha256')
+        hashes.add_to(stream)
+
+        while await stream.read(16):
+            pass
+        await hashes.finish()
+
+        assert hashes in stream.writers.values()
+        assert stream.writers['md5'].hexdigest == hashlib.md5(DATA).hexdigest()
+        assert stream.writers['sha256'].digest == hashlib.sha256(DATA).digest()
+
+    @pytest.mark.asyncio
+    async def test_nested_writers(self, small_chunks):
+        stream = streams.StringStream(DATA)
+        outer = streams.MultiHashStreamWriter('md5', 'sha256')
+        outer.add_to(stream)
+        inner = streams.MultiHashStreamWriter('md5')
+        inner.add_to(stream)
+
+        while await stream.read(16):
+            pass
+        await inner.finish()
+        await outer.finish()
+
+        assert inner.hexdigest('md5') == hashlib.md5(DATA).hexdigest()
+        assert outer.hexdigest('md5') == hashlib.md5(DATA).hexdigest()
+        assert outer.hexdigest('sha256') == hashlib.sha256(DATA).hexdigest()
+        assert stream.writers['sha256'].hexdigest == hashlib.sha256(DATA).hexdigest()
+
+    def test_duplicate_name(self):
+        stream = streams.StringStream(DATA)
+        streams.MultiHashStreamWriter('md5').add_to(stream, name='hashes')
+
+        with pytest.raises(ValueError):
+            streams.MultiHashStreamWriter('sha1').add_to(stream, name='hashes')
+
+    def test_write_does_not_wait(self, small_chunks, monkeypatch):
+        submitted = []
+        monkeypatch.setattr(metadata, 'get_hash_executor', lambda: mock.Mock(submit=submitted.append))
+        hashes = streams.MultiHashStreamWriter('sha1')
+
+        hashes.write(DATA)
+        hashes.write(DATA)
+
+        assert len(submitted) == 1
+        with pytest.raises(RuntimeError):
+            hashes.hexdigest('sha1')
+
+    @pytest.mark.asyncio
+    async def test_drain(self, small_chunks):
+        hashes = streams.MultiHashStreamWriter('sha1')
+
+        hashes.write(DATA)
+        await hashes.drain()
+
+        assert hashes._queued <= settings.HASH_BACKLOG_BYTES
+        await hashes.finish()
+        assert hashes.hexdigest('sha1') == hashlib.sha1(DATA).hexdigest()
+
+    @pytest.mark.asyncio
+    async def test_prefix(self):
+        stream = streams.StringStream(DATA)
+        hashes = streams.MultiHashStreamWriter('sha1')
+        hashes.add_to(stream)
+        hashes.write(b'blob 700\0')
+
+        while await stream.read(1024):
+            pass
+        await hashes.finish()
+
+        assert stream.writers['sha1'].hexdigest == hashlib.sha1(b'blob 700\0' + DATA).hexdigest()
+
+    @pytest.mark.asyncio
+    async def test_empty(self):
+        hashes = streams.MultiHashStreamWriter('md5')
+
+        hashes.write(b'')
+        await hashes.finish()
+
+        assert hashes.hexdigest('md5') == hashlib.md5(b'').hexdigest()
@@ -0,0 +1,106 @@
+import asyncio
+
+import pytest
+
+from waterbutler.core import streams
+
+
+class TestPipeStream:
+
+    @pytest.mark.asyncio
+    async def test_read_exactly(self):
+        stream = streams.PipeStream(size=10)
+        await stream.write(b'1234')
+        await stream.write(b'567890')
+        stream.write_eof()
+
+        assert await stream.read(3) == b'123'
+        assert await stream.read(5) == b'45678'
+        assert await stream.read(5) == b'90'
+        assert stream.at_eof()
+        assert await stream.read(5) == b''
+
+    @pytest.mark.asyncio
+    async def test_whole_chunk_not_copied(self):
+        chunk = b'x' * 100
+        stream = streams.PipeStream()
+        await stream.write(chunk)
+
+        assert await stream.read(100) is chunk
+
+    @pytest.mark.asyncio
+    async def test_read_all(self):
+        stream = streams.PipeStream()
+        await stream.write(b'abc')
+        await stream.write(b'def')
+        stream.write_eof()
+
+        assert await stream.read() == b'abcdef'
+
+    @pytest.mark.asyncio
+    async def test_read_waits_for_data(self):
+        stream = streams.PipeStream()
+        reader = asyncio.ensure_future(stream.read(6))
+        await stream.write(b'abc')
+        await asyncio.sleep(0)
+
+        assert not reader.done()
+
+        await stream.write(b'def')
+        assert await reader == b'abcdef'
+
+    @pytest.mark.asyncio
+    async def test_write_applies_backpressure(self):
+        stream = streams.PipeStream(max_buffer=4)
+        writer = asyncio.ensure_future(stream.write(b'12345'))
+        await asyncio.sleep(0)
+
+        assert not writer.done()
+        assert stream.buffered == 5
+
+        assert await stream.read(2) == b'12'
+        await writer
+        assert stream.buffered == 3
+
+    @pytest.mark.asyncio
+    async def test_large_read_does_not_deadlock(self):
+        stream = streams.PipeStream(max_buffer=2)
+        reader = asyncio.ensure_future(stream.read(6))
+
+        for chunk in (b'ab', b'cd', b'ef'):
+            await stream.write(chunk)
+
+        assert await reader == b'abcdef'
+
+    @pytest.mark.asyncio
+    async def test_close_releases_writer(self):
+        stream = streams.PipeStream(max_buffer=1)
+        writer = asyncio.ensure_future(stream.write(b'abc'))
+        await asyncio.sleep(0)
+
+        stream.close()
+        await writer
+        await stream.write(b'ignored')
+
+        assert stream.buffered == 0
+        assert stream.at_eof()
+
+    @pytest.mark.asyncio
+    async def test_write_after_eof(self):
+        stream = streams.PipeStream()
+        stream.write_eof()
+
+        with pytest.raises(RuntimeError):
+            await stream.write(b'abc')
+
+    @pytest.mark.asyncio
+    async def test_tees_to_readers(self):
+        stream = streams.PipeStream()
+        tee = asyncio.StreamReader()
+        stream.add_reader('tee', tee)
+        await stream.write(b'abc')
+        stream.write_eof()
+
+        assert await stream.read() == b'abc'
+        assert await stream.read() == b''
+        assert await tee.read() == b'abc'
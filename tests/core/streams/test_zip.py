@@ -1,10 +1,13 @@
 import io
+import gzip
 import os
 import zipfile
 
 import pytest
 
+from waterbutler.core import cache
 from waterbutler.core import streams
+from waterbutler.core import exceptions
 from waterbutler.core.utils import AsyncIterator
 
 from tests.utils import temp_files
@@ -164,3 +167,175 @@ class TestZipStreamReader:
                 assert compression_type == zipfile.ZIP_STORED
             else:
                 assert compression_type != zipfile.ZIP_STORED
+
+    @pytest.mark.asyncio
+    async def test_compressed_mimetypes_are_stored(self):
+        files = AsyncIterator([
+            ('photo.jpg', streams.StringStream('[Not Really A JPEG]')),
+            ('movie.mp4', streams.StringStream('[Not Really An MP4]')),
+            ('notes.txt', streams.StringStream('[Plain Text]')),
+        ])
+
+        data = await streams.ZipStreamReader(files).read()
+        zip = zipfile.ZipFile(io.BytesIO(data))
+
+        assert zip.testzip() is None
+        assert zip.getinfo('photo.jpg').compress_type == zipfile.ZIP_STORED
+        assert zip.getinfo('movie.mp4').compress_type == zipfile.ZIP_STORED
+        assert zip.getinfo('notes.txt').compress_type == zipfile.ZIP_DEFLATED
+        assert zip.read('photo.jpg') == b'[Not Really A JPEG]'
+
+    @pytest.mark.asyncio
+    async def test_compressed_content_is_sniffed(self):
+        contents = gzip.compress(os.urandom(2 ** 12))
+        files = AsyncIterator([
+            ('no-extension', streams.StringStream(contents)),
+            ('also-no-extension', streams.StringStream(b'\x00' * 2 ** 12)),
+        ])
+
+        data = await streams.ZipStreamReader(files).read()
+        zip = zipfile.ZipFile(io.BytesIO(data))
+
+        assert zip.testzip() is None
+        assert zip.getinfo('no-extension').compress_type == zipfile.ZIP_STORED
+        assert zip.getinfo('also-no-extension').compress_type == zipfile.ZIP_DEFLATED
+        assert zip.read('no-extension') == contents
+        assert zip.read('also-no-extension') == b'\x00' * 2 ** 12
+
+    @pytest.mark.asyncio
+    async def test_large_chunks_are_compressed_off_loop(self, monkeypatch):
+        monkeypatch.setattr(streams.zip.settings, 'ZIP_COMPRESSION_OFFLOAD_BYTES', 1024)
+        contents = b'[Compressible Content]' * 2 ** 12
+        files = AsyncIterator([('big.txt', streams.StringStream(contents))])
+
+        stream = streams.ZipStreamReader(files)
+        data = b''
+        chunk = await stream.read(4096)
+        while chunk:
+            data += chunk
+            chunk = await stream.read(4096)
+
+        zip = zipfile.ZipFile(io.BytesIO(data))
+
+        assert zip.testzip() is None
+        assert zip.getinfo('big.txt').compress_size < len(contents)
+        assert zip.read('big.txt') == contents
+
+
+class RangedFiles:
+    """Serves the content of stored zip entries, honoring ranges unless ``ignore_ranges``."""
+
+    def __init__(self, contents, ignore_ranges=False):
+        self.contents = contents
+        self.ignore_ranges = ignore_ranges
+        self.opened = []
+
+    async def open(self, entry, byte_range):
+        self.opened.append((entry.path, byte_range))
+        content = self.contents[entry.path]
+        if byte_range is None or self.ignore_ranges:
+            return streams.ByteStream(content)
+        stream = streams.ByteStream(content[byte_range[0]:byte_range[1] + 1])
+        stream.partial = True
+        return stream
+
+
+def stored_archive(contents):
+    entries = [
+        streams.StoredZipEntry(name, len(content), (2017, 1, 1, 0, 0, 0), path=name,
+                               crc_key=name)
+        for name, content in sorted(contents.items())
+    ]
+    entries.append(streams.StoredZipEntry('empty/', 0, (2017, 1, 1, 0, 0, 0)))
+    return streams.StoredZipArchive(entries)
+
+
+async def read_all(stream, chunk_size=100):
+    data = b''
+    chunk = await stream.read(chunk_size)
+    while chunk:
+        data += chunk
+        chunk = await stream.read(chunk_size)
+    return data
+
+
+STORED_CONTENTS = {
+    'file1.txt': b'[File One]' * 30,
+    'folder/file2.txt': os.urandom(2 ** 10),
+    'empty.txt': b'',
+}
+
+
+class TestStoredZipStreamReader:
+
+    @pytest.mark.asyncio
+    async def test_whole_archive(self):
+        archive = stored_archive(STORED_CONTENTS)
+        stream = streams.StoredZipStreamReader(archive, RangedFiles(STORED_CONTENTS).open)
+
+        assert stream.size == archive.size
+        assert not stream.partial
+
+        data = await read_all(stream)
+        zip = zipfile.ZipFile(io.BytesIO(data))
+
+        assert len(data) == archive.size
+        assert zip.testzip() is None
+        for name, content in STORED_CONTENTS.items():
+            assert zip.getinfo(name).compress_type == zipfile.ZIP_STORED
+            assert zip.read(name) == content
+        assert zip.getinfo('empty/').is_dir()
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize('ignore_ranges', [False, True])
+    async def test_ranges_match_whole_archive(self, ignore_ranges):
+        files = RangedFiles(STORED_CONTENTS, ignore_ranges=ignore_ranges)
+        whole = await read_all(streams.StoredZipStreamReader(stored_archive(STORED_CONTENTS),
+                                                             files.open))
+
+        for start, end in ((0, 10), (40, 400), (500, None), (len(whole) - 30, None), (7, 7)):
+            stream = streams.StoredZipStreamReader(stored_archive(STORED_CONTENTS), files.open,
+                                                   byte_range=(start, end))
+            expected = whole[start:None if end is None else end + 1]
+
+            assert stream.partial
+            assert stream.size == len(expected)
+            assert await read_all(stream, chunk_size=33) == expected
+
+    @pytest.mark.asyncio
+    async def test_range_reads_only_what_is_needed(self):
+        files = RangedFiles(STORED_CONTENTS)
+        archive = stored_archive(STORED_CONTENTS)
+        file2 = [entry for entry in archive.entries if entry.path == 'folder/file2.txt'][0]
+        data_start = file2.zinfo.header_offset + len(file2.header)
+
+        stream = streams.StoredZipStreamReader(archive, files.open,
+                                               byte_range=(data_start + 10, data_start + 19))
+        await read_all(stream)
+
+        assert files.opened == [('folder/file2.txt', (10, 19))]
+
+    @pytest.mark.asyncio
+    async def test_resume_uses_cached_checksums(self):
+        crc_cache = cache.MemoryCache()
+        files = RangedFiles(STORED_CONTENTS)
+        whole = await read_all(streams.StoredZipStreamReader(
+            stored_archive(STORED_CONTENTS), files.open, crc_cache=crc_cache
+        ))
+        files.opened = []
+
+        stream = streams.StoredZipStreamReader(stored_archive(STORED_CONTENTS), files.open,
+                                               byte_range=(len(whole) - 200, None),
+                                               crc_cache=crc_cache)
+
+        assert await read_all(stream) == whole[-200:]
+        assert files.opened == []
+
+    @pytest.mark.asyncio
+    async def test_short_file_raises(self):
+        contents = dict(STORED_CONTENTS, **{'file1.txt': b'short'})
+        archive = stored_archive(STORED_CONTENTS)
+        stream = streams.StoredZipStreamReader(archive, RangedFiles(contents).open)
+
+        with pytest.raises(exceptions.DownloadError):
+            await read_all(stream)
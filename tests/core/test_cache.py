@@ -0,0 +1,216 @@
+import asyncio
+from unittest import mock
+
+import pytest
+
+from waterbutler.core import cache
+from waterbutler.core.path import WaterButlerPath
+from waterbutler.providers.github.path import GitHubPath
+
+
+class TestMemoryCache:
+
+    @pytest.mark.asyncio
+    async def test_set_get(self):
+        store = cache.MemoryCache(maxsize=2, ttl=60)
+        await store.set('foo', 'bar')
+
+        assert await store.get('foo') == 'bar'
+        assert await store.get('baz') is None
+        assert store.stats() == {'size': 1, 'hits': 1, 'misses': 1}
+
+    @pytest.mark.asyncio
+    async def test_evicts_least_recently_used(self):
+        store = cache.MemoryCache(maxsize=2, ttl=60)
+        await store.set('a', 1)
+        await store.set('b', 2)
+        await store.get('a')
+        await store.set('c', 3)
+
+        assert await store.get('a') == 1
+        assert await store.get('b') is None
+        assert await store.get('c') == 3
+
+    @pytest.mark.asyncio
+    async def test_expires(self):
+        store = cache.MemoryCache(maxsize=2, ttl=60)
+        with mock.patch('waterbutler.core.cache.time.monotonic', return_value=100):
+            await store.set('a', 1, ttl=5)
+        with mock.patch('waterbutler.core.cache.time.monotonic', return_value=106):
+            assert await store.get('a') is None
+        assert len(store) == 0
+
+    @pytest.mark.asyncio
+    async def test_delete(self):
+        store = cache.MemoryCache()
+        await store.set('a', 1)
+        await store.set('b', 2)
+        await store.delete('a', 'missing')
+
+        assert await store.get('a') is None
+        assert await store.get('b') == 2
+
+
+class TestMakeCache:
+
+    def test_memory(self):
+        store = cache.make_cache('memory', maxsize=5, ttl=3, url='redis://', prefix='foo')
+        assert isinstance(store, cache.MemoryCache)
+        assert store.maxsize == 5
+        assert store.ttl == 3
+
+    def test_unknown(self):
+        with pytest.raises(ValueError):
+            cache.make_cache('memcached')
+
+
+class TestSingleFlight:
+
+    @pytest.mark.asyncio
+    async def test_collapses_concurrent_calls(self):
+        flight = cache.SingleFlight()
+        calls = []
+
+        async def work(value):
+            calls.append(value)
+            await asyncio.sleep(0.01)
+            return value
+
+        results = await asyncio.gather(*[flight.do('key', work, 'foo') for _ in range(5)])
+
+        assert results == ['foo'] * 5
+        assert calls == ['foo']
+        assert flight.stats() == {'calls': 1, 'collapsed': 4}
+
+    @pytest.mark.asyncio
+    async def test_exceptions_are_shared(self):
+        flight = cache.SingleFlight()
+
+        async def work():
+            await asyncio.sleep(0.01)
+            raise ValueError('boom')
+
+        results = await asyncio.gather(flight.do('key', work), flight.do('key', work),
+                                       return_exceptions=True)
+
+        assert all(isinstance(result, ValueError) for result in results)
+        assert flight.stats()['calls'] == 1
+
+    @pytest.mark.asyncio
+    async def test_forgets_finished_calls(self):
+        flight = cache.SingleFlight()
+
+        async def work(value):
+            return value
+
+        assert await flight.do('key', work, 1) == 1
+        assert await flight.do('key', work, 2) == 2
+        assert flight.stats() == {'calls': 2, 'collapsed': 0}
+
+
+@pytest.fixture
+def metadata_cache():
+    return cache.MetadataCache(cache.MemoryCache(), default_ttl=30, ttls={'box': 0, 'github': 90})
+
+
+class TestMetadataCache:
+
+    def test_ttls(self, metadata_cache):
+        assert metadata_cache.ttl_for('s3') == 30
+        assert metadata_cache.ttl_for('github') == 90
+        assert metadata_cache.enabled_for('s3') is True
+        assert metadata_cache.enabled_for('box') is False
+        assert metadata_cache.max_ttl == 90
+
+    @pytest.mark.asyncio
+    async def test_keyed_by_identity_and_path(self, metadata_cache):
+        path = WaterButlerPath('/folder/file.txt')
+        await metadata_cache.set('one', path, 'metadata', ttl=30)
+
+        assert await metadata_cache.get('one', path) == 'metadata'
+        assert await metadata_cache.get('two', path) is None
+        assert await metadata_cache.get('one', WaterButlerPath('/folder/other.txt')) is None
+
+    @pytest.mark.asyncio
+    async def test_keyed_by_identifiers(self, metadata_cache):
+        main = GitHubPath('/folder/', _ids=[('main', None), ('main', None)], folder=True)
+        feature = GitHubPath('/folder/', _ids=[('feature', None), ('feature', None)], folder=True)
+        await metadata_cache.set('one', main, 'main listing', ttl=30)
+        await metadata_cache.set('one', feature, 'feature listing', ttl=30)
+
+        assert await metadata_cache.get('one', main) == 'main listing'
+        assert await metadata_cache.get('one', feature) == 'feature listing'
+
+        await metadata_cache.invalidate('one', main.child('file.txt'))
+
+        assert await metadata_cache.get('one', main) is None
+        assert await metadata_cache.get('one', feature) == 'feature listing'
+
+    @pytest.mark.asyncio
+    async def test_file_write_invalidates_file_and_parent(self, metadata_cache):
+        folder = WaterButlerPath('/folder/')
+        path = WaterButlerPath('/folder/file.txt')
+        sibling = WaterButlerPath('/folder/other.txt')
+        for entry in (folder, path, sibling):
+            await metadata_cache.set('one', entry, 'metadata', ttl=30)
+
+        await metadata_cache.invalidate('one', path)
+
+        assert await metadata_cache.get('one', folder) is None
+        assert await metadata_cache.get('one', path) is None
+        assert await metadata_cache.get('one', sibling) == 'metadata'
+
+    @pytest.mark.asyncio
+    async def test_folder_write_invalidates_identity(self, metadata_cache):
+        path = WaterButlerPath('/elsewhere/file.txt')
+        await metadata_cache.set('one', path, 'metadata', ttl=30)
+        await metadata_cache.set('two', path, 'metadata', ttl=30)
+
+        await metadata_cache.invalidate('one', WaterButlerPath('/folder/'))
+
+        assert await metadata_cache.get('one', path) is None
+        assert await metadata_cache.get('two', path) == 'metadata'
+
+
+@pytest.fixture
+def path_id_cache():
+    return cache.PathIdCache(cache.MemoryCache(), ttl=30)
+
+
+class TestPathIdCache:
+
+    @pytest.mark.asyncio
+    async def test_keyed_by_identity_parent_name_and_kind(self, path_id_cache):
+        await path_id_cache.set('one', 'root', 'a', True, {'id': 'a-id'})
+
+        assert await path_id_cache.get('one', 'root', 'a', True) == {'id': 'a-id'}
+        assert await path_id_cache.get('one', 'root', 'a', False) is None
+        assert await path_id_cache.get('one', 'other', 'a', True) is None
+        assert await path_id_cache.get('two', 'root', 'a', True) is None
+
+    @pytest.mark.asyncio
+    async def test_forget(self, path_id_cache):
+        await path_id_cache.set('one', 'root', 'a', True, {'id': 'a-id'})
+        await path_id_cache.set('one', 'root', 'a', False, {'id': 'a-file-id'})
+        await path_id_cache.set('one', 'root', 'b', False, {'id': 'b-id'})
+
+        await path_id_cache.forget('one', 'root', 'a')
+
+        assert await path_id_cache.get('one', 'root', 'a', True) is None
+        assert await path_id_cache.get('one', 'root', 'a', False) is None
+        assert await path_id_cache.get('one', 'root', 'b', False) == {'id': 'b-id'}
+
+    @pytest.mark.asyncio
+    async def test_invalidate(self, path_id_cache):
+        await path_id_cache.set('one', 'root', 'a', True, {'id': 'a-id'})
+        await path_id_cache.set('two', 'root', 'a', True, {'id': 'a-id'})
+
+        await path_id_cache.invalidate('one')
+
+        assert await path_id_cache.get('one', 'root', 'a', True) is None
+        assert await path_id_cache.get('two', 'root', 'a', True) == {'id': 'a-id'}
+
+    def test_disabled(self, monkeypatch):
+        monkeypatch.setattr(cache.settings, 'PATH_ID_CACHE_TTL', 0)
+
+        assert cache.get_path_id_cache() is None
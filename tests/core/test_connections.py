@@ -0,0 +1,67 @@
+import asyncio
+from unittest import mock
+
+import pytest
+
+from waterbutler.core import metrics
+from waterbutler.core import connections
+
+
+@pytest.fixture
+def loop():
+    return asyncio.new_event_loop()
+
+
+@pytest.fixture
+def pool(loop):
+    return connections.ConnectorPool(limit=5, keepalive_timeout=10, loop=loop)
+
+
+class TestConnectorPool:
+
+    def test_key_fills_in_default_port(self):
+        assert (connections.ConnectorPool.key('https://foo.com/bar') ==
+                connections.ConnectorPool.key('https://FOO.com:443/baz'))
+        assert (connections.ConnectorPool.key('http://foo.com/') ==
+                ('http', 'foo.com', 80, True))
+
+    def test_key_includes_tls_settings(self):
+        assert (connections.ConnectorPool.key('https://foo.com/') !=
+                connections.ConnectorPool.key('https://foo.com/', verify_ssl=False))
+
+    def test_reuses_connector_per_host(self, pool):
+        first = pool.get('https://foo.com/a')
+        second = pool.get('https://foo.com/b?c=d')
+        other = pool.get('https://bar.com/a')
+
+        assert first is second
+        assert first is not other
+        assert pool.stats() == {'hosts': 2, 'hits': 1, 'misses': 2}
+
+    def test_separate_connector_without_verification(self, pool):
+        assert pool.get('https://foo.com/') is not pool.get('https://foo.com/', verify_ssl=False)
+
+    def test_records_metrics(self, pool):
+        record = metrics.MetricsRecord('provider')
+        pool.get('https://foo.com/', metrics=record)
+        pool.get('https://foo.com/', metrics=record)
+        pool.get('https://foo.com/', metrics=record)
+
+        assert record.serialize() == {'connection_pool': {'hits': 2, 'misses': 1}}
+
+    def test_close_drops_connectors(self, pool):
+        connector = pool.get('https://foo.com/')
+        pool.close()
+
+        assert pool.stats()['hosts'] == 0
+        assert pool.get('https://foo.com/') is not connector
+
+
+class TestGetConnector:
+
+    def test_pool_per_loop(self, loop):
+        assert connections.get_pool(loop=loop) is connections.get_pool(loop=loop)
+
+    def test_disabled(self, loop):
+        with mock.patch.object(connections.settings, 'CONNECTION_POOL_ENABLED', False):
+            assert connections.get_connector('https://foo.com/', loop=loop) is None
@@ -0,0 +1,25 @@
+import threading
+
+import pytest
+
+from waterbutler.core import fileio
+
+
+class TestFileIO:
+
+    def test_executor_is_shared(self):
+        assert fileio.get_executor() is fileio.get_executor()
+
+    @pytest.mark.asyncio
+    async def test_run(self):
+        assert await fileio.run(int, '10', base=2) == 2
+
+    @pytest.mark.asyncio
+    async def test_run_off_the_event_loop(self):
+        thread = await fileio.run(threading.current_thread)
+        assert thread is not threading.current_thread()
+
+    @pytest.mark.asyncio
+    async def test_run_raises(self):
+        with pytest.raises(FileNotFoundError):
+            await fileio.run(open, '/does/not/exist')
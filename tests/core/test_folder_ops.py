@@ -0,0 +1,289 @@
+import asyncio
+
+import pytest
+
+from tests import utils
+from waterbutler.core import exceptions
+from waterbutler.core.path import WaterButlerPath
+from waterbutler.core.folder_ops import FolderOpExecutor, FolderOpProgress
+
+
+class Item:
+
+    def __init__(self, name, is_folder=False, size=0, etag='1'):
+        self.name = name
+        self.is_folder = is_folder
+        self.size = size
+        self.etag = etag
+        self.modified = None
+        self.children = None
+
+
+class TreeProvider(utils.MockProvider1):
+    """Keeps files and folders in ``tree``, a dict of folder path to the items in it, and records
+    what it copies, creates and deletes."""
+
+    NAME = 'TreeProvider'
+
+    def __init__(self, tree=None, failures=None, delay=0):
+        super().__init__({}, {}, {})
+        self.tree = tree or {}
+        self.failures = failures or {}
+        self.delay = delay
+        self.running = 0
+        self.max_running = 0
+        self.copied = []
+        self.created = []
+        self.deleted = []
+
+    async def _busy(self, key):
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        try:
+            await asyncio.sleep(self.delay)
+        finally:
+            self.running -= 1
+        if self.failures.get(key):
+            self.failures[key] -= 1
+            raise exceptions.ProviderError('Service unavailable', code=503)
+
+    def _find(self, path):
+        for item in self.tree.get(path.parent.path, []):
+            if item.name == path.name and item.is_folder == path.is_dir:
+                return item
+        raise exceptions.NotFoundError(path.path)
+
+    async def metadata(self, path, **kwargs):
+        await self._busy(path.path)
+        if path.is_dir:
+            return list(self.tree[path.path])
+        return self._find(path)
+
+    async def copy(self, dest_provider, src_path, dest_path, **kwargs):
+        assert kwargs == {'handle_naming': False}
+        await self._busy(src_path.path)
+        source = self._find(src_path)
+        self.copied.append(dest_path.path)
+        item = Item(dest_path.name, is_folder=source.is_folder, size=source.size,
+                    etag=source.etag)
+        self.tree[dest_path.parent.path].append(item)
+        return item, True
+
+    move = copy
+
+    async def create_folder(self, path, **kwargs):
+        self.created.append(path.path)
+        item = Item(path.name, is_folder=True)
+        self.tree[path.parent.path].append(item)
+        self.tree[path.path] = []
+        return item
+
+    async def delete(self, path, **kwargs):
+        self.deleted.append(path.path)
+        self.tree[path.parent.path].remove(self._find(path))
+
+
+class MemoryJournal:
+
+    def __init__(self):
+        self.data = {}
+
+    async def entries(self):
+        return dict(self.data)
+
+    async def record(self, key, entry):
+        self.data[key] = entry
+
+
+def tree():
+    return {
+        '': [Item('src', is_folder=True)],
+        'src/': [Item('a', is_folder=True), Item('top.txt', size=3)],
+        'src/a/': [Item('b', is_folder=True), Item('one.txt', size=5), Item('two.txt', size=7)],
+        'src/a/b/': [],
+    }
+
+
+async def run(provider, move=False, **kwargs):
+    executor = FolderOpExecutor(provider.move if move else provider.copy, provider, provider,
+                                is_move=move, backoff=0, **kwargs)
+    return executor, await executor.run(WaterButlerPath('/src/'), WaterButlerPath('/dest/'))
+
+
+class TestFolderOpExecutor:
+
+    @pytest.mark.asyncio
+    async def test_copies_tree(self):
+        provider = TreeProvider(tree())
+
+        executor, (folder, created) = await run(provider)
+
+        assert created
+        assert sorted(provider.copied) == ['dest/a/one.txt', 'dest/a/two.txt', 'dest/top.txt']
+        assert provider.created == ['dest/', 'dest/a/', 'dest/a/b/']
+        assert [child.name for child in folder.children] == ['a', 'top.txt']
+        assert [child.name for child in folder.children[0].children] == ['b', 'one.txt', 'two.txt']
+        assert folder.children[0].children[0].children == []
+
+    @pytest.mark.asyncio
+    async def test_concurrency_is_shared_by_the_whole_tree(self):
+        provider = TreeProvider(tree(), delay=0.01)
+
+        await run(provider, concurrency=2)
+
+        assert provider.max_running == 2
+
+    @pytest.mark.asyncio
+    async def test_move_deletes_walked_subfolders(self):
+        provider = TreeProvider(tree())
+
+        await run(provider, move=True)
+
+        assert 'src/a/' in provider.deleted
+        assert 'src/a/b/' in provider.deleted
+        assert 'src/' not in provider.deleted
+
+    @pytest.mark.asyncio
+    async def test_replaces_destination(self):
+        provider = TreeProvider(tree())
+        provider.tree[''].append(Item('dest', is_folder=True))
+        provider.tree['dest/'] = [Item('old.txt')]
+
+        _, (folder, created) = await run(provider)
+
+        assert not created
+        assert 'dest/' in provider.deleted
+        assert [item.name for item in provider.tree['dest/']] == ['a', 'top.txt']
+
+    @pytest.mark.asyncio
+    async def test_intra_folders_are_sent_whole(self):
+        provider = TreeProvider(tree())
+        provider.can_intra_copy = lambda other, path=None: True
+
+        await run(provider)
+
+        assert sorted(provider.copied) == ['dest/a/', 'dest/top.txt']
+        assert provider.created == ['dest/']
+
+    @pytest.mark.asyncio
+    async def test_retries_server_errors(self):
+        provider = TreeProvider(tree(), failures={'src/a/one.txt': 2})
+
+        executor, _ = await run(provider, retries=2)
+
+        assert 'dest/a/one.txt' in provider.copied
+        assert executor.progress.retries == 2
+
+    @pytest.mark.asyncio
+    async def test_raises_once_retries_run_out(self):
+        provider = TreeProvider(tree(), failures={'src/a/one.txt': 2})
+
+        with pytest.raises(exceptions.ProviderError) as e:
+            await run(provider, retries=1)
+
+        assert e.value.code == 503
+
+    @pytest.mark.asyncio
+    async def test_client_errors_are_not_retried(self):
+        provider = TreeProvider(tree())
+
+        async def forbidden(*args, **kwargs):
+            raise exceptions.ProviderError('Forbidden', code=403)
+        provider.metadata = forbidden
+
+        with pytest.raises(exceptions.ProviderError):
+            await run(provider, retries=3)
+
+    @pytest.mark.asyncio
+    async def test_progress(self):
+        provider = TreeProvider(tree())
+        progress = FolderOpProgress()
+        updates = []
+        progress.listeners.append(lambda progress: updates.append(progress.serialize()))
+
+        await run(provider, progress=progress)
+
+        serialized = progress.serialize()
+        assert serialized.pop('current').startswith('/src/')
+        assert serialized == {
+            'folders_total': 3,
+            'folders_done': 3,
+            'files_total': 3,
+            'files_done': 3,
+            'bytes_total': 15,
+            'bytes_done': 15,
+            'retries': 0,
+        }
+        assert updates[-1] == progress.serialize()
+        assert all(update['files_done'] <= update['files_total'] for update in updates)
+
+
+class TestFolderOpJournal:
+
+    async def interrupted(self, journal, move=False):
+        """Run until ``src/a/two.txt``, the last item, fails."""
+        provider = TreeProvider(tree(), failures={'src/a/two.txt': 1})
+        with pytest.raises(exceptions.ProviderError):
+            await run(provider, move=move, journal=journal, concurrency=1, retries=0)
+        return provider
+
+    @pytest.mark.asyncio
+    async def test_records_progress(self):
+        journal = MemoryJournal()
+
+        await self.interrupted(journal)
+
+        assert journal.data['/src/'] == {'state': 'created', 'name': 'dest', 'created': True}
+        assert journal.data['/src/a/b/']['state'] == 'done'
+        assert journal.data['/src/a/one.txt'] == {
+            'state': 'done', 'source': [5, '1', None], 'size': 5, 'etag': '1',
+        }
+        assert '/src/a/two.txt' not in journal.data
+
+    @pytest.mark.asyncio
+    async def test_resumes(self):
+        journal = MemoryJournal()
+        provider = await self.interrupted(journal)
+        provider.copied, provider.created, provider.deleted = [], [], []
+
+        _, (folder, created) = await run(provider, journal=journal)
+
+        assert created
+        assert provider.copied == ['dest/a/two.txt']
+        assert provider.created == []
+        assert provider.deleted == []
+        assert [child.name for child in folder.children] == ['a', 'top.txt']
+        assert [child.name for child in folder.children[0].children] == ['b', 'one.txt', 'two.txt']
+
+    @pytest.mark.asyncio
+    async def test_resends_changed_files(self):
+        journal = MemoryJournal()
+        provider = await self.interrupted(journal)
+        provider.tree['src/'][1].etag = '2'
+        provider.tree['dest/a/'][1].size = 1
+        provider.copied = []
+
+        await run(provider, journal=journal)
+
+        assert sorted(provider.copied) == ['dest/a/one.txt', 'dest/a/two.txt', 'dest/top.txt']
+
+    @pytest.mark.asyncio
+    async def test_recreates_missing_folders(self):
+        journal = MemoryJournal()
+        provider = await self.interrupted(journal)
+        await provider.delete(WaterButlerPath('/dest/a/'))
+        provider.copied, provider.created = [], []
+
+        await run(provider, journal=journal)
+
+        assert provider.created == ['dest/a/', 'dest/a/b/']
+        assert sorted(provider.copied) == ['dest/a/one.txt', 'dest/a/two.txt']
+
+    @pytest.mark.asyncio
+    async def test_resumed_move_lists_destination(self):
+        journal = MemoryJournal()
+        provider = await self.interrupted(journal, move=True)
+
+        _, (folder, created) = await run(provider, move=True, journal=journal)
+
+        assert [child.name for child in folder.children] == ['a', 'top.txt']
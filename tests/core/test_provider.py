@@ -1,9 +1,16 @@
+import asyncio
+
 import pytest
 
 from tests import utils
 from unittest import mock
+from waterbutler import settings
+from waterbutler.core import cache
+from waterbutler.core import streams
 from waterbutler.core import metadata
+from waterbutler.core import ratelimit
 from waterbutler.core import exceptions
+from waterbutler.core.path import WaterButlerPath
 
 
 @pytest.fixture
@@ -16,6 +23,39 @@ def provider2():
     return utils.MockProvider2({'user': 'name'}, {'pass': 'phrase'}, {})
 
 
+class SlowMetadataProvider(utils.MockProvider1):
+
+    NAME = 'SlowMetadataProvider'
+
+    def __init__(self, *args, **kwargs):
+        self.calls = []
+        super().__init__(*args, **kwargs)
+
+    async def metadata(self, path, **kwargs):
+        self.calls.append(path)
+        await asyncio.sleep(0.01)
+        return utils.MockFolderMetadata()
+
+
+class OverwritingProvider(utils.MockProvider1):
+    """Uploads like most providers do: check whether the file exists, write it, then read back
+    its metadata."""
+
+    NAME = 'OverwritingProvider'
+
+    def __init__(self, *args, **kwargs):
+        self.version = 1
+        super().__init__(*args, **kwargs)
+
+    async def metadata(self, path, **kwargs):
+        return {'version': self.version}
+
+    async def upload(self, stream, path, **kwargs):
+        exists = await self.exists(path)
+        self.version += 1
+        return (await self.metadata(path)), not exists
+
+
 class TestBaseProvider:
 
     def test_eq(self, provider1, provider2):
@@ -481,3 +521,262 @@ class TestMove:
         assert 'bytes=10-' == provider1._build_range_header((10, None))
         assert 'bytes=10-100' == provider1._build_range_header((10, 100))
         assert 'bytes=-255' == provider1._build_range_header((None, 255))
+
+
+class TestSingleFlight:
+
+    @pytest.mark.asyncio
+    async def test_collapses_identical_calls(self):
+        leader = SlowMetadataProvider({}, {'pass': 'word'}, {})
+        follower = SlowMetadataProvider({}, {'pass': 'word'}, {})
+        path = await leader.validate_path('/folder/')
+
+        # Scheduled in order, so ``leader`` makes the call; gather alone doesn't keep the order
+        calls = [asyncio.ensure_future(leader.metadata(path)),
+                 asyncio.ensure_future(follower.metadata(path))]
+        first, second = await asyncio.gather(*calls)
+
+        assert len(leader.calls) == 1
+        assert len(follower.calls) == 0
+        assert first is not second
+        assert first.name == second.name
+        assert follower.provider_metrics.serialize()['single_flight'] == {
+            'metadata': {'collapsed': 1}
+        }
+
+    @pytest.mark.asyncio
+    async def test_different_credentials_not_collapsed(self):
+        one = SlowMetadataProvider({}, {'pass': 'word'}, {})
+        two = SlowMetadataProvider({}, {'pass': 'phrase'}, {})
+        path = await one.validate_path('/folder/')
+
+        await asyncio.gather(one.metadata(path), two.metadata(path))
+
+        assert len(one.calls) == 1
+        assert len(two.calls) == 1
+
+    @pytest.mark.asyncio
+    async def test_different_arguments_not_collapsed(self):
+        provider = SlowMetadataProvider({}, {'pass': 'word'}, {})
+        path = await provider.validate_path('/folder/')
+
+        await asyncio.gather(provider.metadata(path), provider.metadata(path, revision='1'))
+
+        assert len(provider.calls) == 2
+
+    @pytest.mark.asyncio
+    async def test_sequential_calls_not_collapsed(self):
+        provider = SlowMetadataProvider({}, {'pass': 'word'}, {})
+        path = await provider.validate_path('/folder/')
+
+        await provider.metadata(path)
+        await provider.metadata(path)
+
+        assert len(provider.calls) == 2
+
+    @pytest.mark.asyncio
+    async def test_disabled(self, monkeypatch):
+        monkeypatch.setattr('waterbutler.settings.PROVIDER_SINGLE_FLIGHT', False)
+        leader = SlowMetadataProvider({}, {'pass': 'word'}, {})
+        follower = SlowMetadataProvider({}, {'pass': 'word'}, {})
+        path = await leader.validate_path('/folder/')
+
+        await asyncio.gather(leader.metadata(path), follower.metadata(path))
+
+        assert len(leader.calls) == 1
+        assert len(follower.calls) == 1
+
+
+@pytest.fixture
+def metadata_cache(monkeypatch):
+    metadata_cache = cache.MetadataCache(cache.MemoryCache(), default_ttl=30)
+    monkeypatch.setattr('waterbutler.core.provider.get_metadata_cache', lambda: metadata_cache)
+    return metadata_cache
+
+
+class TestMetadataCache:
+
+    @pytest.mark.asyncio
+    async def test_caches_metadata(self, metadata_cache):
+        provider = SlowMetadataProvider({}, {'pass': 'word'}, {})
+        path = WaterButlerPath('/folder/')
+
+        first = await provider.metadata(path)
+        second = await provider.metadata(path)
+
+        assert len(provider.calls) == 1
+        assert first is not second
+        assert provider.provider_metrics.serialize()['metadata_cache'] == {'hits': 1, 'misses': 1}
+
+    @pytest.mark.asyncio
+    async def test_revisions_bypass_cache(self, metadata_cache):
+        provider = SlowMetadataProvider({}, {'pass': 'word'}, {})
+        path = WaterButlerPath('/folder/file.txt')
+
+        await provider.metadata(path, revision='abc')
+        await provider.metadata(path, revision='abc')
+
+        assert len(provider.calls) == 2
+
+    @pytest.mark.asyncio
+    async def test_upload_invalidates_parent(self, metadata_cache):
+        provider = SlowMetadataProvider({}, {'pass': 'word'}, {})
+        folder = WaterButlerPath('/folder/')
+
+        await provider.metadata(folder)
+        await provider.upload(None, WaterButlerPath('/folder/file.txt'))
+        await provider.metadata(folder)
+
+        assert len(provider.calls) == 2
+
+    @pytest.mark.asyncio
+    async def test_overwrite_upload_returns_new_metadata(self, metadata_cache):
+        provider = OverwritingProvider({}, {'pass': 'word'}, {})
+        path = WaterButlerPath('/folder/file.txt')
+
+        assert await provider.metadata(path) == {'version': 1}
+        metadata, created = await provider.upload(None, path)
+
+        assert metadata == {'version': 2}
+        assert not created
+        assert await provider.metadata(path) == {'version': 2}
+
+    @pytest.mark.asyncio
+    async def test_failed_transfer_invalidates_destination(self, metadata_cache):
+        src = SlowMetadataProvider({}, {'pass': 'word'}, {})
+        dest = SlowMetadataProvider({}, {'pass': 'phrase'}, {})
+        folder = WaterButlerPath('/folder/')
+
+        await dest.metadata(folder)
+        with pytest.raises(NotImplementedError):
+            await src.intra_copy(dest, WaterButlerPath('/file.txt'), folder)
+        await dest.metadata(folder)
+
+        assert len(dest.calls) == 2
+
+    @pytest.mark.asyncio
+    async def test_disabled_for_provider(self, metadata_cache):
+        metadata_cache.ttls['SlowMetadataProvider'] = 0
+        provider = SlowMetadataProvider({}, {'pass': 'word'}, {})
+        path = WaterButlerPath('/folder/')
+
+        await provider.metadata(path)
+        await provider.metadata(path)
+
+        assert len(provider.calls) == 2
+
+
+def mock_response(status, content_range=None, etag=None, retry_after=None):
+    headers = {}
+    if retry_after is not None:
+        headers['Retry-After'] = retry_after
+    if content_range is not None:
+        headers['Content-Range'] = content_range
+    if etag is not None:
+        headers['ETag'] = etag
+    return mock.Mock(status=status, headers=headers, release=utils.MockCoroutine(),
+                     read=utils.MockCoroutine(return_value=b'x' * 10))
+
+
+class TestMakeRequest:
+
+    @pytest.mark.asyncio
+    async def test_retries_rate_limited(self, provider1):
+        responses = [mock_response(429, retry_after='0'), mock_response(200)]
+        with mock.patch('aiohttp.request', utils.MockCoroutine(side_effect=responses)) as request:
+            resp = await provider1.make_request('GET', 'http://foo.com/', expects=(200, ))
+
+        assert resp.status == 200
+        assert request.call_count == 2
+        assert responses[0].release.called
+
+    @pytest.mark.asyncio
+    async def test_rate_limit_does_not_delay_other_requests(self, provider1):
+        limited = mock_response(429, retry_after='3600')
+        with mock.patch('aiohttp.request', utils.MockCoroutine(return_value=limited)) as request:
+            resp = await provider1.make_request('GET', 'http://foo.com/')
+
+        assert resp is limited
+        assert request.call_count == 1
+        assert ratelimit.get_limiter(provider1.NAME, 'http://foo.com/')._delay() == 0
+
+
+class TestMakeRangedDownload:
+
+    @pytest.fixture(autouse=True)
+    def ranged_settings(self, monkeypatch, provider1):
+        provider1.parallel_downloads = True
+        monkeypatch.setattr(settings, 'PARALLEL_DOWNLOAD_ENABLED', True)
+        monkeypatch.setattr(settings, 'PARALLEL_DOWNLOAD_CHUNK_SIZE', 10)
+        monkeypatch.setattr(settings, 'PARALLEL_DOWNLOAD_CONCURRENCY', 1)
+
+    @pytest.mark.asyncio
+    async def test_client_range_is_single_request(self, provider1, monkeypatch):
+        monkeypatch.setattr(settings, 'PARALLEL_DOWNLOAD_CONCURRENCY', 4)
+        provider1.make_request = utils.MockCoroutine(return_value=mock_response(206))
+
+        stream = await provider1.make_ranged_download('http://foo.com/', range=(0, 4))
+
+        assert isinstance(stream, streams.ResponseStreamReader)
+        provider1.make_request.assert_called_once_with('GET', 'http://foo.com/', range=(0, 4),
+                                                       expects=(200, 206))
+
+    @pytest.mark.asyncio
+    async def test_range_ignored(self, provider1, monkeypatch):
+        monkeypatch.setattr(settings, 'PARALLEL_DOWNLOAD_CONCURRENCY', 4)
+        provider1.make_request = utils.MockCoroutine(return_value=mock_response(200))
+
+        stream = await provider1.make_ranged_download('http://foo.com/')
+
+        assert isinstance(stream, streams.ResponseStreamReader)
+        provider1.make_request.assert_called_once_with('GET', 'http://foo.com/', range=(0, 9),
+                                                       expects=(200, 206, 416))
+
+    @pytest.mark.asyncio
+    async def test_empty_file(self, provider1, monkeypatch):
+        monkeypatch.setattr(settings, 'PARALLEL_DOWNLOAD_CONCURRENCY', 4)
+        provider1.make_request = utils.MockCoroutine(side_effect=[
+            mock_response(416), mock_response(200)
+        ])
+
+        stream = await provider1.make_ranged_download('http://foo.com/')
+
+        assert isinstance(stream, streams.ResponseStreamReader)
+        assert stream.response.status == 200
+
+    @pytest.mark.asyncio
+    async def test_segments(self, provider1, monkeypatch):
+        monkeypatch.setattr(settings, 'PARALLEL_DOWNLOAD_CONCURRENCY', 2)
+        provider1.make_request = utils.MockCoroutine(
+            return_value=mock_response(206, 'bytes 0-9/25', etag='"abc"')
+        )
+
+        stream = await provider1.make_ranged_download('http://foo.com/', headers={'a': 'b'})
+        await asyncio.sleep(0)
+
+        assert isinstance(stream, streams.ParallelRangeStream)
+        assert stream.size == 25
+        provider1.make_request.assert_called_with('GET', 'http://foo.com/', range=(10, 19),
+                                                  expects=(206, ),
+                                                  headers={'a': 'b', 'If-Match': '"abc"'})
+        stream.close()
+
+    @pytest.mark.asyncio
+    async def test_client_download_is_single_request(self, provider1, monkeypatch):
+        monkeypatch.setattr(settings, 'PARALLEL_DOWNLOAD_CONCURRENCY', 4)
+        provider1.parallel_downloads = False
+        provider1.make_request = utils.MockCoroutine(return_value=mock_response(200))
+
+        await provider1.make_ranged_download('http://foo.com/')
+
+        provider1.make_request.assert_called_once_with('GET', 'http://foo.com/', range=None,
+                                                       expects=(200, 206))
+
+    @pytest.mark.asyncio
+    async def test_disabled(self, provider1):
+        provider1.make_request = utils.MockCoroutine(return_value=mock_response(200))
+
+        await provider1.make_ranged_download('http://foo.com/')
+
+        provider1.make_request.assert_called_once_with('GET', 'http://foo.com/', range=None,
+                                                       expects=(200, 206))
@@ -0,0 +1,125 @@
+import time
+import asyncio
+from unittest import mock
+
+import pytest
+
+from waterbutler.core import ratelimit
+
+
+@pytest.fixture
+def loop():
+    return asyncio.new_event_loop()
+
+
+def response(status, headers=None):
+    return mock.Mock(status=status, headers=headers or {})
+
+
+class TestHostLimiter:
+
+    def test_fast_path(self, loop):
+        limiter = ratelimit.HostLimiter(rate=10, burst=2, concurrency=0, loop=loop)
+
+        loop.run_until_complete(limiter.acquire())
+        limiter.release()
+
+        assert limiter.stats()['total_queued'] == 0
+        assert limiter.in_flight == 0
+
+    def test_concurrency_cap(self, loop):
+        limiter = ratelimit.HostLimiter(rate=0, burst=1, concurrency=2, loop=loop)
+        active, peak = 0, 0
+
+        async def work():
+            nonlocal active, peak
+            await limiter.acquire()
+            active += 1
+            peak = max(peak, active)
+            await asyncio.sleep(0.01, loop=loop)
+            active -= 1
+            limiter.release()
+
+        loop.run_until_complete(asyncio.gather(*[work() for _ in range(6)], loop=loop))
+
+        assert peak == 2
+        assert limiter.queued == 0
+        assert limiter.in_flight == 0
+
+    def test_token_bucket_delays(self, loop):
+        limiter = ratelimit.HostLimiter(rate=50, burst=1, concurrency=0, loop=loop)
+
+        async def work():
+            await limiter.acquire()
+            limiter.release()
+
+        start = loop.time()
+        loop.run_until_complete(asyncio.gather(*[work() for _ in range(4)], loop=loop))
+
+        # one token available immediately, three more refill at 50/s
+        assert loop.time() - start >= 0.05
+
+    def test_round_robin_between_flows(self, loop):
+        limiter = ratelimit.HostLimiter(rate=0, burst=1, concurrency=1, loop=loop)
+        order = []
+
+        async def work(flow, n):
+            await limiter.acquire(flow=flow)
+            order.append((flow, n))
+            await asyncio.sleep(0, loop=loop)
+            limiter.release()
+
+        async def run():
+            await limiter.acquire()  # hold the only slot while everyone queues up
+            tasks = [asyncio.ensure_future(work('zip', n), loop=loop) for n in range(3)]
+            tasks.append(asyncio.ensure_future(work('meta', 0), loop=loop))
+            await asyncio.sleep(0, loop=loop)
+            limiter.release()
+            await asyncio.gather(*tasks, loop=loop)
+
+        loop.run_until_complete(run())
+
+        assert order[:2] == [('zip', 0), ('meta', 0)]
+
+
+class TestGetLimiter:
+
+    def test_shared_per_provider_and_host(self, loop):
+        first = ratelimit.get_limiter('box', 'https://api.box.com/2.0/files', loop=loop)
+        second = ratelimit.get_limiter('box', 'https://API.box.com/2.0/folders', loop=loop)
+        other = ratelimit.get_limiter('box', 'https://upload.box.com/api/2.0', loop=loop)
+
+        assert first is second
+        assert first is not other
+        assert 'box:api.box.com' in ratelimit.stats(loop=loop)
+
+    def test_overrides(self, loop):
+        overrides = {'github': {'rate': 1}, 'api.github.com': {'concurrency': 3}}
+        with mock.patch.object(ratelimit.settings, 'RATE_LIMITS', overrides):
+            limiter = ratelimit.get_limiter('github', 'https://api.github.com/repos', loop=loop)
+
+        assert limiter.rate == 1
+        assert limiter.concurrency == 3
+
+
+class TestRetryAfter:
+
+    def test_not_rate_limited(self):
+        assert ratelimit.retry_after(response(200, {'Retry-After': '5'})) is None
+        assert ratelimit.retry_after(response(403)) is None
+
+    def test_429_seconds(self):
+        assert ratelimit.retry_after(response(429, {'Retry-After': '7'})) == 7
+
+    def test_429_without_header_uses_default(self):
+        assert ratelimit.retry_after(response(429), default=2) == 2
+
+    def test_http_date(self):
+        delay = ratelimit.retry_after(response(503, {'Retry-After': 'Wed, 21 Oct 2015 07:28:00 GMT'}))
+        assert delay == 0
+
+    def test_github_reset(self):
+        reset = str(int(time.time()) + 30)
+        delay = ratelimit.retry_after(response(403, {'X-RateLimit-Remaining': '0',
+                                                     'X-RateLimit-Reset': reset}))
+        assert 25 < delay <= 30
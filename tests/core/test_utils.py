@@ -1,9 +1,15 @@
+import re
 import asyncio
 from unittest import mock
 
 import pytest
 
 from waterbutler.core import utils
+from waterbutler.core import streams
+from waterbutler.core import exceptions
+from waterbutler.core.path import WaterButlerPath
+
+from tests.utils import MockCoroutine
 
 
 class TestAsyncRetry:
@@ -87,6 +93,85 @@ class TestAsyncRetry:
         assert mock_func.call_count == 18
 
 
+class TestUploadParts:
+
+    @pytest.mark.asyncio
+    async def test_parts_in_order(self):
+        calls = []
+
+        async def upload_part(data, offset):
+            calls.append((data, offset))
+            await asyncio.sleep(0.01 * (10 - offset))
+            return offset
+
+        results = await utils.upload_parts(streams.StringStream('abcdefghij'), 4, upload_part,
+                                           concurrency=3)
+
+        assert results == [0, 4, 8]
+        assert sorted(calls, key=lambda call: call[1]) == [(b'abcd', 0), (b'efgh', 4), (b'ij', 8)]
+
+    @pytest.mark.asyncio
+    async def test_bounded_by_buffer(self):
+        running, peak = [], []
+
+        async def upload_part(data, offset):
+            running.append(offset)
+            peak.append(len(running))
+            await asyncio.sleep(0.01)
+            running.remove(offset)
+
+        await utils.upload_parts(streams.StringStream('abcdefghij'), 2, upload_part,
+                                 concurrency=4, max_buffer=5)
+
+        assert max(peak) == 2
+
+    @pytest.mark.asyncio
+    async def test_stops_on_failure(self):
+        calls = []
+
+        async def failing_part(data, offset):
+            calls.append(offset)
+            raise exceptions.UploadError('nope', code=400)
+
+        with pytest.raises(exceptions.UploadError):
+            await utils.upload_parts(streams.StringStream('abcdefghij'), 2, failing_part,
+                                     retries=3)
+
+        assert calls == [0]
+
+    @pytest.mark.asyncio
+    async def test_retries_server_errors(self, monkeypatch):
+        monkeypatch.setattr('waterbutler.core.utils.asyncio.sleep', MockCoroutine())
+        upload_part = MockCoroutine(side_effect=[exceptions.UploadError('nope', code=503),
+                                                 asyncio.TimeoutError(), 'ok'])
+
+        results = await utils.upload_parts(streams.StringStream('ab'), 2, upload_part,
+                                           retries=2)
+
+        assert results == ['ok']
+        assert upload_part.call_count == 3
+
+    @pytest.mark.asyncio
+    async def test_gives_up(self, monkeypatch):
+        monkeypatch.setattr('waterbutler.core.utils.asyncio.sleep', MockCoroutine())
+        upload_part = MockCoroutine(side_effect=exceptions.UploadError('nope', code=503))
+
+        with pytest.raises(exceptions.UploadError):
+            await utils.upload_parts(streams.StringStream('ab'), 2, upload_part, retries=2)
+
+        assert upload_part.call_count == 3
+
+    @pytest.mark.asyncio
+    async def test_retry_on(self, monkeypatch):
+        monkeypatch.setattr('waterbutler.core.utils.asyncio.sleep', MockCoroutine())
+        upload_part = MockCoroutine(side_effect=[exceptions.UploadError('nope', code=429), 'ok'])
+
+        results = await utils.upload_parts(streams.StringStream('ab'), 2, upload_part, retries=2,
+                                           retry_on=lambda exc: exc.code == 429)
+
+        assert results == ['ok']
+
+
 class TestContentDisposition:
 
     @pytest.mark.parametrize("filename,expected", [
@@ -118,3 +203,167 @@ class TestContentDisposition:
     def test_disposition_encoding(self, filename, expected):
         encoded = utils.encode_for_disposition(filename)
         assert encoded == expected
+
+
+class TestZipDateTime:
+
+    @pytest.mark.parametrize("modified,expected", [
+        ('2017-05-06T07:08:09+09:00', (2017, 5, 5, 22, 8, 9)),
+        ('2017-05-06T07:08:09', (2017, 5, 6, 7, 8, 9)),
+        ('1970-01-01T00:00:00+00:00', (1980, 1, 1, 0, 0, 0)),
+        ('2200-01-01T00:00:00+00:00', (2107, 12, 31, 23, 59, 58)),
+        (None, (1980, 1, 1, 0, 0, 0)),
+        ('never', (1980, 1, 1, 0, 0, 0)),
+    ])
+    def test_zip_date_time(self, modified, expected):
+        assert utils.zip_date_time(modified) == expected
+
+
+class FakeMetadata:
+
+    def __init__(self, name, size=None):
+        self.name = name
+        self.size = size
+
+    @property
+    def is_folder(self):
+        return self.name.endswith('/')
+
+
+class FakeZipProvider:
+    """A tree of folders (dicts) and files (bytes) that records which calls were made."""
+
+    def __init__(self, tree, fail=()):
+        self.tree = tree
+        self.fail = fail
+        self.listed = []
+        self.opened = []
+
+    def _lookup(self, path):
+        node = self.tree
+        for name in re.findall(r'[^/]+/?', path.path):
+            node = node[name]
+        return node
+
+    def path_from_metadata(self, parent_path, metadata):
+        return parent_path.child(metadata.name.rstrip('/'), folder=metadata.is_folder)
+
+    async def metadata(self, path):
+        self.listed.append(path.path)
+        return [FakeMetadata(name, None if name.endswith('/') else len(node))
+                for name, node in sorted(self._lookup(path).items())]
+
+    async def download(self, path):
+        self.opened.append(path.path)
+        if path.name in self.fail:
+            raise exceptions.DownloadError('nope')
+        return streams.ByteStream(self._lookup(path))
+
+
+TREE = {
+    'a.txt': b'a' * 10,
+    'sub/': {
+        'b.txt': b'b' * 10,
+        'deeper/': {'c.txt': b'c' * 10},
+        'empty/': {},
+    },
+    'd.txt': b'd' * 10,
+    'e.txt': b'e' * 10,
+}
+
+
+async def drain(generator):
+    entries = []
+    while True:
+        try:
+            name, stream = await generator.__anext__()
+        except StopAsyncIteration:
+            return entries
+        entries.append((name, await stream.read()))
+
+
+class TestPrefetchingZipStreamGenerator:
+
+    async def _root(self, provider):
+        root = WaterButlerPath('/', prepend='')
+        return root, await provider.metadata(root)
+
+    @pytest.mark.asyncio
+    async def test_same_order_as_zip_stream_generator(self):
+        provider = FakeZipProvider(TREE)
+        root, items = await self._root(provider)
+
+        expected = await drain(utils.ZipStreamGenerator(provider, root, *items))
+        actual = await drain(utils.PrefetchingZipStreamGenerator(provider, root, *items))
+
+        assert actual == expected
+        assert [name for name, _ in actual] == [
+            'a.txt', 'd.txt', 'e.txt', 'sub/b.txt', 'sub/empty/', 'sub/deeper/c.txt'
+        ]
+
+    @pytest.mark.asyncio
+    async def test_opens_downloads_ahead(self):
+        provider = FakeZipProvider(TREE)
+        root, items = await self._root(provider)
+        generator = utils.PrefetchingZipStreamGenerator(provider, root, *items, downloads=2)
+
+        name, _ = await generator.__anext__()
+        await asyncio.sleep(0.01)
+
+        assert name == 'a.txt'
+        assert provider.opened == ['a.txt', 'd.txt', 'e.txt']
+        # Folders are listed as soon as they are discovered
+        assert 'sub/' in provider.listed
+
+    @pytest.mark.asyncio
+    async def test_bytes_ahead_are_bounded(self):
+        provider = FakeZipProvider(TREE)
+        root, items = await self._root(provider)
+        generator = utils.PrefetchingZipStreamGenerator(provider, root, *items, downloads=4,
+                                                        max_bytes=15)
+
+        await generator.__anext__()
+        await asyncio.sleep(0.01)
+
+        assert provider.opened == ['a.txt', 'd.txt']
+
+    @pytest.mark.asyncio
+    async def test_error_raised_in_order(self):
+        provider = FakeZipProvider(TREE, fail=('e.txt', ))
+        root, items = await self._root(provider)
+        generator = utils.PrefetchingZipStreamGenerator(provider, root, *items)
+
+        assert (await generator.__anext__())[0] == 'a.txt'
+        assert (await generator.__anext__())[0] == 'd.txt'
+        with pytest.raises(exceptions.DownloadError):
+            await generator.__anext__()
+
+    @pytest.mark.asyncio
+    async def test_uses_known_listings(self):
+        provider = FakeZipProvider(TREE)
+        root, items = await self._root(provider)
+        listings = {}
+        for folder in ('sub/', 'sub/deeper/', 'sub/empty/'):
+            listings[folder] = await provider.metadata(WaterButlerPath('/' + folder, prepend=''))
+        provider.listed = []
+
+        expected = await drain(utils.ZipStreamGenerator(provider, root, *items, listings=listings))
+        actual = await drain(utils.PrefetchingZipStreamGenerator(provider, root, *items,
+                                                                 listings=listings))
+
+        assert actual == expected
+        assert len(actual) == 6
+        assert provider.listed == []
+
+    @pytest.mark.asyncio
+    async def test_close_cancels_pending_work(self):
+        provider = FakeZipProvider(TREE)
+        provider.metadata = mock.Mock(side_effect=lambda path: asyncio.Future())
+        root = WaterButlerPath('/', prepend='')
+        generator = utils.PrefetchingZipStreamGenerator(provider, root, FakeMetadata('sub/'))
+
+        task = generator._entries[0].task
+        generator.close()
+        await asyncio.sleep(0)
+
+        assert task.cancelled()
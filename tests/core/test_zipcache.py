@@ -0,0 +1,113 @@
+import os
+import asyncio
+from unittest import mock
+
+import pytest
+
+from waterbutler.core import streams
+from waterbutler.core import zipcache
+from waterbutler.core.path import WaterButlerPath
+
+
+@pytest.fixture
+def archive_cache(tmpdir):
+    return zipcache.ZipArchiveCache(str(tmpdir.join('zips')), max_bytes=1024)
+
+
+def file_metadata(size=10, etag='abc', modified='2017-01-01T00:00:00Z'):
+    return mock.Mock(size=size, etag=etag, modified=modified)
+
+
+async def drain(stream, chunk_size=16):
+    data = b''
+    chunk = await stream.read(chunk_size)
+    while chunk:
+        data += chunk
+        chunk = await stream.read(chunk_size)
+    return data
+
+
+class TestFingerprint:
+
+    def test_changes_with_contents(self):
+        before = zipcache.ZipArchiveCache.fingerprint([('a.txt', file_metadata())])
+        after = zipcache.ZipArchiveCache.fingerprint([('a.txt', file_metadata(etag='def'))])
+        renamed = zipcache.ZipArchiveCache.fingerprint([('b.txt', file_metadata())])
+
+        assert before != after
+        assert before != renamed
+
+    def test_ignores_listing_order(self):
+        one, two = ('a.txt', file_metadata()), ('b/c.txt', file_metadata(size=5))
+
+        assert (zipcache.ZipArchiveCache.fingerprint([one, two]) ==
+                zipcache.ZipArchiveCache.fingerprint([two, one]))
+
+    def test_unversioned_files_are_not_cacheable(self):
+        item = file_metadata(etag=None, modified=None)
+
+        assert zipcache.ZipArchiveCache.fingerprint([('a.txt', item)]) is None
+
+
+class TestZipArchiveCache:
+
+    @pytest.mark.asyncio
+    async def test_miss(self, archive_cache):
+        assert await archive_cache.open('missing') is None
+        assert archive_cache.stats() == {'hits': 0, 'misses': 1}
+
+    @pytest.mark.asyncio
+    async def test_tee_stores_archive(self, archive_cache):
+        key = archive_cache.key('identity', WaterButlerPath('/folder/'), 'fingerprint')
+        stream = archive_cache.tee(key, streams.StringStream(b'[Zip Archive]'))
+
+        assert await drain(stream) == b'[Zip Archive]'
+
+        cached = await archive_cache.open(key)
+        assert cached.size == len(b'[Zip Archive]')
+        assert await drain(cached) == b'[Zip Archive]'
+        cached.close()
+
+    @pytest.mark.asyncio
+    async def test_open_range(self, archive_cache):
+        await drain(archive_cache.tee('key', streams.StringStream(b'0123456789')))
+
+        cached = await archive_cache.open('key', range=(2, 5))
+        assert cached.partial
+        assert cached.content_range == 'bytes 2-5/10'
+        assert await drain(cached) == b'2345'
+        cached.close()
+
+        cached = await archive_cache.open('key', range=(7, None))
+        assert await drain(cached) == b'789'
+        cached.close()
+
+    @pytest.mark.asyncio
+    async def test_closed_early_is_not_stored(self, archive_cache):
+        stream = archive_cache.tee('key', streams.StringStream(b'x' * 64))
+
+        await stream.read(16)
+        stream.close()
+        await asyncio.sleep(0.01)
+
+        assert await archive_cache.open('key') is None
+        assert os.listdir(archive_cache.directory) == []
+
+    @pytest.mark.asyncio
+    async def test_too_large_is_not_stored(self, archive_cache):
+        await drain(archive_cache.tee('key', streams.StringStream(b'x' * 2048)), chunk_size=512)
+
+        assert await archive_cache.open('key') is None
+        assert os.listdir(archive_cache.directory) == []
+
+    @pytest.mark.asyncio
+    async def test_evicts_least_recently_served(self, archive_cache):
+        await drain(archive_cache.tee('old', streams.StringStream(b'o' * 400)), chunk_size=512)
+        await drain(archive_cache.tee('used', streams.StringStream(b'u' * 400)), chunk_size=512)
+        os.utime(os.path.join(archive_cache.directory, 'old.zip'), (1, 1))
+        os.utime(os.path.join(archive_cache.directory, 'used.zip'), (2, 2))
+        (await archive_cache.open('used')).close()
+
+        await drain(archive_cache.tee('new', streams.StringStream(b'n' * 400)), chunk_size=512)
+
+        assert sorted(os.listdir(archive_cache.directory)) == ['new.zip', 'used.zip']
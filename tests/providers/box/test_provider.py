@@ -1,5 +1,6 @@
 import io
 import json
+import asyncio
 from http import HTTPStatus
 
 import pytest
@@ -10,6 +11,7 @@ from waterbutler.core import exceptions
 from waterbutler.core.path import WaterButlerPath
 
 from waterbutler.providers.box import BoxProvider
+from waterbutler.providers.box import settings as pd_settings
 from waterbutler.providers.box.metadata import (BoxRevision,
                                                 BoxFileMetadata,
                                                 BoxFolderMetadata)
@@ -508,6 +510,83 @@ class TestUpload:
             'Digest': 'sha={}'.format('pz4mZbOEOesBeUhR1THUF1Oq1bI=')
         }
 
+    @pytest.mark.asyncio
+    async def test_upload_parts_concurrently(self, provider, root_provider_fixtures, monkeypatch):
+        monkeypatch.setattr(pd_settings, 'UPLOAD_PART_CONCURRENCY', 2)
+        session_metadata = dict(root_provider_fixtures['create_session_metadata'], part_size=2)
+        stream = streams.StringStream('abcdefghij')
+        running, peak = [], []
+
+        async def upload_part(data, part_sha, start_offset, total_size, session_id):
+            running.append(start_offset)
+            peak.append(len(running))
+            await asyncio.sleep(0.01 * (10 - start_offset))
+            running.remove(start_offset)
+            return {'offset': start_offset, 'size': len(data)}
+
+        provider._upload_part = upload_part
+        parts_metadata = await provider._upload_parts(stream, session_metadata)
+
+        assert max(peak) == 2
+        assert parts_metadata == [{'offset': offset, 'size': 2} for offset in range(0, 10, 2)]
+
+    @pytest.mark.asyncio
+    async def test_upload_parts_stops_on_failure(self, provider, root_provider_fixtures,
+                                                 monkeypatch):
+        monkeypatch.setattr(pd_settings, 'UPLOAD_PART_CONCURRENCY', 1)
+        session_metadata = dict(root_provider_fixtures['create_session_metadata'], part_size=2)
+        provider._upload_part = MockCoroutine(side_effect=exceptions.UploadError('no', code=412))
+
+        with pytest.raises(exceptions.UploadError):
+            await provider._upload_parts(streams.StringStream('abcdefghij'), session_metadata)
+
+        assert provider._upload_part.call_count == 1
+
+    @pytest.mark.asyncio
+    @pytest.mark.aiohttpretty
+    async def test_upload_parts_retries(self, provider, root_provider_fixtures, monkeypatch):
+        monkeypatch.setattr('waterbutler.core.utils.asyncio.sleep', MockCoroutine())
+        session_url = 'https://upload.box.com/api/2.0/files/upload_sessions/fake_session_id'
+        aiohttpretty.register_json_uri('PUT', session_url, responses=[
+            {'status': 500, 'body': json.dumps({'code': 'internal_server_error'})},
+            {'status': 416, 'body': json.dumps({'code': 'range_not_satisfiable'})},
+            {'status': 201, 'body': json.dumps(root_provider_fixtures['upload_part_one'])},
+        ])
+
+        session_metadata = root_provider_fixtures['create_session_metadata']
+        parts_metadata = await provider._upload_parts(streams.StringStream('tenbytestr'),
+                                                      session_metadata)
+
+        assert parts_metadata == [root_provider_fixtures['upload_part_one']['part']]
+        assert len(aiohttpretty.calls) == 3
+
+    @pytest.mark.asyncio
+    @pytest.mark.aiohttpretty
+    async def test_upload_parts_gives_up(self, provider, root_provider_fixtures, monkeypatch):
+        monkeypatch.setattr('waterbutler.core.utils.asyncio.sleep', MockCoroutine())
+        session_url = 'https://upload.box.com/api/2.0/files/upload_sessions/fake_session_id'
+        aiohttpretty.register_json_uri('PUT', session_url, status=500, body={})
+
+        with pytest.raises(exceptions.UploadError):
+            await provider._upload_parts(streams.StringStream('tenbytestr'),
+                                         root_provider_fixtures['create_session_metadata'])
+
+        assert len(aiohttpretty.calls) == pd_settings.UPLOAD_PART_RETRIES + 1
+
+    @pytest.mark.asyncio
+    @pytest.mark.aiohttpretty
+    async def test_upload_parts_does_not_retry_client_errors(self, provider,
+                                                             root_provider_fixtures):
+        session_url = 'https://upload.box.com/api/2.0/files/upload_sessions/fake_session_id'
+        aiohttpretty.register_json_uri('PUT', session_url, status=412, body={})
+
+        with pytest.raises(exceptions.UploadError) as exc:
+            await provider._upload_parts(streams.StringStream('tenbytestr'),
+                                         root_provider_fixtures['create_session_metadata'])
+
+        assert exc.value.code == 412
+        assert len(aiohttpretty.calls) == 1
+
     @pytest.mark.asyncio
     @pytest.mark.aiohttpretty
     async def test_complete_chunked_upload_session(self, provider, root_provider_fixtures):
@@ -0,0 +1,88 @@
+import asyncio
+
+import pytest
+
+from waterbutler.core import exceptions as core_exceptions
+
+from waterbutler.providers.dropbox.batch import FinishBatcher
+from waterbutler.providers.dropbox.exceptions import DropboxNamingConflictError
+
+from tests.utils import MockCoroutine
+from tests.providers.dropbox.fixtures import (auth,
+                                              settings,
+                                              provider,
+                                              credentials,
+                                              provider_fixtures)
+
+
+def entry(path):
+    return {
+        'cursor': {'session_id': 'session{}'.format(path), 'offset': 4},
+        'commit': {'path': '/Photos{}'.format(path), 'mode': 'overwrite'},
+    }
+
+
+async def together(*calls):
+    """Run ``calls`` side by side, started in order, and return their tasks."""
+    tasks = [asyncio.ensure_future(call) for call in calls]
+    await asyncio.wait(tasks)
+    return tasks
+
+
+class TestFinishBatcher:
+
+    @pytest.mark.asyncio
+    async def test_groups_commits(self, provider, provider_fixtures):
+        success = dict(provider_fixtures['file_metadata'], **{'.tag': 'success'})
+        provider.dropbox_request = MockCoroutine(return_value={'entries': [success, success]})
+        batcher = FinishBatcher(provider, window=0.01, size=1000)
+
+        first, second = await together(batcher.commit(entry('/a')), batcher.commit(entry('/b')))
+
+        assert first.result() == success
+        assert second.result() == success
+        provider.dropbox_request.assert_called_once_with(
+            provider.build_url('files', 'upload_session', 'finish_batch_v2'),
+            {'entries': [entry('/a'), entry('/b')]},
+            expects=(200, ),
+            throws=core_exceptions.UploadError,
+        )
+
+    @pytest.mark.asyncio
+    async def test_failed_entry_raises_for_its_commit(self, provider, provider_fixtures):
+        success = dict(provider_fixtures['file_metadata'], **{'.tag': 'success'})
+        failure = {
+            '.tag': 'failure',
+            'failure': {
+                '.tag': 'path',
+                'path': {'.tag': 'conflict', 'conflict': {'.tag': 'file'}},
+            },
+        }
+        provider.dropbox_request = MockCoroutine(return_value={'entries': [success, failure]})
+        batcher = FinishBatcher(provider, window=0.01, size=1000)
+
+        first, second = await together(batcher.commit(entry('/a')), batcher.commit(entry('/b')))
+
+        assert first.result() == success
+        assert isinstance(second.exception(), DropboxNamingConflictError)
+
+    @pytest.mark.asyncio
+    async def test_failed_batch_raises_for_every_commit(self, provider):
+        provider.dropbox_request = MockCoroutine(
+            side_effect=core_exceptions.UploadError('Backend Error', code=503)
+        )
+        batcher = FinishBatcher(provider, window=0.01, size=1000)
+
+        tasks = await together(batcher.commit(entry('/a')), batcher.commit(entry('/b')))
+
+        assert all(isinstance(task.exception(), core_exceptions.UploadError) for task in tasks)
+
+    @pytest.mark.asyncio
+    async def test_splits_at_size(self, provider, provider_fixtures):
+        success = dict(provider_fixtures['file_metadata'], **{'.tag': 'success'})
+        provider.dropbox_request = MockCoroutine(return_value={'entries': [success, success]})
+        batcher = FinishBatcher(provider, window=0.01, size=2)
+
+        await together(*[batcher.commit(entry('/{}'.format(index))) for index in range(4)])
+
+        assert provider.dropbox_request.call_count == 2
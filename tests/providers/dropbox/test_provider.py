@@ -1,9 +1,13 @@
 import json
+import asyncio
+import functools
 from http import HTTPStatus
+from unittest import mock
 
 import pytest
 import aiohttpretty
 
+from waterbutler.core import streams
 from waterbutler.core.path import WaterButlerPath
 from waterbutler.core import metadata as core_metadata
 from waterbutler.core import exceptions as core_exceptions
@@ -13,6 +17,7 @@ from waterbutler.providers.dropbox.metadata import (DropboxRevision,
                                                     DropboxFolderMetadata)
 from waterbutler.providers.dropbox.exceptions import (DropboxNamingConflictError,
                                                       DropboxUnhandledConflictError)
+from waterbutler.providers.dropbox import settings as pd_settings
 from waterbutler.providers.dropbox.settings import CHUNK_SIZE, CONTIGUOUS_UPLOAD_SIZE_LIMIT
 
 from tests.utils import MockCoroutine
@@ -248,6 +253,25 @@ class TestCRUD:
     @pytest.mark.aiohttpretty
     async def test_chunked_upload(self, provider, file_stream, provider_fixtures):
 
+        session_id = provider_fixtures['session_metadata']['session_id']
+        provider._create_upload_session = MockCoroutine(return_value=session_id)
+        provider._upload_parts_concurrently = MockCoroutine()
+        provider._complete_session = MockCoroutine()
+
+        path = WaterButlerPath('/foobah')
+        await provider._chunked_upload(file_stream, path)
+
+        provider._create_upload_session.assert_called_once_with(session_type='concurrent')
+        provider._upload_parts_concurrently.assert_called_once_with(file_stream, session_id)
+        provider._complete_session.assert_called_once_with(file_stream, session_id, path,
+                                                           conflict='replace')
+
+    @pytest.mark.asyncio
+    @pytest.mark.aiohttpretty
+    async def test_chunked_upload_serial(self, provider, file_stream, provider_fixtures,
+                                         monkeypatch):
+        monkeypatch.setattr(pd_settings, 'UPLOAD_CONCURRENCY', 1)
+
         assert file_stream.size == 38
         provider.CHUNK_SIZE = 4
 
@@ -283,6 +307,116 @@ class TestCRUD:
         assert session_id == provider_fixtures['session_metadata']['session_id']
         assert aiohttpretty.has_call(method='POST', uri=url)
 
+    @pytest.mark.asyncio
+    @pytest.mark.aiohttpretty
+    async def test_chunked_upload_create_concurrent_session(self, provider, provider_fixtures):
+
+        url = provider._build_content_url('files', 'upload_session', 'start')
+        aiohttpretty.register_json_uri('POST', url, status=200,
+                                       body=provider_fixtures['session_metadata'])
+
+        session_id = await provider._create_upload_session(session_type='concurrent')
+
+        assert session_id == provider_fixtures['session_metadata']['session_id']
+        upload_args = json.loads(aiohttpretty.calls[0]['headers']['Dropbox-API-Arg'])
+        assert upload_args == {'close': False, 'session_type': 'concurrent'}
+
+    @pytest.mark.asyncio
+    async def test_chunked_upload_upload_parts_concurrently(self, provider, provider_fixtures,
+                                                           monkeypatch):
+        monkeypatch.setattr(pd_settings, 'UPLOAD_CONCURRENCY', 2)
+        monkeypatch.setattr(pd_settings, 'CONCURRENT_CHUNK_SIZE', 5 * 1024 * 1024)
+        unit = 4 * 1024 * 1024
+        stream = streams.StringStream(b'a' * unit + b'b' * unit + b'c' * unit + b'd' * 3)
+        session_id = provider_fixtures['session_metadata']['session_id']
+        running, peak, appended = [], [], []
+
+        async def append_part(data, session_id, offset, close=False):
+            running.append(offset)
+            peak.append(len(running))
+            await asyncio.sleep(0.01)
+            running.remove(offset)
+            appended.append((offset, len(data), data[:1], close))
+
+        provider._append_part = append_part
+        await provider._upload_parts_concurrently(stream, session_id)
+
+        assert max(peak) == 2
+        assert sorted(appended) == [
+            (0, unit, b'a', False),
+            (unit, unit, b'b', False),
+            (2 * unit, unit, b'c', False),
+            (3 * unit, 3, b'd', True),
+        ]
+
+    @pytest.mark.asyncio
+    async def test_chunked_upload_upload_parts_concurrently_retries(self, provider, monkeypatch):
+        monkeypatch.setattr('waterbutler.core.utils.asyncio.sleep', MockCoroutine())
+        ok = mock.Mock(release=MockCoroutine())
+        provider.make_request = MockCoroutine(
+            side_effect=[core_exceptions.UploadError('nope', code=503), ok]
+        )
+
+        await provider._upload_parts_concurrently(streams.StringStream(b'ab'), 'session')
+
+        assert provider.make_request.call_count == 2
+        upload_args = json.loads(provider.make_request.call_args[1]['headers']['Dropbox-API-Arg'])
+        assert upload_args == {'close': True, 'cursor': {'session_id': 'session', 'offset': 0}}
+
+    @pytest.mark.asyncio
+    async def test_chunked_upload_upload_parts_concurrently_does_not_retry_client_errors(
+            self, provider):
+        provider.make_request = MockCoroutine(
+            side_effect=core_exceptions.UploadError('bad offset', code=409)
+        )
+
+        with pytest.raises(core_exceptions.UploadError):
+            await provider._upload_parts_concurrently(streams.StringStream(b'ab'), 'session')
+
+        assert provider.make_request.call_count == 1
+
+    @pytest.mark.asyncio
+    async def test_upload_batches_concurrent_small_files(self, provider, provider_fixtures):
+        async def handle_name_conflict(path, conflict='replace'):
+            return path, False
+
+        calls = []
+
+        async def send(name, *args, **kwargs):
+            calls.append(name)
+            await asyncio.sleep(0.01)
+            return provider_fixtures['file_metadata']
+
+        provider.handle_name_conflict = handle_name_conflict
+        provider._contiguous_upload = functools.partial(send, 'upload')
+        provider._batched_upload = functools.partial(send, 'batched')
+
+        paths = [WaterButlerPath('/{}'.format(name), prepend=provider.folder) for name in 'abc']
+        await asyncio.gather(*[
+            provider.upload(streams.StringStream(b'data'), path) for path in paths
+        ])
+
+        assert sorted(calls) == ['batched', 'batched', 'upload']
+        assert provider._uploads_in_flight == 0
+
+    @pytest.mark.asyncio
+    async def test_batched_upload(self, provider, provider_fixtures):
+        provider._create_upload_session = MockCoroutine(return_value='session')
+        provider._finish_batch.commit = MockCoroutine(
+            return_value=provider_fixtures['file_metadata']
+        )
+        stream = streams.StringStream(b'data')
+        path = WaterButlerPath('/phile', prepend=provider.folder)
+
+        data = await provider._batched_upload(stream, path)
+
+        assert data == provider_fixtures['file_metadata']
+        provider._create_upload_session.assert_called_once_with(stream=stream)
+        provider._finish_batch.commit.assert_called_once_with({
+            'cursor': {'session_id': 'session', 'offset': 4},
+            'commit': {'path': path.full_path, 'mode': 'overwrite'},
+        })
+
     @pytest.mark.asyncio
     @pytest.mark.aiohttpretty
     async def test_chunked_upload_upload_parts(self, provider, file_stream, provider_fixtures):
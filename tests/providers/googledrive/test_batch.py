@@ -0,0 +1,252 @@
+import json
+import asyncio
+from unittest import mock
+
+import pytest
+
+from waterbutler.core import exceptions
+
+from waterbutler.providers.googledrive import settings as ds
+from waterbutler.providers.googledrive import batch
+
+from tests.utils import MockCoroutine
+
+
+BOUNDARY = 'batch_abc'
+
+
+def batch_body(*parts):
+    """A batch response with a part for each ``(index, status, body)``."""
+    lines = []
+    for index, status, body in parts:
+        lines.extend([
+            '--{}'.format(BOUNDARY),
+            'Content-Type: application/http',
+            'Content-ID: <response-item{}>'.format(index),
+            '',
+            'HTTP/1.1 {} OK'.format(status),
+            'Content-Type: application/json; charset=UTF-8',
+            '',
+            json.dumps(body),
+        ])
+    lines.append('--{}--'.format(BOUNDARY))
+    return '\r\n'.join(lines).encode('utf-8')
+
+
+async def together(*calls):
+    """Run ``calls`` side by side, started in order, and return their tasks."""
+    tasks = [asyncio.ensure_future(call) for call in calls]
+    await asyncio.wait(tasks)
+    return tasks
+
+
+class FakeResponse:
+
+    def __init__(self, body, status=200, headers=None):
+        self.body = body
+        self.status = status
+        self.headers = headers or {}
+
+    async def read(self):
+        return self.body
+
+
+@pytest.fixture
+def provider():
+    return mock.Mock(make_request=MockCoroutine(), metrics=mock.Mock())
+
+
+class TestEncoding:
+
+    def test_encode(self):
+        loop = asyncio.get_event_loop()
+        calls = [
+            batch._Call('GET', ds.BASE_URL + '/files/a?fields=id', None, {}, (200, ),
+                        exceptions.MetadataError, loop.create_future()),
+            batch._Call('PUT', ds.BASE_URL + '/files/b', '{"x": 1}',
+                        {'Content-Type': 'application/json'}, (200, ),
+                        exceptions.DeleteError, loop.create_future()),
+        ]
+
+        body = batch._encode_batch('xyz', calls).decode('utf-8')
+
+        assert body == '\r\n'.join([
+            '--xyz',
+            'Content-Type: application/http',
+            'Content-ID: <item0>',
+            '',
+            'GET /drive/v2/files/a?fields=id HTTP/1.1',
+            '',
+            '',
+            '--xyz',
+            'Content-Type: application/http',
+            'Content-ID: <item1>',
+            '',
+            'PUT /drive/v2/files/b HTTP/1.1',
+            'Content-Type: application/json',
+            '',
+            '{"x": 1}',
+            '--xyz--',
+            '',
+        ])
+
+    def test_decode(self):
+        body = batch_body((1, 404, {'error': 'nope'}), (0, 200, {'id': 'a'}))
+
+        parts = batch._decode_batch('multipart/mixed; boundary={}'.format(BOUNDARY), body)
+
+        assert parts[0][0] == 200
+        assert json.loads(parts[0][2].decode('utf-8')) == {'id': 'a'}
+        assert parts[1][0] == 404
+        assert parts[1][1]['content-type'] == 'application/json; charset=UTF-8'
+
+
+class TestDriveBatcher:
+
+    @pytest.mark.asyncio
+    async def test_groups_calls(self, provider):
+        provider.make_request.return_value = FakeResponse(
+            batch_body((0, 200, {'id': 'a'}), (1, 200, {'id': 'b'})),
+            headers={'Content-Type': 'multipart/mixed; boundary={}'.format(BOUNDARY)},
+        )
+        batcher = batch.DriveBatcher(provider, window=0.01, size=100)
+
+        first, second = await together(
+            batcher.request('GET', ds.BASE_URL + '/files/a'),
+            batcher.request('GET', ds.BASE_URL + '/files/b'),
+        )
+
+        assert await first.result().json() == {'id': 'a'}
+        assert await second.result().json() == {'id': 'b'}
+        assert provider.make_request.call_count == 1
+        assert provider.make_request.call_args[0] == ('POST', ds.BATCH_URL)
+
+    @pytest.mark.asyncio
+    async def test_unexpected_status_raises_for_its_call(self, provider):
+        provider.make_request.return_value = FakeResponse(
+            batch_body((0, 200, {'id': 'a'}), (1, 404, {'error': 'nope'})),
+            headers={'Content-Type': 'multipart/mixed; boundary={}'.format(BOUNDARY)},
+        )
+        batcher = batch.DriveBatcher(provider, window=0.01, size=100)
+
+        first, second = await together(
+            batcher.request('GET', ds.BASE_URL + '/files/a'),
+            batcher.request('GET', ds.BASE_URL + '/files/b', throws=exceptions.MetadataError),
+        )
+
+        assert await first.result().json() == {'id': 'a'}
+        assert isinstance(second.exception(), exceptions.MetadataError)
+        assert second.exception().code == 404
+
+    @pytest.mark.asyncio
+    async def test_failed_batch_raises_for_every_call(self, provider):
+        provider.make_request.side_effect = exceptions.ProviderError('Backend Error', code=503)
+        batcher = batch.DriveBatcher(provider, window=0.01, size=100)
+
+        tasks = await together(
+            batcher.request('GET', ds.BASE_URL + '/files/a', throws=exceptions.MetadataError),
+            batcher.request('PUT', ds.BASE_URL + '/files/b', throws=exceptions.DeleteError),
+        )
+
+        errors = [task.exception() for task in tasks]
+        assert [type(error) for error in errors] == [exceptions.MetadataError,
+                                                     exceptions.DeleteError]
+        assert all(error.code == 503 for error in errors)
+
+    @pytest.mark.asyncio
+    async def test_lone_call_is_sent_directly(self, provider):
+        provider.make_request.return_value = FakeResponse(b'{"id": "a"}')
+        batcher = batch.DriveBatcher(provider, window=0.01, size=100)
+
+        resp = await batcher.request('GET', ds.BASE_URL + '/files/a', expects=(200, 404),
+                                     throws=exceptions.MetadataError)
+
+        assert await resp.json() == {'id': 'a'}
+        provider.make_request.assert_called_once_with(
+            'GET', ds.BASE_URL + '/files/a', data=None, headers={}, expects=(200, 404),
+            throws=exceptions.MetadataError,
+        )
+
+    @pytest.mark.asyncio
+    async def test_splits_at_size(self, provider):
+        provider.make_request.return_value = FakeResponse(
+            batch_body((0, 200, {}), (1, 200, {})),
+            headers={'Content-Type': 'multipart/mixed; boundary={}'.format(BOUNDARY)},
+        )
+        batcher = batch.DriveBatcher(provider, window=0.01, size=2)
+
+        await together(*[
+            batcher.request('GET', ds.BASE_URL + '/files/{}'.format(index)) for index in range(4)
+        ])
+
+        assert provider.make_request.call_count == 2
+
+    @pytest.mark.asyncio
+    async def test_retries_failed_parts(self, provider):
+        rate_limited = {'error': {'errors': [{'reason': 'userRateLimitExceeded'}]}}
+        headers = {'Content-Type': 'multipart/mixed; boundary={}'.format(BOUNDARY)}
+        provider.make_request.side_effect = [
+            FakeResponse(batch_body((0, 200, {'id': 'a'}), (1, 403, rate_limited),
+                                    (2, 503, {}), (3, 403, {'error': 'forbidden'})),
+                         headers=headers),
+            FakeResponse(batch_body((0, 200, {'id': 'b'}), (1, 200, {'id': 'c'})),
+                         headers=headers),
+        ]
+        batcher = batch.DriveBatcher(provider, window=0.01, size=100)
+        batcher.backoff = 0
+
+        tasks = await together(*[
+            batcher.request('GET', ds.BASE_URL + '/files/{}'.format(name),
+                            throws=exceptions.MetadataError)
+            for name in 'abcd'
+        ])
+
+        assert [await task.result().json() for task in tasks[:3]] == [
+            {'id': 'a'}, {'id': 'b'}, {'id': 'c'}
+        ]
+        assert tasks[3].exception().code == 403
+        assert provider.make_request.call_count == 2
+        assert b'/files/b ' in provider.make_request.call_args[1]['data']
+        assert b'/files/a ' not in provider.make_request.call_args[1]['data']
+
+    @pytest.mark.asyncio
+    async def test_gives_up_after_retries(self, provider):
+        provider.make_request.return_value = FakeResponse(
+            batch_body((0, 500, {}), (1, 500, {})),
+            headers={'Content-Type': 'multipart/mixed; boundary={}'.format(BOUNDARY)},
+        )
+        batcher = batch.DriveBatcher(provider, window=0.01, size=100)
+        batcher.retries, batcher.backoff = 2, 0
+
+        tasks = await together(
+            batcher.request('GET', ds.BASE_URL + '/files/a', throws=exceptions.MetadataError),
+            batcher.request('GET', ds.BASE_URL + '/files/b', throws=exceptions.MetadataError),
+        )
+
+        assert [task.exception().code for task in tasks] == [500, 500]
+        assert provider.make_request.call_count == 3
+
+    @pytest.mark.asyncio
+    async def test_limits_batches_in_flight(self, provider):
+        in_flight, most_in_flight = 0, 0
+
+        async def make_request(*args, **kwargs):
+            nonlocal in_flight, most_in_flight
+            in_flight += 1
+            most_in_flight = max(most_in_flight, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+            return FakeResponse(
+                batch_body((0, 200, {}), (1, 200, {})),
+                headers={'Content-Type': 'multipart/mixed; boundary={}'.format(BOUNDARY)},
+            )
+
+        provider.make_request = make_request
+        batcher = batch.DriveBatcher(provider, window=0.01, size=2)
+        batcher.concurrency = 2
+
+        await together(*[
+            batcher.request('GET', ds.BASE_URL + '/files/{}'.format(index)) for index in range(10)
+        ])
+
+        assert most_in_flight == 2
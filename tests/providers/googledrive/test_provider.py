@@ -2,12 +2,14 @@ import io
 import os
 import copy
 import json
+import hashlib
 from http import client
 from urllib import parse
 
 import pytest
 import aiohttpretty
 
+from waterbutler.core import cache
 from waterbutler.core import streams
 from waterbutler.core import exceptions
 from waterbutler.core.path import WaterButlerPath
@@ -83,9 +85,11 @@ def other_provider(auth, other_credentials, settings):
 @pytest.fixture
 def search_for_file_response():
     return {
-        'items': [
-            {'id': '1234ideclarethumbwar'}
-        ]
+        'items': [{
+            'id': '1234ideclarethumbwar',
+            'mimeType': 'text/plain',
+            'title': 'B.txt',
+        }]
     }
 
 
@@ -96,21 +100,14 @@ def no_file_response():
     }
 
 
-@pytest.fixture
-def actual_file_response():
-    return {
-        'id': '1234ideclarethumbwar',
-        'mimeType': 'text/plain',
-        'title': 'B.txt',
-    }
-
-
 @pytest.fixture
 def search_for_folder_response():
     return {
-        'items': [
-            {'id': 'whyis6afraidof7'}
-        ]
+        'items': [{
+            'id': 'whyis6afraidof7',
+            'mimeType': 'application/vnd.google-apps.folder',
+            'title': 'A',
+        }]
     }
 
 
@@ -121,15 +118,6 @@ def no_folder_response():
     }
 
 
-@pytest.fixture
-def actual_folder_response():
-    return {
-        'id': 'whyis6afraidof7',
-        'mimeType': 'application/vnd.google-apps.folder',
-        'title': 'A',
-    }
-
-
 def make_unauthorized_file_access_error(file_id):
     message = ('The authenticated user does not have the required access '
                'to the file {}'.format(file_id))
@@ -191,6 +179,11 @@ def _build_title_search_query(provider, entity_name, is_folder=True):
         )
 
 
+def _build_resolve_url(provider, folder_id, query):
+    return provider.build_url('files', q="'{}' in parents and {}".format(folder_id, query),
+                              fields='items(id,title,mimeType)')
+
+
 def generate_list(child_id, **kwargs):
     item = {}
     item.update(root_provider_fixtures()['list_file']['items'][0])
@@ -204,25 +197,20 @@ class TestValidatePath:
     @pytest.mark.asyncio
     @pytest.mark.aiohttpretty
     async def test_validate_v1_path_file(self, provider, search_for_file_response,
-                                         actual_file_response, no_folder_response):
+                                         no_folder_response):
         file_name = 'file.txt'
-        file_id = '1234ideclarethumbwar'
 
-        query_url = provider.build_url(
-            'files', provider.folder['id'], 'children',
-            q=_build_title_search_query(provider, file_name, False),
-            fields='items(id)'
+        query_url = _build_resolve_url(
+            provider, provider.folder['id'],
+            _build_title_search_query(provider, file_name, False)
         )
-        wrong_query_url = provider.build_url(
-            'files', provider.folder['id'], 'children',
-            q=_build_title_search_query(provider, file_name, True),
-            fields='items(id)'
+        wrong_query_url = _build_resolve_url(
+            provider, provider.folder['id'],
+            _build_title_search_query(provider, file_name, True)
         )
-        specific_url = provider.build_url('files', file_id, fields='id,title,mimeType')
 
         aiohttpretty.register_json_uri('GET', query_url, body=search_for_file_response)
         aiohttpretty.register_json_uri('GET', wrong_query_url, body=no_folder_response)
-        aiohttpretty.register_json_uri('GET', specific_url, body=actual_file_response)
 
         try:
             wb_path_v1 = await provider.validate_v1_path('/' + file_name)
@@ -241,25 +229,20 @@ class TestValidatePath:
     @pytest.mark.asyncio
     @pytest.mark.aiohttpretty
     async def test_validate_v1_path_folder(self, provider, search_for_folder_response,
-                                           actual_folder_response, no_file_response):
+                                           no_file_response):
         folder_name = 'foofolder'
-        folder_id = 'whyis6afraidof7'
 
-        query_url = provider.build_url(
-            'files', provider.folder['id'], 'children',
-            q=_build_title_search_query(provider, folder_name, True),
-            fields='items(id)'
+        query_url = _build_resolve_url(
+            provider, provider.folder['id'],
+            _build_title_search_query(provider, folder_name, True)
         )
-        wrong_query_url = provider.build_url(
-            'files', provider.folder['id'], 'children',
-            q=_build_title_search_query(provider, folder_name, False),
-            fields='items(id)'
+        wrong_query_url = _build_resolve_url(
+            provider, provider.folder['id'],
+            _build_title_search_query(provider, folder_name, False)
         )
-        specific_url = provider.build_url('files', folder_id, fields='id,title,mimeType')
 
         aiohttpretty.register_json_uri('GET', query_url, body=search_for_folder_response)
         aiohttpretty.register_json_uri('GET', wrong_query_url, body=no_file_response)
-        aiohttpretty.register_json_uri('GET', specific_url, body=actual_folder_response)
 
         try:
             wb_path_v1 = await provider.validate_v1_path('/' + folder_name + '/')
@@ -301,12 +284,10 @@ class TestValidatePath:
         name, ext = os.path.splitext(part_name)
         query = _build_title_search_query(provider, file_name.strip('/'), False)
 
-        url = provider.build_url('files', file_id, 'children', q=query, fields='items(id)')
-        aiohttpretty.register_json_uri('GET', url, body=revalidate_path_metadata)
-
-        url = provider.build_url('files', file_id, fields='id,title,mimeType')
-        aiohttpretty.register_json_uri('GET', url,
-                                       body=root_provider_fixtures['revalidate_path_file_metadata_2'])
+        url = _build_resolve_url(provider, file_id, query)
+        aiohttpretty.register_json_uri('GET', url, body={
+            'items': [root_provider_fixtures['revalidate_path_file_metadata_2']]
+        })
 
         result = await provider.revalidate_path(path, file_name)
 
@@ -330,13 +311,10 @@ class TestValidatePath:
                 "and trashed = false " \
                 "and mimeType = '{}'".format(clean_query(name), gd_ext)
 
-        url = provider.build_url('files', file_id, 'children', q=query, fields='items(id)')
-        aiohttpretty.register_json_uri('GET', url,
-                                       body=root_provider_fixtures['revalidate_path_file_metadata_1'])
-
-        url = provider.build_url('files', file_id, fields='id,title,mimeType')
-        aiohttpretty.register_json_uri('GET', url,
-                                       body=root_provider_fixtures['revalidate_path_gdoc_file_metadata'])
+        url = _build_resolve_url(provider, file_id, query)
+        aiohttpretty.register_json_uri('GET', url, body={
+            'items': [root_provider_fixtures['revalidate_path_gdoc_file_metadata']]
+        })
 
         result = await provider.revalidate_path(path, file_name)
 
@@ -357,18 +335,120 @@ class TestValidatePath:
         name, ext = os.path.splitext(part_name)
         query = _build_title_search_query(provider, file_name.strip('/') + '/', True)
 
-        folder_one_url = provider.build_url('files', file_id, 'children', q=query, fields='items(id)')
-        aiohttpretty.register_json_uri('GET', folder_one_url,
-                                       body=root_provider_fixtures['revalidate_path_folder_metadata_1'])
-
-        folder_two_url = provider.build_url('files', file_id, fields='id,title,mimeType')
-        aiohttpretty.register_json_uri('GET', folder_two_url,
-                                       body=root_provider_fixtures['revalidate_path_folder_metadata_2'])
+        url = _build_resolve_url(provider, file_id, query)
+        aiohttpretty.register_json_uri('GET', url, body={
+            'items': [root_provider_fixtures['revalidate_path_folder_metadata_2']]
+        })
 
         result = await provider.revalidate_path(path, file_name, True)
         assert result.name in path.name
 
 
+class TestPathIdCache:
+
+    @pytest.fixture
+    def provider(self, provider):
+        provider._path_id_cache = cache.PathIdCache(cache.MemoryCache(), ttl=60)
+        return provider
+
+    def register_resolution(self, provider, folder_response, file_response):
+        folder_id = folder_response['items'][0]['id']
+        aiohttpretty.register_json_uri('GET', _build_resolve_url(
+            provider, provider.folder['id'], _build_title_search_query(provider, 'A', True)
+        ), body=folder_response)
+        aiohttpretty.register_json_uri('GET', _build_resolve_url(
+            provider, folder_id, _build_title_search_query(provider, 'B.txt', False)
+        ), body=file_response)
+
+    @pytest.mark.asyncio
+    @pytest.mark.aiohttpretty
+    async def test_reuses_resolved_parts(self, provider, search_for_folder_response,
+                                         search_for_file_response):
+        self.register_resolution(provider, search_for_folder_response, search_for_file_response)
+
+        first = await provider.validate_v1_path('/A/B.txt')
+        aiohttpretty.clear()
+        second = await provider.validate_v1_path('/A/B.txt')
+
+        assert first == second
+        assert second.identifier == '1234ideclarethumbwar'
+
+    @pytest.mark.asyncio
+    @pytest.mark.aiohttpretty
+    async def test_disabled_by_default(self, auth, credentials, settings,
+                                       search_for_folder_response, search_for_file_response):
+        provider = GoogleDriveProvider(auth, credentials, settings)
+        assert provider._path_id_cache is None
+        self.register_resolution(provider, search_for_folder_response, search_for_file_response)
+
+        await provider.validate_v1_path('/A/B.txt')
+        aiohttpretty.clear()
+
+        with pytest.raises(Exception):
+            await provider.validate_v1_path('/A/B.txt')
+
+    @pytest.mark.asyncio
+    @pytest.mark.aiohttpretty
+    async def test_folder_delete_drops_cached_parts(self, provider, search_for_folder_response,
+                                                    search_for_file_response):
+        self.register_resolution(provider, search_for_folder_response, search_for_file_response)
+        path = await provider.validate_v1_path('/A/B.txt')
+        aiohttpretty.register_uri('PUT', provider.build_url('files', path.parent.identifier),
+                                  status=200)
+
+        await provider.delete(path.parent)
+
+        search_for_folder_response['items'][0]['id'] = 'newfolderid'
+        search_for_file_response['items'][0]['id'] = 'newfileid'
+        self.register_resolution(provider, search_for_folder_response, search_for_file_response)
+        path = await provider.validate_v1_path('/A/B.txt')
+
+        assert path.identifier == 'newfileid'
+
+    @pytest.mark.asyncio
+    @pytest.mark.aiohttpretty
+    async def test_trashed_file_is_resolved_again(self, provider, search_for_folder_response,
+                                                  search_for_file_response,
+                                                  root_provider_fixtures):
+        self.register_resolution(provider, search_for_folder_response, search_for_file_response)
+        path = await provider.validate_v1_path('/A/B.txt')
+
+        trashed = dict(root_provider_fixtures['list_file']['items'][0],
+                       id=path.identifier, labels={'trashed': True})
+        replacement = dict(trashed, id='newfileid', labels={'trashed': False})
+        aiohttpretty.register_json_uri('GET', provider.build_url('files', path.identifier),
+                                       body=trashed)
+        aiohttpretty.register_json_uri('GET', provider.build_url('files', 'newfileid'),
+                                       body=replacement)
+        search_for_file_response['items'][0]['id'] = 'newfileid'
+        self.register_resolution(provider, search_for_folder_response, search_for_file_response)
+
+        result = await provider.metadata(path)
+
+        assert path.identifier == 'newfileid'
+        assert result.raw['id'] == 'newfileid'
+        assert (await provider.validate_v1_path('/A/B.txt')).identifier == 'newfileid'
+
+    @pytest.mark.asyncio
+    @pytest.mark.aiohttpretty
+    async def test_trashed_file_is_not_found(self, provider, search_for_folder_response,
+                                             search_for_file_response, no_file_response,
+                                             root_provider_fixtures):
+        self.register_resolution(provider, search_for_folder_response, search_for_file_response)
+        path = await provider.validate_v1_path('/A/B.txt')
+
+        trashed = dict(root_provider_fixtures['list_file']['items'][0],
+                       id=path.identifier, labels={'trashed': True})
+        aiohttpretty.register_json_uri('GET', provider.build_url('files', path.identifier),
+                                       body=trashed)
+        self.register_resolution(provider, search_for_folder_response, no_file_response)
+
+        with pytest.raises(exceptions.NotFoundError):
+            await provider.metadata(path)
+
+        assert path.identifier is None
+
+
 class TestUpload:
 
     @pytest.mark.asyncio
@@ -487,6 +567,124 @@ class TestUpload:
         assert aiohttpretty.has_call(method='PUT', uri=finish_upload_url)
         assert aiohttpretty.has_call(method='POST', uri=start_upload_url)
 
+    @pytest.mark.asyncio
+    @pytest.mark.aiohttpretty
+    async def test_upload_in_chunks(self, provider, root_provider_fixtures, monkeypatch):
+        monkeypatch.setattr(ds, 'UPLOAD_CHUNK_SIZE', 256 * 1024)
+        content = os.urandom(300 * 1024)
+        upload_id = '7'
+        item = dict(root_provider_fixtures['list_file']['items'][0],
+                    md5Checksum=hashlib.md5(content).hexdigest())
+        path = WaterButlerPath('/birdie.jpg', _ids=(provider.folder['id'], None))
+
+        start_upload_url = provider._build_upload_url('files', uploadType='resumable')
+        finish_upload_url = provider._build_upload_url('files', uploadType='resumable',
+                                                       upload_id=upload_id)
+
+        aiohttpretty.register_uri('POST', start_upload_url,
+                                  headers={'LOCATION': 'http://waterbutler.io?upload_id={}'.format(upload_id)})
+        aiohttpretty.register_uri('PUT', finish_upload_url, responses=[
+            {'status': 308, 'headers': {'Range': 'bytes=0-262143'}},
+            {'body': json.dumps(item), 'headers': {'Content-Type': 'application/json'}},
+        ])
+
+        result, created = await provider.upload(streams.StringStream(content), path)
+
+        assert created is True
+        assert result == GoogleDriveFileMetadata(item, path)
+        puts = [call['headers'] for call in aiohttpretty.calls if call['method'] == 'PUT']
+        assert [headers['Content-Range'] for headers in puts] == [
+            'bytes 0-262143/307200',
+            'bytes 262144-307199/307200',
+        ]
+
+    @pytest.mark.asyncio
+    @pytest.mark.aiohttpretty
+    async def test_upload_chunk_resumes_from_committed_offset(self, provider,
+                                                              root_provider_fixtures,
+                                                              monkeypatch):
+        monkeypatch.setattr(ds, 'UPLOAD_CHUNK_SIZE', 256 * 1024)
+        monkeypatch.setattr(ds, 'UPLOAD_RETRY_BACKOFF', 0)
+        content = os.urandom(300 * 1024)
+        upload_id = '7'
+        item = dict(root_provider_fixtures['list_file']['items'][0],
+                    md5Checksum=hashlib.md5(content).hexdigest())
+        path = WaterButlerPath('/birdie.jpg', _ids=(provider.folder['id'], None))
+
+        start_upload_url = provider._build_upload_url('files', uploadType='resumable')
+        finish_upload_url = provider._build_upload_url('files', uploadType='resumable',
+                                                       upload_id=upload_id)
+
+        aiohttpretty.register_uri('POST', start_upload_url,
+                                  headers={'LOCATION': 'http://waterbutler.io?upload_id={}'.format(upload_id)})
+        aiohttpretty.register_uri('PUT', finish_upload_url, responses=[
+            {'status': 503},
+            {'status': 308, 'headers': {'Range': 'bytes=0-131071'}},
+            {'status': 308, 'headers': {'Range': 'bytes=0-262143'}},
+            {'body': json.dumps(item), 'headers': {'Content-Type': 'application/json'}},
+        ])
+
+        result, created = await provider.upload(streams.StringStream(content), path)
+
+        assert result == GoogleDriveFileMetadata(item, path)
+        puts = [call['headers'] for call in aiohttpretty.calls if call['method'] == 'PUT']
+        assert [headers['Content-Range'] for headers in puts] == [
+            'bytes 0-262143/307200',
+            'bytes */307200',
+            'bytes 131072-262143/307200',
+            'bytes 262144-307199/307200',
+        ]
+
+    @pytest.mark.asyncio
+    @pytest.mark.aiohttpretty
+    async def test_upload_chunk_gives_up_on_expired_session(self, provider, monkeypatch):
+        monkeypatch.setattr(ds, 'UPLOAD_CHUNK_SIZE', 256 * 1024)
+        upload_id = '7'
+        path = WaterButlerPath('/birdie.jpg', _ids=(provider.folder['id'], None))
+
+        start_upload_url = provider._build_upload_url('files', uploadType='resumable')
+        finish_upload_url = provider._build_upload_url('files', uploadType='resumable',
+                                                       upload_id=upload_id)
+
+        aiohttpretty.register_uri('POST', start_upload_url,
+                                  headers={'LOCATION': 'http://waterbutler.io?upload_id={}'.format(upload_id)})
+        aiohttpretty.register_uri('PUT', finish_upload_url, status=404)
+
+        with pytest.raises(exceptions.UploadError) as exc:
+            await provider.upload(streams.StringStream(os.urandom(300 * 1024)), path)
+
+        assert exc.value.code == 404
+        assert len([call for call in aiohttpretty.calls if call['method'] == 'PUT']) == 1
+
+    @pytest.mark.asyncio
+    @pytest.mark.aiohttpretty
+    async def test_upload_chunk_gives_up_without_progress(self, provider, monkeypatch):
+        monkeypatch.setattr(ds, 'UPLOAD_CHUNK_SIZE', 256 * 1024)
+        monkeypatch.setattr(ds, 'UPLOAD_CHUNK_RETRIES', 2)
+        monkeypatch.setattr(ds, 'UPLOAD_RETRY_BACKOFF', 0)
+        upload_id = '7'
+        path = WaterButlerPath('/birdie.jpg', _ids=(provider.folder['id'], None))
+
+        start_upload_url = provider._build_upload_url('files', uploadType='resumable')
+        finish_upload_url = provider._build_upload_url('files', uploadType='resumable',
+                                                       upload_id=upload_id)
+
+        aiohttpretty.register_uri('POST', start_upload_url,
+                                  headers={'LOCATION': 'http://waterbutler.io?upload_id={}'.format(upload_id)})
+        aiohttpretty.register_uri('PUT', finish_upload_url, status=308)
+
+        with pytest.raises(exceptions.UploadError):
+            await provider.upload(streams.StringStream(os.urandom(300 * 1024)), path)
+
+        puts = [call['headers'] for call in aiohttpretty.calls if call['method'] == 'PUT']
+        assert [headers['Content-Range'] for headers in puts] == [
+            'bytes 0-262143/307200',
+            'bytes */307200',
+            'bytes 0-262143/307200',
+            'bytes */307200',
+            'bytes 0-262143/307200',
+        ]
+
 
 class TestDelete:
 
@@ -1662,8 +1860,7 @@ class TestOperationsOrMisc:
         part_name, part_is_folder = current_part[0], current_part[1]
         query = _build_title_search_query(provider, part_name, True)
 
-        url = provider.build_url('files', provider.folder['id'], 'children',
-                                 q=query, fields='items(id)')
+        url = _build_resolve_url(provider, provider.folder['id'], query)
         aiohttpretty.register_json_uri('GET', url,
                                        body=error_fixtures['parts_file_missing_metadata'])
 
@@ -8,6 +8,7 @@ from urllib import parse
 import pytest
 import aiohttpretty
 
+from waterbutler.core import cache
 from waterbutler.core import streams
 from waterbutler.core import exceptions
 from waterbutler.core.path import WaterButlerPath
@@ -83,9 +84,11 @@ def other_provider(auth, other_credentials, settings):
 @pytest.fixture
 def search_for_file_response():
     return {
-        'items': [
-            {'id': '1234ideclarethumbwar'}
-        ]
+        'items': [{
+            'id': '1234ideclarethumbwar',
+            'mimeType': 'text/plain',
+            'title': 'B.txt',
+        }]
     }
 
 
@@ -96,21 +99,14 @@ def no_file_response():
     }
 
 
-@pytest.fixture
-def actual_file_response():
-    return {
-        'id': '1234ideclarethumbwar',
-        'mimeType': 'text/plain',
-        'title': 'B.txt',
-    }
-
-
 @pytest.fixture
 def search_for_folder_response():
     return {
-        'items': [
-            {'id': 'whyis6afraidof7'}
-        ]
+        'items': [{
+            'id': 'whyis6afraidof7',
+            'mimeType': 'application/vnd.google-apps.folder',
+            'title': 'A',
+        }]
     }
 
 
@@ -121,15 +117,6 @@ def no_folder_response():
     }
 
 
-@pytest.fixture
-def actual_folder_response():
-    return {
-        'id': 'whyis6afraidof7',
-        'mimeType': 'application/vnd.google-apps.folder',
-        'title': 'A',
-    }
-
-
 def make_unauthorized_file_access_error(file_id):
     message = ('The authenticated user does not have the required access '
                'to the file {}'.format(file_id))
@@ -191,6 +178,11 @@ def _build_title_search_query(provider, entity_name, is_folder=True):
         )
 
 
+def _build_resolve_url(provider, folder_id, query):
+    return provider.build_url('files', q="'{}' in parents and {}".format(folder_id, query),
+                              fields='items(id,title,mimeType)')
+
+
 def generate_list(child_id, **kwargs):
     item = {}
     item.update(root_provider_fixtures()['list_file']['items'][0])
@@ -204,25 +196,20 @@ class TestValidatePath:
     @pytest.mark.asyncio
     @pytest.mark.aiohttpretty
     async def test_validate_v1_path_file(self, provider, search_for_file_response,
-                                         actual_file_response, no_folder_response):
+                                         no_folder_response):
         file_name = 'file.txt'
-        file_id = '1234ideclarethumbwar'
 
-        query_url = provider.build_url(
-            'files', provider.folder['id'], 'children',
-            q=_build_title_search_query(provider, file_name, False),
-            fields='items(id)'
+        query_url = _build_resolve_url(
+            provider, provider.folder['id'],
+            _build_title_search_query(provider, file_name, False)
         )
-        wrong_query_url = provider.build_url(
-            'files', provider.folder['id'], 'children',
-            q=_build_title_search_query(provider, file_name, True),
-            fields='items(id)'
+        wrong_query_url = _build_resolve_url(
+            provider, provider.folder['id'],
+            _build_title_search_query(provider, file_name, True)
         )
-        specific_url = provider.build_url('files', file_id, fields='id,title,mimeType')
 
         aiohttpretty.register_json_uri('GET', query_url, body=search_for_file_response)
         aiohttpretty.register_json_uri('GET', wrong_query_url, body=no_folder_response)
-        aiohttpretty.register_json_uri('GET', specific_url, body=actual_file_response)
 
         try:
             wb_path_v1 = await provider.validate_v1_path('/' + file_name)
@@ -241,25 +228,20 @@ class TestValidatePath:
     @pytest.mark.asyncio
     @pytest.mark.aiohttpretty
     async def test_validate_v1_path_folder(self, provider, search_for_folder_response,
-                                           actual_folder_response, no_file_response):
+                                           no_file_response):
         folder_name = 'foofolder'
-        folder_id = 'whyis6afraidof7'
 
-        query_url = provider.build_url(
-            'files', provider.folder['id'], 'children',
-            q=_build_title_search_query(provider, folder_name, True),
-            fields='items(id)'
+        query_url = _build_resolve_url(
+            provider, provider.folder['id'],
+            _build_title_search_query(provider, folder_name, True)
         )
-        wrong_query_url = provider.build_url(
-            'files', provider.folder['id'], 'children',
-            q=_build_title_search_query(provider, folder_name, False),
-            fields='items(id)'
+        wrong_query_url = _build_resolve_url(
+            provider, provider.folder['id'],
+            _build_title_search_query(provider, folder_name, False)
         )
-        specific_url = provider.build_url('files', folder_id, fields='id,title,mimeType')
 
         aiohttpretty.register_json_uri('GET', query_url, body=search_for_folder_response)
         aiohttpretty.register_json_uri('GET', wrong_query_url, body=no_file_response)
-        aiohttpretty.register_json_uri('GET', specific_url, body=actual_folder_response)
 
         try:
             wb_path_v1 = await provider.validate_v1_path('/' + folder_name + '/')
@@ -301,12 +283,10 @@ class TestValidatePath:
         name, ext = os.path.splitext(part_name)
         query = _build_title_search_query(provider, file_name.strip('/'), False)
 
-        url = provider.build_url('files', file_id, 'children', q=query, fields='items(id)')
-        aiohttpretty.register_json_uri('GET', url, body=revalidate_path_metadata)
-
-        url = provider.build_url('files', file_id, fields='id,title,mimeType')
-        aiohttpretty.register_json_uri('GET', url,
-                                       body=root_provider_fixtures['revalidate_path_file_metadata_2'])
+        url = _build_resolve_url(provider, file_id, query)
+        aiohttpretty.register_json_uri('GET', url, body={
+            'items': [root_provider_fixtures['revalidate_path_file_metadata_2']]
+        })
 
         result = await provider.revalidate_path(path, file_name)
 
@@ -330,13 +310,10 @@ class TestValidatePath:
                 "and trashed = false " \
                 "and mimeType = '{}'".format(clean_query(name), gd_ext)
 
-        url = provider.build_url('files', file_id, 'children', q=query, fields='items(id)')
-        aiohttpretty.register_json_uri('GET', url,
-                                       body=root_provider_fixtures['revalidate_path_file_metadata_1'])
-
-        url = provider.build_url('files', file_id, fields='id,title,mimeType')
-        aiohttpretty.register_json_uri('GET', url,
-                                       body=root_provider_fixtures['revalidate_path_gdoc_file_metadata'])
+        url = _build_resolve_url(provider, file_id, query)
+        aiohttpretty.register_json_uri('GET', url, body={
+            'items': [root_provider_fixtures['revalidate_path_gdoc_file_metadata']]
+        })
 
         result = await provider.revalidate_path(path, file_name)
 
@@ -357,18 +334,43 @@ class TestValidatePath:
         name, ext = os.path.splitext(part_name)
         query = _build_title_search_query(provider, file_name.strip('/') + '/', True)
 
-        folder_one_url = provider.build_url('files', file_id, 'children', q=query, fields='items(id)')
-        aiohttpretty.register_json_uri('GET', folder_one_url,
-                                       body=root_provider_fixtures['revalidate_path_folder_metadata_1'])
-
-        folder_two_url = provider.build_url('files', file_id, fields='id,title,mimeType')
-        aiohttpretty.register_json_uri('GET', folder_two_url,
-                                       body=root_provider_fixtures['revalidate_path_folder_metadata_2'])
+        url = _build_resolve_url(provider, file_id, query)
+        aiohttpretty.register_json_uri('GET', url, body={
+            'items': [root_provider_fixtures['revalidate_path_folder_metadata_2']]
+        })
 
         result = await provider.revalidate_path(path, file_name, True)
         assert result.name in path.name
 
 
+class TestPathIdCache:
+
+    @pytest.mark.asyncio
+    @pytest.mark.aiohttpretty
+    async def test_trashed_file_is_resolved_again(self, provider, search_for_file_response,
+                                                  root_provider_fixtures):
+        provider._path_id_cache = cache.PathIdCache(cache.MemoryCache(), ttl=60)
+        query_url = _build_resolve_url(provider, provider.folder['id'],
+                                       _build_title_search_query(provider, 'B.txt', False))
+        aiohttpretty.register_json_uri('GET', query_url, body=search_for_file_response)
+        path = await provider.validate_v1_path('/B.txt')
+
+        trashed = dict(root_provider_fixtures['list_file']['items'][0],
+                       id=path.identifier, labels={'trashed': True})
+        replacement = dict(trashed, id='newfileid', labels={'trashed': False})
+        aiohttpretty.register_json_uri('GET', provider.build_url('files', path.identifier),
+                                       body=trashed)
+        aiohttpretty.register_json_uri('GET', provider.build_url('files', 'newfileid'),
+                                       body=replacement)
+        search_for_file_response['items'][0]['id'] = 'newfileid'
+        aiohttpretty.register_json_uri('GET', query_url, body=search_for_file_response)
+
+        result = await provider.metadata(path)
+
+        assert path.identifier == 'newfileid'
+        assert result.raw['id'] == 'newfileid'
+
+
 class TestUpload:
 
     @pytest.mark.asyncio
@@ -1402,8 +1404,7 @@ class TestOperationsOrMisc:
         part_name, part_is_folder = current_part[0], current_part[1]
         query = _build_title_search_query(provider, part_name, True)
 
-        url = provider.build_url('files', provider.folder['id'], 'children',
-                                 q=query, fields='items(id)')
+        url = _build_resolve_url(provider, provider.folder['id'], query)
         aiohttpretty.register_json_uri('GET', url,
                                        body=error_fixtures['parts_file_missing_metadata'])
 
@@ -3,6 +3,7 @@ import io
 import xml
 import json
 import time
+import asyncio
 import base64
 import hashlib
 import aiohttpretty
@@ -574,9 +575,9 @@ class TestCRUD:
 
         assert provider._upload_part.call_count == 3
         provider._upload_part.assert_has_calls([
-            mock.call(file_stream, path, upload_id, 1, 9),
-            mock.call(file_stream, path, upload_id, 2, 9),
-            mock.call(file_stream, path, upload_id, 3, 2),
+            mock.call(b'abcdefghi', path, upload_id, 1),
+            mock.call(b'jklmnopqr', path, upload_id, 2),
+            mock.call(b'st', path, upload_id, 3),
         ])
         assert len(parts_metadata) == 3
         assert parts_metadata == side_effect
@@ -585,11 +586,9 @@ class TestCRUD:
 
     @pytest.mark.asyncio
     @pytest.mark.aiohttpretty
-    async def test_chunked_upload_upload_part(self, provider, file_stream,
-                                              upload_parts_headers_list,
+    async def test_chunked_upload_upload_part(self, provider, upload_parts_headers_list,
                                               mock_time):
-        assert file_stream.size == 6
-        provider.CHUNK_SIZE = 2
+        data = b'ab'
 
         path = WaterButlerPath('/foobah')
         chunk_number = 1
@@ -599,7 +598,10 @@ class TestCRUD:
             'partNumber': str(chunk_number),
             'uploadId': upload_id,
         }
-        headers = {'Content-Length': str(provider.CHUNK_SIZE)}
+        headers = {
+            'Content-Length': str(len(data)),
+            'Content-MD5': base64.b64encode(hashlib.md5(data).digest()).decode('ascii'),
+        }
         upload_part_url = provider.bucket.new_key(path.path).generate_url(
             100,
             'PUT',
@@ -611,12 +613,80 @@ class TestCRUD:
         part_headers = {k.upper(): v for k, v in part_headers.items()}
         aiohttpretty.register_uri('PUT', upload_part_url, status=200, headers=part_headers)
 
-        part_metadata = await provider._upload_part(file_stream, path, upload_id, chunk_number,
-                                                    provider.CHUNK_SIZE)
+        part_metadata = await provider._upload_part(data, path, upload_id, chunk_number)
 
         assert aiohttpretty.has_call(method='PUT', uri=upload_part_url)
         assert part_headers == part_metadata
 
+    @pytest.mark.asyncio
+    async def test_chunked_upload_upload_parts_retries(self, provider, monkeypatch):
+        monkeypatch.setattr('waterbutler.core.utils.asyncio.sleep', MockCoroutine())
+        file_stream = streams.StringStream('ab')
+        provider._upload_part = MockCoroutine(side_effect=[exceptions.UploadError('nope'),
+                                                           {'ETAG': '"abc"'}])
+
+        parts_metadata = await provider._upload_parts(file_stream, WaterButlerPath('/foobah'),
+                                                      'upload_id')
+
+        assert provider._upload_part.call_count == 2
+        assert parts_metadata == [{'ETAG': '"abc"'}]
+
+    @pytest.mark.asyncio
+    async def test_chunked_upload_upload_parts_gives_up(self, provider, monkeypatch):
+        monkeypatch.setattr('waterbutler.core.utils.asyncio.sleep', MockCoroutine())
+        file_stream = streams.StringStream('ab')
+        provider._upload_part = MockCoroutine(side_effect=exceptions.UploadError('nope'))
+
+        with pytest.raises(exceptions.UploadError):
+            await provider._upload_parts(file_stream, WaterButlerPath('/foobah'), 'upload_id')
+
+        assert provider._upload_part.call_count == pd_settings.CHUNKED_UPLOAD_PART_MAX_RETRIES + 1
+
+    @pytest.mark.asyncio
+    async def test_chunked_upload_upload_parts_does_not_retry_auth_errors(self, provider):
+        file_stream = streams.StringStream('ab')
+        provider._upload_part = MockCoroutine(side_effect=exceptions.UploadError('no', code=403))
+
+        with pytest.raises(exceptions.UploadError):
+            await provider._upload_parts(file_stream, WaterButlerPath('/foobah'), 'upload_id')
+
+        assert provider._upload_part.call_count == 1
+
+    @pytest.mark.asyncio
+    async def test_chunked_upload_upload_parts_concurrently(self, provider, monkeypatch):
+        monkeypatch.setattr(pd_settings, 'CHUNKED_UPLOAD_CONCURRENCY', 2)
+        file_stream = streams.StringStream('abcdefghij')
+        provider.CHUNK_SIZE = 2
+        running, peak = [], []
+
+        async def upload_part(data, path, upload_id, chunk_number):
+            running.append(chunk_number)
+            peak.append(len(running))
+            await asyncio.sleep(0.01 * (6 - chunk_number))
+            running.remove(chunk_number)
+            return {'ETAG': str(chunk_number)}
+
+        provider._upload_part = upload_part
+        parts_metadata = await provider._upload_parts(file_stream, WaterButlerPath('/foobah'),
+                                                      'upload_id')
+
+        assert max(peak) == 2
+        assert parts_metadata == [{'ETAG': str(i)} for i in range(1, 6)]
+
+        provider.CHUNK_SIZE = pd_settings.CHUNK_SIZE
+
+    @pytest.mark.asyncio
+    async def test_chunked_upload_upload_parts_stops_on_failure(self, provider, monkeypatch):
+        monkeypatch.setattr(pd_settings, 'CHUNKED_UPLOAD_CONCURRENCY', 1)
+        file_stream = streams.StringStream('abcdefghij')
+        provider.CHUNK_SIZE = 2
+        provider._upload_part = MockCoroutine(side_effect=exceptions.UploadError('no', code=403))
+
+        with pytest.raises(exceptions.UploadError):
+            await provider._upload_parts(file_stream, WaterButlerPath('/foobah'), 'upload_id')
+
+        assert provider._upload_part.call_count == 1
+
         provider.CHUNK_SIZE = pd_settings.CHUNK_SIZE
 
     @pytest.mark.asyncio
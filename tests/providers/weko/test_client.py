@@ -2,6 +2,10 @@ import datetime
 from lxml import etree
 import re
 
+import pytest
+import aiohttpretty
+
+from waterbutler.core import exceptions
 import waterbutler.providers.weko.client as client
 
 fake_weko_item_item_type = {
@@ -252,3 +256,57 @@ class TestWEKOClient:
                                        fake_weko_item_uploaded_filename2, fake_weko_item_title,
                                        fake_weko_item_title_en, fake_weko_item_contributors)
         assert etree_to_dict(res) == etree_to_dict(etree.XML(fake_expected_create_import_xml2))
+
+
+fake_service_document = b"""<?xml version="1.0" encoding="utf-8"?>
+<service xmlns="http://www.w3.org/2007/app">
+  <workspace>
+    <collection href="http://localhost/weko/sword/deposit.php"/>
+  </workspace>
+  <rdf:RDF xmlns:rdf="http://www.w3.org/1999/02/22-rdf-syntax-ns#"
+           xmlns:dc="http://purl.org/metadata/dublin_core#">
+    <rdf:Description rdf:about="http://localhost/weko/?index_id=1">
+      <dc:title>Root</dc:title><dc:identifier>1</dc:identifier>
+    </rdf:Description>
+    <rdf:Description rdf:about="http://localhost/weko/?index_id=2">
+      <dc:title>--Child</dc:title><dc:identifier>2</dc:identifier>
+    </rdf:Description>
+  </rdf:RDF>
+</service>"""
+
+
+class TestWEKOConnection:
+
+    @pytest.mark.asyncio
+    @pytest.mark.aiohttpretty
+    async def test_get_all_indices(self):
+        connection = client.Connection('http://localhost/weko/sword/', token='token')
+        aiohttpretty.register_uri('GET', 'http://localhost/weko/sword/servicedocument.php',
+                                  body=fake_service_document, status=200)
+
+        indices = await client.get_all_indices(connection)
+
+        assert [index.identifier for index in indices] == ['1', '2']
+        assert indices[1].title == 'Child'
+        assert indices[1].parentIdentifier == '1'
+
+    @pytest.mark.asyncio
+    @pytest.mark.aiohttpretty
+    async def test_get_login_user(self):
+        connection = client.Connection('http://localhost/weko/sword/', username='user',
+                                       password='pass')
+        aiohttpretty.register_uri('GET', 'http://localhost/weko/sword/servicedocument.php',
+                                  body=fake_service_document, status=200,
+                                  headers={'X-WEKO-Login-User': 'weko-user'})
+
+        assert await connection.get_login_user() == 'weko-user'
+
+    @pytest.mark.asyncio
+    @pytest.mark.aiohttpretty
+    async def test_error_status(self):
+        connection = client.Connection('http://localhost/weko/sword/', token='token')
+        aiohttpretty.register_uri('GET', 'http://localhost/weko/sword/servicedocument.php',
+                                  body=b'nope', status=500)
+
+        with pytest.raises(exceptions.ProviderError):
+            await client.get_all_indices(connection)
@@ -18,5 +18,8 @@ class TestStatusHandler(utils.HandlerTestCase):
         resp = yield self.http_client.fetch(
             self.get_url('/status'),
         )
+        data = json.loads(resp.body.decode())
         assert resp.code == HTTPStatus.OK
-        assert expected == json.loads(resp.body.decode())
+        assert expected == {key: data[key] for key in expected}
+        assert isinstance(data['rate_limits'], dict)
+        assert isinstance(data['single_flight'], dict)
@@ -57,8 +57,7 @@ def handler(http_request):
     mocked_handler.write_stream = MockCoroutine()
     mocked_handler.redirect = mock.Mock()
     mocked_handler.uploader = asyncio.Future()
-    mocked_handler.wsock = mock.Mock()
-    mocked_handler.writer = mock.Mock()
+    mocked_handler.stream = mock.Mock()
 
     return mocked_handler
 
@@ -1,5 +1,9 @@
+import sys
 from unittest import mock
 
+from waterbutler.server.api.v1 import core
+from waterbutler.tasks.exceptions import WaitTimeOutError
+
 from tests.server.api.v1.fixtures import (http_request, handler, mock_exc_info, mock_exc_info_202,
                                           mock_exc_info_http)
 
@@ -24,6 +28,24 @@ class TestBaseHandler:
         handler.finish.assert_called_with()
         handler.captureException.assert_called_with(mock_exc_info_202, data={'level': 'info'})
 
+    def test_write_error_202_with_task(self, handler):
+        handler.finish = mock.Mock()
+        handler.captureException = mock.Mock()
+        try:
+            raise WaitTimeOutError(task_id='abc-123')
+        except WaitTimeOutError:
+            exc_info = sys.exc_info()
+
+        handler.write_error(500, exc_info)
+
+        url = core.task_url('abc-123', {'resource': 'guid1', 'provider': 'test', 'path': '/file'})
+        assert url.startswith('/v1/tasks/abc-123?origin=')
+        assert handler.get_status() == 202
+        assert handler._headers['Location'] == url.encode()
+        handler.finish.assert_called_with({
+            'data': {'id': 'abc-123', 'type': 'tasks', 'links': {'self': url}}
+        })
+
     @mock.patch('tornado.web.app_log.error')
     def test_log_exception_uncaught(self, mocked_error, handler, mock_exc_info):
 
@@ -243,8 +243,7 @@ class TestUploadFile:
 
         await handler.upload_file()
 
-        assert handler.wsock.close.called
-        assert handler.writer.close.called
+        assert handler.stream.write_eof.called
         handler.set_status.assert_called_once_with(201)
         handler.write.assert_called_once_with({
             'data': mock_file_metadata.json_api_serialized('3rqws')
@@ -258,8 +257,7 @@ class TestUploadFile:
 
         await handler.upload_file()
 
-        assert handler.wsock.close.called
-        assert handler.writer.close.called
+        assert handler.stream.write_eof.called
         assert handler.set_status.called is False
         handler.write.assert_called_once_with({
             'data': mock_file_metadata.json_api_serialized('3rqws')
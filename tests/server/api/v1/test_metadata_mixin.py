@@ -1,8 +1,11 @@
 import json
+from unittest import mock
 
 import pytest
+import tornado.iostream
 
 from tests.utils import MockCoroutine
+from waterbutler.core import streams
 from waterbutler.core.path import WaterButlerPath
 from tests.server.api.v1.fixtures import (http_request, handler, handler_auth, mock_stream,
                                           mock_partial_stream, mock_file_metadata,
@@ -94,6 +97,20 @@ class TestMetadataMixin:
 
         handler.write_stream.assert_awaited_once()
 
+    @pytest.mark.asyncio
+    async def test_download_file_closes_ranged_stream(self, handler):
+        stream = mock.Mock(spec=streams.ParallelRangeStream, size=10, content_type='text/plain',
+                           partial=False)
+        stream.name = 'file'
+        handler.provider.download = MockCoroutine(return_value=stream)
+        handler.path = WaterButlerPath('/test_file')
+        handler.write_stream = MockCoroutine(side_effect=tornado.iostream.StreamClosedError())
+
+        with pytest.raises(tornado.iostream.StreamClosedError):
+            await handler.download_file()
+
+        stream.close.assert_called_once_with()
+
     @pytest.mark.asyncio
     async def test_download_file_headers_no_stream_name(self, handler, mock_stream):
 
@@ -230,3 +247,34 @@ class TestMetadataMixin:
         assert handler._headers['Content-Disposition'] == expected
 
         handler.write_stream.assert_called_once_with(mock_stream)
+
+    @pytest.mark.asyncio
+    async def test_download_folder_as_zip_range_request_header(self, handler, mock_partial_stream):
+
+        handler.request.headers['Range'] = 'bytes=10-100'
+        handler.provider.zip = MockCoroutine(return_value=mock_partial_stream)
+        handler.path = WaterButlerPath('/test_folder/')
+
+        await handler.download_folder_as_zip()
+
+        handler.provider.zip.assert_called_once_with(handler.path, range=(10, 100), stored=False)
+        assert handler._headers['Content-Range'] == bytes(mock_partial_stream.content_range,
+                                                          'latin-1')
+        assert handler._headers['Content-Length'] == bytes(str(mock_partial_stream.size),
+                                                           'latin-1')
+        assert handler.get_status() == 206
+        handler.write_stream.assert_called_once_with(mock_partial_stream)
+
+    @pytest.mark.asyncio
+    async def test_download_folder_as_stored_zip(self, handler, mock_stream):
+
+        handler.request.query_arguments['zip'] = [b'stored']
+        handler.provider.zip = MockCoroutine(return_value=mock_stream)
+        handler.path = WaterButlerPath('/test_folder/')
+
+        await handler.download_folder_as_zip()
+
+        handler.provider.zip.assert_called_once_with(handler.path, range=None, stored=True)
+        assert handler._headers['Content-Length'] == bytes(str(mock_stream.size), 'latin-1')
+        assert handler._headers['Accept-Ranges'] == b'bytes'
+        handler.write_stream.assert_called_once_with(mock_stream)
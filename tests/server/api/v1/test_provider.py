@@ -3,10 +3,12 @@ from unittest import mock
 
 import pytest
 
+from waterbutler.core import streams
+from waterbutler.server import settings
 from waterbutler.core.path import WaterButlerPath
 from waterbutler.server.api.v1.provider import ProviderHandler, list_or_value
 
-from tests.utils import MockCoroutine, MockStream, MockWriter, MockProvider
+from tests.utils import MockCoroutine, MockProvider
 from tests.server.api.v1.fixtures import (http_request, handler, patch_auth_handler, handler_auth,
                                           patch_make_provider_core)
 
@@ -50,6 +52,9 @@ class TestProviderHandler:
         handler.target_path = WaterButlerPath('/file')
         await handler.prepare_stream()
 
+        assert isinstance(handler.stream, streams.PipeStream)
+        assert handler.stream.max_buffer == settings.UPLOAD_BUFFER_SIZE
+
     @pytest.mark.asyncio
     async def test_head(self, handler):
         handler.path = WaterButlerPath('/file')
@@ -130,13 +135,12 @@ class TestProviderHandler:
     @pytest.mark.asyncio
     async def test_data_received_stream(self, handler):
         handler.path = WaterButlerPath('/folder/')
-        handler.stream = MockStream()
-        handler.writer = MockWriter()
+        handler.stream = streams.PipeStream(size=10)
 
         await handler.data_received(b'1234567890')
 
         assert handler.bytes_uploaded == 10
-        handler.writer.write.assert_called_once_with(b'1234567890')
+        assert await handler.stream.read(10) == b'1234567890'
 
 
 class TestProviderHandlerFinish:
@@ -0,0 +1,99 @@
+import json
+from unittest import mock
+
+from tornado import testing
+from tornado.httpclient import HTTPError
+
+from waterbutler.core import exceptions
+from waterbutler.server.api.v1 import core
+
+from tests.utils import MockCoroutine
+from tests.server.api.v1.utils import ServerTestCase
+
+
+ORIGIN = {'resource': 'guid1', 'provider': 'osfstorage', 'path': '/folder/'}
+
+
+class TestTaskHandler(ServerTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.auth = MockCoroutine(return_value={})
+        auth_patcher = mock.patch('waterbutler.server.api.v1.tasks.auth_handler.get', self.auth)
+        auth_patcher.start()
+        self.addCleanup(auth_patcher.stop)
+
+    def status(self, **status):
+        return mock.patch('waterbutler.server.api.v1.tasks.tasks.get_task_status',
+                          mock.Mock(return_value=dict({'progress': None, 'error': None}, **status)))
+
+    def task_url(self, task_id='abc-123', origin=ORIGIN):
+        return self.get_url(core.task_url(task_id, origin)[len('/v1'):])
+
+    @testing.gen_test
+    def test_progress(self):
+        progress = {'files_total': 4, 'files_done': 1, 'current': '/folder/b.txt'}
+        with self.status(state='PROGRESS', progress=progress) as get_task_status:
+            resp = yield self.http_client.fetch(self.task_url())
+
+        get_task_status.assert_called_once_with('abc-123')
+        assert self.auth.call_args[0][:2] == ('guid1', 'osfstorage')
+        assert self.auth.call_args[1] == {'path': '/folder/'}
+        assert resp.headers['Cache-Control'] == 'no-store'
+        assert json.loads(resp.body.decode('utf-8')) == {
+            'data': {
+                'id': 'abc-123',
+                'type': 'tasks',
+                'attributes': {'state': 'PROGRESS', 'progress': progress, 'error': None},
+                'links': {'self': core.task_url('abc-123', ORIGIN)},
+            }
+        }
+
+    @testing.gen_test
+    def test_failure(self):
+        with self.status(state='FAILURE', error=exceptions.NotFoundError('/folder/')):
+            resp = yield self.http_client.fetch(self.task_url())
+
+        attributes = json.loads(resp.body.decode('utf-8'))['data']['attributes']
+        assert attributes['state'] == 'FAILURE'
+        assert attributes['error'] == {
+            'code': 404, 'message': 'Could not retrieve file or directory /folder/'
+        }
+
+    @testing.gen_test
+    def test_unexpected_failure_is_not_described(self):
+        with self.status(state='FAILURE', error=KeyError('secret')):
+            resp = yield self.http_client.fetch(self.task_url())
+
+        attributes = json.loads(resp.body.decode('utf-8'))['data']['attributes']
+        assert attributes['error'] == {'code': 500, 'message': 'The task failed unexpectedly'}
+
+    @testing.gen_test
+    def test_unsigned(self):
+        with self.status(state='PROGRESS') as get_task_status:
+            with self.assertRaises(HTTPError) as exc:
+                yield self.http_client.fetch(self.get_url('/tasks/abc-123'))
+
+        assert exc.exception.code == 403
+        assert not get_task_status.called
+        assert not self.auth.called
+
+    @testing.gen_test
+    def test_signed_for_other_task(self):
+        url = self.task_url(task_id='other').replace('/tasks/other', '/tasks/abc-123')
+        with self.status(state='PROGRESS') as get_task_status:
+            with self.assertRaises(HTTPError) as exc:
+                yield self.http_client.fetch(url)
+
+        assert exc.exception.code == 403
+        assert not get_task_status.called
+
+    @testing.gen_test
+    def test_unauthorized(self):
+        self.auth.side_effect = exceptions.AuthError('Forbidden', code=403)
+        with self.status(state='PROGRESS') as get_task_status:
+            with self.assertRaises(HTTPError) as exc:
+                yield self.http_client.fetch(self.task_url())
+
+        assert exc.exception.code == 403
+        assert not get_task_status.called
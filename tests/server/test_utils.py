@@ -1,11 +1,15 @@
+import asyncio
 from unittest import mock
 
 import pytest
+import tornado.iostream
 from tornado import testing
 
 from tests.server.api.v1.utils import ServerTestCase
 
-from waterbutler.server.utils import CORsMixin, parse_request_range
+from waterbutler.server import settings
+from waterbutler.core.streams import ByteStream
+from waterbutler.server.utils import CORsMixin, UtilMixin, parse_request_range
 
 
 class MockHandler(CORsMixin):
@@ -189,3 +193,92 @@ class TestRangeParsing():
         result = parse_request_range(range_header)
         assert result == expected
 
+
+
+class MockWriter(UtilMixin):
+
+    def __init__(self, closed=False):
+        self.closed = closed
+        self.written = []
+        self.flushed = []
+
+    def write(self, chunk):
+        assert isinstance(chunk, bytes)
+        self.written.append(chunk)
+
+    def flush(self):
+        if self.closed:
+            raise tornado.iostream.StreamClosedError()
+        self.flushed.append(len(self.written))
+        future = asyncio.Future()
+        future.set_result(None)
+        return future
+
+
+class TrickleStream:
+    """Hands out ``chunks`` one read at a time, however much is asked for."""
+
+    def __init__(self, chunks):
+        self.chunks = list(chunks)
+        self.sizes = []
+
+    async def read(self, size=-1):
+        self.sizes.append(size)
+        return self.chunks.pop(0) if self.chunks else b''
+
+
+class TestWriteStream:
+
+    @pytest.fixture(autouse=True)
+    def sizes(self, monkeypatch):
+        monkeypatch.setattr(settings, 'CHUNK_SIZE', 4)
+        monkeypatch.setattr(settings, 'MAX_CHUNK_SIZE', 16)
+        monkeypatch.setattr(settings, 'FLUSH_WATERMARK', 32)
+        monkeypatch.setattr(settings, 'FLUSH_INTERVAL', 60)
+
+    @pytest.mark.asyncio
+    async def test_coalesces_full_reads(self):
+        handler = MockWriter()
+        data = bytes(range(100))
+
+        await handler.write_stream(ByteStream(data))
+
+        assert b''.join(handler.written) == data
+        assert handler.bytes_downloaded == 100
+        assert [len(chunk) for chunk in handler.written] == [44, 32, 24]
+        assert handler.flushed == [1, 2, 3]
+
+    @pytest.mark.asyncio
+    async def test_read_size_adapts(self):
+        stream = TrickleStream([b'a' * 4, b'b' * 8, b'c' * 16, b'd' * 16, b'e', b'f'])
+
+        await MockWriter().write_stream(stream)
+
+        assert stream.sizes == [4, 8, 16, 16, 16, 8, 4]
+
+    @pytest.mark.asyncio
+    async def test_flushes_when_stream_falls_behind(self, monkeypatch):
+        monkeypatch.setattr(settings, 'CHUNK_SIZE', 8)
+        handler = MockWriter()
+
+        await handler.write_stream(TrickleStream([b'a', bytearray(b'b'), b'cdef', b'gh']))
+
+        assert handler.written == [b'a', b'b', b'cdefgh']
+        assert handler.flushed == [1, 2, 3]
+
+    @pytest.mark.asyncio
+    async def test_flushes_on_interval(self, monkeypatch):
+        monkeypatch.setattr(settings, 'FLUSH_INTERVAL', 0)
+        handler = MockWriter()
+
+        await handler.write_stream(TrickleStream([b'abcd', b'efgh' * 2]))
+
+        assert handler.written == [b'abcd', b'efghefgh']
+
+    @pytest.mark.asyncio
+    async def test_client_disconnect(self):
+        handler = MockWriter(closed=True)
+
+        await handler.write_stream(TrickleStream([b'ab']))
+
+        assert handler.bytes_downloaded == 2
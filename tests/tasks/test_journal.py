@@ -0,0 +1,120 @@
+import os
+import time
+import asyncio
+from unittest import mock
+
+import pytest
+
+from waterbutler.tasks import journal
+from waterbutler.core.path import WaterButlerPath
+from waterbutler.core.folder_ops import FolderOpProgress
+
+import tests.utils as test_utils
+
+
+@pytest.fixture
+def checkpoints(tmpdir):
+    return journal.CopyJournal(str(tmpdir.join('task.sqlite')))
+
+
+@pytest.fixture
+def checkpoint_path(monkeypatch, tmpdir):
+    path = str(tmpdir.join('checkpoints'))
+    monkeypatch.setattr(journal.settings, 'CHECKPOINT_PATH', path)
+    return path
+
+
+class TestCopyJournal:
+
+    @pytest.mark.asyncio
+    async def test_entries_survive_reopening(self, checkpoints):
+        await checkpoints.record('/src/', {'state': 'created', 'name': 'dest', 'created': True})
+        await checkpoints.record('/src/a.txt', {'state': 'done', 'size': 3})
+        await checkpoints.record('/src/a.txt', {'state': 'done', 'size': 4})
+
+        reopened = journal.CopyJournal(checkpoints.path)
+
+        assert await reopened.entries() == {
+            '/src/': {'state': 'created', 'name': 'dest', 'created': True},
+            '/src/a.txt': {'state': 'done', 'size': 4},
+        }
+
+    @pytest.mark.asyncio
+    async def test_tracks_progress(self, checkpoints, monkeypatch):
+        monkeypatch.setattr(journal.settings, 'CHECKPOINT_PROGRESS_INTERVAL', 0)
+        progress = FolderOpProgress()
+        checkpoints.track(progress)
+
+        progress.files_total = 2
+        progress.changed()
+        await asyncio.sleep(0.1)
+
+        assert (await checkpoints.progress())['files_total'] == 2
+        assert await checkpoints.entries() == {}
+
+    @pytest.mark.asyncio
+    async def test_resume_reuses_destination_name(self, checkpoints):
+        provider = test_utils.MockProvider()
+        src_path = WaterButlerPath('/src/')
+
+        assert await checkpoints.resume(provider, src_path, {'conflict': 'keep'}) == {
+            'conflict': 'keep'
+        }
+        assert provider.folder_op_journal is checkpoints
+
+        await checkpoints.record('/src/', {'state': 'created', 'name': 'src (1)', 'created': True})
+
+        assert await checkpoints.resume(provider, src_path, {'conflict': 'keep'}) == {
+            'conflict': 'replace', 'rename': 'src (1)'
+        }
+
+    @pytest.mark.asyncio
+    async def test_discard(self, checkpoints):
+        await checkpoints.record('/src/', {'state': 'created'})
+
+        await checkpoints.discard()
+
+        assert not os.path.exists(checkpoints.path)
+
+    @pytest.mark.asyncio
+    async def test_unusable_journal_is_ignored(self, tmpdir):
+        checkpoints = journal.CopyJournal(str(tmpdir.join('missing', 'task.sqlite')))
+
+        await checkpoints.record('/src/', {'state': 'created'})
+
+        assert await checkpoints.entries() == {}
+
+
+class TestOpenTaskJournal:
+
+    @pytest.mark.asyncio
+    async def test_outside_of_a_task(self, checkpoint_path):
+        assert await journal.open_task_journal() is None
+
+    @pytest.mark.asyncio
+    async def test_disabled(self, checkpoint_path, monkeypatch):
+        monkeypatch.setattr(journal, 'current_task', mock.Mock(request=mock.Mock(id='abc')))
+        monkeypatch.setattr(journal.settings, 'CHECKPOINT_ENABLED', False)
+
+        assert await journal.open_task_journal() is None
+
+    @pytest.mark.asyncio
+    async def test_keyed_by_task_id(self, checkpoint_path, monkeypatch):
+        monkeypatch.setattr(journal, 'current_task', mock.Mock(request=mock.Mock(id='abc')))
+
+        checkpoints = await journal.open_task_journal()
+
+        assert checkpoints.path == os.path.join(checkpoint_path, 'abc.sqlite')
+
+    @pytest.mark.asyncio
+    async def test_removes_expired_journals(self, checkpoint_path, monkeypatch):
+        monkeypatch.setattr(journal, 'current_task', mock.Mock(request=mock.Mock(id='abc')))
+        os.makedirs(checkpoint_path)
+        for name, age in (('old.sqlite', 8 * 24 * 60 * 60), ('new.sqlite', 60)):
+            path = os.path.join(checkpoint_path, name)
+            open(path, 'w').close()
+            os.utime(path, (time.time() - age, time.time() - age))
+
+        await journal.open_task_journal()
+
+        assert os.listdir(checkpoint_path) == ['new.sqlite']
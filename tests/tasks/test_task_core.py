@@ -0,0 +1,213 @@
+import os
+import pickle
+import asyncio
+from unittest import mock
+
+import pytest
+from celery import Celery
+from celery.backends.amqp import AMQPBackend
+from celery.backends.base import DisabledBackend
+from celery.backends.base import KeyValueStoreBackend
+
+from waterbutler.tasks import core
+from waterbutler.core import exceptions
+from waterbutler.core.path import WaterButlerPath
+
+import tests.utils as test_utils
+
+
+@pytest.fixture
+def adhoc_backend(monkeypatch, tmpdir):
+    monkeypatch.setattr(core.app, 'backend', DisabledBackend(core.app))
+    monkeypatch.setattr(core.settings, 'ADHOC_BACKEND_PATH', str(tmpdir))
+    return str(tmpdir)
+
+
+@pytest.fixture
+def amqp_backend(monkeypatch):
+    backend = AMQPBackend(Celery('test', broker='memory://', backend='amqp'))
+    monkeypatch.setattr(core.app, 'backend', backend)
+    return backend
+
+
+@pytest.fixture
+def task_id(monkeypatch):
+    monkeypatch.setattr(core, 'current_task', mock.Mock(request=mock.Mock(id='abc')))
+    return 'abc'
+
+
+class TestGetTaskStatus:
+
+    def test_pending(self, adhoc_backend):
+        assert core.get_task_status('abc') == {'state': 'PENDING', 'progress': None,
+                                               'error': None}
+
+    def test_progress(self, adhoc_backend):
+        core.store_progress('abc', {'files_done': 1})
+
+        assert core.get_task_status('abc') == {'state': 'PROGRESS',
+                                               'progress': {'files_done': 1}, 'error': None}
+
+    def test_finished(self, adhoc_backend):
+        core.store_progress('abc', {'files_done': 1})
+        with open(os.path.join(adhoc_backend, 'abc'), 'wb') as result_file:
+            pickle.dump(('metadata', True), result_file)
+
+        assert core.get_task_status('abc')['state'] == 'SUCCESS'
+
+    def test_failed(self, adhoc_backend):
+        error = exceptions.NotFoundError('/folder/')
+        with open(os.path.join(adhoc_backend, 'abc'), 'wb') as result_file:
+            pickle.dump(error, result_file)
+
+        status = core.get_task_status('abc')
+
+        assert status['state'] == 'FAILURE'
+        assert status['error'].code == 404
+
+    def test_result_backend(self, monkeypatch):
+        result = mock.Mock(state='PROGRESS', info={'files_done': 1})
+        monkeypatch.setattr(core.app, 'AsyncResult', mock.Mock(return_value=result))
+
+        assert core.get_task_status('abc') == {'state': 'PROGRESS',
+                                               'progress': {'files_done': 1}, 'error': None}
+        core.app.AsyncResult.assert_called_once_with('abc')
+
+
+class TestTrackProgress:
+
+    def test_outside_of_a_task(self):
+        provider = test_utils.MockProvider()
+
+        progress, publisher = core.track_progress(provider, WaterButlerPath('/folder/'))
+
+        assert provider.folder_op_progress is progress
+        assert progress.current == '/folder/'
+        assert publisher is None
+
+    @pytest.mark.asyncio
+    async def test_publishes_until_closed(self, adhoc_backend, task_id, monkeypatch):
+        monkeypatch.setattr(core.settings, 'PROGRESS_INTERVAL', 0)
+        provider = test_utils.MockProvider()
+
+        progress, publisher = core.track_progress(provider, WaterButlerPath('/file.txt'))
+        await asyncio.sleep(0.1)
+
+        assert core.get_task_status(task_id)['progress']['files_total'] == 1
+
+        progress.files_done = 1
+        progress.changed()
+        await asyncio.sleep(0.1)
+
+        assert core.get_task_status(task_id)['progress']['files_done'] == 1
+
+        await publisher.close()
+        progress.changed()
+        await asyncio.sleep(0.1)
+
+        assert core.get_task_status(task_id)['state'] == 'PENDING'
+
+
+class ResultsBackend(KeyValueStoreBackend):
+    """A key-value result backend that publishes the results in ``results`` when asked for many,
+    then times out as the Redis backend does."""
+
+    def __init__(self, results):
+        self.results = results
+        self.calls = []
+
+    def get_many(self, task_ids, timeout=None):
+        self.calls.append(sorted(task_ids))
+        for task_id in task_ids:
+            if task_id in self.results:
+                yield task_id, self.results[task_id]
+        raise core.CeleryTimeoutError()
+
+
+def store_adhoc_result(basepath, task_id, result):
+    with open(os.path.join(basepath, task_id), 'wb') as result_file:
+        pickle.dump(result, result_file)
+
+
+class TestWaitOnCelery:
+
+    @pytest.mark.asyncio
+    async def test_timeout_names_task(self, adhoc_backend):
+        with pytest.raises(core.exceptions.WaitTimeOutError) as exc:
+            await core.wait_on_celery(mock.Mock(id='abc'), interval=0.01, timeout=0.01)
+
+        assert exc.value.task_id == 'abc'
+        assert core.get_result_waiter()._waiting == {}
+        await asyncio.sleep(0.05)
+        assert core.get_result_waiter()._watcher.done()
+
+    @pytest.mark.asyncio
+    async def test_adhoc_results(self, adhoc_backend):
+        store_adhoc_result(adhoc_backend, 'done', ('metadata', True))
+        store_adhoc_result(adhoc_backend, 'failed', exceptions.NotFoundError('/folder/'))
+
+        assert await core.wait_on_celery(mock.Mock(id='done'), interval=0.01) == ('metadata', True)
+        with pytest.raises(exceptions.NotFoundError):
+            await core.wait_on_celery(mock.Mock(id='failed'), interval=0.01)
+
+    @pytest.mark.asyncio
+    async def test_waits_share_one_watcher(self, adhoc_backend):
+        waits = [
+            asyncio.ensure_future(core.wait_on_celery(mock.Mock(id=task_id), interval=0.01))
+            for task_id in ('one', 'two', 'two')
+        ]
+        await asyncio.sleep(0.05)
+        waiter = core.get_result_waiter()
+
+        assert sorted(waiter._waiting) == ['one', 'two']
+        assert not any(wait.done() for wait in waits)
+
+        store_adhoc_result(adhoc_backend, 'two', 2)
+        store_adhoc_result(adhoc_backend, 'one', 1)
+
+        assert await asyncio.gather(*waits) == [1, 2, 2]
+        await asyncio.sleep(0.05)
+        assert waiter._watcher.done()
+
+    @pytest.mark.asyncio
+    async def test_result_backend(self, monkeypatch):
+        backend = ResultsBackend({
+            'done': {'status': 'SUCCESS', 'result': ('metadata', True)},
+            'failed': {'status': 'FAILURE', 'result': exceptions.NotFoundError('/folder/')},
+            'running': {'status': 'PROGRESS', 'result': {'files_done': 1}},
+        })
+        monkeypatch.setattr(core.app, 'backend', backend)
+
+        assert await core.wait_on_celery(mock.Mock(id='done'), interval=0.01) == ('metadata', True)
+        with pytest.raises(exceptions.NotFoundError):
+            await core.wait_on_celery(mock.Mock(id='failed'), interval=0.01)
+        with pytest.raises(core.exceptions.WaitTimeOutError):
+            await core.wait_on_celery(mock.Mock(id='running'), interval=0.01, timeout=0.05)
+
+        assert ['done'] in backend.calls
+        await asyncio.sleep(0.05)
+
+    @pytest.mark.asyncio
+    async def test_amqp_backend_keeps_progress(self, amqp_backend):
+        amqp_backend.store_result('running', {'files_done': 1}, core.PROGRESS_STATE)
+
+        with pytest.raises(core.exceptions.WaitTimeOutError):
+            await core.wait_on_celery(mock.Mock(id='running'), interval=0.01, timeout=0.05)
+        await asyncio.sleep(0.05)
+
+        status = core.get_task_status('running')
+        assert status['state'] == core.PROGRESS_STATE
+        assert status['progress'] == {'files_done': 1}
+
+    @pytest.mark.asyncio
+    async def test_amqp_result_can_be_followed_elsewhere(self, amqp_backend, monkeypatch):
+        wait = asyncio.ensure_future(core.wait_on_celery(mock.Mock(id='done'), interval=0.01))
+        await asyncio.sleep(0.05)
+        amqp_backend.store_result('done', ('metadata', True), 'SUCCESS')
+
+        assert await wait == ('metadata', True)
+        await asyncio.sleep(0.05)
+
+        # As another process, with its own backend, following the task's url would
+        monkeypatch.setattr(core.app, 'backend', AMQPBackend(amqp_backend.app))
+        assert core.get_task_status('done')['state'] == 'SUCCESS'
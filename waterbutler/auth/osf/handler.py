@@ -1,3 +1,6 @@
+import copy
+import json
+import hashlib
 import datetime
 
 import jwe
@@ -5,7 +8,9 @@ import jwt
 import aiohttp
 
 from waterbutler.core import exceptions
+from waterbutler.core import connections
 from waterbutler.auth.osf import settings
+from waterbutler.core.cache import make_cache, SingleFlight
 from waterbutler.core.auth import (BaseAuthHandler,
                                    AuthType)
 from waterbutler.settings import MFR_IDENTIFYING_HEADER
@@ -14,6 +19,14 @@ from waterbutler.settings import MFR_IDENTIFYING_HEADER
 JWE_KEY = jwe.kdf(settings.JWE_SECRET.encode(), settings.JWE_SALT.encode())
 
 
+def _encrypt_payload(payload):
+    return jwe.encrypt(json.dumps(payload).encode(), JWE_KEY)
+
+
+def _decrypt_payload(raw):
+    return json.loads(jwe.decrypt(raw, JWE_KEY).decode())
+
+
 class OsfAuthHandler(BaseAuthHandler):
     """Identity lookup via the Open Science Framework"""
     ACTION_MAP = {
@@ -23,6 +36,65 @@ class OsfAuthHandler(BaseAuthHandler):
         'delete': 'delete',
     }
 
+    def __init__(self):
+        self.cache = None
+        if settings.AUTH_CACHE_ENABLED:
+            self.cache = make_cache(
+                settings.AUTH_CACHE_BACKEND,
+                maxsize=settings.AUTH_CACHE_MAX_SIZE,
+                ttl=settings.AUTH_CACHE_TTL,
+                url=settings.AUTH_CACHE_REDIS_URL,
+                prefix='waterbutler:auth',
+                dumps=_encrypt_payload,
+                loads=_decrypt_payload,
+            )
+        self.single_flight = SingleFlight()
+
+    @staticmethod
+    def cache_key(bundle, headers, cookies, cookie=None, view_only=None):
+        """Identify an auth lookup by everything that can change the OSF's answer: the resource,
+        provider, action, path and version, plus a hash of the caller's credentials (cookies and
+        Authorization header) and the view-only key.  Request metrics are deliberately left out.
+        """
+        identity = json.dumps([
+            bundle['nid'],
+            bundle['provider'],
+            bundle['action'],
+            str(bundle['path']),
+            bundle['version'],
+            view_only,
+            cookie,
+            headers.get('Authorization'),
+            headers.get(MFR_IDENTIFYING_HEADER),
+            sorted(cookies.items()),
+        ], default=str)
+        return hashlib.sha256(identity.encode()).hexdigest()
+
+    def stats(self):
+        stats = {'single_flight': self.single_flight.stats()}
+        if self.cache is not None:
+            stats['cache'] = self.cache.stats()
+        return stats
+
+    async def _cached_request(self, key, bundle, headers, cookies, cookie=None, view_only=None):
+        """Return the decrypted auth payload for ``bundle``, from the cache if possible.  Only
+        successful responses are cached; auth errors are raised every time.
+        """
+        if self.cache is not None:
+            payload = await self.cache.get(key)
+            if payload is not None:
+                return payload
+
+        payload = await self.make_request(
+            self.build_payload(bundle, cookie=cookie, view_only=view_only),
+            headers,
+            cookies,
+        )
+
+        if self.cache is not None:
+            await self.cache.set(key, payload)
+        return payload
+
     def build_payload(self, bundle, view_only=None, cookie=None):
         query_params = {}
 
@@ -48,6 +120,7 @@ class OsfAuthHandler(BaseAuthHandler):
                 params=params,
                 headers=headers,
                 cookies=cookies,
+                connector=connections.get_connector(settings.API_URL),
             )
         except aiohttp.errors.ClientError:
             raise exceptions.AuthError('Unable to connect to auth sever', code=503)
@@ -137,23 +210,27 @@ class OsfAuthHandler(BaseAuthHandler):
             # View only must go outside of the jwt
             view_only = view_only[0].decode()
 
-        payload = (await self.make_request(
-            self.build_payload({
-                'nid': resource,
-                'provider': provider,
-                'action': osf_action,
-                'path': path,
-                'version': version,
-                'metrics': {
-                    'referrer': request.headers.get('Referer'),
-                    'user_agent': request.headers.get('User-Agent'),
-                    'origin': request.headers.get('Origin'),
-                    'uri': request.uri,
-                }
-            }, cookie=cookie, view_only=view_only),
-            headers,
-            dict(request.cookies)
-        ))
+        bundle = {
+            'nid': resource,
+            'provider': provider,
+            'action': osf_action,
+            'path': path,
+            'version': version,
+            'metrics': {
+                'referrer': request.headers.get('Referer'),
+                'user_agent': request.headers.get('User-Agent'),
+                'origin': request.headers.get('Origin'),
+                'uri': request.uri,
+            }
+        }
+        cookies = dict(request.cookies)
+
+        # Concurrent identical lookups share a single request to the OSF
+        key = self.cache_key(bundle, headers, cookies, cookie=cookie, view_only=view_only)
+        payload = await self.single_flight.do(key, self._cached_request, key, bundle, headers,
+                                              cookies, cookie=cookie, view_only=view_only)
 
+        # Callers mutate the payload, so never hand out the cached or shared object itself
+        payload = copy.deepcopy(payload)
         payload['auth']['callback_url'] = payload['callback_url']
         return payload
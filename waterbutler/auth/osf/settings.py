@@ -21,3 +21,13 @@ JWE_SECRET = (JWE_SECRET or 'CirclesAre4Squares')
 JWT_SECRET = (JWT_SECRET or 'ILiekTrianglesALot')
 
 MFR_ACTION_HEADER = config.get('MFR_ACTION_HEADER', 'X-Cos-Mfr-Request-Action')
+
+# Successful auth responses are cached for a short time so bursts of identical requests (MFR
+# renders, zip downloads) don't each round-trip to the OSF.  ``BACKEND`` is ``memory`` (per
+# process LRU) or ``redis`` (shared, requires aioredis; payloads are stored JWE-encrypted).
+auth_cache_config = config.child('AUTH_CACHE')
+AUTH_CACHE_ENABLED = auth_cache_config.get_bool('ENABLED', True)
+AUTH_CACHE_BACKEND = auth_cache_config.get('BACKEND', 'memory')
+AUTH_CACHE_TTL = float(auth_cache_config.get('TTL', 15))
+AUTH_CACHE_MAX_SIZE = int(auth_cache_config.get('MAX_SIZE', 1000))
+AUTH_CACHE_REDIS_URL = auth_cache_config.get('REDIS_URL', 'redis://localhost:6379/0')
@@ -0,0 +1,346 @@
+import json
+import time
+import uuid
+import pickle
+import asyncio
+import logging
+import weakref
+import collections
+
+try:
+    import aioredis
+except ImportError:
+    aioredis = None
+
+from waterbutler import settings
+from waterbutler.core.path import WaterButlerPath
+
+
+logger = logging.getLogger(__name__)
+
+
+class MemoryCache:
+    """A bounded, in-process LRU cache whose entries expire after ``ttl`` seconds.  Methods are
+    coroutines so that it is interchangeable with `RedisCache`.
+
+    :param int maxsize: maximum number of entries kept; the least recently used are evicted first
+    :param float ttl: default number of seconds an entry stays valid
+    """
+
+    def __init__(self, maxsize=1024, ttl=60):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = collections.OrderedDict()  # type: collections.OrderedDict
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        return {'size': len(self._entries), 'hits': self.hits, 'misses': self.misses}
+
+    async def get(self, key):
+        """Return the value stored for ``key`` or `None` if missing or expired."""
+        try:
+            expires, value = self._entries[key]
+        except KeyError:
+            self.misses += 1
+            return None
+
+        if expires < time.monotonic():
+            del self._entries[key]
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    async def set(self, key, value, ttl=None):
+        self._entries[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    async def delete(self, *keys):
+        for key in keys:
+            self._entries.pop(key, None)
+
+    async def clear(self):
+        self._entries.clear()
+
+
+class RedisCache:
+    """A cache stored in Redis, shared between WaterButler processes.  Keys are strings and are
+    namespaced with ``prefix``; values are run through ``dumps``/``loads`` on the way in and out.
+    Requires the optional ``aioredis`` package.
+
+    :param str url: redis connection url, e.g. ``redis://localhost:6379/0``
+    :param str prefix: namespace prepended to every key
+    :param float ttl: default number of seconds an entry stays valid
+    :param callable dumps: serializes a value to `str` or `bytes`
+    :param callable loads: deserializes the output of ``dumps``
+    """
+
+    def __init__(self, url, prefix='waterbutler', ttl=60, dumps=json.dumps, loads=json.loads):
+        if aioredis is None:
+            raise ImportError('The redis cache backend requires the aioredis package')
+        self.url = url
+        self.prefix = prefix
+        self.ttl = ttl
+        self.dumps = dumps
+        self.loads = loads
+        self.hits = 0
+        self.misses = 0
+        self._connections = weakref.WeakKeyDictionary()  # type: weakref.WeakKeyDictionary
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses}
+
+    def _key(self, key):
+        return '{}:{}'.format(self.prefix, key)
+
+    async def _redis(self):
+        loop = asyncio.get_event_loop()
+        if loop not in self._connections:
+            self._connections[loop] = await aioredis.create_redis(self.url, loop=loop)
+        return self._connections[loop]
+
+    async def get(self, key):
+        redis = await self._redis()
+        raw = await redis.get(self._key(key))
+        if raw is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return self.loads(raw)
+
+    async def set(self, key, value, ttl=None):
+        redis = await self._redis()
+        expire = self.ttl if ttl is None else ttl
+        await redis.set(self._key(key), self.dumps(value), expire=max(int(expire), 1))
+
+    async def delete(self, *keys):
+        if keys:
+            redis = await self._redis()
+            await redis.delete(*[self._key(key) for key in keys])
+
+    async def clear(self):
+        redis = await self._redis()
+        keys = await redis.keys(self._key('*'))
+        if keys:
+            await redis.delete(*keys)
+
+
+def make_cache(backend='memory', **kwargs):
+    """Build a cache from settings.  ``backend`` is either ``memory`` or ``redis``; ``kwargs``
+    are passed through to the backend's constructor.  The ``memory`` backend ignores the redis
+    specific ``url``, ``prefix``, ``dumps``, and ``loads`` arguments.
+    """
+    if backend == 'memory':
+        return MemoryCache(maxsize=kwargs.get('maxsize', 1024), ttl=kwargs.get('ttl', 60))
+    if backend == 'redis':
+        kwargs.pop('maxsize', None)
+        return RedisCache(**kwargs)
+    raise ValueError('Unknown cache backend {!r}'.format(backend))
+
+
+class SingleFlight:
+    """Collapses concurrent calls that share a key into a single call.  The first caller for a
+    key starts the work; callers arriving while it is still running wait for and receive the same
+    result (or exception).  Once the call finishes the key is forgotten, so later calls start
+    fresh.  Waiters are shielded from each other: cancelling one does not cancel the shared call.
+    """
+
+    def __init__(self):
+        self.calls = 0
+        self.collapsed = 0
+        self._inflight = weakref.WeakKeyDictionary()  # type: weakref.WeakKeyDictionary
+
+    def stats(self):
+        return {'calls': self.calls, 'collapsed': self.collapsed}
+
+    def pending(self, key):
+        """Whether a call for ``key`` is currently in flight on this event loop."""
+        return key in self._inflight.get(asyncio.get_event_loop(), {})
+
+    async def do(self, key, func, *args, **kwargs):
+        """Await ``func(*args, **kwargs)``, or the already running call for ``key``."""
+        loop = asyncio.get_event_loop()
+        inflight = self._inflight.setdefault(loop, {})
+
+        future = inflight.get(key)
+        if future is None:
+            self.calls += 1
+            future = asyncio.ensure_future(func(*args, **kwargs), loop=loop)
+            inflight[key] = future
+            future.add_done_callback(lambda _: inflight.pop(key, None))
+        else:
+            self.collapsed += 1
+
+        return await asyncio.shield(future, loop=loop)
+
+
+def path_identity(path):
+    """A json-able value distinguishing ``path`` from any path that may resolve differently,
+    such as the same path on another branch, whose identifiers differ."""
+    if isinstance(path, WaterButlerPath):
+        return [type(path).__name__, path.full_path, [part.identifier for part in path.parts]]
+    return path
+
+
+class MetadataCache:
+    """Caches provider metadata responses by provider identity and path, including the
+    identifiers of its parts.  Writes
+    invalidate the written path and its parent; writes to folders invalidate everything cached
+    for the provider, since any descendant may have changed.  The latter is done by bumping a
+    per-identity generation token that is part of every key, so it works for backends that can't
+    enumerate keys.
+
+    :param store: a `MemoryCache` or `RedisCache`
+    :param float default_ttl: ttl for providers without an entry in ``ttls``
+    :param dict ttls: map of provider name to ttl in seconds; ``0`` disables caching for that
+        provider
+    """
+
+    def __init__(self, store, default_ttl=60, ttls=None):
+        self.store = store
+        self.default_ttl = default_ttl
+        self.ttls = ttls or {}
+
+    @property
+    def max_ttl(self):
+        return max([self.default_ttl] + [float(ttl) for ttl in self.ttls.values()])
+
+    def ttl_for(self, provider_name):
+        return float(self.ttls.get(provider_name, self.default_ttl))
+
+    def enabled_for(self, provider_name):
+        return self.ttl_for(provider_name) > 0
+
+    def stats(self):
+        return self.store.stats()
+
+    async def _generation(self, identity):
+        return (await self.store.get('gen:{}'.format(identity))) or '0'
+
+    async def _key(self, identity, path):
+        return 'meta:{}:{}:{}'.format(identity, await self._generation(identity),
+                                      json.dumps(path_identity(path), default=str))
+
+    async def get(self, identity, path):
+        """Return the cached metadata for ``path`` or `None`."""
+        return await self.store.get(await self._key(identity, path))
+
+    async def set(self, identity, path, value, ttl):
+        await self.store.set(await self._key(identity, path), value, ttl=ttl)
+
+    async def invalidate(self, identity, *paths):
+        """Drop cached metadata for each of ``paths`` and their parents."""
+        keys = []
+        for path in paths:
+            if path is None:
+                continue
+            if path.is_dir:
+                # Must outlive any entry written under the previous generation
+                await self.store.set('gen:{}'.format(identity), uuid.uuid4().hex,
+                                     ttl=self.max_ttl)
+                return
+            keys.append(await self._key(identity, path))
+            if path.parent is not None:
+                keys.append(await self._key(identity, path.parent))
+        await self.store.delete(*keys)
+
+
+_METADATA_CACHE = None
+
+
+def get_metadata_cache():
+    """Return the process-wide `MetadataCache` configured in ``METADATA_CACHE`` settings, or
+    `None` if metadata caching is disabled."""
+    global _METADATA_CACHE
+    if not settings.METADATA_CACHE_ENABLED:
+        return None
+    if _METADATA_CACHE is None:
+        _METADATA_CACHE = MetadataCache(
+            make_cache(
+                settings.METADATA_CACHE_BACKEND,
+                maxsize=settings.METADATA_CACHE_MAX_SIZE,
+                ttl=settings.METADATA_CACHE_TTL,
+                url=settings.METADATA_CACHE_REDIS_URL,
+                prefix='waterbutler:metadata',
+                dumps=pickle.dumps,
+                loads=pickle.loads,
+            ),
+            default_ttl=settings.METADATA_CACHE_TTL,
+            ttls=settings.METADATA_CACHE_PROVIDER_TTLS,
+        )
+    return _METADATA_CACHE
+
+
+class PathIdCache:
+    """Caches how providers that look files up by id resolve a path, one segment at a time: the
+    child named ``name`` of the folder with id ``parent_id`` maps to a dict with its ``id``,
+    ``title`` and ``mimeType``.  Entries are kept per provider identity.  ``forget`` drops the
+    entries for one child; ``invalidate`` drops everything cached for an identity, for writes that
+    may affect anything below a folder, by bumping a generation token as `MetadataCache` does.
+
+    :param store: a `MemoryCache` or `RedisCache`
+    :param float ttl: number of seconds an entry stays valid
+    """
+
+    def __init__(self, store, ttl=60):
+        self.store = store
+        self.ttl = ttl
+
+    def stats(self):
+        return self.store.stats()
+
+    async def _key(self, identity, parent_id, name, is_folder):
+        generation = (await self.store.get('gen:{}'.format(identity))) or '0'
+        return 'path:{}:{}:{}:{}:{}'.format(identity, generation, parent_id,
+                                            'folder' if is_folder else 'file', name)
+
+    async def get(self, identity, parent_id, name, is_folder):
+        """Return the cached child of ``parent_id`` named ``name`` or `None`."""
+        return await self.store.get(await self._key(identity, parent_id, name, is_folder))
+
+    async def set(self, identity, parent_id, name, is_folder, value):
+        await self.store.set(await self._key(identity, parent_id, name, is_folder), value,
+                             ttl=self.ttl)
+
+    async def forget(self, identity, parent_id, name):
+        """Drop the cached file or folder named ``name`` in ``parent_id``."""
+        await self.store.delete(
+            await self._key(identity, parent_id, name, True),
+            await self._key(identity, parent_id, name, False),
+        )
+
+    async def invalidate(self, identity):
+        """Drop everything cached for ``identity``."""
+        # Must outlive any entry written under the previous generation
+        await self.store.set('gen:{}'.format(identity), uuid.uuid4().hex, ttl=self.ttl)
+
+
+_PATH_ID_CACHE = None
+
+
+def get_path_id_cache():
+    """Return the process-wide `PathIdCache` configured in ``PATH_ID_CACHE`` settings, or `None`
+    if path id caching is disabled."""
+    global _PATH_ID_CACHE
+    if settings.PATH_ID_CACHE_TTL <= 0:
+        return None
+    if _PATH_ID_CACHE is None:
+        _PATH_ID_CACHE = PathIdCache(
+            make_cache(
+                settings.PATH_ID_CACHE_BACKEND,
+                maxsize=settings.PATH_ID_CACHE_MAX_SIZE,
+                ttl=settings.PATH_ID_CACHE_TTL,
+                url=settings.PATH_ID_CACHE_REDIS_URL,
+                prefix='waterbutler:path_id',
+            ),
+            ttl=settings.PATH_ID_CACHE_TTL,
+        )
+    return _PATH_ID_CACHE
@@ -0,0 +1,125 @@
+import asyncio
+import logging
+import weakref
+from urllib import parse
+
+import aiohttp
+
+from waterbutler import settings
+
+
+logger = logging.getLogger(__name__)
+_POOLS = weakref.WeakKeyDictionary()  # type: weakref.WeakKeyDictionary
+
+
+class ConnectorPool:
+    """A registry of shared `aiohttp.TCPConnector` objects, one per upstream host.  aiohttp keeps
+    idle keep-alive connections on the connector, so reusing a connector across requests lets
+    WaterButler skip the TCP and TLS handshakes when talking to the same provider host again.
+
+    Connectors are keyed by scheme, host, port and TLS verification setting, so a provider that
+    disables certificate verification (e.g. a self-hosted ownCloud) never shares sockets with one
+    that doesn't.  Each connector is bound to the event loop the pool was created for.
+
+    :param int limit: max number of simultaneous connections per host
+    :param float keepalive_timeout: seconds an idle connection is kept open
+    :param float conn_timeout: seconds to wait for a new connection to be established
+    :param loop: the event loop the connectors belong to
+    """
+
+    def __init__(self, limit=None, keepalive_timeout=None, conn_timeout=None, loop=None):
+        self.limit = limit
+        self.keepalive_timeout = keepalive_timeout
+        self.conn_timeout = conn_timeout
+        self.loop = loop or asyncio.get_event_loop()
+        self.hits = 0
+        self.misses = 0
+        self._connectors = {}
+
+    @staticmethod
+    def key(url, verify_ssl=True):
+        """Build the pool key for ``url``.  The default port for the scheme is filled in so that
+        ``https://foo.com`` and ``https://foo.com:443`` share a connector.
+        """
+        parsed = parse.urlsplit(url)
+        scheme = parsed.scheme.lower()
+        port = parsed.port or {'http': 80, 'https': 443}.get(scheme)
+        return (scheme, (parsed.hostname or '').lower(), port, bool(verify_ssl))
+
+    def get(self, url, verify_ssl=True, metrics=None):
+        """Return the shared connector for ``url``, creating it if this is the first request to
+        that host or if the previous connector has been closed.
+
+        :param str url: the url about to be requested
+        :param bool verify_ssl: whether the connector should verify TLS certificates
+        :param metrics: an optional `MetricsBase` to tally ``connection_pool.hits`` and
+            ``connection_pool.misses`` on
+        """
+        key = self.key(url, verify_ssl=verify_ssl)
+        connector = self._connectors.get(key)
+        if connector is not None and not getattr(connector, 'closed', False):
+            self.hits += 1
+            if metrics is not None:
+                metrics.incr('connection_pool.hits')
+            return connector
+
+        self.misses += 1
+        if metrics is not None:
+            metrics.incr('connection_pool.misses')
+        connector = aiohttp.TCPConnector(
+            verify_ssl=verify_ssl,
+            limit=self.limit,
+            keepalive_timeout=self.keepalive_timeout,
+            conn_timeout=self.conn_timeout,
+            loop=self.loop,
+        )
+        self._connectors[key] = connector
+        return connector
+
+    def stats(self):
+        return {
+            'hosts': len(self._connectors),
+            'hits': self.hits,
+            'misses': self.misses,
+        }
+
+    def close(self):
+        """Close every connector in the pool, dropping any idle keep-alive connections."""
+        for key, connector in self._connectors.items():
+            try:
+                connector.close()
+            except Exception as exc:
+                logger.warning('Failed to close connector for {}: {!r}'.format(key, exc))
+        self._connectors = {}
+
+
+def get_pool(loop=None):
+    """Return the `ConnectorPool` for the given (or current) event loop.  Celery workers spin up
+    their own event loops, so pools are tracked per-loop rather than process-wide.
+    """
+    loop = loop or asyncio.get_event_loop()
+    if loop not in _POOLS:
+        conn_timeout = settings.CONNECTION_POOL_CONN_TIMEOUT
+        _POOLS[loop] = ConnectorPool(
+            limit=settings.CONNECTION_POOL_LIMIT,
+            keepalive_timeout=settings.CONNECTION_POOL_KEEPALIVE_TIMEOUT,
+            conn_timeout=None if conn_timeout is None else float(conn_timeout),
+            loop=loop,
+        )
+    return _POOLS[loop]
+
+
+def get_connector(url, verify_ssl=True, metrics=None, loop=None):
+    """Return a pooled connector suitable for passing as the ``connector`` kwarg of
+    `aiohttp.request`.  Returns `None` when pooling has been disabled in the settings, which makes
+    aiohttp fall back to a fresh connector per request.
+    """
+    if not settings.CONNECTION_POOL_ENABLED:
+        return None
+    return get_pool(loop=loop).get(url, verify_ssl=verify_ssl, metrics=metrics)
+
+
+def close_all():
+    """Close the connectors of every known pool.  Called on server shutdown."""
+    for pool in list(_POOLS.values()):
+        pool.close()
@@ -0,0 +1,27 @@
+import asyncio
+import functools
+import concurrent.futures
+
+from waterbutler import settings
+
+
+_EXECUTOR = None
+
+
+def get_executor():
+    """Return the thread pool used for blocking filesystem calls.  It's kept separate from the
+    loop's default executor so that slow disks can't starve other work (e.g. XML parsing) that
+    runs in the default executor, and vice versa.
+    """
+    global _EXECUTOR
+    if _EXECUTOR is None:
+        _EXECUTOR = concurrent.futures.ThreadPoolExecutor(max_workers=settings.FILE_IO_THREADS)
+    return _EXECUTOR
+
+
+async def run(func, *args, **kwargs):
+    """Call the blocking ``func(*args, **kwargs)`` in the file I/O thread pool and return its
+    result, e.g. ``await fileio.run(os.listdir, path)``.
+    """
+    loop = asyncio.get_event_loop()
+    return await loop.run_in_executor(get_executor(), functools.partial(func, *args, **kwargs))
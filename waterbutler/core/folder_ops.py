@@ -0,0 +1,370 @@
+import asyncio
+import logging
+
+import aiohttp
+
+from waterbutler import settings
+from waterbutler.core import exceptions
+
+
+logger = logging.getLogger(__name__)
+
+
+class FolderOpProgress:
+    """Counters for a recursive folder copy or move.  Totals grow as folders are listed, so they
+    are only final once every folder has been listed.  ``current`` is the source path of the item
+    most recently started.  ``listeners`` are called with the progress object each time it changes.
+    """
+
+    def __init__(self):
+        self.folders_total = 0
+        self.folders_done = 0
+        self.files_total = 0
+        self.files_done = 0
+        self.bytes_total = 0
+        self.bytes_done = 0
+        self.retries = 0
+        self.current = None  # type: str
+        self.listeners = []  # type: list
+
+    def serialize(self):
+        return {
+            'folders_total': self.folders_total,
+            'folders_done': self.folders_done,
+            'files_total': self.files_total,
+            'files_done': self.files_done,
+            'bytes_total': self.bytes_total,
+            'bytes_done': self.bytes_done,
+            'retries': self.retries,
+            'current': self.current,
+        }
+
+    def changed(self):
+        for listener in self.listeners:
+            listener(self)
+
+
+class _Node:
+    """A file or folder waiting to be copied or moved."""
+
+    __slots__ = ('parent', 'index', 'item', 'src_path', 'dest_path', 'size', 'metadata',
+                 'children', 'pending', 'walked', 'resumed')
+
+    def __init__(self, parent, index, item, src_path=None, dest_path=None):
+        self.parent = parent
+        self.index = index
+        self.item = item
+        self.src_path = src_path
+        self.dest_path = dest_path
+        self.size = 0
+        self.metadata = None
+        self.children = []  # type: list
+        self.pending = 0
+        self.walked = False  # whether the folder was recreated and walked rather than sent whole
+        self.resumed = False  # whether the folder was created by an earlier, interrupted run
+
+
+class FolderOpExecutor:
+    """Copies or moves a folder tree with a fixed pool of ``concurrency`` workers pulling from one
+    work queue, so the limit holds across the whole tree.  Listing a folder queues its children
+    straight away, so files and subfolders at any depth are worked on side by side.
+
+    Files, and folders ``src_provider`` can copy or move in a single call, are handed to ``func``
+    (the provider's ``copy`` or ``move``) with ``handle_naming=False``.  Other folders are
+    recreated at the destination and walked.  When moving, a walked folder is deleted from the
+    source once everything in it has been moved.
+
+    Each step is retried up to ``retries`` times if it fails with a server or connection error.
+    The first error that outlasts its retries stops the whole operation and is raised.
+
+    If a ``journal`` is given, every folder created and every item finished is recorded in it, by
+    source path.  A later run with the same journal, e.g. after the worker running the first one
+    died, keeps the folders already created and skips items already finished.  A finished file is
+    only skipped if the source still reports the same size, etag and modified time, and the copy
+    at the destination still has the recorded size and etag; otherwise it is sent again.
+
+    :param func: bound ``copy`` or ``move`` method of ``src_provider``
+    :param bool is_move: whether ``func`` moves rather than copies
+    :param progress: a `FolderOpProgress` to update
+    :param journal: a `waterbutler.tasks.journal.CopyJournal`, or anything else with its
+        ``entries`` and ``record`` coroutines
+    """
+
+    RETRYABLE = (aiohttp.ClientError, asyncio.TimeoutError)
+
+    def __init__(self, func, src_provider, dest_provider, is_move=False, progress=None,
+                 concurrency=None, retries=None, backoff=None, journal=None):
+        self.func = func
+        self.src_provider = src_provider
+        self.dest_provider = dest_provider
+        self.progress = progress or FolderOpProgress()
+        self.concurrency = max(settings.OP_CONCURRENCY if concurrency is None else concurrency, 1)
+        self.retries = settings.OP_RETRIES if retries is None else retries
+        self.backoff = settings.OP_RETRY_BACKOFF if backoff is None else backoff
+        self.is_move = is_move
+        self.journal = journal
+
+        self._journaled = {}  # type: dict
+        self._queue = asyncio.Queue()  # type: asyncio.Queue
+        self._done = asyncio.Event()
+        self._error = None  # type: BaseException
+
+    async def run(self, src_path, dest_path):
+        """Copy or move the contents of ``src_path`` into a new folder at ``dest_path``, replacing
+        anything already there.  Returns the new folder's metadata, with its ``children`` filled
+        in, and whether nothing was replaced."""
+        if self.journal is not None:
+            self._journaled = await self.journal.entries()
+
+        root = _Node(None, 0, None, src_path, dest_path)
+        created = await self._create_folder(root)
+        root.walked = True
+        self.progress.folders_total += 1
+        self.progress.changed()
+        self._queue.put_nowait(root)
+
+        workers = [asyncio.ensure_future(self._work()) for _ in range(self.concurrency)]
+        try:
+            await self._done.wait()
+        finally:
+            for worker in workers:
+                worker.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+
+        if self._error is not None:
+            raise self._error
+        return root.metadata, created
+
+    async def _work(self):
+        while True:
+            node = await self._queue.get()
+            try:
+                await self._process(node)
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                if self._error is None:
+                    self._error = exc
+                self._done.set()
+
+    async def _process(self, node):
+        if node.item is not None:
+            node.src_path, node.dest_path = await self._attempt(self._revalidate, node)
+            self.progress.current = node.src_path.materialized_path
+            self.progress.changed()
+
+        if node.item is not None and not self._walks(node):
+            if not await self._resume(node):
+                node.metadata = (await self._attempt(
+                    self.func, self.dest_provider, node.src_path, node.dest_path,
+                    handle_naming=False,
+                ))[0]
+                await self._record(node, 'done', source=_version(node.item),
+                                   size=_size(node.metadata), etag=_etag(node.metadata))
+            if node.item.is_folder:
+                self.progress.folders_done += 1
+            else:
+                self.progress.files_done += 1
+                self.progress.bytes_done += node.size
+            self.progress.changed()
+            return await self._complete(node)
+
+        if node.item is not None:
+            if await self._resume(node):
+                self.progress.folders_done += 1
+                self.progress.changed()
+                return await self._complete(node)
+            await self._create_folder(node)
+            node.walked = True
+
+        items = await self._attempt(self.src_provider.metadata, node.src_path)
+        self.src_provider.provider_metrics.append('_folder_file_ops.item_counts', len(items))
+
+        node.children = [None] * len(items)
+        node.pending = len(items)
+        for index, item in enumerate(items):
+            child = _Node(node, index, item)
+            if item.is_folder:
+                self.progress.folders_total += 1
+            else:
+                child.size = _size(item)
+                self.progress.files_total += 1
+                self.progress.bytes_total += child.size
+            self._queue.put_nowait(child)
+        self.progress.changed()
+
+        if not items:
+            await self._complete(node)
+
+    def _walks(self, node):
+        """Whether ``node`` is a folder that must be recreated and walked, rather than handed to
+        ``func`` whole."""
+        if not node.item.is_folder:
+            return False
+        if self.is_move:
+            return not self.src_provider.can_intra_move(self.dest_provider, node.src_path)
+        return not self.src_provider.can_intra_copy(self.dest_provider, node.src_path)
+
+    async def _revalidate(self, node):
+        parent, item = node.parent, node.item
+        return await asyncio.gather(
+            self.src_provider.revalidate_path(parent.src_path, item.name, folder=item.is_folder),
+            self.dest_provider.revalidate_path(parent.dest_path, item.name, folder=item.is_folder),
+        )
+
+    async def _create_folder(self, node):
+        """Set up the destination folder of ``node``, reusing the one made by an earlier run if
+        the journal has it, and otherwise replacing whatever is at ``node.dest_path`` with an
+        empty folder.  Returns whether nothing was replaced."""
+        entry = self._journaled.get(node.src_path.materialized_path)
+        if entry is not None:
+            folder = await self._existing_folder(node.dest_path)
+            if folder is not None:
+                node.metadata, node.resumed = folder, True
+                node.dest_path = await self._attempt(
+                    self.dest_provider.revalidate_path, node.dest_path.parent,
+                    node.dest_path.name, folder=True,
+                )
+                return entry['created']
+
+        node.metadata, node.dest_path, created = await self._attempt(self._recreate_folder,
+                                                                     node.dest_path)
+        await self._record(node, 'created', name=node.dest_path.name, created=created)
+        return created
+
+    async def _recreate_folder(self, dest_path):
+        """Replace whatever is at ``dest_path`` with an empty folder.  Returns the new folder's
+        metadata, its path, revalidated so that id-based providers know its id, and whether
+        nothing was replaced."""
+        try:
+            await self.dest_provider.delete(dest_path)
+            created = False
+        except exceptions.ProviderError as e:
+            if e.code != 404:
+                raise
+            created = True
+        folder = await self.dest_provider.create_folder(dest_path, folder_precheck=False)
+        dest_path = await self.dest_provider.revalidate_path(dest_path.parent, dest_path.name,
+                                                             folder=True)
+        return folder, dest_path, created
+
+    async def _existing_folder(self, dest_path):
+        """The metadata of the folder at ``dest_path``, or `None` if there isn't one."""
+        try:
+            items = await self._attempt(self.dest_provider.metadata, dest_path.parent)
+        except exceptions.NotFoundError:
+            return None
+        for item in items:
+            if item.is_folder and item.name == dest_path.name:
+                return item
+        return None
+
+    async def _resume(self, node):
+        """Whether the journal shows ``node`` was finished by an earlier run, and what it left at
+        the destination is still there.  If so, ``node.metadata`` is set from the destination."""
+        entry = self._journaled.get(node.src_path.materialized_path)
+        if entry is None or entry['state'] != 'done':
+            return False
+
+        if node.item.is_folder:
+            metadata = await self._existing_folder(node.dest_path)
+            if metadata is None:
+                return False
+        else:
+            if entry['source'] != _version(node.item):
+                return False
+            try:
+                metadata = await self._attempt(self.dest_provider.metadata, node.dest_path)
+            except exceptions.NotFoundError:
+                return False
+            if _size(metadata) != entry['size'] or _etag(metadata) != entry['etag']:
+                return False
+
+        if self.is_move:
+            # the earlier run may have stopped between copying the item and deleting it
+            try:
+                await self._attempt(self.src_provider.delete, node.src_path)
+            except exceptions.NotFoundError:
+                pass
+
+        node.metadata = metadata
+        return True
+
+    async def _record(self, node, state, **values):
+        if self.journal is None:
+            return
+        key = node.src_path.materialized_path
+        entry = dict(self._journaled.get(key) or {}, state=state, **values)
+        self._journaled[key] = entry
+        await self.journal.record(key, entry)
+
+    async def _complete(self, node):
+        """Record that ``node`` and everything in it are done, finishing its parents in turn."""
+        while True:
+            if node.walked:
+                node.metadata.children = node.children
+                if self.is_move and node.resumed:
+                    # whatever was moved before the interruption is no longer listed at the source
+                    node.metadata.children = await self._attempt(self.dest_provider.metadata,
+                                                                 node.dest_path)
+                if self.is_move and node.parent is not None:
+                    await self._attempt(self.src_provider.delete, node.src_path)
+                await self._record(node, 'done')
+                self.progress.folders_done += 1
+                self.progress.changed()
+
+            parent = node.parent
+            if parent is None:
+                self._done.set()
+                return
+
+            parent.children[node.index] = node.metadata
+            parent.pending -= 1
+            if parent.pending:
+                return
+            node = parent
+
+    async def _attempt(self, func, *args, **kwargs):
+        attempt = 0
+        while True:
+            try:
+                return await func(*args, **kwargs)
+            except Exception as exc:
+                if attempt >= self.retries or not self._retryable(exc):
+                    raise
+                attempt += 1
+                self.progress.retries += 1
+                self.progress.changed()
+                wait_time = self.backoff * attempt
+                logger.warning('{!r} failed with {!r}, retry {} / {} in {} seconds'.format(
+                    func, exc, attempt, self.retries, wait_time))
+                await asyncio.sleep(wait_time)
+
+    def _retryable(self, exc):
+        if isinstance(exc, exceptions.ProviderError):
+            return exc.code >= 500
+        return isinstance(exc, self.RETRYABLE)
+
+
+def _size(item):
+    try:
+        return int(item.size or 0)
+    except (AttributeError, NotImplementedError, TypeError, ValueError):
+        return 0
+
+
+def _etag(item):
+    try:
+        etag = item.etag
+    except (AttributeError, NotImplementedError):
+        return None
+    return None if etag is None else str(etag)
+
+
+def _version(item):
+    """The ``[size, etag, modified]`` of a file, as recorded in a journal."""
+    try:
+        modified = item.modified
+    except (AttributeError, NotImplementedError):
+        modified = None
+    return [_size(item), _etag(item), None if modified is None else str(modified)]
@@ -1,55 +1,42 @@
 import abc
-import time
+import copy
+import json
 import typing
 import asyncio
+import hashlib
 import logging
-import weakref
 import functools
 import itertools
+import collections
 from urllib import parse
 
 import furl
 import aiohttp
 
 from waterbutler.core import streams
+from waterbutler.core import ratelimit
 from waterbutler.core import exceptions
+from waterbutler.core import connections
 from waterbutler.core import path as wb_path
 from waterbutler import settings as wb_settings
+from waterbutler.core.cache import SingleFlight
+from waterbutler.core.cache import path_identity
+from waterbutler.core.cache import get_metadata_cache
+from waterbutler.core.zipcache import file_version_key
+from waterbutler.core.zipcache import get_zip_crc_cache
+from waterbutler.core.zipcache import get_zip_archive_cache
 from waterbutler.core.metrics import MetricsRecord
+from waterbutler.core.folder_ops import FolderOpExecutor
+from waterbutler.core.folder_ops import FolderOpProgress
 from waterbutler.core import metadata as wb_metadata
 from waterbutler.core.utils import ZipStreamGenerator
+from waterbutler.core.utils import PrefetchingZipStreamGenerator
 from waterbutler.core.utils import RequestHandlerContext
+from waterbutler.core.utils import zip_date_time
 
 
 logger = logging.getLogger(__name__)
-_THROTTLES = weakref.WeakKeyDictionary()  # type: weakref.WeakKeyDictionary
-
-
-def throttle(concurrency=10, interval=1):
-    def _throttle(func):
-        @functools.wraps(func)
-        async def wrapped(*args, **kwargs):
-            if asyncio.get_event_loop() not in _THROTTLES:
-                count, last_call, event = 0, time.time(), asyncio.Event()
-                _THROTTLES[asyncio.get_event_loop()] = (count, last_call, event)
-                event.set()
-            else:
-                count, last_call, event = _THROTTLES[asyncio.get_event_loop()]
-
-            await event.wait()
-            count += 1
-            if count > concurrency:
-                count = 0
-                if (time.time() - last_call) < interval:
-                    event.clear()
-                    await asyncio.sleep(interval - (time.time() - last_call))
-                    event.set()
-
-            last_call = time.time()
-            _THROTTLES[asyncio.get_event_loop()] = (count, last_call, event)
-            return await func(*args, **kwargs)
-        return wrapped
-    return _throttle
+single_flight = SingleFlight()
 
 
 def build_url(base, *segments, **query):
@@ -84,6 +71,11 @@ class BaseProvider(metaclass=abc.ABCMeta):
 
     BASE_URL = None
 
+    # Methods whose concurrent identical calls may share a single upstream request.  Providers
+    # whose implementations stash state on the instance (e.g. GitHub's ``validate_v1_path``
+    # recording the default branch) must leave those methods out.
+    COALESCED_METHODS = ('metadata', 'validate_v1_path')  # type: typing.Tuple[str, ...]
+
     def __init__(self, auth: dict,
                  credentials: dict,
                  settings: dict,
@@ -104,6 +96,30 @@ class BaseProvider(metaclass=abc.ABCMeta):
         self.provider_metrics.add('auth', auth)
         self.metrics = self.provider_metrics.new_subrecord(self.NAME)
 
+        # Progress of the folder copy or move started by this provider, and the journal that lets
+        # an interrupted one be resumed (see waterbutler.tasks.journal)
+        self.folder_op_progress = None  # type: FolderOpProgress
+        self.folder_op_journal = None
+
+        # Whether downloads may be fetched as concurrent Range requests.  Only set when WaterButler
+        # consumes the bytes itself (copies, moves and zips), not for downloads sent to a client.
+        self.parallel_downloads = False
+
+        if wb_settings.PROVIDER_SINGLE_FLIGHT:
+            for name in self.COALESCED_METHODS:
+                setattr(self, name, self._coalesced(getattr(self, name)))
+
+        self._metadata_cache = get_metadata_cache()
+        self._writes_in_progress = 0
+        if self._metadata_cache is not None and self._metadata_cache.enabled_for(self.NAME):
+            self.metadata = self._cached_metadata(self.metadata)
+            for name in ('upload', 'delete', 'create_folder'):
+                setattr(self, name, self._invalidates_path(getattr(self, name)))
+            for name in ('move', 'copy', 'intra_move', 'intra_copy'):
+                setattr(self, name, self._invalidates_transfer(getattr(self, name)))
+        else:
+            self._metadata_cache = None
+
     @property
     @abc.abstractmethod
     def NAME(self) -> str:
@@ -118,6 +134,125 @@ class BaseProvider(metaclass=abc.ABCMeta):
         except AttributeError:
             return False
 
+    def _coalesced(self, func: typing.Callable) -> typing.Callable:
+        """Wrap ``func`` so that concurrent calls with the same provider identity (name,
+        credentials and settings) and the same arguments share one upstream request.  Callers that
+        piggyback on a call already in flight get a deep copy of its result, since paths and
+        metadata objects may be mutated by their recipients.
+        """
+        if not callable(func):
+            return func
+
+        @functools.wraps(func)
+        async def wrapped(*args, **kwargs):
+            call = json.dumps([
+                func.__name__,
+                [path_identity(arg) for arg in args],
+                sorted(kwargs.items()),
+            ], default=str, sort_keys=True)
+            key = hashlib.sha256((self.identity + call).encode()).hexdigest()
+
+            collapsed = single_flight.pending(key)
+            result = await single_flight.do(key, func, *args, **kwargs)
+            if collapsed:
+                self.provider_metrics.incr('single_flight.{}.collapsed'.format(func.__name__))
+                result = copy.deepcopy(result)
+            return result
+
+        return wrapped
+
+    def _cached_metadata(self, func: typing.Callable) -> typing.Callable:
+        """Wrap ``metadata`` so that responses are served from and stored in the metadata cache.
+        Only requests for the current state of a path are cached; requests for a specific
+        revision or version bypass the cache, as do requests made while this provider is writing,
+        since a write's own reads (e.g. ``exists`` before an upload, ``metadata`` after it) would
+        otherwise see the state from before the write.
+        """
+        if not callable(func):
+            return func
+
+        @functools.wraps(func)
+        async def wrapped(path, **kwargs):
+            if self._writes_in_progress or any(value is not None for value in kwargs.values()):
+                return await func(path, **kwargs)
+
+            # Copies keep callers from mutating what's stored in an in-memory cache
+            cached = await self._metadata_cache.get(self.identity, path)
+            if cached is not None:
+                self.provider_metrics.incr('metadata_cache.hits')
+                return copy.deepcopy(cached)
+
+            self.provider_metrics.incr('metadata_cache.misses')
+            result = await func(path, **kwargs)
+            await self._metadata_cache.set(self.identity, path, copy.deepcopy(result),
+                                           ttl=self._metadata_cache.ttl_for(self.NAME))
+            return result
+
+        return wrapped
+
+    def _invalidates_path(self, func: typing.Callable) -> typing.Callable:
+        """Wrap a write method taking the affected path as its first path argument (``upload``,
+        ``delete``, ``create_folder``) so that it invalidates cached metadata before it starts and
+        once it finishes.
+        """
+        if not callable(func):
+            return func
+
+        @functools.wraps(func)
+        async def wrapped(*args, **kwargs):
+            paths = [arg for arg in args + tuple(kwargs.values())
+                     if isinstance(arg, wb_path.WaterButlerPath)]
+            await self.invalidate_metadata(*paths[:1])
+            self._writes_in_progress += 1
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                self._writes_in_progress -= 1
+                await self.invalidate_metadata(*paths[:1])
+
+        return wrapped
+
+    def _invalidates_transfer(self, func: typing.Callable) -> typing.Callable:
+        """Wrap ``move``/``copy``/``intra_move``/``intra_copy`` so that cached metadata for the
+        destination (and for moves, the source) is invalidated before the transfer starts and once
+        it finishes.
+        """
+        if not callable(func):
+            return func
+
+        async def invalidate(dest_provider, src_path, dest_path):
+            if func.__name__ in ('move', 'intra_move'):
+                await self.invalidate_metadata(src_path)
+            await dest_provider.invalidate_metadata(dest_path)
+
+        @functools.wraps(func)
+        async def wrapped(dest_provider, src_path, dest_path, *args, **kwargs):
+            await invalidate(dest_provider, src_path, dest_path)
+            self._writes_in_progress += 1
+            dest_provider._writes_in_progress += 1
+            try:
+                return await func(dest_provider, src_path, dest_path, *args, **kwargs)
+            finally:
+                self._writes_in_progress -= 1
+                dest_provider._writes_in_progress -= 1
+                await invalidate(dest_provider, src_path, dest_path)
+
+        return wrapped
+
+    async def invalidate_metadata(self, *paths: wb_path.WaterButlerPath) -> None:
+        """Drop cached metadata for ``paths`` and their parents.  A no-op unless the metadata
+        cache is enabled for this provider."""
+        if self._metadata_cache is not None:
+            await self._metadata_cache.invalidate(self.identity, *paths)
+
+    @property
+    def identity(self) -> str:
+        """A hash of the provider's name, credentials and settings.  Providers with the same
+        identity see the same storage with the same permissions."""
+        return hashlib.sha256(json.dumps(
+            [self.NAME, self.credentials, self.settings], default=str, sort_keys=True
+        ).encode()).hexdigest()
+
     def serialized(self) -> dict:
         return {
             'name': self.NAME,
@@ -151,39 +286,68 @@ class BaseProvider(metaclass=abc.ABCMeta):
             if value is not None
         }
 
-    @throttle()
-    async def make_request(self, method: str, url: str, *args, **kwargs) -> aiohttp.client.ClientResponse:
+    async def make_request(self, method: str, url: typing.Union[str, typing.Callable[[], str]],
+                           *args, **kwargs) -> aiohttp.client.ClientResponse:
         """A wrapper around :func:`aiohttp.request`. Inserts default headers.
 
         :param method: ( :class:`str` ) The HTTP method
-        :param url: ( :class:`str` ) The url to send the request to
+        :param url: ( :class:`str` or callable ) The url to send the request to, or a callable
+            returning it, called again for every retry
         :keyword range: An optional tuple (start, end) that is transformed into a Range header
         :keyword expects: An optional tuple of HTTP status codes as integers raises an exception
             if the returned status code is not in it.
         :type expects: tuple of ints
         :param throws: ( :class:`Exception` ) The exception to be raised from expects
+        :keyword connector: An optional :class:`aiohttp.TCPConnector`. If not given, a shared
+            connector for the url's host is taken from :mod:`waterbutler.core.connections`.
         :param \*args: ( :class:`tuple` )args passed to :func:`aiohttp.request`
         :param \*\*kwargs:  ( :class:`dict` ) kwargs passed to :func:`aiohttp.request`
         :rtype: :class:`aiohttp.ClientResponse`
         :raises: :class:`.UnhandledProviderError` Raised if expects is defined
+
+        Requests are gated by the (provider, host) limiter from :mod:`waterbutler.core.ratelimit`.
+        Rate-limited responses (429, or a ``Retry-After`` on 403/503) are retried once the upstream
+        allows it.  Only the limited request waits; rate limits are often per user or token, so the
+        wait is not imposed on other requests to the same host.
         """
         kwargs['headers'] = self.build_headers(**kwargs.get('headers', {}))
         retry = _retry = kwargs.pop('retry', 2)
         range = kwargs.pop('range', None)
         expects = kwargs.pop('expects', None)
         throws = kwargs.pop('throws', exceptions.UnhandledProviderError)
+        connector = kwargs.pop('connector', None)
         if range:
             kwargs['headers']['Range'] = self._build_range_header(range)
 
         while retry >= 0:
             # Don't overwrite the callable ``url`` so that signed URLs are refreshed for every retry
             non_callable_url = url() if callable(url) else url
+            limiter = ratelimit.get_limiter(self.NAME, non_callable_url)
             try:
                 self.provider_metrics.incr('requests.count')
                 self.provider_metrics.append('requests.urls', non_callable_url)
-                response = await aiohttp.request(method, non_callable_url, *args, **kwargs)
+                await limiter.acquire(flow=id(self))
+                try:
+                    response = await aiohttp.request(
+                        method, non_callable_url, *args,
+                        connector=connector or connections.get_connector(
+                            non_callable_url, metrics=self.provider_metrics
+                        ),
+                        **kwargs
+                    )
+                finally:
+                    limiter.release()
                 self.provider_metrics.append('requests.verbose',
                                              ['OK', response.status, non_callable_url])
+
+                delay = ratelimit.retry_after(response, default=(1 + _retry - retry) * 2)
+                if delay is not None:
+                    self.provider_metrics.incr('requests.rate_limited')
+                    if retry > 0 and delay <= wb_settings.RATE_LIMIT_MAX_RETRY_AFTER:
+                        await response.release()
+                        await asyncio.sleep(delay)
+                        retry -= 1
+                        continue
                 if expects and response.status not in expects:
                     raise (await exceptions.exception_from_response(response, error=throws, **kwargs))
                 return response
@@ -197,6 +361,71 @@ class BaseProvider(metaclass=abc.ABCMeta):
     def request(self, *args, **kwargs):
         return RequestHandlerContext(self.make_request(*args, **kwargs))
 
+    async def make_ranged_download(self, url, range: typing.Tuple[int, int]=None,
+                                   request: typing.Callable=None, name: str=None,
+                                   **kwargs) -> streams.BaseStream:
+        """GET ``url`` and return its body as a stream.  For providers whose download urls honor
+        ``Range`` headers.  If ``parallel_downloads`` is set and the caller didn't ask for a specific
+        ``range``, the file is requested in segments of ``PARALLEL_DOWNLOAD_CHUNK_SIZE`` bytes,
+        ``PARALLEL_DOWNLOAD_CONCURRENCY`` at a time, and reassembled by a
+        :class:`.streams.ParallelRangeStream`.  The first segment's ``ETag`` is sent as ``If-Match``
+        with the rest, so a file modified mid-download fails rather than being spliced together.
+
+        Files that fit in a single segment, and servers that ignore the ``Range`` header, are
+        streamed from the first response as usual.
+
+        :param url: the url, or a callable returning a freshly signed url
+        :param tuple range: a client requested range; disables segmenting
+        :param request: coroutine function used to send the requests, defaults to
+            :meth:`make_request`
+        :param str name: passed on to the returned stream
+        :param \*\*kwargs: passed through to ``request``; must not include ``expects``
+        :rtype: :class:`.streams.ResponseStreamReader` or :class:`.streams.ParallelRangeStream`
+        """
+        request = request or self.make_request
+        chunk_size = wb_settings.PARALLEL_DOWNLOAD_CHUNK_SIZE
+        concurrency = wb_settings.PARALLEL_DOWNLOAD_CONCURRENCY
+
+        if (range is not None or not self.parallel_downloads or
+                not wb_settings.PARALLEL_DOWNLOAD_ENABLED or concurrency < 2):
+            resp = await request('GET', url, range=range, expects=(200, 206), **kwargs)
+            return streams.ResponseStreamReader(resp, name=name)
+
+        resp = await request('GET', url, range=(0, chunk_size - 1), expects=(200, 206, 416),
+                             **kwargs)
+        if resp.status == 200:
+            return streams.ResponseStreamReader(resp, name=name)
+
+        # 416 is returned for empty files, an unknown total can't be split up
+        size = self._content_range_size(resp)
+        if size is None:
+            await resp.release()
+            resp = await request('GET', url, expects=(200, ), **kwargs)
+            return streams.ResponseStreamReader(resp, name=name)
+
+        headers = dict(kwargs.pop('headers', {}))
+        if resp.headers.get('ETag'):
+            headers['If-Match'] = resp.headers['ETag']
+
+        async def fetch(start, end):
+            return await request('GET', url, range=(start, end), expects=(206, ),
+                                 headers=headers, **kwargs)
+
+        if size > chunk_size:
+            self.provider_metrics.incr('download.ranged')
+        return streams.ParallelRangeStream(fetch, resp, size, chunk_size, concurrency, name=name)
+
+    @staticmethod
+    def _content_range_size(response: aiohttp.client.ClientResponse) -> typing.Optional[int]:
+        """Total size from a ``Content-Range: bytes <start>-<end>/<size>`` response header."""
+        if response.status != 206:
+            return None
+        _, _, size = response.headers.get('Content-Range', '').rpartition('/')
+        try:
+            return int(size)
+        except ValueError:
+            return None
+
     async def move(self,
                    dest_provider: 'BaseProvider',
                    src_path: wb_path.WaterButlerPath,
@@ -295,6 +524,7 @@ class BaseProvider(metaclass=abc.ABCMeta):
         if src_path.is_dir:
             return await self._folder_file_op(self.copy, *args, **kwargs)  # type: ignore
 
+        self.parallel_downloads = True
         download_stream = await self.download(src_path)
 
         if getattr(download_stream, 'name', None):
@@ -308,7 +538,11 @@ class BaseProvider(metaclass=abc.ABCMeta):
                               src_path: wb_path.WaterButlerPath,
                               dest_path: wb_path.WaterButlerPath,
                               **kwargs) -> typing.Tuple[wb_metadata.BaseFolderMetadata, bool]:
-        """Recursively apply func to src/dest path.
+        """Recursively apply func to src/dest path.  The folder tree is walked by a
+        :class:`.FolderOpExecutor`, whose progress can be followed through
+        ``self.folder_op_progress`` while it runs; set it beforehand to follow it from the start.
+        If ``self.folder_op_journal`` is set, work already recorded in it by an interrupted run is
+        not repeated.
 
         Called from: func: copy and move if src_path.is_dir.
 
@@ -325,48 +559,15 @@ class BaseProvider(metaclass=abc.ABCMeta):
         assert src_path.is_dir, 'src_path must be a directory'
         assert asyncio.iscoroutinefunction(func), 'func must be a coroutine'
 
-        try:
-            await dest_provider.delete(dest_path)
-            created = False
-        except exceptions.ProviderError as e:
-            if e.code != 404:
-                raise
-            created = True
+        if self.folder_op_progress is None:
+            self.folder_op_progress = FolderOpProgress()
 
-        folder = await dest_provider.create_folder(dest_path, folder_precheck=False)
-
-        dest_path = await dest_provider.revalidate_path(dest_path.parent, dest_path.name, folder=dest_path.is_dir)
-
-        folder.children = []
-        items = await self.metadata(src_path)  # type: ignore
-
-        # Metadata returns a union, which confuses mypy
-        self.provider_metrics.append('_folder_file_ops.item_counts', len(items))  # type: ignore
-
-        for i in range(0, len(items), wb_settings.OP_CONCURRENCY):  # type: ignore
-            futures = []
-            for item in items[i:i + wb_settings.OP_CONCURRENCY]:  # type: ignore
-                futures.append(asyncio.ensure_future(
-                    func(
-                        dest_provider,
-                        # TODO figure out a way to cut down on all the requests made here
-                        (await self.revalidate_path(src_path, item.name, folder=item.is_folder)),
-                        (await dest_provider.revalidate_path(dest_path, item.name, folder=item.is_folder)),
-                        handle_naming=False,
-                    )
-                ))
-
-                if item.is_folder:
-                    await futures[-1]
-
-            if not futures:
-                continue
-
-            done, _ = await asyncio.wait(futures, return_when=asyncio.FIRST_EXCEPTION)
-
-            for fut in done:
-                folder.children.append(fut.result()[0])
+        executor = FolderOpExecutor(func, self, dest_provider, is_move=func == self.move,
+                                    progress=self.folder_op_progress,
+                                    journal=self.folder_op_journal)
+        folder, created = await executor.run(src_path, dest_path)
 
+        self.provider_metrics.add('_folder_file_ops.progress', self.folder_op_progress.serialize())
         return folder, created
 
     async def handle_naming(self,
@@ -545,18 +746,138 @@ class BaseProvider(metaclass=abc.ABCMeta):
         """
         return base.child(path, folder=folder)
 
-    async def zip(self, path: wb_path.WaterButlerPath, **kwargs) -> asyncio.StreamReader:
+    async def zip(self, path: wb_path.WaterButlerPath, range: typing.Tuple[int, int]=None,
+                  stored: bool=False, **kwargs) -> asyncio.StreamReader:
         """Streams a Zip archive of the given folder
 
+        If ``stored`` is set and every file reports its size, the archive is built without
+        compression, its exact size is known up front and ``range`` is honored by downloading only
+        the matching ranges of the files.  Otherwise, if the zip archive cache is enabled, the
+        archive of a folder whose contents haven't changed since it was last zipped is served from
+        the cache, honoring ``range``.  Otherwise the archive is built on the fly and ``range`` is
+        ignored.
+
         :param  path: ( :class:`.WaterButlerPath` ) The folder to compress
+        :param range: ( :class:`tuple` ) inclusive byte range of the archive to return
+        :param stored: ( :class:`bool` ) build an uncompressed archive of known size
         """
 
-        meta_data = await self.metadata(path)  # type: ignore
+        self.parallel_downloads = True
+        meta_data = await self.metadata(path)  # type: typing.Any
         if path.is_file:
-            meta_data = [meta_data]  # type: ignore
+            meta_data = [meta_data]
             path = path.parent
 
-        return streams.ZipStreamReader(ZipStreamGenerator(self, path, *meta_data))  # type: ignore
+        if stored:
+            listings, _ = await self._zip_listings(path, meta_data)
+            entries = self._stored_zip_entries(path, meta_data, listings)
+            if entries is not None:
+                return streams.StoredZipStreamReader(
+                    streams.StoredZipArchive(entries),
+                    lambda entry, range: self.download(entry.path, range=range),  # type: ignore
+                    byte_range=range,
+                    crc_cache=get_zip_crc_cache(),
+                )
+            logger.info('Not all file sizes under {} are known, zipping with compression '
+                        'instead'.format(path))
+
+        archive_cache = get_zip_archive_cache()
+        listings, cache_key = None, None
+        if archive_cache is not None:
+            listings, entries = await self._zip_listings(path, meta_data)
+            fingerprint = archive_cache.fingerprint(entries)
+            if fingerprint is not None:
+                cache_key = archive_cache.key(self.identity, path, fingerprint)
+                cached = await archive_cache.open(cache_key, range=range)
+                if cached is not None:
+                    self.provider_metrics.incr('zip_archive_cache.hits')
+                    return cached
+                self.provider_metrics.incr('zip_archive_cache.misses')
+
+        if wb_settings.ZIP_PREFETCH_DOWNLOADS > 0:
+            generator = PrefetchingZipStreamGenerator(
+                self, path, *meta_data,
+                downloads=wb_settings.ZIP_PREFETCH_DOWNLOADS,
+                max_bytes=wb_settings.ZIP_PREFETCH_MAX_BYTES,
+                list_concurrency=wb_settings.ZIP_PREFETCH_LIST_CONCURRENCY,
+                listings=listings,
+            )  # type: typing.Any
+        else:
+            generator = ZipStreamGenerator(self, path, *meta_data,
+                                           listings=listings)
+
+        stream = streams.ZipStreamReader(generator)
+        if cache_key is not None:
+            return archive_cache.tee(cache_key, stream)  # type: ignore
+        return stream
+
+    async def _zip_listings(self, path: wb_path.WaterButlerPath,
+                            items: typing.List[wb_metadata.BaseMetadata]) -> typing.Tuple[dict, list]:
+        """List every folder below ``path``, whose contents are ``items``, up to
+        ``ZIP_PREFETCH_LIST_CONCURRENCY`` at a time.  Returns a map of each folder's ``path`` to its
+        contents, and ``(name, metadata)`` for every descendant, named as in the zip archive.
+        """
+        listings = {}  # type: dict
+        entries = []  # type: list
+        slots = asyncio.Semaphore(max(wb_settings.ZIP_PREFETCH_LIST_CONCURRENCY, 1))
+
+        async def list_folder(folder):
+            async with slots:
+                children = await self.metadata(folder)  # type: ignore
+            listings[folder.path] = children
+            await walk(folder, children)
+
+        async def walk(parent, children):
+            folders = []
+            for item in children:
+                child = self.path_from_metadata(parent, item)
+                entries.append((child.path.replace(path.path, '', 1), item))
+                if child.is_dir:
+                    folders.append(child)
+            await asyncio.gather(*[list_folder(folder) for folder in folders])
+
+        await walk(path, items)
+        return listings, entries
+
+    def _stored_zip_entries(self, path: wb_path.WaterButlerPath,
+                            items: typing.List[wb_metadata.BaseMetadata],
+                            listings: dict) -> typing.Optional[typing.List[streams.StoredZipEntry]]:
+        """Build the entries of a stored zip archive of ``path``, whose contents are ``items``,
+        in the order `ZipStreamGenerator` would emit them.  ``listings`` is as returned by
+        ``_zip_listings``.  Returns `None` if the size of any file is unknown.
+        """
+        entries = []
+        remaining = collections.deque((path, item) for item in items)
+        while remaining:
+            parent, item = remaining.popleft()
+            child = self.path_from_metadata(parent, item)
+            name = child.path.replace(path.path, '', 1)
+
+            if child.is_dir:
+                if listings[child.path]:
+                    remaining.extend((child, grandchild) for grandchild in listings[child.path])
+                else:
+                    entries.append(streams.StoredZipEntry(name, 0, zip_date_time(None)))
+                continue
+
+            if not isinstance(item, wb_metadata.BaseFileMetadata):
+                return None
+            try:
+                size = int(item.size)
+            except (NotImplementedError, TypeError, ValueError):
+                return None
+
+            try:
+                modified = item.modified_utc  # type: typing.Optional[str]
+            except (NotImplementedError, TypeError, ValueError):
+                modified = None
+
+            entries.append(streams.StoredZipEntry(
+                name, size, zip_date_time(modified), path=child,
+                crc_key=file_version_key(self.identity, child, item),
+            ))
+
+        return entries
 
     def shares_storage_root(self, other: 'BaseProvider') -> bool:
         """Returns True if ``self`` and ``other`` both point to the same storage root.  Used to
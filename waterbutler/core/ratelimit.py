@@ -0,0 +1,225 @@
+import time
+import asyncio
+import logging
+import weakref
+import collections
+from urllib import parse
+from email.utils import parsedate_to_datetime
+
+from waterbutler import settings
+
+
+logger = logging.getLogger(__name__)
+_LIMITERS = weakref.WeakKeyDictionary()  # type: weakref.WeakKeyDictionary
+
+
+class HostLimiter:
+    """Gatekeeper for requests to a single upstream host.  Combines a token bucket (``rate``
+    requests per second, bursting up to ``burst``) with a cap on the number of requests in flight
+    at once.  Callers that can't proceed immediately are queued per *flow*, and queued flows are
+    served round-robin so that one request issuing hundreds of upstream calls (e.g. a zip download)
+    can't starve another request that needs only one.
+
+    :param float rate: tokens added per second; ``0`` disables the token bucket
+    :param int burst: maximum number of tokens the bucket may hold
+    :param int concurrency: maximum number of requests in flight; ``0`` disables the cap
+    :param loop: the event loop the limiter belongs to
+    """
+
+    def __init__(self, rate, burst, concurrency, loop=None):
+        self.rate = float(rate)
+        self.burst = max(int(burst), 1)
+        self.concurrency = int(concurrency)
+        self.loop = loop or asyncio.get_event_loop()
+
+        self.tokens = float(self.burst)
+        self.in_flight = 0
+        self.total_queued = 0
+
+        self._last_refill = self.loop.time()
+        self._waiters = collections.OrderedDict()  # type: collections.OrderedDict
+        self._timer = None
+
+    @property
+    def queued(self):
+        """Number of callers currently waiting for a slot."""
+        return sum(len(waiters) for waiters in self._waiters.values())
+
+    def stats(self):
+        return {
+            'queued': self.queued,
+            'in_flight': self.in_flight,
+            'tokens': round(self.tokens, 2),
+            'total_queued': self.total_queued,
+        }
+
+    async def acquire(self, flow=None):
+        """Wait until a request may be sent.  Every successful ``acquire`` must be paired with a
+        ``release`` once the upstream has responded.
+
+        :param flow: hashable identifying the caller, used for fair queuing
+        """
+        if not self._waiters and self._delay() == 0:
+            self._take()
+            return
+
+        waiter = asyncio.Future(loop=self.loop)
+        self._waiters.setdefault(flow, collections.deque()).append(waiter)
+        self.total_queued += 1
+        self._wake()
+
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # Slot was granted just as we were cancelled, hand it back
+                self.release()
+            else:
+                self._discard(flow, waiter)
+            raise
+
+    def release(self):
+        self.in_flight = max(self.in_flight - 1, 0)
+        self._wake()
+
+    def _refill(self):
+        now = self.loop.time()
+        if self.rate > 0:
+            self.tokens = min(self.burst, self.tokens + (now - self._last_refill) * self.rate)
+        self._last_refill = now
+
+    def _delay(self):
+        """Seconds until the next slot can be granted, ``0`` if one is available now and ``None``
+        if we must wait for a request in flight to finish."""
+        if self.concurrency and self.in_flight >= self.concurrency:
+            return None
+
+        self._refill()
+        if self.rate > 0 and self.tokens < 1:
+            return (1 - self.tokens) / self.rate
+        return 0
+
+    def _take(self):
+        if self.rate > 0:
+            self.tokens -= 1
+        self.in_flight += 1
+
+    def _next_waiter(self):
+        """Pop the next waiter, rotating through flows so each gets a turn."""
+        while self._waiters:
+            flow, waiters = next(iter(self._waiters.items()))
+            waiter = waiters.popleft()
+            if waiters:
+                self._waiters.move_to_end(flow)
+            else:
+                del self._waiters[flow]
+            if not waiter.done():
+                return waiter
+        return None
+
+    def _discard(self, flow, waiter):
+        waiters = self._waiters.get(flow)
+        if waiters is None:
+            return
+        try:
+            waiters.remove(waiter)
+        except ValueError:
+            pass
+        if not waiters:
+            del self._waiters[flow]
+
+    def _wake(self):
+        while self._waiters:
+            delay = self._delay()
+            if delay is None:
+                return  # release() will wake us
+            if delay > 0:
+                if self._timer is None:
+                    self._timer = self.loop.call_later(delay, self._on_timer)
+                return
+
+            waiter = self._next_waiter()
+            if waiter is None:
+                return
+            self._take()
+            waiter.set_result(None)
+
+    def _on_timer(self):
+        self._timer = None
+        self._wake()
+
+
+def _limits_for(provider_name, host):
+    limits = dict(settings.RATE_LIMIT_DEFAULT)
+    limits.update(settings.RATE_LIMITS.get(provider_name, {}))
+    limits.update(settings.RATE_LIMITS.get(host, {}))
+    return limits
+
+
+def get_limiter(provider_name, url, loop=None):
+    """Return the `HostLimiter` for requests made by ``provider_name`` to the host of ``url``.
+    Limits are looked up in ``settings.RATE_LIMITS`` by host first, then by provider name, falling
+    back to ``settings.RATE_LIMIT_DEFAULT``.
+    """
+    loop = loop or asyncio.get_event_loop()
+    host = (parse.urlsplit(url).hostname or '').lower()
+    limiters = _LIMITERS.setdefault(loop, {})
+    key = (provider_name, host)
+    if key not in limiters:
+        limits = _limits_for(provider_name, host)
+        limiters[key] = HostLimiter(limits['rate'], limits['burst'], limits['concurrency'],
+                                    loop=loop)
+    return limiters[key]
+
+
+def stats(loop=None):
+    """Queue depth and bucket state for every limiter on the given (or current) loop, keyed by
+    ``<provider>:<host>``."""
+    loop = loop or asyncio.get_event_loop()
+    return {
+        '{}:{}'.format(*key): limiter.stats()
+        for key, limiter in _LIMITERS.get(loop, {}).items()
+    }
+
+
+def _parse_retry_after(value):
+    """``Retry-After`` may be either a number of seconds or an HTTP date."""
+    try:
+        return max(float(value), 0)
+    except ValueError:
+        pass
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0)
+    except (TypeError, ValueError):
+        return None
+
+
+def retry_after(response, default=None):
+    """Inspect ``response`` for signs of upstream rate limiting and return the number of seconds
+    to wait before trying again, or `None` if the response isn't rate limited.
+
+    * ``429 Too Many Requests`` (Dropbox, Google Drive, Box): honor ``Retry-After`` if present,
+      otherwise wait ``default`` seconds.
+    * ``403``/``503`` with ``Retry-After`` (GitHub secondary limits, overloaded services).
+    * ``403`` with ``X-RateLimit-Remaining: 0`` (GitHub primary limits): wait for
+      ``X-RateLimit-Reset``.
+    """
+    headers = response.headers
+    if response.status not in (403, 429, 503):
+        return None
+
+    if 'Retry-After' in headers:
+        delay = _parse_retry_after(headers['Retry-After'])
+        if delay is not None:
+            return delay
+
+    if response.status == 403 and headers.get('X-RateLimit-Remaining') == '0':
+        try:
+            return max(float(headers['X-RateLimit-Reset']) - time.time(), 0)
+        except (KeyError, ValueError):
+            return default
+
+    if response.status == 429:
+        return default
+
+    return None
@@ -8,6 +8,7 @@ import aiohttp
 
 from waterbutler import settings
 from waterbutler.core import utils
+from waterbutler.core import connections
 from waterbutler.sizes import KBs, MBs, GBs
 from waterbutler.version import __version__
 from waterbutler.tasks import settings as task_settings
@@ -200,7 +201,8 @@ async def _send_to_keen(payload, collection, project_id, write_key, action, doma
                                                    settings.KEEN_API_VERSION,
                                                    project_id, collection)
 
-    async with await aiohttp.request('POST', url, headers=headers, data=serialized) as resp:
+    async with await aiohttp.request('POST', url, headers=headers, data=serialized,
+                                     connector=connections.get_connector(url)) as resp:
         if resp.status == 201:
             logger.info('Successfully logged {} to {} collection in {} Keen'.format(action, collection, domain))
         else:
@@ -12,10 +12,17 @@ from waterbutler.core.streams.file import PartialFileStreamReader  # noqa
 from waterbutler.core.streams.http import FormDataStream  # noqa
 from waterbutler.core.streams.http import RequestStreamReader  # noqa
 from waterbutler.core.streams.http import ResponseStreamReader  # noqa
+from waterbutler.core.streams.http import ParallelRangeStream  # noqa
 
 from waterbutler.core.streams.metadata import HashStreamWriter  # noqa
+from waterbutler.core.streams.metadata import MultiHashStreamWriter  # noqa
+
+from waterbutler.core.streams.pipe import PipeStream  # noqa
 
 from waterbutler.core.streams.zip import ZipStreamReader  # noqa
+from waterbutler.core.streams.zip import StoredZipEntry  # noqa
+from waterbutler.core.streams.zip import StoredZipArchive  # noqa
+from waterbutler.core.streams.zip import StoredZipStreamReader  # noqa
 
 from waterbutler.core.streams.base64 import Base64EncodeStream  # noqa
 
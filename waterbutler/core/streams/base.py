@@ -47,8 +47,12 @@ class BaseStream(asyncio.StreamReader, metaclass=abc.ABCMeta):
         if not eof:
             for reader in self.readers.values():
                 reader.feed_data(data)
-            for writer in self.writers.values():
+            writers = list(self.writers.values())
+            for writer in writers:
                 writer.write(data)
+            for writer in writers:
+                if hasattr(writer, 'drain'):
+                    await writer.drain()
         return data
 
     @abc.abstractmethod
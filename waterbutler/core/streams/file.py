@@ -1,19 +1,26 @@
+import io
 import os
-import asyncio
-
-import agent
+import tempfile
 
+from waterbutler.core import fileio
 from waterbutler.core.streams.base import BaseStream
 
 
 class FileStreamReader(BaseStream):
+    """Stream the contents of an open file.  Reads are done in the `waterbutler.core.fileio`
+    thread pool so a slow disk never blocks the event loop.  Binary files backed by a file
+    descriptor are read with ``os.pread``, which leaves the file's position untouched, so ``size``
+    can be asked for while a read is in flight.  In-memory files are read directly.
+
+    Reading always starts from the beginning of the file, regardless of its current position.
+    """
 
     def __init__(self, file_pointer):
         super().__init__()
-        self.file_gen = None
         self.file_pointer = file_pointer
-        self.read_size = None
         self.content_type = 'application/octet-stream'
+        self._fd = self._pread_fileno(file_pointer)
+        self._offset = None  # type: int
 
     @property
     def size(self):
@@ -27,38 +34,63 @@ class FileStreamReader(BaseStream):
         self.file_pointer.close()
         self.feed_eof()
 
-    @agent.async_generator
-    def chunk_reader(self):
-        self.file_pointer.seek(0)
-        while True:
-            chunk = self.file_pointer.read(self.read_size)
-            if not chunk:
-                self.feed_eof()
-                yield b''
-
-            yield chunk
+    @staticmethod
+    def _pread_fileno(file_pointer):
+        """The file descriptor to ``pread`` from, or `None` if the file must be read through
+        its own ``read`` method (text mode, in-memory or spooled files)."""
+        if not hasattr(os, 'pread') or 'b' not in getattr(file_pointer, 'mode', ''):
+            return None
+        if isinstance(file_pointer, tempfile.SpooledTemporaryFile):
+            return None
+        try:
+            return file_pointer.fileno()
+        except (AttributeError, OSError, io.UnsupportedOperation):
+            return None
+
+    def _start_offset(self):
+        return 0
+
+    def _remaining(self):
+        """Number of bytes left to read, or `None` if unknown."""
+        return None
 
     async def _read(self, size):
-        self.file_gen = self.file_gen or self.chunk_reader()
-        self.read_size = size
-        # add sleep of 0 so read will yield and continue in next io loop iteration
-        # asyncio.sleep(0) yields None by default, which displeases tornado
-        await asyncio.sleep(0.001)
-        async for chunk in self.file_gen:
-            return chunk
+        if self._offset is None:
+            # Seeking also flushes anything still buffered for writing, which pread can't see
+            self._offset = self._start_offset()
+            self.file_pointer.seek(self._offset)
+
+        remaining = self._remaining()
+        if remaining is not None:
+            size = remaining if size < 0 else min(size, remaining)
+
+        chunk = await self._read_chunk(size) if size != 0 else b''
+        if not chunk:
+            self.feed_eof()
+            return b''
+
+        self._offset += len(chunk)
+        return chunk
+
+    async def _read_chunk(self, size):
+        if self._fd is not None:
+            if size < 0:
+                size = os.fstat(self._fd).st_size - self._offset
+            return await fileio.run(os.pread, self._fd, size, self._offset)
+        if isinstance(self.file_pointer, (io.BytesIO, io.StringIO)):
+            return self.file_pointer.read(size)
+        return await fileio.run(self.file_pointer.read, size)
 
 
 class PartialFileStreamReader(FileStreamReader):
-    """Awful class, used to avoid messing with FileStreamReader.  Extends FSR with start and end
-    byte offsets to indicate a byte range of the file to return.  Reading from this stream will
-    only return the requested range, never data outside of it.
+    """Extends FSR with start and end byte offsets to indicate a byte range of the file to return.
+    Reading from this stream will only return the requested range, never data outside of it.
     """
 
     def __init__(self, file_pointer, byte_range):
         super().__init__(file_pointer)
         self.start = byte_range[0]
         self.end = byte_range[1]
-        self.bytes_read = 0
 
     @property
     def size(self):
@@ -72,6 +104,10 @@ class PartialFileStreamReader(FileStreamReader):
         self.file_pointer.seek(cursor)
         return ret
 
+    @property
+    def bytes_read(self):
+        return 0 if self._offset is None else self._offset - self.start
+
     @property
     def partial(self):
         return self.size < self.total_size
@@ -80,24 +116,8 @@ class PartialFileStreamReader(FileStreamReader):
     def content_range(self):
         return 'bytes {}-{}/{}'.format(self.start, self.end, self.total_size)
 
-    @agent.async_generator
-    def chunk_reader(self):
-        self.file_pointer.seek(self.start)
-        while True:
-            chunk = self.file_pointer.read(self.read_size)
-            self.bytes_read += self.read_size
-            if not chunk:
-                self.feed_eof()
-                yield b''
-
-            yield chunk
+    def _start_offset(self):
+        return self.start
 
-    async def _read(self, size):
-        self.file_gen = self.file_gen or self.chunk_reader()
-        bytes_remaining = self.size - self.bytes_read
-        self.read_size = bytes_remaining if size == -1 else min(size, bytes_remaining)
-        # add sleep of 0 so read will yield and continue in next io loop iteration
-        # asyncio.sleep(0) yields None by default, which displeases tornado
-        await asyncio.sleep(0.001)
-        async for chunk in self.file_gen:
-            return chunk
+    def _remaining(self):
+        return self.size - self.bytes_read
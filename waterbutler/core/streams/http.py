@@ -1,6 +1,8 @@
 import uuid
 import asyncio
+import collections
 
+from waterbutler.core import exceptions
 from waterbutler.core.streams.base import BaseStream, MultiStream, StringStream
 
 
@@ -163,6 +165,10 @@ class ResponseStreamReader(BaseStream):
     def size(self):
         return self._size
 
+    def close(self):
+        self.response.close()
+        self.feed_eof()
+
     async def _read(self, size):
         chunk = (await self.response.content.read(size))
 
@@ -196,3 +202,129 @@ class RequestStreamReader(BaseStream):
             return (await self.inner.readexactly(size))
         except asyncio.IncompleteReadError as e:
             return e.partial
+
+
+class ParallelRangeStream(BaseStream):
+    """Reassembles a large HTTP resource that is being fetched as several concurrent ``Range``
+    requests.  The first segment is streamed straight from ``first``, the response to a request
+    for bytes ``0`` to ``chunk_size - 1``, while the following ``concurrency - 1`` segments are
+    downloaded in the background.  Each time a segment is consumed the next one is requested, so
+    at most ``concurrency`` segments are buffered or in flight at once.
+
+    Built by `BaseProvider.make_ranged_download`; quacks like a non-partial `ResponseStreamReader`.
+
+    :param fetch: coroutine function ``fetch(start, end)`` returning the response for the
+        (inclusive) byte range ``start`` to ``end``
+    :param first: the response for the first segment
+    :param int size: size of the whole resource
+    :param int chunk_size: number of bytes requested per segment
+    :param int concurrency: number of segments fetched at once
+    """
+
+    partial = False
+
+    def __init__(self, fetch, first, size, chunk_size, concurrency, name=None):
+        super().__init__()
+        self.response = first
+        self._fetch = fetch
+        self._size = size
+        self._name = name
+        self.chunk_size = chunk_size
+        self.concurrency = max(int(concurrency), 1)
+
+        self._served = 0
+        self._current = None  # the segment being served, once it isn't the first response
+        self._offset = 0
+        self._next_start = min(chunk_size, size)
+        self._segments = collections.deque()  # type: collections.deque
+
+        while len(self._segments) < self.concurrency - 1 and self._schedule():
+            pass
+
+    @property
+    def content_type(self):
+        return self.response.headers.get('Content-Type', 'application/octet-stream')
+
+    @property
+    def name(self):
+        return self._name
+
+    @property
+    def size(self):
+        return self._size
+
+    def at_eof(self):
+        return self._served >= self._size
+
+    def close(self):
+        """Stop fetching segments.  Needed if the stream is abandoned before it has been read."""
+        for segment in self._segments:
+            if segment.done() and not segment.cancelled():
+                segment.exception()  # already failed or fetched; don't log it as never retrieved
+            segment.cancel()
+        self._segments.clear()
+        self._next_start = self._size
+        self.response.close()
+
+    def _schedule(self):
+        if self._next_start >= self._size:
+            return False
+        start = self._next_start
+        end = min(start + self.chunk_size, self._size) - 1
+        self._next_start = end + 1
+        self._segments.append(asyncio.ensure_future(self._fetch_segment(start, end)))
+        return True
+
+    async def _fetch_segment(self, start, end):
+        resp = await self._fetch(start, end)
+        data = await resp.read()
+        if len(data) != end - start + 1:
+            raise exceptions.DownloadError(
+                'Expected {} bytes for range {}-{}, received {}'.format(
+                    end - start + 1, start, end, len(data)
+                )
+            )
+        return data
+
+    async def _read(self, size):
+        if size < 0:
+            chunks = []
+            chunk = await self._read(self.chunk_size)
+            while chunk:
+                chunks.append(chunk)
+                chunk = await self._read(self.chunk_size)
+            return b''.join(chunks)
+
+        try:
+            chunk = await self._read_chunk(size)
+        except BaseException:
+            self.close()
+            raise
+
+        self._served += len(chunk)
+        if self.at_eof():
+            self.feed_eof()
+        return chunk
+
+    async def _read_chunk(self, size):
+        if self.at_eof():
+            return b''
+
+        if self._current is None:
+            chunk = await self.response.content.read(size)
+            if chunk:
+                return chunk
+            await self.response.release()
+            if self._served != min(self.chunk_size, self._size):
+                raise exceptions.DownloadError('Connection closed before the first segment was '
+                                               'fully received')
+        elif self._offset < len(self._current):
+            chunk = self._current[self._offset:self._offset + size]
+            self._offset += len(chunk)
+            return bytes(chunk)
+
+        # Current segment exhausted, move on to the next one
+        self._current = memoryview(await self._segments.popleft())
+        self._offset = 0
+        self._schedule()
+        return await self._read_chunk(size)
@@ -1,3 +1,13 @@
+import asyncio
+import hashlib
+import itertools
+import threading
+import collections
+import concurrent.futures
+
+from waterbutler.core.streams import settings
+
+
 class HashStreamWriter:
     """Stream-like object that hashes and discards its input."""
 
@@ -20,3 +30,152 @@ class HashStreamWriter:
 
     def close(self):
         pass
+
+
+_HASH_EXECUTOR = None
+
+_writer_ids = itertools.count()
+
+
+def get_hash_executor():
+    """Return the thread pool shared by every `MultiHashStreamWriter`."""
+    global _HASH_EXECUTOR
+    if _HASH_EXECUTOR is None:
+        _HASH_EXECUTOR = concurrent.futures.ThreadPoolExecutor(max_workers=settings.HASH_THREADS)
+    return _HASH_EXECUTOR
+
+
+class MultiHashStreamWriter:
+    """Stream-like object that computes several digests of its input in one pass, off the event
+    loop.  Writes are gathered into chunks of at least ``HASH_OFFLOAD_BYTES`` and queued to be
+    hashed in order on the hash thread pool; ``write`` never waits.  Like an `asyncio.StreamWriter`,
+    the writer has a ``drain`` coroutine, which `BaseStream.read` awaits after each write, that
+    waits while more than ``HASH_BACKLOG_BYTES`` are queued.
+
+    ``add_to`` adds the writer to a stream under a name of its own, along with one view per
+    algorithm, under the algorithm's name, which can be read like a `HashStreamWriter`::
+
+        hashes = MultiHashStreamWriter('md5', 'sha256')
+        hashes.add_to(stream)
+        ...  # read the stream
+        await hashes.finish()
+        hashes.hexdigest('sha256')  # or stream.writers['sha256'].hexdigest
+
+    A provider that hands its stream to another provider (e.g. osfstorage to its storage provider)
+    may find its views replaced by the other provider's writer, so it should read its digests from
+    its own writer.
+
+    Reading a digest before ``finish`` raises `RuntimeError` if any write is still waiting to be
+    hashed.
+
+    :param names: names of hashlib algorithms
+    """
+
+    def __init__(self, *names):
+        self.names = names
+        self.hashes = collections.OrderedDict((name, hashlib.new(name)) for name in names)
+        self._buffer = []  # type: list
+        self._buffered = 0
+        self._queue = collections.deque()  # type: collections.deque
+        self._queued = 0
+        self._lock = threading.Lock()
+        self._running = False
+        self._job = None  # type: concurrent.futures.Future
+
+    def add_to(self, stream, name=None):
+        name = name or 'hashes-{}'.format(next(_writer_ids))
+        if name in stream.writers:
+            raise ValueError('Stream already has a writer named {!r}'.format(name))
+        stream.add_writer(name, self)
+        for algorithm in self.names:
+            stream.add_writer(algorithm, HashView(self, algorithm))
+
+    def can_write_eof(self):
+        return False
+
+    def write(self, data):
+        if not data:
+            return
+        self._buffer.append(bytes(data))
+        self._buffered += len(data)
+        if self._buffered >= settings.HASH_OFFLOAD_BYTES:
+            self._flush()
+
+    def close(self):
+        pass
+
+    async def drain(self):
+        """Wait, without blocking the event loop, until no more than ``HASH_BACKLOG_BYTES`` are
+        waiting to be hashed."""
+        while self._queued > settings.HASH_BACKLOG_BYTES and not self._job.done():
+            await asyncio.wrap_future(self._job)
+
+    async def finish(self):
+        """Wait, without blocking the event loop, for everything written to be hashed."""
+        self._flush()
+        while self._job is not None and not self._job.done():
+            await asyncio.wrap_future(self._job)
+
+    def digest(self, name):
+        self._check_finished()
+        return self.hashes[name].digest()
+
+    def hexdigest(self, name):
+        self._check_finished()
+        return self.hashes[name].hexdigest()
+
+    def _check_finished(self):
+        if self._buffered or self._queued:
+            raise RuntimeError('Digests are not ready until MultiHashStreamWriter.finish() is awaited')
+
+    def _flush(self):
+        if not self._buffered:
+            return
+        chunk = b''.join(self._buffer)
+        self._buffer, self._buffered = [], 0
+
+        with self._lock:
+            self._queue.append(chunk)
+            self._queued += len(chunk)
+            start = not self._running
+            self._running = True
+        if start:
+            self._job = get_hash_executor().submit(self._hash_queued)
+
+    def _hash_queued(self):
+        while True:
+            with self._lock:
+                if not self._queue:
+                    self._running = False
+                    return
+                chunk = self._queue.popleft()
+            for hasher in self.hashes.values():
+                hasher.update(chunk)
+            with self._lock:
+                self._queued -= len(chunk)
+
+
+class HashView:
+    """One digest of a `MultiHashStreamWriter`, with the interface of a `HashStreamWriter`.  The
+    view ignores writes, as its writer receives them."""
+
+    def __init__(self, writer, name):
+        self.writer = writer
+        self.name = name
+
+    @property
+    def digest(self):
+        return self.writer.digest(self.name)
+
+    @property
+    def hexdigest(self):
+        return self.writer.hexdigest(self.name)
+
+    def can_write_eof(self):
+        return False
+
+    def write(self, data):
+        pass
+
+    def close(self):
+        pass
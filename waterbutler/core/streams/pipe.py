@@ -0,0 +1,132 @@
+import asyncio
+import collections
+
+from waterbutler.core.streams.base import BaseStream
+
+
+class PipeStream(BaseStream):
+    """An in-process, bounded pipe between a producer that ``write``s chunks and a consumer that
+    ``read``s them.  Used to hand an upload's request body from Tornado to the provider without
+    round-tripping it through a socket.
+
+    Written chunks are buffered as-is and are only copied when a read has to stitch several of
+    them together.  ``write`` waits while ``max_buffer`` or more bytes are buffered, so a slow
+    consumer pushes back on the producer.  As with `RequestStreamReader`, ``read(n)`` returns
+    exactly ``n`` bytes unless the producer signals EOF first.
+
+    :param int size: total number of bytes that will be written, if known
+    :param int max_buffer: number of buffered bytes at which ``write`` starts to wait
+    """
+
+    def __init__(self, size=None, max_buffer=2 ** 20):
+        super().__init__()
+        self._size = size
+        self.max_buffer = max_buffer
+
+        self._chunks = collections.deque()  # type: collections.deque
+        self._buffered = 0
+        self._offset = 0  # bytes of _chunks[0] already read
+        self._wanted = 0  # bytes a waiting read needs before it can return
+
+        self._write_eof = False
+        self._closed = False
+        self._read_waiter = None
+        self._drain_waiter = None
+
+    @property
+    def size(self):
+        return self._size
+
+    @property
+    def buffered(self):
+        """Number of bytes written but not yet read."""
+        return self._buffered
+
+    def at_eof(self):
+        return (self._write_eof or self._closed) and not self._buffered
+
+    async def write(self, data):
+        """Append ``data`` to the pipe, waiting for the consumer to catch up if the buffer is full.
+        Data written after the consumer has called ``close`` is discarded.
+        """
+        if self._write_eof:
+            raise RuntimeError('Cannot write to a pipe after write_eof()')
+        if self._closed or not data:
+            return
+
+        self._chunks.append(data)
+        self._buffered += len(data)
+        self._wake('_read_waiter')
+
+        # A read waiting for more than max_buffer bytes raises the limit, otherwise we'd deadlock
+        while not self._closed and self._buffered >= max(self.max_buffer, self._wanted):
+            self._drain_waiter = asyncio.Future(loop=self._loop)
+            await self._drain_waiter
+
+    def write_eof(self):
+        """Signal that nothing more will be written."""
+        self._write_eof = True
+        self._wake('_read_waiter')
+
+    def close(self):
+        """Signal that nothing more will be read.  Buffered data is dropped and a producer waiting
+        in ``write`` is released.
+        """
+        self._closed = True
+        self._chunks.clear()
+        self._buffered = self._offset = 0
+        self._wake('_drain_waiter')
+        self._wake('_read_waiter')
+
+    async def _read(self, size):
+        wanted = float('inf') if size < 0 else size
+        while self._buffered < wanted and not (self._write_eof or self._closed):
+            self._wanted = wanted
+            self._wake('_drain_waiter')
+            self._read_waiter = asyncio.Future(loop=self._loop)
+            try:
+                await self._read_waiter
+            finally:
+                self._wanted = 0
+
+        data = self._take(self._buffered if size < 0 else min(size, self._buffered))
+        self._wake('_drain_waiter')
+
+        if not data:
+            self.feed_eof()
+        return data
+
+    def _take(self, n):
+        """Pop ``n`` bytes off the front of the buffer.  A read that lines up with a whole chunk
+        returns it without copying.
+        """
+        if n == 0:
+            return b''
+
+        first = self._chunks[0]
+        if self._offset == 0 and len(first) == n:
+            self._chunks.popleft()
+            self._buffered -= n
+            return first
+
+        parts = []
+        remaining = n
+        while remaining:
+            chunk = memoryview(self._chunks[0])[self._offset:]
+            if len(chunk) <= remaining:
+                self._chunks.popleft()
+                self._offset = 0
+            else:
+                chunk = chunk[:remaining]
+                self._offset += remaining
+            parts.append(chunk)
+            remaining -= len(chunk)
+
+        self._buffered -= n
+        return b''.join(parts)
+
+    def _wake(self, name):
+        waiter = getattr(self, name)
+        setattr(self, name, None)
+        if waiter is not None and not waiter.done():
+            waiter.set_result(None)
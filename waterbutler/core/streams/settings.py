@@ -6,10 +6,40 @@ from waterbutler import settings
 config = settings.child('STREAMS_CONFIG')
 
 
-ZIP_EXTENSIONS = config.get('ZIP_EXTENSIONS', '.zip .gz .bzip .bzip2 .rar .xz .bz2 .7z').split(' ')
+ZIP_EXTENSIONS = config.get(
+    'ZIP_EXTENSIONS',
+    '.zip .gz .bzip .bzip2 .rar .xz .bz2 .7z .zst .parquet',
+).split(' ')
+
+# Files whose guessed mimetype starts with one of these prefixes are already compressed and are
+# stored in the archive as-is.  Files that match neither this nor ``ZIP_EXTENSIONS`` are still
+# sniffed for the magic numbers of common compressed formats before choosing to deflate them.
+ZIP_STORED_MIMETYPES = config.get(
+    'ZIP_STORED_MIMETYPES',
+    'image/jpeg image/png image/gif image/webp image/heic image/heif '
+    'video/mp4 video/quicktime video/webm video/x-matroska video/mpeg '
+    'audio/mpeg audio/mp4 audio/ogg audio/flac audio/aac '
+    'application/zip application/gzip application/x-7z-compressed application/x-rar-compressed '
+    'application/x-xz application/x-bzip2 application/vnd.openxmlformats-officedocument. '
+    'application/vnd.oasis.opendocument. application/epub+zip application/java-archive',
+).split(' ')
 
 # Compression level to apply to zipped files. Value must be an integer from 0 to 9, where
 # lower values represent less compression.  -1 is also allowed, meaning the default level
 # (approximately equivalent to a 6).  See the zlib docs for more:
 # https://docs.python.org/3/library/zlib.html#zlib.compressobj
 ZIP_COMPRESSION_LEVEL = int(config.get('ZIP_COMPRESSION_LEVEL', zlib.Z_DEFAULT_COMPRESSION))
+
+# Chunks of at least this many bytes are checksummed and compressed in the loop's default thread
+# pool instead of on the event loop.  zlib releases the GIL, so large zip downloads no longer
+# stall other requests.  Smaller chunks are cheaper to handle inline than to hand off.
+ZIP_COMPRESSION_OFFLOAD_BYTES = int(config.get('ZIP_COMPRESSION_OFFLOAD_BYTES', 64 * 1024))
+
+# Uploads that need several digests of their data (e.g. osfstorage's md5, sha1 and sha256) hash
+# it in one pass on one of HASH_THREADS threads.  hashlib releases the GIL while hashing, so the
+# event loop keeps serving requests.  Data is handed over in chunks of at least
+# HASH_OFFLOAD_BYTES.  Once HASH_BACKLOG_BYTES are waiting to be hashed, the upload waits for the
+# hashing to catch up instead of buffering more in memory.
+HASH_THREADS = int(config.get('HASH_THREADS', 4))
+HASH_OFFLOAD_BYTES = int(config.get('HASH_OFFLOAD_BYTES', 256 * 1024))
+HASH_BACKLOG_BYTES = int(config.get('HASH_BACKLOG_BYTES', 16 * 1024 ** 2))
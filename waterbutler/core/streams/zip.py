@@ -1,11 +1,14 @@
 import zlib
 import time
+import bisect
 import struct
 import asyncio
 import logging
 import zipfile
 import binascii
+import mimetypes
 
+from waterbutler.core import exceptions
 from waterbutler.core.streams import settings
 from waterbutler.core.streams.base import BaseStream, MultiStream, StringStream
 
@@ -15,6 +18,33 @@ logger = logging.getLogger(__name__)
 # for some reason python3.5 has this as (1 << 31) - 1, which is 0x7fffffff
 ZIP64_LIMIT = 0xffffffff - 1
 
+# Number of bytes read from the start of a file to look for one of the magic numbers below.
+SNIFF_BYTES = 64 * 1024
+
+# Number of bytes read at a time when a stored file is read only to be checksummed or skipped.
+STORED_READ_BYTES = 1024 * 1024
+
+# (offset, magic number) pairs identifying formats that deflate can't usefully shrink.
+COMPRESSED_MAGIC = (
+    (0, b'PK\x03\x04'),                 # zip, and zip-based formats (docx, odt, jar, epub)
+    (0, b'\x1f\x8b'),                   # gzip
+    (0, b'BZh'),                        # bzip2
+    (0, b'\xfd7zXZ\x00'),               # xz
+    (0, b'7z\xbc\xaf\x27\x1c'),         # 7z
+    (0, b'Rar!\x1a\x07'),               # rar
+    (0, b'\x28\xb5\x2f\xfd'),           # zstandard
+    (0, b'PAR1'),                       # parquet
+    (0, b'\xff\xd8\xff'),               # jpeg
+    (0, b'\x89PNG\r\n\x1a\n'),          # png
+    (0, b'GIF8'),                       # gif
+    (8, b'WEBP'),                       # webp
+    (4, b'ftyp'),                       # mp4, mov, heic
+    (0, b'\x1a\x45\xdf\xa3'),           # matroska, webm
+    (0, b'OggS'),                       # ogg
+    (0, b'fLaC'),                       # flac
+    (0, b'ID3'),                        # mp3
+)
+
 
 # Basic structure of .zip:
 
@@ -64,10 +94,41 @@ class ZipLocalFileDataDescriptor(BaseStream):
         return self.file.descriptor
 
 
+class ZipLocalFileHeader(BaseStream):
+    """The local file header of a file in a zip archive.  The header is built on first read
+    rather than up front, so that the start of the file's content can be sniffed for an already
+    compressed format before the compression method is written out.
+
+    See section 4.3.7 of the PKZIP APPNOTE.TXT.
+
+    Note: This class is tightly coupled to ZipStreamReader and should not be used separately.
+    """
+    def __init__(self, file):
+        super().__init__()
+        self.file = file
+        self._built = False
+
+    @property
+    def size(self):
+        return 0
+
+    async def _read(self, n=-1):
+        if not self._built:
+            self._built = True
+            await self.file.sniff()
+            self.feed_data(self.file.local_header)
+            self.feed_eof()
+        return (await asyncio.StreamReader.read(self, n))
+
+
 class ZipLocalFileData(BaseStream):
     """A thin stream wrapper. Update the original_size, compressed_size, and CRC of a ZipLocalFile
     as chunks are read and compressed.
 
+    Checksumming and compression of large chunks run in the loop's default thread pool.  The
+    compressor is only flushed once the file has been read in full; until then deflate emits
+    output as its own buffers fill.
+
     See section 4.3.8 of the PKZIP APPNOTE.TXT.
 
     Note: This class is tightly coupled to ZipStreamReader and should not be used separately.
@@ -76,31 +137,55 @@ class ZipLocalFileData(BaseStream):
         self.file = file
         self.stream = stream
         self._buffer = bytearray()
+        self._peeked = b''
+        self._finished = False
         super().__init__(*args, **kwargs)
 
     @property
     def size(self):
         return 0
 
+    async def peek(self, n):
+        """Read and hold on to up to ``n`` bytes from the start of the file, to be returned by
+        the first call to ``read()``.
+        """
+        if not self._peeked and not self.stream.at_eof():
+            self._peeked = await self.stream.read(n)
+        return self._peeked
+
+    def _process(self, chunk):
+        """Update the CRC of the file with ``chunk`` and return its compressed form.  The
+        compressor is finished if ``chunk`` is the last one.
+        """
+        self.file.zinfo.CRC = binascii.crc32(chunk, self.file.zinfo.CRC)
+        if not self.file.compressor:
+            return chunk
+
+        compressed = self.file.compressor.compress(chunk)
+        if self.stream.at_eof():
+            compressed += self.file.compressor.flush(zlib.Z_FINISH)
+        return compressed
+
     async def _read(self, n=-1, *args, **kwargs):
 
         ret = self._buffer
 
-        while (n == -1 or len(ret) < n) and not self.stream.at_eof():
-            chunk = await self.stream.read(n, *args, **kwargs)
+        while (n == -1 or len(ret) < n) and not self._finished:
+            if self._peeked:
+                chunk, self._peeked = self._peeked, b''
+            elif not self.stream.at_eof():
+                chunk = await self.stream.read(n, *args, **kwargs)
+            else:
+                chunk = b''
 
-            # Update file info
             self.file.original_size += len(chunk)
-            self.file.zinfo.CRC = binascii.crc32(chunk, self.file.zinfo.CRC)
-
-            # compress
-            if self.file.compressor:
-                compressed = self.file.compressor.compress(chunk)
-                compressed += self.file.compressor.flush(
-                    zlib.Z_FINISH if self.stream.at_eof() else zlib.Z_SYNC_FLUSH
-                )
+            self._finished = self.stream.at_eof()
+
+            if len(chunk) >= settings.ZIP_COMPRESSION_OFFLOAD_BYTES:
+                loop = asyncio.get_event_loop()
+                compressed = await loop.run_in_executor(None, self._process, chunk)
             else:
-                compressed = chunk
+                compressed = self._process(chunk)
 
             # Update file info
             self.file.compressed_size += len(compressed)
@@ -114,73 +199,18 @@ class ZipLocalFileData(BaseStream):
             self._buffer = bytearray()
 
         # EOF is the buffer and stream are both empty
-        if not self._buffer and self.stream.at_eof():
+        if not self._buffer and self._finished:
             self.feed_eof()
 
         return bytes(ret)
 
 
-class ZipLocalFile(MultiStream):
-    """A local file entry in a zip archive. Constructs the local file header,
-    file data stream, and data descriptor.
+class ZipLocalFileRecords:
+    """The header, data descriptor and central directory header of a file in a zip archive, built
+    from ``zinfo``, ``original_size``, ``compressed_size`` and ``need_zip64_data_descriptor``.
 
-    Note: This class is tightly coupled to ZipStreamReader and should not be
-    used separately.
+    Note: This class is tightly coupled to ZipStreamReader and should not be used separately.
     """
-    def __init__(self, file_tuple):
-
-        filename, stream = file_tuple
-        # Build a ZipInfo instance to use for the file's header and footer
-        self.zinfo = zipfile.ZipInfo(
-            filename=filename,
-            date_time=time.localtime(time.time())[:6],
-        )
-
-        already_zipped = False
-        for zip_ext in settings.ZIP_EXTENSIONS:
-            if self.zinfo.filename.endswith(zip_ext):
-                already_zipped = True
-                logger.info('   DONE!')
-                break
-
-        logger.debug('file is already compressed: {}'.format(already_zipped))
-        # If the file is a `.zip`, set permission and turn off compression
-        if already_zipped:
-            self.zinfo.external_attr = 0o600 << 16      # -rw-------
-            self.zinfo.compress_type = zipfile.ZIP_STORED
-            self.compressor = None
-        # If the file is a directory, set the directory flag and turn off compression
-        elif self.zinfo.filename[-1] == '/':
-            self.zinfo.external_attr = 0o40775 << 16    # drwxrwxr-x
-            self.zinfo.external_attr |= 0x10            # Directory flag
-            self.zinfo.compress_type = zipfile.ZIP_STORED
-            self.compressor = None
-        # For other types, set permission and define a compressor
-        else:
-            self.zinfo.external_attr = 0o600 << 16      # -rw-------
-            self.zinfo.compress_type = zipfile.ZIP_DEFLATED
-            self.compressor = zlib.compressobj(
-                settings.ZIP_COMPRESSION_LEVEL,
-                zlib.DEFLATED,
-                -15,
-            )
-
-        self.zinfo.header_offset = 0
-        self.zinfo.flag_bits |= 0x08
-
-        # Initial CRC: value will be updated as file is streamed
-        self.zinfo.CRC = 0
-
-        # meta information - needed to build the footer
-        self.original_size = 0
-        self.compressed_size = 0
-        self.need_zip64_data_descriptor = False
-
-        super().__init__(
-            StringStream(self.local_header),
-            ZipLocalFileData(self, stream),
-            ZipLocalFileDataDescriptor(self),
-        )
 
     @property
     def local_header(self):
@@ -296,6 +326,95 @@ class ZipLocalFile(MultiStream):
         )
 
 
+class ZipLocalFile(ZipLocalFileRecords, MultiStream):
+    """A local file entry in a zip archive. Constructs the local file header,
+    file data stream, and data descriptor.
+
+    Note: This class is tightly coupled to ZipStreamReader and should not be
+    used separately.
+    """
+    def __init__(self, file_tuple):
+
+        filename, stream = file_tuple
+        # Build a ZipInfo instance to use for the file's header and footer
+        self.zinfo = zipfile.ZipInfo(
+            filename=filename,
+            date_time=time.localtime(time.time())[:6],
+        )
+
+        already_zipped = self.is_compressed_name(self.zinfo.filename)
+
+        logger.debug('file is already compressed: {}'.format(already_zipped))
+        # If the file is a `.zip`, set permission and turn off compression
+        if already_zipped:
+            self.zinfo.external_attr = 0o600 << 16      # -rw-------
+            self.zinfo.compress_type = zipfile.ZIP_STORED
+            self.compressor = None
+        # If the file is a directory, set the directory flag and turn off compression
+        elif self.zinfo.filename[-1] == '/':
+            self.zinfo.external_attr = 0o40775 << 16    # drwxrwxr-x
+            self.zinfo.external_attr |= 0x10            # Directory flag
+            self.zinfo.compress_type = zipfile.ZIP_STORED
+            self.compressor = None
+        # For other types, set permission and define a compressor
+        else:
+            self.zinfo.external_attr = 0o600 << 16      # -rw-------
+            self.zinfo.compress_type = zipfile.ZIP_DEFLATED
+            self.compressor = zlib.compressobj(
+                settings.ZIP_COMPRESSION_LEVEL,
+                zlib.DEFLATED,
+                -15,
+            )
+
+        self.zinfo.header_offset = 0
+        self.zinfo.flag_bits |= 0x08
+
+        # Initial CRC: value will be updated as file is streamed
+        self.zinfo.CRC = 0
+
+        # meta information - needed to build the footer
+        self.original_size = 0
+        self.compressed_size = 0
+        self.need_zip64_data_descriptor = False
+
+        self.data = ZipLocalFileData(self, stream)
+
+        super().__init__(
+            ZipLocalFileHeader(self),
+            self.data,
+            ZipLocalFileDataDescriptor(self),
+        )
+
+    @staticmethod
+    def is_compressed_name(filename):
+        """Guess from its name alone whether a file is already compressed, either by extension
+        (``ZIP_EXTENSIONS``) or by mimetype (``ZIP_STORED_MIMETYPES``).
+        """
+        lowered = filename.lower()
+        if any(lowered.endswith(ext) for ext in settings.ZIP_EXTENSIONS if ext):
+            return True
+
+        mimetype, encoding = mimetypes.guess_type(lowered)
+        if encoding is not None:
+            return True
+        prefixes = tuple(prefix for prefix in settings.ZIP_STORED_MIMETYPES if prefix)
+        return mimetype is not None and mimetype.startswith(prefixes)
+
+    async def sniff(self):
+        """Look at the start of the file's content and turn off compression if it carries the
+        magic number of an already compressed format.  Must be called before the local header is
+        written out.
+        """
+        if self.compressor is None:
+            return
+
+        head = await self.data.peek(SNIFF_BYTES)
+        if any(head[offset:offset + len(magic)] == magic for offset, magic in COMPRESSED_MAGIC):
+            logger.debug('file content is already compressed, storing as-is')
+            self.zinfo.compress_type = zipfile.ZIP_STORED
+            self.compressor = None
+
+
 class ZipArchiveCentralDirectory(StringStream):
     """The central directory for a zip archive.  Contains the Central Directory File Headers for
     each file.  This class also builds the Zip64 End of Central Directory, the Zip64 End of
@@ -398,3 +517,285 @@ class ZipStreamReader(asyncio.StreamReader):
             chunk += await self.read(n - len(chunk))
 
         return chunk
+
+    def close(self):
+        """Abandon the archive, letting the stream generator drop any work it started ahead."""
+        close = getattr(self.streams, 'close', None)
+        if close is not None:
+            close()
+
+
+class StoredZipEntry(ZipLocalFileRecords):
+    """A file or empty folder in a `StoredZipArchive`.  Its size must be known up front and its
+    content is stored as-is, so its place in the archive depends on nothing but the names and
+    sizes of the entries before it.  ``crc`` stays `None` until the content has been checksummed.
+
+    :param str name: path of the entry within the archive; folders end with ``/``
+    :param int size: size of the file's content
+    :param tuple date_time: modification time, as for `zipfile.ZipInfo`
+    :param path: passed back to the stream's ``open_file`` to download the content
+    :param str crc_key: key the entry's CRC is cached under, or `None` to never cache it
+    """
+    def __init__(self, name, size, date_time, path=None, crc_key=None):
+        self.zinfo = zipfile.ZipInfo(filename=name, date_time=date_time)
+        self.zinfo.compress_type = zipfile.ZIP_STORED
+        if name.endswith('/'):
+            self.zinfo.external_attr = 0o40775 << 16    # drwxrwxr-x
+            self.zinfo.external_attr |= 0x10            # Directory flag
+        else:
+            self.zinfo.external_attr = 0o600 << 16      # -rw-------
+        self.zinfo.header_offset = 0
+        self.zinfo.flag_bits |= 0x08
+        self.zinfo.CRC = 0
+
+        self.path = path
+        self.crc_key = crc_key
+        self.crc = None  # type: int
+        self.original_size = self.compressed_size = size
+        self.need_zip64_data_descriptor = size > ZIP64_LIMIT
+
+        self.header = self.local_header
+        self.descriptor_size = len(self.descriptor)
+
+    @property
+    def size(self):
+        return self.original_size
+
+    @property
+    def is_dir(self):
+        return self.zinfo.filename.endswith('/')
+
+    def set_crc(self, crc):
+        self.crc = self.zinfo.CRC = crc
+
+
+class StoredZipArchive:
+    """The layout of a zip archive in which every entry is stored uncompressed.  Local headers,
+    data, data descriptors and the central directory are all at offsets that are known before any
+    content is read, so the archive's exact size is known up front and any byte range of it can
+    be produced by reading only the matching ranges of the files it contains.
+
+    :param list entries: `StoredZipEntry` objects, in archive order
+    """
+    HEADER, DATA, DESCRIPTOR, CENTRAL_DIRECTORY = 'header', 'data', 'descriptor', 'central'
+
+    def __init__(self, entries):
+        self.entries = entries
+        # (start, end, kind, entry) for each region of the archive, end exclusive
+        self.segments = []  # type: list
+
+        offset = 0
+        for entry in entries:
+            entry.zinfo.header_offset = offset
+            for kind, length in ((self.HEADER, len(entry.header)),
+                                 (self.DATA, entry.size),
+                                 (self.DESCRIPTOR, entry.descriptor_size)):
+                if length:
+                    self.segments.append((offset, offset + length, kind, entry))
+                offset += length
+
+        # Checksums don't change the length of the central directory
+        central_directory_size = ZipArchiveCentralDirectory(entries).size
+        self.segments.append((offset, offset + central_directory_size,
+                              self.CENTRAL_DIRECTORY, None))
+        self.size = offset + central_directory_size
+        self._starts = [segment[0] for segment in self.segments]
+
+    def segment_at(self, position):
+        return self.segments[bisect.bisect_right(self._starts, position) - 1]
+
+    def central_directory(self):
+        """The central directory, once every entry's ``crc`` is known."""
+        return ZipArchiveCentralDirectory(self.entries).build_content()
+
+
+class StoredZipStreamReader(asyncio.StreamReader):
+    """Streams all or part of a `StoredZipArchive`.  File content is fetched with
+    ``open_file(entry, range)``, which must return a stream of the entry's content, or of the
+    inclusive byte ``range`` of it if ``range`` isn't `None`.  Files are only read in full when
+    their checksum is needed, i.e. when their data descriptor or the central directory is part of
+    the requested range and the checksum isn't found in ``crc_cache``.
+
+    :param archive: the `StoredZipArchive` to stream
+    :param open_file: coroutine function ``open_file(entry, range)``
+    :param tuple byte_range: inclusive ``(start, end)`` range of the archive to stream; an end of
+        `None` means the rest of the archive.  Ranges that can't be satisfied are ignored.
+    :param crc_cache: optional `MemoryCache` or `RedisCache` to look up and remember checksums
+    """
+    def __init__(self, archive, open_file, byte_range=None, crc_cache=None):
+        super().__init__()
+        self.archive = archive
+        self.open_file = open_file
+        self.crc_cache = crc_cache
+
+        start, end = 0, archive.size - 1
+        if byte_range is not None and byte_range[0] < archive.size:
+            start = byte_range[0]
+            if byte_range[1] is not None:
+                end = min(byte_range[1], end)
+        self.start, self.end = start, end
+        self._position = start
+
+        self._stream = None  # stream of the entry whose data is being read
+        self._stream_entry = None  # type: StoredZipEntry
+        self._skip = 0  # bytes to discard from the stream before its data is in range
+        self._crc = None  # type: int  # running checksum of the stream, if one is being computed
+        self._read_bytes = 0
+        self._central_directory = None  # type: bytes
+
+    @property
+    def size(self):
+        return self.end - self.start + 1
+
+    @property
+    def partial(self):
+        return self.size < self.archive.size
+
+    @property
+    def content_range(self):
+        return 'bytes {}-{}/{}'.format(self.start, self.end, self.archive.size)
+
+    @property
+    def content_type(self):
+        return 'application/zip'
+
+    def close(self):
+        self._close_stream()
+        self.feed_eof()
+
+    async def read(self, n=-1):
+        if n < 0:
+            # Parent class will handle auto chunking for us
+            return await super().read(n)
+
+        chunk = bytearray()
+        while len(chunk) < n and self._position <= self.end:
+            data = await self._read_segment(self.archive.segment_at(self._position), n - len(chunk))
+            self._position += len(data)
+            chunk += data
+
+        if self._position > self.end:
+            self._close_stream()
+            self.feed_eof()
+        return bytes(chunk)
+
+    async def _read_segment(self, segment, n):
+        start, end, kind, entry = segment
+        n = min(n, end - self._position, self.end + 1 - self._position)
+        offset = self._position - start
+
+        if kind == self.archive.HEADER:
+            return entry.header[offset:offset + n]
+        if kind == self.archive.DATA:
+            return await self._read_data(entry, offset, n)
+        if kind == self.archive.DESCRIPTOR:
+            await self._checksum(entry)
+            return entry.descriptor[offset:offset + n]
+
+        if self._central_directory is None:
+            for archived in self.archive.entries:
+                await self._checksum(archived)
+            self._central_directory = self.archive.central_directory()
+        return self._central_directory[offset:offset + n]
+
+    async def _read_data(self, entry, offset, n):
+        if self._stream_entry is not entry:
+            await self._open(entry, offset)
+
+        while self._skip:
+            discarded = await self._stream_read(min(self._skip, STORED_READ_BYTES))
+            self._skip -= len(discarded)
+
+        return await self._stream_read(n)
+
+    async def _open(self, entry, offset):
+        """Open the content of ``entry`` from ``offset`` to the end of the requested range.  The
+        whole file is read, and checksummed along the way, if its checksum is needed."""
+        self._close_stream()
+        last = min(entry.size - 1, self.end - entry.zinfo.header_offset - len(entry.header))
+        whole = offset == 0 and last == entry.size - 1
+        need_crc = (
+            self.end >= entry.zinfo.header_offset + len(entry.header) + entry.size and
+            not await self._cached_checksum(entry)
+        )
+
+        if whole or need_crc:
+            self._stream = await self.open_file(entry, None)
+            self._skip = offset
+            self._crc = 0 if entry.crc is None else None
+        else:
+            self._stream = await self.open_file(entry, (offset, last))
+            self._skip = 0 if getattr(self._stream, 'partial', False) else offset
+            self._crc = None
+
+        self._stream_entry = entry
+        self._read_bytes = offset - self._skip
+
+    async def _stream_read(self, n):
+        entry = self._stream_entry
+        n = min(n, entry.size - self._read_bytes)
+        data = await self._stream.read(n) if n > 0 else b''
+        if n > 0 and not data:
+            raise exceptions.DownloadError(
+                'Expected {} bytes of {}, received {}'.format(entry.size, entry.zinfo.filename,
+                                                              self._read_bytes)
+            )
+
+        self._read_bytes += len(data)
+        if self._crc is not None:
+            self._crc = await _crc32(data, self._crc)
+            if self._read_bytes == entry.size:
+                await self._remember(entry, self._crc)
+        return data
+
+    async def _cached_checksum(self, entry):
+        if entry.crc is None and entry.crc_key is not None and self.crc_cache is not None:
+            crc = await self.crc_cache.get(entry.crc_key)
+            if crc is not None:
+                entry.set_crc(crc)
+        return entry.crc is not None
+
+    async def _checksum(self, entry):
+        """Make sure the checksum of ``entry`` is known, reading the whole file if need be."""
+        if entry.is_dir or entry.size == 0:
+            entry.set_crc(0)
+        if await self._cached_checksum(entry):
+            return
+
+        stream = await self.open_file(entry, None)
+        crc, read = 0, 0
+        try:
+            while read < entry.size:
+                data = await stream.read(min(entry.size - read, STORED_READ_BYTES))
+                if not data:
+                    raise exceptions.DownloadError(
+                        'Expected {} bytes of {}, received {}'.format(entry.size,
+                                                                      entry.zinfo.filename, read)
+                    )
+                crc = await _crc32(data, crc)
+                read += len(data)
+        finally:
+            close = getattr(stream, 'close', None)
+            if close is not None:
+                close()
+
+        await self._remember(entry, crc)
+
+    async def _remember(self, entry, crc):
+        entry.set_crc(crc)
+        if entry.crc_key is not None and self.crc_cache is not None:
+            await self.crc_cache.set(entry.crc_key, crc)
+
+    def _close_stream(self):
+        if self._stream is not None:
+            close = getattr(self._stream, 'close', None)
+            if close is not None:
+                close()
+        self._stream = self._stream_entry = None
+
+
+async def _crc32(data, crc):
+    if len(data) >= settings.ZIP_COMPRESSION_OFFLOAD_BYTES:
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(None, binascii.crc32, data, crc)
+    return binascii.crc32(data, crc)
@@ -4,6 +4,7 @@ import pytz
 import asyncio
 import logging
 import functools
+import collections
 import unicodedata
 import dateutil.parser
 from urllib import parse
@@ -15,6 +16,7 @@ from stevedore import driver
 
 from waterbutler.settings import config
 from waterbutler.core import exceptions
+from waterbutler.core import connections
 from waterbutler.server import settings as server_settings
 from waterbutler.core.signing import Signer
 from waterbutler.core.streams import EmptyStream
@@ -96,6 +98,90 @@ def async_retry(retries=5, backoff=1, exceptions=(Exception, ), raven=client):
     return _async_retry
 
 
+def _is_server_error(exc):
+    code = getattr(exc, 'code', None)
+    return code is None or code >= 500
+
+
+async def upload_parts(stream, part_size, upload_part, concurrency=1, max_buffer=None,
+                       retries=0, retry_on=_is_server_error):
+    """Split ``stream`` into parts of ``part_size`` bytes, the last one possibly shorter, and send
+    each with ``await upload_part(data, offset)``, up to ``concurrency`` at a time.  Returns the
+    results of ``upload_part`` in part order.
+
+    Parts are read off the stream in order and buffered in memory while they are sent.  No more
+    than ``max_buffer`` bytes worth of parts are held at once; reading the next part waits until an
+    earlier one has finished.  Reading stops as soon as any part has given up, and the parts still
+    in flight are cancelled.
+
+    A part whose upload raises a `ProviderError`, a connection error or a timeout is sent again, up
+    to ``retries`` times, if ``retry_on(exc)`` is true.  By default only server errors and
+    failures without a status code are retried.
+    """
+    parts = [part_size for _ in range(0, stream.size // part_size)]
+    if stream.size % part_size:
+        parts.append(stream.size - (len(parts) * part_size))
+    logger.debug('Stream will be uploaded in {} parts of sizes {}'.format(len(parts), parts))
+
+    if max_buffer is not None:
+        concurrency = min(concurrency, max_buffer // part_size)
+    slots = asyncio.Semaphore(max(concurrency, 1))
+    offset = 0
+    uploads = []  # type: list
+
+    try:
+        for size in parts:
+            await slots.acquire()
+
+            # Stop reading the stream as soon as any part has given up
+            for upload in uploads:
+                if upload.done() and upload.exception() is not None:
+                    raise upload.exception()
+
+            data = await _read_part(stream, size)
+            logger.debug('Uploading part {} with size {} at offset {}'.format(len(uploads) + 1,
+                                                                            size, offset))
+            upload = asyncio.ensure_future(_retry_part(upload_part, data, offset,
+                                                       retries, retry_on))
+            upload.add_done_callback(lambda _: slots.release())
+            uploads.append(upload)
+            offset += size
+
+        return list(await asyncio.gather(*uploads))
+    except BaseException:
+        for upload in uploads:
+            upload.cancel()
+        raise
+
+
+async def _read_part(stream, size):
+    """Read exactly ``size`` bytes from ``stream``, or whatever is left of it."""
+    chunks = []
+    remaining = size
+    while remaining > 0:
+        chunk = await stream.read(remaining)
+        if not chunk:
+            break
+        chunks.append(chunk)
+        remaining -= len(chunk)
+    return b''.join(chunks)
+
+
+async def _retry_part(upload_part, data, offset, retries, retry_on):
+    attempt = 0
+    while True:
+        try:
+            return await upload_part(data, offset)
+        except (exceptions.ProviderError, aiohttp.errors.ClientError,
+                asyncio.TimeoutError) as exc:
+            if attempt >= retries or not retry_on(exc):
+                raise
+            attempt += 1
+            logger.warning('Retrying part at offset {} ({}/{}) after {!r}'.format(
+                offset, attempt, retries, exc))
+            await asyncio.sleep(attempt)
+
+
 async def send_signed_request(method, url, payload):
     message, signature = signer.sign_payload(payload)
     return (await aiohttp.request(
@@ -105,6 +191,7 @@ async def send_signed_request(method, url, payload):
             'signature': signature,
         }),
         headers={'Content-Type': 'application/json'},
+        connector=connections.get_connector(url),
     ))
 
 
@@ -119,6 +206,21 @@ def normalize_datetime(date_string):
     return parsed_datetime.isoformat()
 
 
+def zip_date_time(date_string):
+    """Convert a modified time reported by a provider to the ``date_time`` tuple of a zip archive
+    entry, in UTC.  Zip archives can't represent times outside of 1980 to 2107, which are clamped to
+    that range.  Missing or unparseable times are given as the start of 1980.
+    """
+    earliest = (1980, 1, 1, 0, 0, 0)
+    if not date_string:
+        return earliest
+    try:
+        parsed_datetime = dateutil.parser.parse(normalize_datetime(date_string))
+    except (TypeError, ValueError, OverflowError):
+        return earliest
+    return min(max(earliest, parsed_datetime.timetuple()[:6]), (2107, 12, 31, 23, 59, 58))
+
+
 def strip_for_disposition(filename):
     """Convert given filename to a form useable by a non-extended parameter.
 
@@ -175,9 +277,15 @@ def make_disposition(filename):
 
 
 class ZipStreamGenerator:
-    def __init__(self, provider, parent_path, *metadata_objs):
+    """Yields ``(name, stream)`` for every file and empty folder under ``parent_path``.
+    ``listings`` optionally maps the ``path`` of folders that have already been listed to their
+    contents, so that they aren't listed again.
+    """
+
+    def __init__(self, provider, parent_path, *metadata_objs, listings=None):
         self.provider = provider
         self.parent_path = parent_path
+        self.listings = listings or {}
         self.remaining = [
             (parent_path, metadata)
             for metadata in metadata_objs
@@ -192,7 +300,10 @@ class ZipStreamGenerator:
         current = self.remaining.pop(0)
         path = self.provider.path_from_metadata(*current)
         if path.is_dir:
-            items = await self.provider.metadata(path)
+            if path.path in self.listings:
+                items = self.listings[path.path]
+            else:
+                items = await self.provider.metadata(path)
             if items:
                 self.remaining.extend([
                     (path, item) for item in items
@@ -204,6 +315,117 @@ class ZipStreamGenerator:
         return path.path.replace(self.parent_path.path, '', 1), await self.provider.download(path)
 
 
+class _ZipEntry:
+    __slots__ = ('path', 'name', 'size', 'task')
+
+    def __init__(self, path, name, size):
+        self.path = path
+        self.name = name
+        self.size = size
+        self.task = None  # type: asyncio.Future
+
+
+class PrefetchingZipStreamGenerator:
+    """A `ZipStreamGenerator` that works ahead of its consumer.  Folders are listed as soon as
+    they are discovered, up to ``list_concurrency`` at a time, and up to ``downloads`` files
+    following the one being zipped are opened in advance, as long as their reported sizes add up
+    to no more than ``max_bytes``.  The next file is always opened, whatever its size.
+
+    Entries are emitted in exactly the same order as `ZipStreamGenerator` emits them.  An error
+    listing a folder or opening a file is raised when that entry's turn comes.  Call ``close`` to
+    abandon work started ahead of time if the archive won't be read to the end.  ``listings`` is
+    as for `ZipStreamGenerator`.
+    """
+
+    def __init__(self, provider, parent_path, *metadata_objs, downloads=4,
+                 max_bytes=64 * 1024 ** 2, list_concurrency=4, listings=None):
+        self.provider = provider
+        self.parent_path = parent_path
+        self.listings = listings or {}
+        self.downloads = downloads
+        self.max_bytes = max_bytes
+        self._list_slots = asyncio.Semaphore(list_concurrency)
+
+        self._entries = []  # type: list
+        self._cursor = 0  # index of the next entry to emit
+        self._fetch_cursor = 0  # index of the next entry to consider opening ahead
+        self._ahead = collections.deque()  # type: collections.deque
+        self._ahead_bytes = 0
+
+        self._extend(parent_path, metadata_objs)
+
+    async def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        while self._cursor < len(self._entries):
+            entry = self._entries[self._cursor]
+            self._cursor += 1
+
+            if entry.path.is_dir:
+                items = await entry.task
+                if items:
+                    self._extend(entry.path, items)
+                    continue
+                return entry.name, EmptyStream()
+
+            if entry.task is None:
+                self._open(entry)
+            else:
+                self._ahead.popleft()
+                self._ahead_bytes -= entry.size
+            self._prefetch()
+
+            return entry.name, await entry.task
+
+        raise StopAsyncIteration
+
+    def close(self):
+        for entry in self._entries[self._cursor:]:
+            if entry.task is None:
+                continue
+            if not entry.task.done():
+                entry.task.cancel()
+            elif not entry.task.cancelled() and entry.task.exception() is None:
+                close = getattr(entry.task.result(), 'close', None)
+                if close is not None:
+                    close()
+
+    def _extend(self, parent, items):
+        for item in items:
+            path = self.provider.path_from_metadata(parent, item)
+            entry = _ZipEntry(path, path.path.replace(self.parent_path.path, '', 1),
+                              0 if path.is_dir else int(getattr(item, 'size', None) or 0))
+            if path.is_dir and path.path in self.listings:
+                entry.task = asyncio.get_event_loop().create_future()
+                entry.task.set_result(self.listings[path.path])
+            elif path.is_dir:
+                entry.task = asyncio.ensure_future(self._list(path))
+            self._entries.append(entry)
+
+    async def _list(self, path):
+        await self._list_slots.acquire()
+        try:
+            return await self.provider.metadata(path)
+        finally:
+            self._list_slots.release()
+
+    def _open(self, entry):
+        entry.task = asyncio.ensure_future(self.provider.download(entry.path))
+
+    def _prefetch(self):
+        self._fetch_cursor = max(self._fetch_cursor, self._cursor)
+        while self._fetch_cursor < len(self._entries) and len(self._ahead) < self.downloads:
+            entry = self._entries[self._fetch_cursor]
+            if not entry.path.is_dir:
+                if self._ahead and self._ahead_bytes + entry.size > self.max_bytes:
+                    break
+                self._open(entry)
+                self._ahead.append(entry)
+                self._ahead_bytes += entry.size
+            self._fetch_cursor += 1
+
+
 class RequestHandlerContext:
 
     def __init__(self, request_coro):
@@ -0,0 +1,256 @@
+import os
+import json
+import uuid
+import asyncio
+import hashlib
+import logging
+
+from waterbutler import settings
+from waterbutler.core import fileio
+from waterbutler.core import streams
+from waterbutler.core.cache import MemoryCache
+
+
+logger = logging.getLogger(__name__)
+
+
+def _item_version(item):
+    """The ``[size, etag, modified]`` of a metadata object, with `None` for whatever the provider
+    can't report."""
+    version = []
+    for attr in ('size', 'etag', 'modified'):
+        try:
+            version.append(getattr(item, attr))
+        except (AttributeError, NotImplementedError):
+            version.append(None)
+    return version
+
+
+def file_version_key(identity, path, item):
+    """A key identifying the content of the file at ``path``, as described by its metadata
+    ``item``, or `None` if the metadata doesn't say enough to tell versions of the file apart."""
+    version = _item_version(item)
+    if version[1] is None and version[2] is None:
+        return None
+    return hashlib.sha256(
+        json.dumps([identity, path.full_path] + version, default=str).encode('utf-8')
+    ).hexdigest()
+
+
+class ZipArchiveCache:
+    """Keeps zip archives of folders on local disk so that repeat downloads of an unchanged folder
+    are served from disk instead of being downloaded and compressed again.  Archives are keyed by
+    provider identity, folder path and a fingerprint of every descendant's size, etag and
+    modified time, so any change to the folder's contents produces a new key.
+
+    The least recently served archives are removed once the archives add up to more than
+    ``max_bytes``.  Recency is tracked with file modification times, so the cache survives
+    restarts and may be shared by WaterButler processes on the same host.
+
+    :param str directory: where archives are stored; created if missing
+    :param int max_bytes: total size the archives may take up
+    """
+
+    SUFFIX = '.zip'
+
+    def __init__(self, directory, max_bytes):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses}
+
+    @staticmethod
+    def fingerprint(entries):
+        """Fingerprint a folder's contents from ``(name, metadata)`` pairs for every descendant.
+        Returns `None` if a file reports neither an etag nor a modified time, since a change to it
+        could go unnoticed.
+        """
+        digest = hashlib.sha256()
+        for name, item in sorted(entries, key=lambda entry: entry[0]):
+            version = _item_version(item)
+            if not name.endswith('/') and version[1] is None and version[2] is None:
+                return None
+            digest.update(json.dumps([name] + version, default=str).encode('utf-8'))
+        return digest.hexdigest()
+
+    def key(self, identity, path, fingerprint):
+        return hashlib.sha256(
+            json.dumps([identity, path.full_path, fingerprint]).encode('utf-8')
+        ).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + self.SUFFIX)
+
+    async def open(self, key, range=None):
+        """Return a stream of the archive stored for ``key``, or `None` if there isn't one.
+        ``range`` is an inclusive ``(start, end)`` byte range as parsed from a Range header; an
+        end of `None` means the rest of the archive.  Unsatisfiable ranges are ignored.
+        """
+        path = self._path(key)
+        try:
+            file_pointer = await fileio.run(open, path, 'rb')
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        try:
+            await fileio.run(os.utime, path)
+        except OSError:
+            pass
+
+        size = os.fstat(file_pointer.fileno()).st_size
+        if range is None or range[0] >= size:
+            return streams.FileStreamReader(file_pointer)
+
+        end = size - 1 if range[1] is None else min(range[1], size - 1)
+        return streams.PartialFileStreamReader(file_pointer, (range[0], end))
+
+    def tee(self, key, stream):
+        """Wrap ``stream`` so that the archive it produces is stored under ``key`` once it has
+        been read to the end."""
+        return ZipArchiveCacheWriter(self, key, stream)
+
+    async def store(self, key, temp_path):
+        """Move a finished archive into place and evict old archives to make room for it."""
+        await fileio.run(os.replace, temp_path, self._path(key))
+        await fileio.run(self._evict)
+
+    def temp_path(self):
+        return os.path.join(self.directory, '.{}.tmp'.format(uuid.uuid4().hex))
+
+    def _evict(self):
+        archives = []
+        for entry in os.scandir(self.directory):
+            if not entry.name.endswith(self.SUFFIX):
+                continue
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            archives.append((stat.st_mtime, stat.st_size, entry.path))
+
+        total = sum(size for _, size, _ in archives)
+        for _, size, path in sorted(archives):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+
+class ZipArchiveCacheWriter(asyncio.StreamReader):
+    """Passes reads through to a zip stream while copying the archive to a temporary file, which
+    is moved into the cache once the stream is exhausted.  The copy is abandoned if the stream is
+    closed early, fails, or grows larger than the cache itself.
+    """
+
+    def __init__(self, cache, key, stream):
+        super().__init__()
+        self.cache = cache
+        self.key = key
+        self.stream = stream
+        self._temp_path = None  # type: str
+        self._file = None
+        self._written = 0
+        self._abandoned = False
+
+    async def read(self, n=-1):
+        try:
+            chunk = await self.stream.read(n)
+        except Exception:
+            await self._abandon()
+            raise
+
+        if self._abandoned:
+            return chunk
+
+        if chunk:
+            await self._write(chunk)
+        elif n != 0:
+            await self._finish()
+            self.feed_eof()
+
+        return chunk
+
+    def close(self):
+        if not self.at_eof():
+            asyncio.ensure_future(self._abandon())
+        close = getattr(self.stream, 'close', None)
+        if close is not None:
+            close()
+
+    async def _write(self, chunk):
+        self._written += len(chunk)
+        if self._written > self.cache.max_bytes:
+            await self._abandon()
+            return
+
+        try:
+            if self._file is None:
+                self._temp_path = self.cache.temp_path()
+                self._file = await fileio.run(open, self._temp_path, 'wb')
+            await fileio.run(self._file.write, chunk)
+        except OSError:
+            logger.exception('Unable to write zip archive to cache')
+            await self._abandon()
+
+    async def _finish(self):
+        if self._file is None:
+            return
+        try:
+            await fileio.run(self._file.close)
+            await self.cache.store(self.key, self._temp_path)
+        except OSError:
+            logger.exception('Unable to store zip archive in cache')
+            await self._abandon()
+        self._file = None
+
+    async def _abandon(self):
+        if self._abandoned:
+            return
+        self._abandoned = True
+        if self._file is None:
+            return
+        file, self._file = self._file, None
+        try:
+            await fileio.run(file.close)
+            await fileio.run(os.remove, self._temp_path)
+        except OSError:
+            pass
+
+
+_ZIP_ARCHIVE_CACHE = None
+
+
+def get_zip_archive_cache():
+    """Return the process-wide `ZipArchiveCache` configured in ``ZIP_ARCHIVE_CACHE`` settings, or
+    `None` if archive caching is disabled."""
+    global _ZIP_ARCHIVE_CACHE
+    if not settings.ZIP_ARCHIVE_CACHE_ENABLED:
+        return None
+    if _ZIP_ARCHIVE_CACHE is None:
+        _ZIP_ARCHIVE_CACHE = ZipArchiveCache(
+            settings.ZIP_ARCHIVE_CACHE_DIRECTORY,
+            settings.ZIP_ARCHIVE_CACHE_MAX_BYTES,
+        )
+    return _ZIP_ARCHIVE_CACHE
+
+
+_ZIP_CRC_CACHE = None
+
+
+def get_zip_crc_cache():
+    """Return the process-wide cache of file checksums used to serve ranges of stored zip
+    archives without reading the files before the range."""
+    global _ZIP_CRC_CACHE
+    if _ZIP_CRC_CACHE is None:
+        _ZIP_CRC_CACHE = MemoryCache(maxsize=settings.ZIP_STORED_CRC_CACHE_SIZE,
+                                     ttl=settings.ZIP_STORED_CRC_CACHE_TTL)
+    return _ZIP_CRC_CACHE
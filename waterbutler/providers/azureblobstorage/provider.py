@@ -22,6 +22,8 @@ from azure.storage._constants import (
 from waterbutler.core import streams
 from waterbutler.core import provider
 from waterbutler.core import exceptions
+from waterbutler.core import ratelimit
+from waterbutler.core import connections
 from waterbutler.core.path import WaterButlerPath
 from waterbutler.core.streams import StringStream, ByteStream
 
@@ -103,7 +105,6 @@ class AzureBlobStorageProvider(provider.BaseProvider):
         hosts = self._get_host_locations(primary, secondary)
         return list(map(lambda h: "https://" + h + path, hosts))
 
-    @provider.throttle()
     async def make_signed_request(self, method, urls, *args, **kwargs):
         kwargs['headers'] = self.build_headers(**kwargs.get('headers', {}))
         retry = _retry = kwargs.pop('retry', 2)
@@ -123,7 +124,15 @@ class AzureBlobStorageProvider(provider.BaseProvider):
         target_url = 0
         while retry >= 0:
             try:
-                response = await aiohttp.request(method, urls[target_url % len(urls)], *args, **kwargs)
+                url = urls[target_url % len(urls)]
+                limiter = ratelimit.get_limiter(self.NAME, url)
+                await limiter.acquire(flow=id(self))
+                try:
+                    response = await aiohttp.request(method, url, *args,
+                                                     connector=connections.get_connector(url),
+                                                     **kwargs)
+                finally:
+                    limiter.release()
                 if expects and response.status not in expects:
                     raise (await exceptions.exception_from_response(response, error=throws, **kwargs))
                 return response
@@ -201,15 +210,12 @@ class AzureBlobStorageProvider(provider.BaseProvider):
         assert not path.path.startswith('/')
         urls = functools.partial(self.generate_urls, path.path, secondary=True)
 
-        resp = await self.make_signed_request(
-            'GET',
+        return await self.make_ranged_download(
             urls,
-            expects=(200, ),
+            request=self.make_signed_request,
             throws=exceptions.MetadataError,
         )
 
-        return streams.ResponseStreamReader(resp)
-
     async def upload(self, stream, path, conflict='replace', block_id_prefix=None, **kwargs):
         """Uploads the given stream to Azure Blob Storage
 
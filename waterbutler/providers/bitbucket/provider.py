@@ -38,6 +38,9 @@ class BitbucketProvider(provider.BaseProvider):
     VIEW_URL = pd_settings.VIEW_URL
     RESP_PAGE_LEN = pd_settings.RESP_PAGE_LEN
 
+    # validate_v1_path caches the parent folder listing on the instance
+    COALESCED_METHODS = ('metadata', )
+
     def __init__(self, auth, credentials, settings):
         super().__init__(auth, credentials, settings)
         self.name = self.auth.get('name', None)
@@ -1,8 +1,8 @@
 import json
 import base64
 import hashlib
+import asyncio
 import logging
-import tempfile
 from asyncio import sleep
 from http import HTTPStatus
 from typing import List, Tuple, Union
@@ -10,8 +10,9 @@ from typing import List, Tuple, Union
 import aiohttp
 
 from waterbutler.core.path import WaterButlerPath
-from waterbutler.core import exceptions, streams, provider
+from waterbutler.core import exceptions, streams, provider, utils
 from waterbutler.core.exceptions import RetryChunkedUploadCommit
+from waterbutler.core.streams.metadata import get_hash_executor
 
 from waterbutler.providers.box import settings as pd_settings
 from waterbutler.providers.box.metadata import (BaseBoxMetadata, BoxRevision,
@@ -30,7 +31,6 @@ class BoxProvider(provider.BaseProvider):
     NAME = 'box'
     BASE_URL = pd_settings.BASE_URL
     NONCHUNKED_UPLOAD_LIMIT = pd_settings.NONCHUNKED_UPLOAD_LIMIT  # 50MB default
-    TEMP_CHUNK_SIZE = pd_settings.TEMP_CHUNK_SIZE  # 32KiB default
     UPLOAD_COMMIT_RETRIES = pd_settings.UPLOAD_COMMIT_RETRIES
 
     def __init__(self, auth, credentials, settings):
@@ -496,7 +496,8 @@ class BoxProvider(provider.BaseProvider):
         API Docs: https://developer.box.com/reference#upload-a-file
         """
         assert stream.size <= self.NONCHUNKED_UPLOAD_LIMIT
-        stream.add_writer('sha1', streams.HashStreamWriter(hashlib.sha1))
+        hashes = streams.MultiHashStreamWriter('sha1')
+        hashes.add_to(stream)
 
         data_stream = streams.FormDataStream(
             attributes=json.dumps({
@@ -520,6 +521,7 @@ class BoxProvider(provider.BaseProvider):
             throws=exceptions.UploadError,
         ) as resp:
             data = await resp.json()
+        await hashes.finish()
 
         entry = data['entries'][0]
         if stream.writers['sha1'].hexdigest != entry['sha1']:
@@ -536,7 +538,8 @@ class BoxProvider(provider.BaseProvider):
         """
 
         # Step 1: Add a sha1 calculator. The final sha1 will be needed to complete the session
-        stream.add_writer('sha1', streams.HashStreamWriter(hashlib.sha1))
+        hashes = streams.MultiHashStreamWriter('sha1')
+        hashes.add_to(stream)
 
         # Step 2: Create an upload session with Box and recieve session id.
         session_data = await self._create_chunked_upload_session(path, stream)
@@ -549,6 +552,7 @@ class BoxProvider(provider.BaseProvider):
             parts_manifest = await self._upload_parts(stream, session_data)
             logger.debug('chunked upload parts manifest: {}'.format(json.dumps(parts_manifest)))
 
+            await hashes.finish()
             data_sha = base64.standard_b64encode(stream.writers['sha1'].digest).decode()
 
             # Step 4. Complete the session and return the uploaded file's metadata.
@@ -604,76 +608,62 @@ class BoxProvider(provider.BaseProvider):
             return await resp.json()
 
     async def _upload_parts(self, stream: streams.BaseStream, session_data: dict) -> list:
-        """Calculate the partitioning scheme and upload the parts of the stream.  Returns a list
-        of metadata objects for each part, as reported by Box.  This list will be used to finialize
-        the upload.
+        """Upload the parts of the stream, using the partitioning scheme of the session, up to
+        ``UPLOAD_PART_CONCURRENCY`` at a time and with no more than ``UPLOAD_PART_MAX_BUFFER``
+        bytes of parts held in memory.  A part is re-sent up to ``UPLOAD_PART_RETRIES`` times if
+        Box answers with a 5xx or a 416, or the connection fails.  Returns a list of metadata
+        objects for each part, as reported by Box, in part order.  This list will be used to
+        finialize the upload.
         """
 
-        part_max_size = session_data['part_size']
-        parts = [part_max_size for _ in range(0, stream.size // part_max_size)]
-        if stream.size % part_max_size:
-            parts.append(stream.size - (len(parts) * part_max_size))
-        logger.debug('Stream will be partitioned into {} with the following '
-                     'sizes: {}'.format(len(parts), parts))
+        loop = asyncio.get_event_loop()
 
-        start_offset, manifest = 0, []
-        for part_id, part_size in enumerate(parts):
-            logging.debug('Uploading part {}, with size {} bytes, starting '
-                          'at offset {}'.format(part_id, part_size, start_offset))
-            part_metadata = await self._upload_part(stream, str(part_id), part_size, start_offset,
-                                                    session_data['id'])
-            manifest.append(part_metadata)
-            start_offset += part_size
+        async def upload_part(data, start_offset):
+            part_sha = await loop.run_in_executor(get_hash_executor(), _sha1, data)
+            return await self._upload_part(data, part_sha, start_offset, stream.size,
+                                           session_data['id'])
 
-        return manifest
-
-    async def _upload_part(self, stream: streams.BaseStream, part_id: str, part_size: int,
-                           start_offset: int, session_id: str) -> dict:
-        """Upload one part/chunk of the given stream to Box.
+        return await utils.upload_parts(
+            stream, session_data['part_size'], upload_part,
+            concurrency=pd_settings.UPLOAD_PART_CONCURRENCY,
+            max_buffer=pd_settings.UPLOAD_PART_MAX_BUFFER,
+            retries=pd_settings.UPLOAD_PART_RETRIES,
+            # Anything else, like bad credentials or a digest mismatch, won't go away on retry
+            retry_on=_is_retryable_part_error,
+        )
 
-        Box requires that the sha of the part be sent along in the headers of the request.  To do
-        this WB must write the stream segment to disk before uploading.  The part sha is calculated
-        as the tempfile is written.
+    async def _upload_part(self, data: bytes, part_sha: bytes, start_offset: int, total_size: int,
+                           session_id: str) -> dict:
+        """Upload one part/chunk of a chunked upload to Box.  Box requires that the sha of the part
+        be sent along in the headers of the request.
 
         API Docs: https://developer.box.com/reference#upload-part
-        """
 
-        cutoff_stream = streams.CutoffStream(stream, cutoff=part_size)
-        part_hasher_name = 'part-{}-sha1'.format(part_id)
-        stream.add_writer(part_hasher_name, streams.HashStreamWriter(hashlib.sha1))
-
-        f = tempfile.TemporaryFile()
-        chunk = await cutoff_stream.read(self.TEMP_CHUNK_SIZE)
-        while chunk:
-            f.write(chunk)
-            chunk = await cutoff_stream.read(self.TEMP_CHUNK_SIZE)
-        file_stream = streams.FileStreamReader(f)
+        :param bytes data: the contents of the part
+        :param bytes part_sha: the sha1 digest of ``data``
+        :param int start_offset: offset of the part's first byte within the file
+        :param int total_size: size of the whole file
+        """
 
-        part_sha = stream.writers[part_hasher_name].digest
+        byte_range = self._build_range_header((start_offset, start_offset + len(data) - 1))
+        content_range = str(byte_range).replace('=', ' ') + '/{}'.format(total_size)
         part_sha_b64 = base64.standard_b64encode(part_sha).decode()
-        stream.remove_writer(part_hasher_name)
-
-        byte_range = self._build_range_header((start_offset, start_offset + part_size - 1))
-        content_range = str(byte_range).replace('=', ' ') + '/{}'.format(stream.size)
 
         async with self.request(
             'PUT',
             self._build_upload_url('files', 'upload_sessions', session_id),
             headers={
-                # ``Content-Length`` is required for ``asyncio`` to use inner chunked stream read
-                'Content-Length': str(part_size),
+                'Content-Length': str(len(data)),
                 'Content-Range': content_range,
                 'Content-Type:': 'application/octet-stream',
                 'Digest': 'sha={}'.format(part_sha_b64)
             },
-            data=file_stream,
+            data=data,
             expects=(201, 200),
             throws=exceptions.UploadError,
         ) as resp:
-            data = await resp.json()
-
-        f.close()
-        return data['part']
+            body = await resp.json()
+        return body['part']
 
     async def _complete_chunked_upload_session(self, session_data: dict, parts_manifest: list,
                                                data_sha: str) -> dict:
@@ -723,3 +713,12 @@ class BoxProvider(provider.BaseProvider):
 
         await resp.release()
         return resp.status == HTTPStatus.NO_CONTENT
+
+
+def _sha1(data: bytes) -> bytes:
+    return hashlib.sha1(data).digest()
+
+
+def _is_retryable_part_error(exc: Exception) -> bool:
+    code = getattr(exc, 'code', None)
+    return code is None or code >= 500 or code == 416
@@ -7,8 +7,15 @@ BASE_URL = config.get('BASE_URL', 'https://api.box.com/2.0')
 BASE_UPLOAD_URL = config.get('BASE_CONTENT_URL', 'https://upload.box.com/api/2.0')
 NONCHUNKED_UPLOAD_LIMIT = int(config.get('NONCHUNKED_UPLOAD_LIMIT', 50 * 1000 * 1000))  # 50 MB
 
-# The size of the chunks read when writing the upload stream to disk
-TEMP_CHUNK_SIZE = int(config.get('TEMP_CHUNK_SIZE', 32 * 1024))  # 32KiB
+# Number of parts of a chunked upload sent to Box at once
+UPLOAD_PART_CONCURRENCY = int(config.get('UPLOAD_PART_CONCURRENCY', 4))
+
+# Upper bound on the bytes of an upload held in memory while parts are in flight.  Concurrency is
+# reduced if UPLOAD_PART_CONCURRENCY parts of the session's part size would exceed it.
+UPLOAD_PART_MAX_BUFFER = int(config.get('UPLOAD_PART_MAX_BUFFER', 128 * 1024 * 1024))  # 128MiB
+
+# Number of times a single part is re-sent after a 5xx, 416 or connection error
+UPLOAD_PART_RETRIES = int(config.get('UPLOAD_PART_RETRIES', 2))
 
 # Number of times to retry upload commits before giving up
 UPLOAD_COMMIT_RETRIES = int(config.get('UPLOAD_COMMIT_RETRIES', 10))
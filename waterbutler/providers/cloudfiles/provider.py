@@ -93,14 +93,11 @@ class CloudFilesProvider(provider.BaseProvider):
             parsed_url.args['filename'] = kwargs.get('display_name') or path.name
             return parsed_url.url
 
-        resp = await self.make_request(
-            'GET',
+        return await self.make_ranged_download(
             functools.partial(self.sign_url, path),
             range=range,
-            expects=(200, 206),
             throws=exceptions.DownloadError,
         )
-        return streams.ResponseStreamReader(resp)
 
     @ensure_connection
     async def upload(self, stream, path, check_created=True, fetch_metadata=True, **kwargs):
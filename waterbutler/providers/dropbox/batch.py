@@ -0,0 +1,86 @@
+import asyncio
+
+from waterbutler.core import exceptions as core_exceptions
+
+from waterbutler.providers.dropbox import settings as pd_settings
+
+
+class FinishBatcher:
+    """Commits closed upload sessions together with ``/files/upload_session/finish_batch_v2``.
+    Commits queued within ``FINISH_BATCH_WINDOW`` seconds of the first one are sent together, up to
+    ``FINISH_BATCH_SIZE`` per batch.  Dropbox takes the namespace lock once per batch instead of
+    once per file, which keeps many small files written at once from failing on lock contention.
+    Each caller gets the metadata of its own file, or the error Dropbox reported for it.
+
+    API Docs: https://www.dropbox.com/developers/documentation/http/documentation#files-upload_session-finish_batch
+
+    :param provider: the `DropboxProvider` whose credentials and requests are used
+    """
+
+    def __init__(self, provider, window: float=None, size: int=None) -> None:
+        self.provider = provider
+        self.window = pd_settings.FINISH_BATCH_WINDOW if window is None else window
+        self.size = min(pd_settings.FINISH_BATCH_SIZE if size is None else size, 1000)
+        self._queued = []  # type: list
+        self._timer = None  # type: asyncio.Handle
+
+    async def commit(self, entry: dict) -> dict:
+        """Queue ``entry``, a ``{'cursor': ..., 'commit': ...}`` dict as sent to
+        ``/files/upload_session/finish``, and return the metadata of the committed file."""
+        loop = asyncio.get_event_loop()
+        future = loop.create_future()
+        self._queued.append((entry, future))
+        if len(self._queued) >= self.size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush)
+        return await future
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        calls, self._queued = self._queued[:self.size], self._queued[self.size:]
+        if self._queued:
+            self._timer = asyncio.get_event_loop().call_later(self.window, self._flush)
+        calls = [(entry, future) for entry, future in calls if not future.done()]
+        if calls:
+            asyncio.ensure_future(self._send(calls))
+
+    async def _send(self, calls: list) -> None:
+        self.provider.metrics.append('finish_batch.sizes', len(calls))
+        try:
+            data = await self.provider.dropbox_request(
+                self.provider.build_url('files', 'upload_session', 'finish_batch_v2'),
+                {'entries': [entry for entry, _ in calls]},
+                expects=(200, ),
+                throws=core_exceptions.UploadError,
+            )
+        except Exception as exc:
+            for _, future in calls:
+                if not future.done():
+                    future.set_exception(exc)
+            return
+
+        results = data.get('entries', [])
+        for index, (entry, future) in enumerate(calls):
+            if future.done():
+                continue
+            if index >= len(results):
+                future.set_exception(core_exceptions.UploadError(
+                    'No result for {} in finish batch'.format(entry['commit']['path'])
+                ))
+            elif results[index]['.tag'] == 'success':
+                future.set_result(results[index])
+            else:
+                future.set_exception(self._failure(entry, results[index]))
+
+    def _failure(self, entry: dict, result: dict) -> Exception:
+        """The exception `DropboxProvider.dropbox_conflict_error_handler` raises for a failed
+        entry, as if its session had been finished on its own."""
+        try:
+            self.provider.dropbox_conflict_error_handler({'error': result.get('failure', result)},
+                                                         entry['commit']['path'])
+        except Exception as exc:
+            return exc
+        return core_exceptions.UploadError(str(result))  # pragma: no cover
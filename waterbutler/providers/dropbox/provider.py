@@ -3,12 +3,13 @@ import typing
 import logging
 from http import HTTPStatus
 
-from waterbutler.core import provider, streams
+from waterbutler.core import provider, streams, utils
 from waterbutler.core.path import WaterButlerPath
 from waterbutler.core import exceptions as core_exceptions
 
 from waterbutler.providers.dropbox import settings as pd_settings
 from waterbutler.providers.dropbox import exceptions as pd_exceptions
+from waterbutler.providers.dropbox.batch import FinishBatcher
 from waterbutler.providers.dropbox.metadata import (DropboxRevision,
                                                     BaseDropboxMetadata,
                                                     DropboxFileMetadata,
@@ -16,6 +17,9 @@ from waterbutler.providers.dropbox.metadata import (DropboxRevision,
 
 logger = logging.getLogger(__name__)
 
+# Dropbox wants every part of a concurrent upload session but the last to be a multiple of this size
+CONCURRENT_CHUNK_UNIT = 4 * 1024 * 1024
+
 
 class DropboxProvider(provider.BaseProvider):
     """Provider for the Dropbox.com cloud storage service.
@@ -66,6 +70,8 @@ class DropboxProvider(provider.BaseProvider):
         self.token = self.credentials['token']
         self.folder = self.settings['folder']
         self.metrics.add('folder_is_root', self.folder == '/')
+        self._finish_batch = FinishBatcher(self)
+        self._uploads_in_flight = 0
 
     async def dropbox_request(self,
                               url: str,
@@ -257,14 +263,21 @@ class DropboxProvider(provider.BaseProvider):
                      conflict: str='replace',
                      **kwargs) -> typing.Tuple[DropboxFileMetadata, bool]:
         """Upload file stream to Dropbox.  If file exceeds `CONTIGUOUS_UPLOAD_SIZE_LIMIT`, Dropbox's
-        multipart upload endpoints will be used.
+        multipart upload endpoints will be used.  Smaller files uploaded while another upload is
+        running on this provider, e.g. during a folder copy, are committed in batches.
         """
         path, exists = await self.handle_name_conflict(path, conflict=conflict)
 
-        if stream.size > self.CONTIGUOUS_UPLOAD_SIZE_LIMIT:
-            data = await self._chunked_upload(stream, path, conflict=conflict)
-        else:
-            data = await self._contiguous_upload(stream, path, conflict=conflict)
+        self._uploads_in_flight += 1
+        try:
+            if stream.size > self.CONTIGUOUS_UPLOAD_SIZE_LIMIT:
+                data = await self._chunked_upload(stream, path, conflict=conflict)
+            elif self._uploads_in_flight > 1 and self._finish_batch.size > 1:
+                data = await self._batched_upload(stream, path, conflict=conflict)
+            else:
+                data = await self._contiguous_upload(stream, path, conflict=conflict)
+        finally:
+            self._uploads_in_flight -= 1
 
         return DropboxFileMetadata(data, self.folder), not exists
 
@@ -305,14 +318,32 @@ class DropboxProvider(provider.BaseProvider):
             self.dropbox_conflict_error_handler(data, path.path)
         return data
 
+    async def _batched_upload(self, stream: streams.BaseStream, path: WaterButlerPath,
+                              conflict: str='replace') -> dict:
+        """Upload a small file to a closed upload session of its own, then commit it together with
+        other files uploaded at the same time through the provider's `FinishBatcher`.
+
+        :param stream: the stream to upload
+        :param path: the WB path of the file
+        :param conflict: whether to replace upon conflict
+        :rtype: `dict`
+        :return: A dictionary of the metadata about the file just uploaded
+        """
+        session_id = await self._create_upload_session(stream=stream)
+        return await self._finish_batch.commit(
+            self._session_finish_args(session_id, stream.size, path, conflict=conflict)
+        )
+
     async def _chunked_upload(self, stream: streams.BaseStream, path: WaterButlerPath,
                               conflict: str='replace') -> dict:
         """Chunked uploading is a 3-step process using Dropbox's "Upload Session".
 
-        First, start a new upload session and receive an upload session ID.
+        First, start a new upload session and receive an upload session ID.  Unless
+        ``UPLOAD_CONCURRENCY`` is 1, the session is a concurrent one.
         API Docs: https://www.dropbox.com/developers/documentation/http/documentation#files-upload_session-start
 
-        Then, split the file into multiple chunks and upload them across multiple requests.
+        Then, split the file into multiple chunks and upload them across multiple requests, up to
+        ``UPLOAD_CONCURRENCY`` at a time.
         API Docs: https://www.dropbox.com/developers/documentation/http/documentation#files-upload_session-append
 
         Finally, when all of the parts have finished uploading, send a complete session request to
@@ -325,16 +356,21 @@ class DropboxProvider(provider.BaseProvider):
         3. An upload session can be used for a maximum of 48 hours.
         """
 
-        # 1. Create an upload session and retrieves the session id to upload parts.
-        session_id = await self._create_upload_session()
+        if pd_settings.UPLOAD_CONCURRENCY > 1:
+            # 1. Create an upload session and retrieves the session id to upload parts.
+            session_id = await self._create_upload_session(session_type='concurrent')
 
-        # 2. Upload all parts in the session
-        await self._upload_parts(stream, session_id)
+            # 2. Upload all parts in the session, several at once
+            await self._upload_parts_concurrently(stream, session_id)
+        else:
+            session_id = await self._create_upload_session()
+            await self._upload_parts(stream, session_id)
 
         # 3. Complete the session and return the uploaded file's metadata.
         return await self._complete_session(stream, session_id, path, conflict=conflict)
 
-    async def _create_upload_session(self) -> str:
+    async def _create_upload_session(self, session_type: str=None,
+                                     stream: streams.BaseStream=None) -> str:
         """Create an upload session for chunked upload.
 
         "Upload sessions allow you to upload a single file in one or more requests, for example
@@ -343,17 +379,25 @@ class DropboxProvider(provider.BaseProvider):
 
         API Docs: https://www.dropbox.com/developers/documentation/http/documentation#files-upload_session-start
 
+        :param session_type: ``'concurrent'`` to allow parts to be appended in parallel
+        :param stream: the whole file, to upload it with the request and close the session
         :rtype: str
         :return: session identifier
         """
 
+        upload_args = {'close': stream is not None}  # type: dict
+        headers = {'Content-Type': 'application/octet-stream'}
+        if session_type is not None:
+            upload_args['session_type'] = session_type
+        if stream is not None:
+            headers['Content-Length'] = str(stream.size)
+        headers['Dropbox-API-Arg'] = json.dumps(upload_args)
+
         resp = await self.make_request(
             'POST',
             self._build_content_url('files', 'upload_session', 'start'),
-            headers={
-                'Content-Type': 'application/octet-stream',
-                'Dropbox-API-Arg': json.dumps({'close': False}),
-            },
+            headers=headers,
+            data=stream,
             expects=(200, ),
             throws=core_exceptions.UploadError
         )
@@ -416,6 +460,57 @@ class DropboxProvider(provider.BaseProvider):
 
         await resp.release()
 
+    async def _upload_parts_concurrently(self, stream: streams.BaseStream,
+                                         session_id: str) -> None:
+        """Upload the stream to a concurrent upload session, up to ``UPLOAD_CONCURRENCY`` parts at
+        a time and with no more than ``UPLOAD_MAX_BUFFER`` bytes of parts held in memory.  Every
+        part is appended at its own offset, and the last one closes the session.  A part is re-sent
+        up to ``UPLOAD_PART_RETRIES`` times if Dropbox answers with a 5xx or a 429, or the
+        connection fails.
+        """
+
+        unit = CONCURRENT_CHUNK_UNIT
+        chunk_size = max(pd_settings.CONCURRENT_CHUNK_SIZE // unit, 1) * unit
+
+        async def append_part(data, offset):
+            close = offset + len(data) >= stream.size
+            await self._append_part(data, session_id, offset, close=close)
+
+        await utils.upload_parts(
+            stream, chunk_size, append_part,
+            concurrency=pd_settings.UPLOAD_CONCURRENCY,
+            max_buffer=pd_settings.UPLOAD_MAX_BUFFER,
+            retries=pd_settings.UPLOAD_PART_RETRIES,
+            # Retrying won't fix bad credentials, a bad offset or a closed session
+            retry_on=_is_retryable_part_error,
+        )
+
+    async def _append_part(self, data: bytes, session_id: str, offset: int,
+                           close: bool=False) -> None:
+        """Append one part to a concurrent upload session at ``offset``.
+
+        API Docs: https://www.dropbox.com/developers/documentation/http/documentation#files-upload_session-append
+        """
+
+        upload_args = {
+            'close': close,
+            'cursor': {'session_id': session_id, 'offset': offset, },
+        }
+
+        resp = await self.make_request(
+            'POST',
+            self._build_content_url('files', 'upload_session', 'append_v2'),
+            headers={
+                'Content-Length': str(len(data)),
+                'Content-Type': 'application/octet-stream',
+                'Dropbox-API-Arg': json.dumps(upload_args),
+            },
+            data=data,
+            expects=(200, ),
+            throws=core_exceptions.UploadError
+        )
+        await resp.release()
+
     async def _complete_session(self, stream: streams.BaseStream, session_id: str,
                                 path: WaterButlerPath, conflict: str='replace') -> dict:
         """Complete the chunked upload session.
@@ -433,12 +528,7 @@ class DropboxProvider(provider.BaseProvider):
         :return: A dictionary of the metadata about the file just uploaded
         """
 
-        upload_args = {
-            'cursor': {'session_id': session_id, 'offset': stream.size, },
-            'commit': {"path": path.full_path, },
-        }
-        if conflict == 'replace':
-            upload_args['commit']['mode'] = 'overwrite'
+        upload_args = self._session_finish_args(session_id, stream.size, path, conflict=conflict)
 
         resp = await self.make_request(
             'POST',
@@ -453,6 +543,18 @@ class DropboxProvider(provider.BaseProvider):
 
         return await resp.json()
 
+    def _session_finish_args(self, session_id: str, size: int, path: WaterButlerPath,
+                             conflict: str='replace') -> dict:
+        """The cursor and commit info that finish an upload session of ``size`` bytes, either on
+        its own or as an entry of a finish batch."""
+        upload_args = {
+            'cursor': {'session_id': session_id, 'offset': size, },
+            'commit': {"path": path.full_path, },
+        }  # type: dict
+        if conflict == 'replace':
+            upload_args['commit']['mode'] = 'overwrite'
+        return upload_args
+
     async def delete(self, path: WaterButlerPath, confirm_delete: int=0,  # type: ignore
                      **kwargs) -> None:  # type: ignore
         """Delete file, folder, or provider root contents
@@ -574,3 +676,8 @@ class DropboxProvider(provider.BaseProvider):
         for child in meta:  # type: ignore
             dropbox_path = await self.validate_path(child.path)
             await self.delete(dropbox_path)
+
+
+def _is_retryable_part_error(exc: Exception) -> bool:
+    code = getattr(exc, 'code', None)
+    return code is None or code >= 500 or code == 429
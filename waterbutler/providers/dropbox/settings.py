@@ -10,3 +10,21 @@ BASE_CONTENT_URL = config.get('BASE_CONTENT_URL', 'https://content.dropboxapi.co
 CONTIGUOUS_UPLOAD_SIZE_LIMIT = int(config.get('CONTIGUOUS_UPLOAD_SIZE_LIMIT', 150000000))  # 150 MB
 
 CHUNK_SIZE = int(config.get('CHUNK_SIZE', 4000000))  # 4 MB
+
+# Chunked uploads go through a concurrent upload session, sending up to UPLOAD_CONCURRENCY parts of
+# CONCURRENT_CHUNK_SIZE bytes at once.  Dropbox wants those parts to be a multiple of 4 MiB, so the
+# size is rounded down to one.  No more than UPLOAD_MAX_BUFFER bytes of parts are held in memory at
+# a time, and a part is re-sent up to UPLOAD_PART_RETRIES times after a server or connection error.
+# An UPLOAD_CONCURRENCY of 1 appends parts of CHUNK_SIZE one after another to a regular session.
+UPLOAD_CONCURRENCY = int(config.get('UPLOAD_CONCURRENCY', 4))
+CONCURRENT_CHUNK_SIZE = int(config.get('CONCURRENT_CHUNK_SIZE', 16 * 1024 * 1024))  # 16 MiB
+UPLOAD_MAX_BUFFER = int(config.get('UPLOAD_MAX_BUFFER', 128 * 1024 * 1024))  # 128 MiB
+UPLOAD_PART_RETRIES = int(config.get('UPLOAD_PART_RETRIES', 2))
+
+# Small files uploaded while another upload is running on the same provider, as when a folder is
+# copied into Dropbox, are each sent to a closed upload session and committed together.  Commits
+# queued within FINISH_BATCH_WINDOW seconds of the first are sent in one finish_batch request of
+# up to FINISH_BATCH_SIZE files (at most 1000, Dropbox's limit).  A FINISH_BATCH_SIZE of 1 turns
+# this off.
+FINISH_BATCH_WINDOW = float(config.get('FINISH_BATCH_WINDOW', 0.05))
+FINISH_BATCH_SIZE = int(config.get('FINISH_BATCH_SIZE', 1000))
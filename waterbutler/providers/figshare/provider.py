@@ -8,7 +8,7 @@ from http import HTTPStatus
 import aiohttp
 
 from waterbutler.core.streams import CutoffStream
-from waterbutler.core import exceptions, provider, streams
+from waterbutler.core import exceptions, provider, streams, connections
 
 from waterbutler.providers.figshare.path import FigsharePath
 from waterbutler.providers.figshare import settings as pd_settings
@@ -201,11 +201,14 @@ class BaseFigshareProvider(provider.BaseProvider):
 
         if resp.status in (302, 301):
             await resp.release()
+            location = resp.headers['location']
             if range:
-                resp = await aiohttp.request('GET', resp.headers['location'],
-                                             headers={'Range': self._build_range_header(range)})
+                resp = await aiohttp.request('GET', location,
+                                             headers={'Range': self._build_range_header(range)},
+                                             connector=connections.get_connector(location))
             else:
-                resp = await aiohttp.request('GET', resp.headers['location'])
+                resp = await aiohttp.request('GET', location,
+                                             connector=connections.get_connector(location))
 
         return streams.ResponseStreamReader(resp)
 
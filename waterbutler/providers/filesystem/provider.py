@@ -5,7 +5,7 @@ import datetime
 import mimetypes
 from typing import Tuple, Union
 
-from waterbutler.core import exceptions, provider
+from waterbutler.core import exceptions, fileio, provider
 from waterbutler.core.path import WaterButlerPath
 from waterbutler.core.streams import FileStreamReader, PartialFileStreamReader
 
@@ -30,11 +30,11 @@ class FileSystemProvider(provider.BaseProvider):
         os.makedirs(self.folder, exist_ok=True)
 
     async def validate_v1_path(self, path, **kwargs):
-        if not os.path.exists(self.folder + path):
+        if not (await fileio.run(os.path.exists, self.folder + path)):
             raise exceptions.NotFoundError(str(path))
 
         implicit_folder = path.endswith('/')
-        explicit_folder = os.path.isdir(self.folder + path)
+        explicit_folder = await fileio.run(os.path.isdir, self.folder + path)
         if implicit_folder != explicit_folder:
             raise exceptions.NotFoundError(str(path))
 
@@ -48,19 +48,19 @@ class FileSystemProvider(provider.BaseProvider):
 
     async def intra_copy(self, dest_provider, src_path, dest_path):
         exists = await self.exists(dest_path)
-        shutil.copy(src_path.full_path, dest_path.full_path)
+        await fileio.run(shutil.copy, src_path.full_path, dest_path.full_path)
         return (await dest_provider.metadata(dest_path)), not exists
 
     async def intra_move(self, dest_provider, src_path, dest_path):
         exists = await self.exists(dest_path)
-        shutil.move(src_path.full_path, dest_path.full_path)
+        await fileio.run(shutil.move, src_path.full_path, dest_path.full_path)
         return (await dest_provider.metadata(dest_path)), not exists
 
     async def download(self, path: WaterButlerPath, range: Tuple[int, int]=None,   # type: ignore
                        **kwargs) -> Union[FileStreamReader, PartialFileStreamReader]:
-        if not os.path.exists(path.full_path):
+        if not (await fileio.run(os.path.exists, path.full_path)):
             raise exceptions.DownloadError('Could not retrieve file \'{0}\''.format(path), code=404)
-        file_pointer = open(path.full_path, 'rb')
+        file_pointer = await fileio.run(open, path.full_path, 'rb')
         logger.debug('requested-range:: {}'.format(range))
         if range is not None and range[1] is not None:
             return PartialFileStreamReader(file_pointer, range)
@@ -69,18 +69,24 @@ class FileSystemProvider(provider.BaseProvider):
     async def upload(self, stream, path, **kwargs):
         created = not (await self.exists(path))
 
-        os.makedirs(os.path.split(path.full_path)[0], exist_ok=True)
+        await fileio.run(os.makedirs, os.path.split(path.full_path)[0], exist_ok=True)
 
-        with open(path.full_path, 'wb') as file_pointer:
+        file_pointer = await fileio.run(open, path.full_path, 'wb')
+        try:
             chunk = await stream.read(pd_settings.CHUNK_SIZE)
             while chunk:
-                file_pointer.write(chunk)
+                await fileio.run(file_pointer.write, chunk)
                 chunk = await stream.read(pd_settings.CHUNK_SIZE)
+        finally:
+            await fileio.run(file_pointer.close)
 
         metadata = await self.metadata(path)
         return metadata, created
 
     async def delete(self, path, **kwargs):
+        await fileio.run(self._delete, path)
+
+    def _delete(self, path):
         if path.is_file:
             os.remove(path.full_path)
         else:
@@ -89,6 +95,9 @@ class FileSystemProvider(provider.BaseProvider):
                 os.makedirs(self.folder, exist_ok=True)
 
     async def metadata(self, path, **kwargs):
+        return await fileio.run(self._metadata, path)
+
+    def _metadata(self, path):
         if path.is_dir:
             if not os.path.exists(path.full_path) or not os.path.isdir(path.full_path):
                 raise exceptions.MetadataError(
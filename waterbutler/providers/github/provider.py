@@ -1,6 +1,5 @@
 import copy
 import json
-import hashlib
 import logging
 from typing import Tuple
 
@@ -57,6 +56,9 @@ class GitHubProvider(provider.BaseProvider):
     BASE_URL = pd_settings.BASE_URL
     VIEW_URL = pd_settings.VIEW_URL
 
+    # validate_v1_path records the repo and default branch on the instance
+    COALESCED_METHODS = ('metadata', )
+
     def __init__(self, auth, credentials, settings):
         super().__init__(auth, credentials, settings)
         self.name = self.auth.get('name', None)
@@ -608,8 +610,8 @@ class GitHubProvider(provider.BaseProvider):
             'content': streams.Base64EncodeStream(stream),
         })
 
-        sha1_calculator = streams.HashStreamWriter(hashlib.sha1)
-        stream.add_writer('sha1', sha1_calculator)
+        sha1_calculator = streams.MultiHashStreamWriter('sha1')
+        sha1_calculator.add_to(stream)
         git_blob_header = 'blob {}\0'.format(str(stream.size))
         sha1_calculator.write(git_blob_header.encode('utf-8'))
 
@@ -626,6 +628,7 @@ class GitHubProvider(provider.BaseProvider):
         )
 
         blob_metadata = await resp.json()
+        await sha1_calculator.finish()
         if stream.writers['sha1'].hexdigest != blob_metadata['sha']:
             raise exceptions.UploadChecksumMismatchError()
 
@@ -11,7 +11,7 @@ from google.oauth2 import service_account
 from waterbutler.core.path import WaterButlerPath
 from waterbutler.core.provider import BaseProvider
 from waterbutler.core.utils import make_disposition
-from waterbutler.core.streams import BaseStream, HashStreamWriter, ResponseStreamReader
+from waterbutler.core.streams import BaseStream, HashStreamWriter
 from waterbutler.core.exceptions import (WaterButlerError, MetadataError, NotFoundError,
                                          CopyError, UploadError, DownloadError, DeleteError,
                                          UploadChecksumMismatchError, InvalidProviderConfigError, )
@@ -196,7 +196,7 @@ class GoogleCloudProvider(BaseProvider):
         return metadata, created  # type: ignore
 
     async def download(self, path: WaterButlerPath, accept_url=False, range=None,  # type: ignore
-                       **kwargs) -> typing.Union[str, ResponseStreamReader]:
+                       **kwargs) -> typing.Union[str, BaseStream]:
         """Download the object with the given path.
 
 
@@ -217,7 +217,7 @@ class GoogleCloudProvider(BaseProvider):
         :param bool accept_url: should return a direct time-limited download url from the provider
         :param tuple range: the Range HTTP request header
         :param dict kwargs: ``display_name`` - the display name of the file on OSF and for download
-        :rtype: str or :class:`.streams.ResponseStreamReader`
+        :rtype: str or :class:`.streams.BaseStream`
         """
 
         if path.is_folder:
@@ -234,14 +234,7 @@ class GoogleCloudProvider(BaseProvider):
             return signed_url
 
         signed_url = functools.partial(self._build_and_sign_url, req_method, obj_name, **{})
-        resp = await self.make_request(
-            req_method,
-            signed_url,
-            range=range,
-            expects=(HTTPStatus.OK, HTTPStatus.PARTIAL_CONTENT),
-            throws=DownloadError
-        )
-        return ResponseStreamReader(resp)
+        return await self.make_ranged_download(signed_url, range=range, throws=DownloadError)
 
     async def delete(self, path: WaterButlerPath, *args, **kwargs) -> None:  # type: ignore
         """Deletes the file object with the specified WaterButler path.
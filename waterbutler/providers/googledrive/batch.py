@@ -0,0 +1,253 @@
+import json
+import uuid
+import asyncio
+from urllib import parse
+
+from waterbutler.core import exceptions
+
+from waterbutler.providers.googledrive import settings as pd_settings
+
+
+# ``reason`` of the errors Drive returns, with a 403 or 429, when a user or project is rate limited
+RATE_LIMIT_REASONS = ('rateLimitExceeded', 'userRateLimitExceeded')
+
+
+class BatchResponse:
+    """The response to one call of a batch, or to a call sent on its own.  Has the parts of
+    `aiohttp.ClientResponse` that the provider and `exceptions.exception_from_response` use."""
+
+    def __init__(self, method: str, status: int, headers: dict, body: bytes) -> None:
+        self.method = method
+        self.status = status
+        self.headers = headers
+        self.body = body
+
+    async def json(self):
+        return json.loads(self.body.decode('utf-8'))
+
+    async def read(self) -> bytes:
+        return self.body
+
+    async def release(self) -> None:
+        pass
+
+
+class _Call:
+
+    __slots__ = ('method', 'url', 'data', 'headers', 'expects', 'throws', 'future')
+
+    def __init__(self, method, url, data, headers, expects, throws, future):
+        self.method = method
+        self.url = url
+        self.data = data
+        self.headers = headers
+        self.expects = expects
+        self.throws = throws
+        self.future = future
+
+
+class DriveBatcher:
+    """Groups independent Drive API calls into ``multipart/mixed`` batch requests.  Calls made
+    within ``BATCH_WINDOW`` seconds of the first one queued are sent together, up to
+    ``BATCH_SIZE`` per batch; a call that ends up alone is sent as a plain request.  At most
+    ``BATCH_CONCURRENCY`` batches are sent at once.  Calls whose part of a batch failed with a
+    server or rate limit error are sent again, up to ``BATCH_RETRIES`` times.  Each caller gets its
+    own `BatchResponse`, or the exception its ``expects`` and ``throws`` call for, as if it had
+    made the request itself.
+
+    API docs: https://developers.google.com/drive/v2/web/batch
+
+    :param provider: the `GoogleDriveProvider` whose credentials and requests are used
+    """
+
+    def __init__(self, provider, window: float=None, size: int=None) -> None:
+        self.provider = provider
+        self.window = pd_settings.BATCH_WINDOW if window is None else window
+        self.size = min(pd_settings.BATCH_SIZE if size is None else size, 100)
+        self.concurrency = max(pd_settings.BATCH_CONCURRENCY, 1)
+        self.retries = pd_settings.BATCH_RETRIES
+        self.backoff = pd_settings.BATCH_RETRY_BACKOFF
+        self._queued = []  # type: list
+        self._timer = None  # type: asyncio.Handle
+        self._slots = None  # type: asyncio.Semaphore
+
+    async def request(self, method: str, url: str, data: str=None, headers: dict=None,
+                      expects=(200, ), throws=exceptions.UnhandledProviderError) -> BatchResponse:
+        loop = asyncio.get_event_loop()
+        call = _Call(method, url, data, headers or {}, expects, throws, loop.create_future())
+        if self.size <= 1:
+            return await self._send_one(call)
+
+        self._queued.append(call)
+        if len(self._queued) >= self.size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush)
+        return await call.future
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        calls, self._queued = self._queued[:self.size], self._queued[self.size:]
+        if self._queued:
+            self._timer = asyncio.get_event_loop().call_later(self.window, self._flush)
+        calls = [call for call in calls if not call.future.done()]
+        if calls:
+            asyncio.ensure_future(self._send(calls))
+
+    async def _send(self, calls: list) -> None:
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.concurrency)
+        async with self._slots:
+            for attempt in range(self.retries + 1):
+                if attempt:
+                    await asyncio.sleep(self.backoff * attempt)
+                calls = await self._send_calls(
+                    [call for call in calls if not call.future.done()],
+                    retry=attempt < self.retries,
+                )
+                if not calls:
+                    return
+
+    async def _send_calls(self, calls: list, retry: bool=False) -> list:
+        """Send ``calls`` and resolve their futures.  If ``retry`` is set, calls that failed in a
+        way worth retrying are left unresolved and returned."""
+        if not calls:
+            return []
+        try:
+            if len(calls) == 1:
+                calls[0].future.set_result(await self._send_one(calls[0]))
+                return []
+            responses = await self._send_batch(calls)
+        except Exception as exc:
+            for call in calls:
+                if call.future.done():
+                    continue
+                if isinstance(exc, exceptions.ProviderError) and len(calls) > 1:
+                    call.future.set_exception(call.throws(exc.message, code=exc.code))
+                else:
+                    call.future.set_exception(exc)
+            return []
+
+        failed = []
+        for call, resp in zip(calls, responses):
+            if call.future.done():
+                continue
+            if retry and _should_retry(resp):
+                failed.append(call)
+            elif resp is None:
+                call.future.set_exception(call.throws(
+                    'No response to {} {} in batch'.format(call.method, call.url)
+                ))
+            elif resp.status not in call.expects:
+                call.future.set_exception(
+                    await exceptions.exception_from_response(resp, error=call.throws)
+                )
+            else:
+                call.future.set_result(resp)
+        if failed:
+            self.provider.metrics.append('batch.retries', len(failed))
+        return failed
+
+    async def _send_one(self, call: _Call) -> BatchResponse:
+        resp = await self.provider.make_request(
+            call.method, call.url,
+            data=call.data,
+            headers=call.headers,
+            expects=call.expects,
+            throws=call.throws,
+        )
+        body = await resp.read()
+        return BatchResponse(call.method, resp.status, dict(resp.headers), body)
+
+    async def _send_batch(self, calls: list) -> list:
+        self.provider.metrics.append('batch.sizes', len(calls))
+        boundary = 'batch_{}'.format(uuid.uuid4().hex)
+        resp = await self.provider.make_request(
+            'POST', pd_settings.BATCH_URL,
+            data=_encode_batch(boundary, calls),
+            headers={'Content-Type': 'multipart/mixed; boundary={}'.format(boundary)},
+            expects=(200, ),
+            throws=exceptions.ProviderError,
+        )
+        body = await resp.read()
+        parts = _decode_batch(resp.headers.get('Content-Type', ''), body)
+        return [
+            parts.get(index) and BatchResponse(call.method, *parts[index])
+            for index, call in enumerate(calls)
+        ]
+
+
+def _should_retry(resp: BatchResponse) -> bool:
+    """Whether the call that got ``resp`` (`None` if it got no response) is worth sending again:
+    it got no response, a server error, or a rate limit error."""
+    if resp is None or resp.status >= 500:
+        return True
+    if resp.status not in (403, 429):
+        return False
+    try:
+        errors = json.loads(resp.body.decode('utf-8'))['error']['errors']
+        return any(error.get('reason') in RATE_LIMIT_REASONS for error in errors)
+    except (ValueError, KeyError, TypeError, AttributeError):
+        return resp.status == 429
+
+
+def _encode_batch(boundary: str, calls: list) -> bytes:
+    parts = []
+    for index, call in enumerate(calls):
+        url = parse.urlsplit(call.url)
+        target = url.path + ('?' + url.query if url.query else '')
+        lines = [
+            '--{}'.format(boundary),
+            'Content-Type: application/http',
+            'Content-ID: <item{}>'.format(index),
+            '',
+            '{} {} HTTP/1.1'.format(call.method, target),
+        ]
+        lines.extend('{}: {}'.format(key, value) for key, value in call.headers.items())
+        lines.extend(['', call.data or ''])
+        parts.append('\r\n'.join(lines))
+    parts.append('--{}--\r\n'.format(boundary))
+    return '\r\n'.join(parts).encode('utf-8')
+
+
+def _split_head(data: bytes):
+    """Split ``data`` into its header lines and body, tolerating bare ``\\n`` line endings."""
+    data = data.lstrip(b'\r\n')
+    ends = [(data.find(sep), sep) for sep in (b'\r\n\r\n', b'\n\n') if data.find(sep) >= 0]
+    if not ends:
+        return data.decode('utf-8').splitlines(), b''
+    end, sep = min(ends)
+    return data[:end].decode('utf-8').splitlines(), data[end + len(sep):]
+
+
+def _headers(lines) -> dict:
+    headers = {}
+    for line in lines:
+        key, _, value = line.partition(':')
+        headers[key.strip().lower()] = value.strip()
+    return headers
+
+
+def _decode_batch(content_type: str, body: bytes) -> dict:
+    """Parse a batch response into a dict of call index to ``(status, headers, body)``."""
+    _, _, boundary = content_type.partition('boundary=')
+    delimiter = b'--' + boundary.split(';')[0].strip('"').encode('utf-8')
+
+    responses = {}
+    for part in body.split(delimiter)[1:]:
+        if part.startswith(b'--'):
+            break
+        outer, inner = _split_head(part)
+        content_id = _headers(outer).get('content-id', '').strip('<>')
+        try:
+            index = int(content_id.rpartition('item')[2])
+        except ValueError:
+            continue
+        head, content = _split_head(inner)
+        if not head:
+            continue
+        status = int(head[0].split()[1])
+        responses[index] = (status, _headers(head[1:]), content.rstrip(b'\r\n'))
+    return responses
@@ -1,18 +1,22 @@
 import os
 import json
-import hashlib
+import asyncio
+import tempfile
 import functools
 from urllib import parse
 from http import HTTPStatus
 from typing import List, Sequence, Tuple, Union
 
 import furl
+import aiohttp
 
-from waterbutler.core import exceptions, provider, streams
+from waterbutler.core import exceptions, fileio, provider, streams
+from waterbutler.core.cache import get_path_id_cache
 from waterbutler.core.path import WaterButlerPath, WaterButlerPathPart
 
 from waterbutler.providers.googledrive import utils
 from waterbutler.providers.googledrive import settings as pd_settings
+from waterbutler.providers.googledrive.batch import DriveBatcher
 from waterbutler.providers.googledrive.metadata import (GoogleDriveRevision,
                                                         BaseGoogleDriveMetadata,
                                                         GoogleDriveFileMetadata,
@@ -20,6 +24,10 @@ from waterbutler.providers.googledrive.metadata import (GoogleDriveRevision,
                                                         GoogleDriveFileRevisionMetadata, )
 
 
+# Drive wants every chunk of a resumable upload but the last to be a multiple of this size
+UPLOAD_CHUNK_UNIT = 256 * 1024
+
+
 def clean_query(query: str):
     # Replace \ with \\ and ' with \'
     # Note only single quotes need to be escaped
@@ -82,6 +90,8 @@ class GoogleDriveProvider(provider.BaseProvider):
         super().__init__(auth, credentials, settings)
         self.token = self.credentials['token']
         self.folder = self.settings['folder']
+        self._path_id_cache = get_path_id_cache()
+        self._batch = DriveBatcher(self)
 
     async def validate_v1_path(self, path: str, **kwargs) -> GoogleDrivePath:
         if path == '/':
@@ -167,6 +177,8 @@ class GoogleDriveProvider(provider.BaseProvider):
 
         created = dest_path.identifier is None
         dest_path.parts[-1]._id = data['id']
+        await self._uncache_path(src_path, recursive=True)
+        await self._uncache_path(dest_path)
 
         if dest_path.is_dir:
             metadata = GoogleDriveFolderMetadata(data, dest_path)
@@ -198,6 +210,7 @@ class GoogleDriveProvider(provider.BaseProvider):
         ) as resp:
             data = await resp.json()
 
+        await self._uncache_path(dest_path)
         # GoogleDrive doesn't support intra-copy for folders, so dest_path will always
         # be a file.  See can_intra_copy() for type check.
         return GoogleDriveFileMetadata(data, dest_path), dest_path.identifier is None
@@ -259,18 +272,21 @@ class GoogleDriveProvider(provider.BaseProvider):
         else:
             segments = []
 
-        stream.add_writer('md5', streams.HashStreamWriter(hashlib.md5))
+        hashes = streams.MultiHashStreamWriter('md5')
+        hashes.add_to(stream)
 
         upload_metadata = self._build_upload_metadata(path.parent.identifier, path.name)
         upload_id = await self._start_resumable_upload(not path.identifier, segments, stream.size,
                                                        upload_metadata)
         data = await self._finish_resumable_upload(segments, stream, upload_id)
+        await hashes.finish()
 
         if data['md5Checksum'] != stream.writers['md5'].hexdigest:
             raise exceptions.UploadChecksumMismatchError()
 
         created = path.identifier is None
         path._parts[-1]._id = data.get('id')
+        await self._uncache_path(path)
         return GoogleDriveFileMetadata(data, path), created
 
     async def delete(self,  # type: ignore
@@ -297,6 +313,7 @@ class GoogleDriveProvider(provider.BaseProvider):
             self.metrics.add('delete.root_delete_confirmed', confirm_delete == 1)
             if confirm_delete == 1:
                 await self._delete_folder_contents(path)
+                await self._uncache_path(path, recursive=True)
                 return
             else:
                 raise exceptions.DeleteError(
@@ -304,15 +321,8 @@ class GoogleDriveProvider(provider.BaseProvider):
                     code=400
                 )
 
-        async with self.request(
-            'PUT',
-            self.build_url('files', path.identifier),
-            data=json.dumps({'labels': {'trashed': 'true'}}),
-            headers={'Content-Type': 'application/json'},
-            expects=(200, ),
-            throws=exceptions.DeleteError,
-        ):
-            return
+        await self._trash(path.identifier)
+        await self._uncache_path(path, recursive=True)
 
     def _build_query(self, folder_id: str, title: str=None) -> str:
         queries = [
@@ -407,7 +417,10 @@ class GoogleDriveProvider(provider.BaseProvider):
             expects=(200, ),
             throws=exceptions.CreateFolderError,
         ) as resp:
-            return GoogleDriveFolderMetadata(await resp.json(), path)
+            data = await resp.json()
+
+        await self._uncache_path(path)
+        return GoogleDriveFolderMetadata(data, path)
 
     def path_from_metadata(self, parent_path, metadata):
         """ Unfortunately-named method, currently only used to get path name for zip archives. """
@@ -457,9 +470,15 @@ class GoogleDriveProvider(provider.BaseProvider):
         return location.args['upload_id']
 
     async def _finish_resumable_upload(self, segments: Sequence[str], stream, upload_id):
+        url = self._build_upload_url('files', *segments, uploadType='resumable',
+                                     upload_id=upload_id)
+        chunk_size = pd_settings.UPLOAD_CHUNK_SIZE // UPLOAD_CHUNK_UNIT * UPLOAD_CHUNK_UNIT
+        if chunk_size > 0 and stream.size > chunk_size:
+            return await self._upload_chunks(url, stream, chunk_size)
+
         async with self.request(
             'PUT',
-            self._build_upload_url('files', *segments, uploadType='resumable', upload_id=upload_id),
+            url,
             headers={'Content-Length': str(stream.size)},
             data=stream,
             expects=(200, ),
@@ -467,10 +486,120 @@ class GoogleDriveProvider(provider.BaseProvider):
         ) as resp:
             return await resp.json()
 
+    async def _upload_chunks(self, url: str, stream, chunk_size: int) -> dict:
+        """Send ``stream`` to the resumable upload session at ``url`` in chunks of ``chunk_size``
+        bytes.  Each chunk is read from ``stream`` once and spooled to a temporary file, so the
+        part of it the session hasn't committed can be sent again after a server or connection
+        error.  Returns the metadata of the uploaded file.
+
+        API docs: https://developers.google.com/drive/v2/web/manage-uploads#resumable
+        """
+        size = stream.size
+        offset = 0
+        while True:
+            with tempfile.TemporaryFile() as spool:
+                start = offset
+                end = start + await self._spool_chunk(stream, spool, min(chunk_size, size - start))
+                failures = 0
+                resuming = False
+                while True:
+                    try:
+                        if resuming:
+                            data, offset = await self._query_upload(url, size)
+                        else:
+                            sent_from = offset
+                            data, offset = await self._put_chunk(url, spool, start, offset, end,
+                                                                 size)
+                            # A 308 that committed nothing new is a failure, or it'd be re-sent
+                            # forever
+                            if data is None and start <= offset <= sent_from:
+                                raise exceptions.UploadError(
+                                    'Upload session committed none of bytes '
+                                    '{}-{}'.format(sent_from, end - 1)
+                                )
+                    except (exceptions.UploadError, aiohttp.errors.ClientError,
+                            asyncio.TimeoutError) as exc:
+                        if failures >= pd_settings.UPLOAD_CHUNK_RETRIES:
+                            raise
+                        # Retrying won't fix bad credentials or an expired upload session
+                        code = getattr(exc, 'code', 500)
+                        if code < 500 and code not in (408, 429):
+                            raise
+                        failures += 1
+                        self.metrics.incr('upload.chunk_retries')
+                        await asyncio.sleep(pd_settings.UPLOAD_RETRY_BACKOFF * failures)
+                        resuming = True
+                        continue
+
+                    resuming = False
+                    if data is not None:
+                        return data
+                    if offset < start:
+                        raise exceptions.UploadError(
+                            'Upload session lost already sent bytes, '
+                            'committed {} of {}'.format(offset, size)
+                        )
+                    if offset >= end:
+                        break
+
+    async def _spool_chunk(self, stream, spool, length: int) -> int:
+        """Copy the next ``length`` bytes of ``stream`` into ``spool``."""
+        remaining = length
+        while remaining > 0:
+            chunk = await stream.read(min(remaining, UPLOAD_CHUNK_UNIT))
+            if not chunk:
+                raise exceptions.UploadError(
+                    'Upload stream ended {} bytes short of its size'.format(remaining)
+                )
+            await fileio.run(spool.write, chunk)
+            remaining -= len(chunk)
+        return length
+
+    async def _put_chunk(self, url: str, spool, start: int, offset: int, end: int, size: int):
+        """Send bytes ``offset`` up to ``end`` of the upload, spooled in ``spool`` from ``start``
+        on.  Returns ``(metadata, committed)`` as `_upload_progress` does."""
+        async with self.request(
+            'PUT',
+            url,
+            headers={
+                'Content-Length': str(end - offset),
+                'Content-Range': 'bytes {}-{}/{}'.format(offset, end - 1, size),
+            },
+            data=streams.PartialFileStreamReader(spool, (offset - start, end - start - 1)),
+            expects=(200, 201, 308),
+            throws=exceptions.UploadError,
+            retry=0,
+        ) as resp:
+            return await self._upload_progress(resp, size)
+
+    async def _query_upload(self, url: str, size: int):
+        """Ask the upload session at ``url`` how much of the upload it has committed."""
+        async with self.request(
+            'PUT',
+            url,
+            headers={
+                'Content-Length': '0',
+                'Content-Range': 'bytes */{}'.format(size),
+            },
+            expects=(200, 201, 308),
+            throws=exceptions.UploadError,
+            retry=0,
+        ) as resp:
+            return await self._upload_progress(resp, size)
+
+    async def _upload_progress(self, resp, size: int):
+        """Returns ``(metadata, size)`` if the upload is complete, else ``(None, committed)`` where
+        ``committed`` is the number of bytes the session has, from its ``Range`` header."""
+        if resp.status != 308:
+            return await resp.json(), size
+        _, _, committed = resp.headers.get('Range', '').rpartition('-')
+        return None, int(committed) + 1 if committed else 0
+
     async def _resolve_path_to_ids(self, path, start_at=None):
         """Takes a path and traverses the file tree (ha!) beginning at ``start_at``, looking for
         something that matches ``path``.  Returns a list of dicts for each part of the path, with
-        ``title``, ``mimeType``, and ``id`` keys.
+        ``title``, ``mimeType``, and ``id`` keys.  Each part costs one request unless the path id
+        cache already has it.
         """
         self.metrics.incr('called_resolve_path_to_ids')
         ret = start_at or [{
@@ -487,37 +616,8 @@ class GoogleDriveProvider(provider.BaseProvider):
         while parts:
             current_part = parts.pop(0)
             part_name, part_is_folder = current_part[0], current_part[1]
-            name, ext = os.path.splitext(part_name)
-            if not part_is_folder and ext in ('.gdoc', '.gdraw', '.gslides', '.gsheet'):
-                gd_ext = utils.get_mimetype_from_ext(ext)
-                query = "title = '{}' " \
-                        "and trashed = false " \
-                        "and mimeType = '{}'".format(clean_query(name), gd_ext)
-            else:
-                query = "title = '{}' " \
-                        "and trashed = false " \
-                        "and mimeType != 'application/vnd.google-apps.form' " \
-                        "and mimeType != 'application/vnd.google-apps.map' " \
-                        "and mimeType != 'application/vnd.google-apps.document' " \
-                        "and mimeType != 'application/vnd.google-apps.drawing' " \
-                        "and mimeType != 'application/vnd.google-apps.presentation' " \
-                        "and mimeType != 'application/vnd.google-apps.spreadsheet' " \
-                        "and mimeType {} '{}'".format(
-                            clean_query(part_name),
-                            '=' if part_is_folder else '!=',
-                            self.FOLDER_MIME_TYPE
-                        )
-            async with self.request(
-                'GET',
-                self.build_url('files', item_id, 'children', q=query, fields='items(id)'),
-                expects=(200, ),
-                throws=exceptions.MetadataError,
-            ) as resp:
-                data = await resp.json()
-
-            try:
-                item_id = data['items'][0]['id']
-            except (KeyError, IndexError):
+            item = await self._resolve_child(item_id, part_name, part_is_folder)
+            if item is None:
                 if parts:
                     # if we can't find an intermediate path part, that's an error
                     raise exceptions.MetadataError('{} not found'.format(str(path)),
@@ -527,16 +627,85 @@ class GoogleDriveProvider(provider.BaseProvider):
                     'title': part_name,
                     'mimeType': 'folder' if part_is_folder else '',
                 }]
-
-            async with self.request(
-                'GET',
-                self.build_url('files', item_id, fields='id,title,mimeType'),
-                expects=(200, ),
-                throws=exceptions.MetadataError,
-            ) as resp:
-                ret.append(await resp.json())
+            item_id = item['id']
+            ret.append(item)
         return ret
 
+    async def _resolve_child(self, folder_id: str, part_name: str, part_is_folder: bool):
+        """Looks up the file or folder named ``part_name`` in the folder ``folder_id``.  Returns a
+        dict with ``title``, ``mimeType``, and ``id`` keys, or `None` if there is no such child.
+        Children found are kept in the path id cache, so that resolving a path reuses every
+        segment of it resolved recently.
+        """
+        if self._path_id_cache is not None:
+            cached = await self._path_id_cache.get(self.identity, folder_id, part_name,
+                                                   part_is_folder)
+            self.metrics.add('path_id_cache.hit', cached is not None)
+            if cached is not None:
+                return dict(cached)
+
+        name, ext = os.path.splitext(part_name)
+        if not part_is_folder and ext in ('.gdoc', '.gdraw', '.gslides', '.gsheet'):
+            gd_ext = utils.get_mimetype_from_ext(ext)
+            query = "title = '{}' " \
+                    "and trashed = false " \
+                    "and mimeType = '{}'".format(clean_query(name), gd_ext)
+        else:
+            query = "title = '{}' " \
+                    "and trashed = false " \
+                    "and mimeType != 'application/vnd.google-apps.form' " \
+                    "and mimeType != 'application/vnd.google-apps.map' " \
+                    "and mimeType != 'application/vnd.google-apps.document' " \
+                    "and mimeType != 'application/vnd.google-apps.drawing' " \
+                    "and mimeType != 'application/vnd.google-apps.presentation' " \
+                    "and mimeType != 'application/vnd.google-apps.spreadsheet' " \
+                    "and mimeType {} '{}'".format(
+                        clean_query(part_name),
+                        '=' if part_is_folder else '!=',
+                        self.FOLDER_MIME_TYPE
+                    )
+        resp = await self._batch.request(
+            'GET',
+            self.build_url('files', q="'{}' in parents and {}".format(folder_id, query),
+                           fields='items(id,title,mimeType)'),
+            throws=exceptions.MetadataError,
+        )
+        data = await resp.json()
+
+        try:
+            item = data['items'][0]
+        except (KeyError, IndexError):
+            return None
+
+        if self._path_id_cache is not None:
+            await self._path_id_cache.set(self.identity, folder_id, part_name, part_is_folder,
+                                          dict(item))
+        return item
+
+    async def _resolve_trashed(self, path: WaterButlerPath) -> None:
+        """``path`` was resolved, from the path id cache, to a file that has been trashed since.
+        Drop the cached id and look the name up again, updating ``path`` in place, so that e.g. an
+        upload to it doesn't update the trashed file.  Raises `NotFoundError` if no file in the
+        folder has that name anymore."""
+        trashed_id = path.identifier
+        await self._uncache_path(path)
+        item = await self._resolve_child(path.parent.identifier, path.name, path.is_dir)
+        if item is None or item['id'] == trashed_id:
+            path._parts[-1]._id = None
+            raise exceptions.NotFoundError(str(path))
+        path._parts[-1]._id = item['id']
+
+    async def _uncache_path(self, path: WaterButlerPath, recursive: bool=False) -> None:
+        """Drop the cached id of ``path`` after a write.  With ``recursive``, e.g. once a folder
+        is deleted or moved, everything cached for this provider is dropped, since anything below
+        ``path`` may have been cached too."""
+        if self._path_id_cache is None:
+            return
+        if (recursive and path.is_dir) or path.parent is None:
+            await self._path_id_cache.invalidate(self.identity)
+        else:
+            await self._path_id_cache.forget(self.identity, path.parent.identifier, path.name)
+
     async def _handle_docs_versioning(self, path: GoogleDrivePath, item: dict, raw: bool=True):
         """Sends an extra request to GDrive to fetch revision information for Google Docs. Needed
         because Google Docs use a different versioning system from regular files.
@@ -557,14 +726,13 @@ class GoogleDriveProvider(provider.BaseProvider):
         :rtype: dict
         :return: a metadata for the googledoc or the raw response object from the GDrive API
         """
-        async with self.request(
+        resp = await self._batch.request(
             'GET',
             self.build_url('files', item['id'], 'revisions'),
-            expects=(200, ),
             throws=exceptions.RevisionsError,
-        ) as resp:
-            revisions_data = await resp.json()
-            has_revisions = revisions_data['items'] is not None
+        )
+        revisions_data = await resp.json()
+        has_revisions = revisions_data['items'] is not None
 
         # Revisions are not available for some sharing configurations. If revisions list is empty,
         # use the etag of the file plus a sentinel string as a dummy revision ID.
@@ -643,15 +811,15 @@ class GoogleDriveProvider(provider.BaseProvider):
         else:
             url = self.build_url('files', path.identifier)
 
-        async with self.request(
+        resp = await self._batch.request(
             'GET', url,
             expects=(200, 403, 404, ),
             throws=exceptions.MetadataError,
-        ) as resp:
-            try:
-                data = await resp.json()
-            except:  # some 404s return a string instead of json
-                data = await resp.read()
+        )
+        try:
+            data = await resp.json()
+        except:  # some 404s return a string instead of json
+            data = await resp.read()
 
         if resp.status != 200:
             raise exceptions.NotFoundError(path)
@@ -659,6 +827,10 @@ class GoogleDriveProvider(provider.BaseProvider):
         if revision and valid_revision:
             return GoogleDriveFileRevisionMetadata(data, path)
 
+        if data.get('labels', {}).get('trashed'):
+            await self._resolve_trashed(path)
+            return await self._file_metadata(path, revision=revision, raw=raw)
+
         user_role = data['userPermission']['role']
         self.metrics.add('_file_metadata.user_role', user_role)
         can_access_revisions = user_role in self.ROLES_ALLOWING_REVISIONS
@@ -698,11 +870,15 @@ class GoogleDriveProvider(provider.BaseProvider):
             raise exceptions.MetadataError('{} not found'.format(str(path)),
                                            code=HTTPStatus.NOT_FOUND)
 
-        for child in child_ids:
-            await self.make_request(
-                'PUT',
-                self.build_url('files', child['id']),
-                data=json.dumps({'labels': {'trashed': 'true'}}),
-                headers={'Content-Type': 'application/json'},
-                expects=(200, ),
-                throws=exceptions.DeleteError)
+        await asyncio.gather(*[self._trash(child['id']) for child in child_ids])
+
+    async def _trash(self, file_id: str) -> None:
+        """Move the file or folder ``file_id`` to the trash.  Calls made together, e.g. when
+        emptying a folder, are batched."""
+        await self._batch.request(
+            'PUT',
+            self.build_url('files', file_id),
+            data=json.dumps({'labels': {'trashed': 'true'}}),
+            headers={'Content-Type': 'application/json'},
+            throws=exceptions.DeleteError,
+        )
@@ -6,3 +6,26 @@ config = settings.child('GOOGLEDRIVE_PROVIDER_CONFIG')
 BASE_URL = config.get('BASE_URL', 'https://www.googleapis.com/drive/v2')
 BASE_UPLOAD_URL = config.get('BASE_UPLOAD_URL', 'https://www.googleapis.com/upload/drive/v2')
 DRIVE_IGNORE_VERSION = config.get('DRIVE_IGNORE_VERSION', '0000000000000000000000000000000000000')
+
+# Independent metadata and trash calls made within BATCH_WINDOW seconds of each other are sent to
+# BATCH_URL as a single batch request of up to BATCH_SIZE calls (at most 100, Drive's limit).  A
+# BATCH_SIZE of 1 sends every call on its own.
+BATCH_URL = config.get('BATCH_URL', 'https://www.googleapis.com/batch/drive/v2')
+BATCH_WINDOW = float(config.get('BATCH_WINDOW', 0.01))
+BATCH_SIZE = int(config.get('BATCH_SIZE', 100))
+# At most BATCH_CONCURRENCY batches are in flight at once per provider; the rest wait their turn.
+# Calls in a batch that fail with a server error or a rate limit error are sent again in a later
+# batch, up to BATCH_RETRIES times, waiting BATCH_RETRY_BACKOFF seconds longer after each failure.
+BATCH_CONCURRENCY = int(config.get('BATCH_CONCURRENCY', 2))
+BATCH_RETRIES = int(config.get('BATCH_RETRIES', 3))
+BATCH_RETRY_BACKOFF = float(config.get('BATCH_RETRY_BACKOFF', 1))
+
+# Uploads larger than UPLOAD_CHUNK_SIZE bytes (rounded down to a multiple of 256 KiB, as Drive
+# requires) are sent to the resumable upload session one chunk at a time.  Each chunk is spooled to
+# a temporary file as it's read, so only one chunk is ever on disk per upload.  A chunk that fails
+# with a server or connection error is resumed from the session's committed offset, up to
+# UPLOAD_CHUNK_RETRIES times, waiting UPLOAD_RETRY_BACKOFF seconds longer after each failure.  An
+# UPLOAD_CHUNK_SIZE of 0 sends every upload in a single request.
+UPLOAD_CHUNK_SIZE = int(config.get('UPLOAD_CHUNK_SIZE', 32 * 1024 * 1024))
+UPLOAD_CHUNK_RETRIES = int(config.get('UPLOAD_CHUNK_RETRIES', 5))
+UPLOAD_RETRY_BACKOFF = float(config.get('UPLOAD_RETRY_BACKOFF', 1))
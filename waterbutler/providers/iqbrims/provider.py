@@ -13,6 +13,7 @@ from waterbutler.core import provider
 from waterbutler.core import exceptions
 from waterbutler.core import path as wb_path
 from waterbutler.core.path import WaterButlerPath
+from waterbutler.core.cache import get_path_id_cache
 
 from waterbutler.providers.iqbrims import settings
 from waterbutler.providers.iqbrims import utils as drive_utils
@@ -85,6 +86,7 @@ class IQBRIMSProvider(provider.BaseProvider):
         super().__init__(auth, credentials, settings)
         self.token = self.credentials['token']
         self.folder = self.settings['folder']
+        self._path_id_cache = get_path_id_cache()
         self.permissions = self.settings['permissions'] if 'permissions' in self.settings else {}
 
     async def validate_v1_path(self, path: str, **kwargs) -> IQBRIMSPath:
@@ -203,6 +205,8 @@ class IQBRIMSProvider(provider.BaseProvider):
         if data['md5Checksum'] != stream.writers['md5'].hexdigest:
             raise exceptions.UploadChecksumMismatchError()
 
+        if self._path_id_cache is not None:
+            await self._path_id_cache.forget(self.identity, path.parent.identifier, path.name)
         return IQBRIMSFileMetadata(data, path), path.identifier is None
 
     def _build_upload_url(self, *segments, **query):
@@ -351,7 +355,8 @@ class IQBRIMSProvider(provider.BaseProvider):
     async def _resolve_path_to_ids(self, path, start_at=None):
         """Takes a path and traverses the file tree (ha!) beginning at ``start_at``, looking for
         something that matches ``path``.  Returns a list of dicts for each part of the path, with
-        ``title``, ``mimeType``, and ``id`` keys.
+        ``title``, ``mimeType``, and ``id`` keys.  Each part costs one request unless the path id
+        cache already has it.
         """
         self.metrics.incr('called_resolve_path_to_ids')
         ret = start_at or [{
@@ -368,37 +373,8 @@ class IQBRIMSProvider(provider.BaseProvider):
         while parts:
             current_part = parts.pop(0)
             part_name, part_is_folder = current_part[0], current_part[1]
-            name, ext = os.path.splitext(part_name)
-            if not part_is_folder and ext in ('.gdoc', '.gdraw', '.gslides', '.gsheet'):
-                gd_ext = drive_utils.get_mimetype_from_ext(ext)
-                query = "title = '{}' " \
-                        "and trashed = false " \
-                        "and mimeType = '{}'".format(clean_query(name), gd_ext)
-            else:
-                query = "title = '{}' " \
-                        "and trashed = false " \
-                        "and mimeType != 'application/vnd.google-apps.form' " \
-                        "and mimeType != 'application/vnd.google-apps.map' " \
-                        "and mimeType != 'application/vnd.google-apps.document' " \
-                        "and mimeType != 'application/vnd.google-apps.drawing' " \
-                        "and mimeType != 'application/vnd.google-apps.presentation' " \
-                        "and mimeType != 'application/vnd.google-apps.spreadsheet' " \
-                        "and mimeType {} '{}'".format(
-                            clean_query(part_name),
-                            '=' if part_is_folder else '!=',
-                            self.FOLDER_MIME_TYPE
-                        )
-            async with self.request(
-                'GET',
-                self.build_url('files', item_id, 'children', q=query, fields='items(id)'),
-                expects=(200, ),
-                throws=exceptions.MetadataError,
-            ) as resp:
-                data = await resp.json()
-
-            try:
-                item_id = data['items'][0]['id']
-            except (KeyError, IndexError):
+            item = await self._resolve_child(item_id, part_name, part_is_folder)
+            if item is None:
                 if parts:
                     # if we can't find an intermediate path part, that's an error
                     raise exceptions.MetadataError('{} not found'.format(str(path)),
@@ -408,16 +384,75 @@ class IQBRIMSProvider(provider.BaseProvider):
                     'title': part_name,
                     'mimeType': 'folder' if part_is_folder else '',
                 }]
-
-            async with self.request(
-                'GET',
-                self.build_url('files', item_id, fields='id,title,mimeType'),
-                expects=(200, ),
-                throws=exceptions.MetadataError,
-            ) as resp:
-                ret.append(await resp.json())
+            item_id = item['id']
+            ret.append(item)
         return ret
 
+    async def _resolve_child(self, folder_id: str, part_name: str, part_is_folder: bool):
+        """Looks up the file or folder named ``part_name`` in the folder ``folder_id``.  Returns a
+        dict with ``title``, ``mimeType``, and ``id`` keys, or `None` if there is no such child.
+        Children found are kept in the path id cache, so that resolving a path reuses every
+        segment of it resolved recently.
+        """
+        if self._path_id_cache is not None:
+            cached = await self._path_id_cache.get(self.identity, folder_id, part_name,
+                                                   part_is_folder)
+            self.metrics.add('path_id_cache.hit', cached is not None)
+            if cached is not None:
+                return dict(cached)
+
+        name, ext = os.path.splitext(part_name)
+        if not part_is_folder and ext in ('.gdoc', '.gdraw', '.gslides', '.gsheet'):
+            gd_ext = drive_utils.get_mimetype_from_ext(ext)
+            query = "title = '{}' " \
+                    "and trashed = false " \
+                    "and mimeType = '{}'".format(clean_query(name), gd_ext)
+        else:
+            query = "title = '{}' " \
+                    "and trashed = false " \
+                    "and mimeType != 'application/vnd.google-apps.form' " \
+                    "and mimeType != 'application/vnd.google-apps.map' " \
+                    "and mimeType != 'application/vnd.google-apps.document' " \
+                    "and mimeType != 'application/vnd.google-apps.drawing' " \
+                    "and mimeType != 'application/vnd.google-apps.presentation' " \
+                    "and mimeType != 'application/vnd.google-apps.spreadsheet' " \
+                    "and mimeType {} '{}'".format(
+                        clean_query(part_name),
+                        '=' if part_is_folder else '!=',
+                        self.FOLDER_MIME_TYPE
+                    )
+        async with self.request(
+            'GET',
+            self.build_url('files', q="'{}' in parents and {}".format(folder_id, query),
+                           fields='items(id,title,mimeType)'),
+            expects=(200, ),
+            throws=exceptions.MetadataError,
+        ) as resp:
+            data = await resp.json()
+
+        try:
+            item = data['items'][0]
+        except (KeyError, IndexError):
+            return None
+
+        if self._path_id_cache is not None:
+            await self._path_id_cache.set(self.identity, folder_id, part_name, part_is_folder,
+                                          dict(item))
+        return item
+
+    async def _resolve_trashed(self, path: WaterButlerPath) -> None:
+        """``path`` was resolved, from the path id cache, to a file that has been trashed since.
+        Drop the cached id and look the name up again, updating ``path`` in place.  Raises
+        `NotFoundError` if no file in the folder has that name anymore."""
+        trashed_id = path.identifier
+        if self._path_id_cache is not None:
+            await self._path_id_cache.forget(self.identity, path.parent.identifier, path.name)
+        item = await self._resolve_child(path.parent.identifier, path.name, path.is_dir)
+        if item is None or item['id'] == trashed_id:
+            path._parts[-1]._id = None
+            raise exceptions.NotFoundError(str(path))
+        path._parts[-1]._id = item['id']
+
     async def _handle_docs_versioning(self, path: IQBRIMSPath, item: dict, raw: bool=True):
         """Sends an extra request to GDrive to fetch revision information for Google Docs. Needed
         because Google Docs use a different versioning system from regular files.
@@ -540,6 +575,10 @@ class IQBRIMSProvider(provider.BaseProvider):
         if revision and valid_revision:
             return IQBRIMSFileRevisionMetadata(data, path)
 
+        if data.get('labels', {}).get('trashed'):
+            await self._resolve_trashed(path)
+            return await self._file_metadata(path, revision=revision, raw=raw)
+
         user_role = data['userPermission']['role']
         self.metrics.add('_file_metadata.user_role', user_role)
         can_access_revisions = user_role in self.ROLES_ALLOWING_REVISIONS
@@ -2,7 +2,6 @@ import os
 import json
 import uuid
 import typing
-import hashlib
 import logging
 
 from waterbutler import settings as wb_settings
@@ -557,14 +556,14 @@ class OSFStorageProvider(provider.BaseProvider):
         remote_pending_path = await provider.validate_path('/' + pending_name)
         logger.debug('upload: remote_pending_path::{}'.format(remote_pending_path))
 
-        stream.add_writer('md5', streams.HashStreamWriter(hashlib.md5))
-        stream.add_writer('sha1', streams.HashStreamWriter(hashlib.sha1))
-        stream.add_writer('sha256', streams.HashStreamWriter(hashlib.sha256))
+        hashes = streams.MultiHashStreamWriter('md5', 'sha1', 'sha256')
+        hashes.add_to(stream)
 
         await provider.upload(stream, remote_pending_path, check_created=False,
                               fetch_metadata=False, **kwargs)
+        await hashes.finish()
 
-        complete_name = stream.writers['sha256'].hexdigest
+        complete_name = hashes.hexdigest('sha256')
         remote_complete_path = await provider.validate_path('/' + complete_name)
 
         try:
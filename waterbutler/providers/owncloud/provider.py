@@ -3,6 +3,7 @@ import aiohttp
 from waterbutler.core import streams
 from waterbutler.core import provider
 from waterbutler.core import exceptions
+from waterbutler.core import connections
 from waterbutler.core.path import WaterButlerPath
 
 from waterbutler.providers.owncloud import utils
@@ -50,7 +51,7 @@ class OwnCloudProvider(provider.BaseProvider):
         self.metrics.add('host', self.url)
 
     def connector(self):
-        return aiohttp.TCPConnector(verify_ssl=self.verify_ssl)
+        return connections.get_connector(self.url, verify_ssl=self.verify_ssl)
 
     @property
     def _webdav_url_(self):
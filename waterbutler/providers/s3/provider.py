@@ -1,4 +1,5 @@
 import os
+import base64
 import hashlib
 import logging
 import functools
@@ -14,6 +15,7 @@ from boto.s3.connection import S3Connection, OrdinaryCallingFormat
 
 from waterbutler.providers.s3 import settings
 from waterbutler.core.path import WaterButlerPath
+from waterbutler.core.utils import upload_parts
 from waterbutler.core.utils import make_disposition
 from waterbutler.core import streams, provider, exceptions
 from waterbutler.providers.s3.metadata import (S3Revision,
@@ -172,16 +174,12 @@ class S3Provider(provider.BaseProvider):
         if accept_url:
             return url()
 
-        resp = await self.make_request(
-            'GET',
+        return await self.make_ranged_download(
             url,
             range=range,
-            expects=(200, 206, ),
             throws=exceptions.DownloadError,
         )
 
-        return streams.ResponseStreamReader(resp)
-
     async def upload(self, stream, path, conflict='replace', **kwargs):
         """Uploads the given stream to S3
 
@@ -205,7 +203,8 @@ class S3Provider(provider.BaseProvider):
         """Uploads the given stream in one request.
         """
 
-        stream.add_writer('md5', streams.HashStreamWriter(hashlib.md5))
+        hashes = streams.MultiHashStreamWriter('md5')
+        hashes.add_to(stream)
 
         headers = {'Content-Length': str(stream.size)}
         # this is usually set in boto.s3.key.generate_url, but do it here
@@ -229,6 +228,7 @@ class S3Provider(provider.BaseProvider):
             throws=exceptions.UploadError,
         )
         await resp.release()
+        await hashes.finish()
 
         # md5 is returned as ETag header as long as server side encryption is not used.
         if stream.writers['md5'].hexdigest != resp.headers['ETag'].replace('"', ''):
@@ -242,7 +242,7 @@ class S3Provider(provider.BaseProvider):
         session_upload_id = await self._create_upload_session(path)
 
         try:
-            # Step 2. Break stream into chunks and upload them one by one
+            # Step 2. Break stream into chunks and upload them several at a time
             parts_metadata = await self._upload_parts(stream, path, session_upload_id)
             # Step 3. Commit the parts and end the upload session
             await self._complete_multipart_upload(path, session_upload_id, parts_metadata)
@@ -291,29 +291,38 @@ class S3Provider(provider.BaseProvider):
         return session_data['InitiateMultipartUploadResult']['UploadId']
 
     async def _upload_parts(self, stream, path, session_upload_id):
-        """Uploads all parts/chunks of the given stream to S3 one by one.
+        """Uploads all parts/chunks of the given stream to S3, up to
+        ``settings.CHUNKED_UPLOAD_CONCURRENCY`` at a time and with no more than
+        ``settings.CHUNKED_UPLOAD_MAX_BUFFER`` bytes of parts held in memory.  A part is re-sent up
+        to ``settings.CHUNKED_UPLOAD_PART_MAX_RETRIES`` times if the request fails.  Returns the
+        parts' response headers in part order, ready for `_complete_multipart_upload`.
         """
 
-        metadata = []
-        parts = [self.CHUNK_SIZE for i in range(0, stream.size // self.CHUNK_SIZE)]
-        if stream.size % self.CHUNK_SIZE:
-            parts.append(stream.size - (len(parts) * self.CHUNK_SIZE))
-        logger.debug('Multipart upload segment sizes: {}'.format(parts))
-        for chunk_number, chunk_size in enumerate(parts):
-            logger.debug('  uploading part {} with size {}'.format(chunk_number + 1, chunk_size))
-            metadata.append(await self._upload_part(stream, path, session_upload_id,
-                                                    chunk_number + 1, chunk_size))
-        return metadata
+        async def upload_part(data, offset):
+            chunk_number = offset // self.CHUNK_SIZE + 1
+            return await self._upload_part(data, path, session_upload_id, chunk_number)
+
+        return await upload_parts(
+            stream, self.CHUNK_SIZE, upload_part,
+            concurrency=settings.CHUNKED_UPLOAD_CONCURRENCY,
+            max_buffer=settings.CHUNKED_UPLOAD_MAX_BUFFER,
+            retries=settings.CHUNKED_UPLOAD_PART_MAX_RETRIES,
+            # Retrying won't fix bad credentials or a vanished upload session
+            retry_on=lambda exc: getattr(exc, 'code', None) not in (401, 403, 404),
+        )
 
-    async def _upload_part(self, stream, path, session_upload_id, chunk_number, chunk_size):
-        """Uploads a single part/chunk of the given stream to S3.
+    async def _upload_part(self, data, path, session_upload_id, chunk_number):
+        """Uploads a single part/chunk of a multi-part upload to S3.  The part is sent with its
+        ``Content-MD5`` so S3 rejects it if it's corrupted in transit.
 
+        :param bytes data: the contents of the part
         :param int chunk_number: sequence number of chunk. 1-indexed.
         """
 
-        cutoff_stream = streams.CutoffStream(stream, cutoff=chunk_size)
-
-        headers = {'Content-Length': str(chunk_size)}
+        headers = {
+            'Content-Length': str(len(data)),
+            'Content-MD5': base64.b64encode(hashlib.md5(data).digest()).decode('ascii'),
+        }
         params = {
             'partNumber': str(chunk_number),
             'uploadId': session_upload_id,
@@ -325,10 +334,11 @@ class S3Provider(provider.BaseProvider):
             query_parameters=params,
             headers=headers
         )
+
         resp = await self.make_request(
             'PUT',
             upload_url,
-            data=cutoff_stream,
+            data=data,
             skip_auto_headers={'CONTENT-TYPE'},
             headers=headers,
             params=params,
@@ -10,3 +10,13 @@ CONTIGUOUS_UPLOAD_SIZE_LIMIT = int(config.get('CONTIGUOUS_UPLOAD_SIZE_LIMIT', 12
 CHUNK_SIZE = int(config.get('CHUNK_SIZE', 64000000))  # 64 MB
 
 CHUNKED_UPLOAD_MAX_ABORT_RETRIES = int(config.get('CHUNKED_UPLOAD_MAX_ABORT_RETRIES', 2))
+
+# Number of parts of a multi-part upload sent to S3 at once
+CHUNKED_UPLOAD_CONCURRENCY = int(config.get('CHUNKED_UPLOAD_CONCURRENCY', 4))
+
+# Upper bound on the bytes of an upload held in memory while parts are in flight.  Concurrency is
+# reduced if CHUNKED_UPLOAD_CONCURRENCY parts of CHUNK_SIZE would exceed it.
+CHUNKED_UPLOAD_MAX_BUFFER = int(config.get('CHUNKED_UPLOAD_MAX_BUFFER', 256000000))  # 256 MB
+
+# Number of times a single part is re-sent after a failure before the upload is aborted
+CHUNKED_UPLOAD_PART_MAX_RETRIES = int(config.get('CHUNKED_UPLOAD_PART_MAX_RETRIES', 2))
@@ -200,17 +200,13 @@ class S3CompatProvider(provider.BaseProvider):
         headers = {}
         raw_url = self.connection.add_auth('GET', url('GET'), headers)
 
-        resp = await self.make_request(
-            'GET',
+        return await self.make_ranged_download(
             raw_url,
             range=range,
             headers=headers,
-            expects=(200, 206),
             throws=exceptions.DownloadError,
         )
 
-        return streams.ResponseStreamReader(resp)
-
     async def upload(self, stream, path, conflict='replace', **kwargs):
         """Uploads the given stream to S3 Compatible Storage
 
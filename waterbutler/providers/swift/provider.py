@@ -132,14 +132,7 @@ class SwiftProvider(provider.BaseProvider):
         assert not path.path.startswith('/')
         url = functools.partial(self.generate_url, path.path)
 
-        resp = await self.make_request(
-            'GET',
-            url,
-            expects=(200, ),
-            throws=exceptions.MetadataError,
-        )
-
-        return streams.ResponseStreamReader(resp)
+        return await self.make_ranged_download(url, throws=exceptions.MetadataError)
 
     async def upload(self, stream, path, conflict='replace', **kwargs):
         """Uploads the given stream to Swift
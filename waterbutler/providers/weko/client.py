@@ -1,12 +1,16 @@
 import logging
-import requests
+import asyncio
 from io import BytesIO
 from lxml import etree
 from urllib.parse import urlparse, parse_qs
 import os
 import datetime
 import mimetypes
+
+import aiohttp
+
 from waterbutler.core import exceptions
+from waterbutler.core import connections
 
 logger = logging.getLogger(__name__)
 
@@ -78,6 +82,10 @@ class Item(object):
 
 
 class Connection(object):
+    """Asynchronous client for a WEKO SWORD endpoint.  Requests go through aiohttp and responses
+    are parsed in the loop's default executor, so a slow WEKO server or a large service document
+    doesn't block the event loop.
+    """
     host = None
     token = None
     username = None
@@ -89,41 +97,34 @@ class Connection(object):
         self.username = username
         self.password = password
 
-    def get_login_user(self, default_user=None):
-        resp = requests.get(self.host + 'servicedocument.php',
-                            **self._requests_args())
-        if resp.status_code != 200:
-            resp.raise_for_status()
+    async def get_login_user(self, default_user=None):
+        resp = await self._request('GET', self.host + 'servicedocument.php')
+        await resp.release()
         if self.username is not None:
             default_user = self.username
         return resp.headers.get('X-WEKO-Login-User', default_user)
 
-    def get(self, path):
-        resp = requests.get(self.host + path, **self._requests_args())
-        if resp.status_code != 200:
-            resp.raise_for_status()
-        tree = etree.parse(BytesIO(resp.content))
-        return tree
-
-    def get_url(self, url):
-        resp = requests.get(url, **self._requests_args())
-        if resp.status_code != 200:
-            resp.raise_for_status()
-        tree = etree.parse(BytesIO(resp.content))
-        return tree
-
-    def delete_url(self, url):
-        resp = requests.delete(url, **self._requests_args())
-        if resp.status_code != 200:
-            resp.raise_for_status()
-
-    def post_url(self, url, stream, default_headers={}):
-        resp = requests.post(url, data=stream,
-                             **self._requests_args(default_headers.copy()))
-        if resp.status_code != 200:
-            resp.raise_for_status()
-        tree = etree.parse(BytesIO(resp.content))
-        return tree
+    async def get(self, path):
+        return await self.get_url(self.host + path)
+
+    async def get_url(self, url):
+        resp = await self._request('GET', url)
+        return await _parse(await resp.read())
+
+    async def delete_url(self, url):
+        resp = await self._request('DELETE', url)
+        await resp.release()
+
+    async def post_url(self, url, stream, default_headers={}):
+        resp = await self._request('POST', url, data=stream, headers=default_headers.copy())
+        return await _parse(await resp.read())
+
+    async def _request(self, method, url, headers={}, **kwargs):
+        resp = await aiohttp.request(method, url, connector=connections.get_connector(url),
+                                     **self._requests_args(headers), **kwargs)
+        if resp.status != 200:
+            raise (await exceptions.exception_from_response(resp, error=exceptions.ProviderError))
+        return resp
 
     def _requests_args(self, headers={}):
         if self.token is not None:
@@ -131,7 +132,13 @@ class Connection(object):
             headers['Authorization'] = 'Bearer ' + self.token
             return {'headers': headers}
         else:
-            return {'auth': (self.username, self.password), 'headers': headers}
+            return {'auth': aiohttp.BasicAuth(self.username, self.password), 'headers': headers}
+
+
+async def _parse(content):
+    """Parse an XML response body in the default executor."""
+    loop = asyncio.get_event_loop()
+    return await loop.run_in_executor(None, etree.parse, BytesIO(content))
 
 
 def itemId(url, default_value=None):
@@ -161,8 +168,8 @@ def connect_or_error(sword_url, token=None, username=None, password=None):
         raise exceptions.ProviderError("Unavailable")
 
 
-def get_all_indices(connection):
-    root = connection.get('servicedocument.php')
+async def get_all_indices(connection):
+    root = await connection.get('servicedocument.php')
     indices = []
     for desc in root.findall('.//{%s}Description' % RDF_NAMESPACE):
         indices.append(Index(desc))
@@ -182,12 +189,13 @@ def get_all_indices(connection):
     return indices
 
 
-def get_index_by_id(connection, index_id):
-    return list(filter(lambda i: i.identifier == index_id, get_all_indices(connection)))[0]
+async def get_index_by_id(connection, index_id):
+    indices = await get_all_indices(connection)
+    return list(filter(lambda i: i.identifier == index_id, indices))[0]
 
 
-def get_items(connection, index):
-    root = connection.get_url(index.about)
+async def get_items(connection, index):
+    root = await connection.get_url(index.about)
     items = []
     for entry in root.findall('.//atom.entry'):
         logger.info('Name: {}'.format(entry.find('{%s}title' % ATOM_NAMESPACE).text))
@@ -195,8 +203,8 @@ def get_items(connection, index):
     return items
 
 
-def get_serviceitemtype(connection):
-    root = connection.get('serviceitemtype.php')
+async def get_serviceitemtype(connection):
+    root = await connection.get('serviceitemtype.php')
     logger.debug('Serviceitemtype: {}'.format(etree.tostring(root)))
     r = {'metadata': [], 'item_type': []}
     for metadata in root.findall('metadata'):
@@ -236,12 +244,12 @@ def get_serviceitemtype(connection):
     return r
 
 
-def delete(connection, url):
-    connection.delete_url(url)
+async def delete(connection, url):
+    await connection.delete_url(url)
 
 
-def post(connection, insert_index_id, stream, stream_size):
-    root = connection.get('servicedocument.php')
+async def post(connection, insert_index_id, stream, stream_size):
+    root = await connection.get('servicedocument.php')
     target = None
     for collection in root.findall('.//{%s}collection' % APP_NAMESPACE):
         target = collection.attrib['href']
@@ -253,7 +261,7 @@ def post(connection, insert_index_id, stream, stream_size):
         "Content-Length": str(stream_size),
         "insert_index": str(insert_index_id)
     }
-    resp = connection.post_url(target, stream, default_headers=weko_headers)
+    resp = await connection.post_url(target, stream, default_headers=weko_headers)
     logger.info(etree.tostring(resp))
     for index, elem in enumerate(resp.findall('.//{%s}content' % ATOM_NAMESPACE)):
         src = elem.attrib['src']
@@ -263,8 +271,8 @@ def post(connection, insert_index_id, stream, stream_size):
     return src
 
 
-def create_index(connection, title_ja=None, title_en=None, relation=None):
-    root = connection.get('servicedocument.php')
+async def create_index(connection, title_ja=None, title_en=None, relation=None):
+    root = await connection.get('servicedocument.php')
     indices = []
     for desc in root.findall('.//{%s}Description' % RDF_NAMESPACE):
         indices.append(Index(desc))
@@ -297,13 +305,13 @@ def create_index(connection, title_ja=None, title_en=None, relation=None):
         "Content-Type": "text/xml",
         "Content-Length": str(len(stream)),
     }
-    root = connection.post_url(target, stream, default_headers=weko_headers)
+    root = await connection.post_url(target, stream, default_headers=weko_headers)
     logger.info('Result: {}'.format(etree.tostring(root)))
     return index_id
 
 
-def update_index(connection, index_id, title_ja=None, title_en=None, relation=None):
-    root = connection.get('servicedocument.php')
+async def update_index(connection, index_id, title_ja=None, title_en=None, relation=None):
+    root = await connection.get('servicedocument.php')
     target = None
     for collection in root.findall('.//{%s}collection' % APP_NAMESPACE):
         target = collection.attrib['href']
@@ -331,7 +339,7 @@ def update_index(connection, index_id, title_ja=None, title_en=None, relation=No
         "Content-Type": "text/xml",
         "Content-Length": str(len(stream)),
     }
-    root = connection.post_url(target, stream, headers=weko_headers)
+    root = await connection.post_url(target, stream, default_headers=weko_headers)
     logger.info('Result: {}'.format(etree.tostring(root)))
 
 
@@ -7,6 +7,7 @@ import shutil
 from urllib.parse import urlparse, urlunparse
 from lxml import etree
 
+from waterbutler.core import fileio
 from waterbutler.core import streams
 from waterbutler.core import provider
 from waterbutler.core import exceptions
@@ -82,7 +83,11 @@ class WEKOProvider(provider.BaseProvider):
                                           'filepath': file_path},
                                          index_path)
 
-    def _import_xml(self, target_index_id, import_xml_path):
+    def _list_draft_metadata(self, draft_path, dir_path, index_path):
+        return [self._get_draft_metadata(draft_path, os.path.join(dir_path, d), index_path)
+                for d in os.listdir(dir_path)]
+
+    async def _import_xml(self, target_index_id, import_xml_path):
         import_xml_dir, fname = os.path.split(import_xml_path)
         target_file = os.path.join(import_xml_dir, fname[:-len(IMPORT_XML_SUFFIX)])
         if not os.path.exists(target_file):
@@ -106,22 +111,28 @@ class WEKOProvider(provider.BaseProvider):
                     else:
                         content_files.append((cname, target_file))
         logger.info('Importing... {} to {}'.format(content_files, target_index_id))
+        archived_file = await fileio.run(self._archive_import, import_xml_path, content_files)
+        with open(archived_file, 'rb') as f:
+            await client.post(self.connection, target_index_id, streams.FileStreamReader(f),
+                              os.path.getsize(archived_file))
+        await fileio.run(self._cleanup_import, import_xml_path, target_file, content_files)
+
+    def _archive_import(self, import_xml_path, content_files):
         with tempfile.NamedTemporaryFile(delete=False) as ziptf:
             with zipfile.ZipFile(ziptf, 'w', zipfile.ZIP_DEFLATED) as zipf:
                 zipf.write(import_xml_path, 'import.xml')
                 for cname, cpath in content_files:
                     zipf.write(cpath, cname)
-            archived_file = ziptf.name
-        with open(archived_file, 'rb') as f:
-            client.post(self.connection, target_index_id, f,
-                        os.path.getsize(archived_file))
+            return ziptf.name
+
+    def _cleanup_import(self, import_xml_path, target_file, content_files):
         for cname, cpath in content_files:
             os.remove(cpath)
         if os.path.isdir(target_file) and len(get_files(target_file)) == 0:
             shutil.rmtree(target_file)
         os.remove(import_xml_path)
 
-    def _import_zip(self, target_index_id, import_xml_path):
+    async def _import_zip(self, target_index_id, import_xml_path):
         import_xml_dir, fname = os.path.split(import_xml_path)
         target_file = os.path.join(import_xml_dir, fname[:-len(IMPORT_ZIP_SUFFIX)])
         if not os.path.exists(target_file):
@@ -129,10 +140,10 @@ class WEKOProvider(provider.BaseProvider):
             return
         logger.info('Importing... {} to {}'.format(target_file, target_index_id))
         with open(target_file, 'rb') as f:
-            client.post(self.connection, target_index_id, f,
-                        os.path.getsize(target_file))
-        os.remove(target_file)
-        os.remove(import_xml_path)
+            await client.post(self.connection, target_index_id, streams.FileStreamReader(f),
+                              os.path.getsize(target_file))
+        await fileio.run(os.remove, target_file)
+        await fileio.run(os.remove, import_xml_path)
 
     def path_from_metadata(self, parent_path, metadata):
         return parent_path.child(metadata.materialized_name,
@@ -163,7 +174,7 @@ class WEKOProvider(provider.BaseProvider):
             draft_root = os.path.join(self._get_draft_dir(), parent)
             assert len([d for d in draft_path if d == '..']) == 0
             file_path = os.path.join(draft_root, draft_path)
-            return streams.FileStreamReader(open(file_path, 'rb'))
+            return streams.FileStreamReader(await fileio.run(open, file_path, 'rb'))
         else:
             # Dummy implementation for registration
             return streams.StringStream('')
@@ -184,24 +195,26 @@ class WEKOProvider(provider.BaseProvider):
         fname = path.path.split('/')[-1]
         assert not fname.startswith(ITEM_PREFIX)
         dest_file = os.path.join(draft_dir, parent_index, draft_path, fname)
-        if not os.path.exists(os.path.split(dest_file)[0]):
-            os.makedirs(os.path.split(dest_file)[0])
-        with open(dest_file, 'wb') as f:
+        await fileio.run(os.makedirs, os.path.split(dest_file)[0], exist_ok=True)
+        f = await fileio.run(open, dest_file, 'wb')
+        try:
             stream_size = 0
             chunk = await stream.read()
             while chunk:
-                f.write(chunk)
+                await fileio.run(f.write, chunk)
                 stream_size += len(chunk)
                 chunk = await stream.read()
+        finally:
+            await fileio.run(f.close)
 
         mt = WEKODraftFileMetadata({'path': draft_path + fname,
                                     'bytes': stream_size,
                                     'filepath': dest_file},
                                     index_path), True
         if fname.endswith(IMPORT_XML_SUFFIX):
-            self._import_xml(parent_index, dest_file)
+            await self._import_xml(parent_index, dest_file)
         elif fname.endswith(IMPORT_ZIP_SUFFIX):
-            self._import_zip(parent_index, dest_file)
+            await self._import_zip(parent_index, dest_file)
         return mt
 
     async def create_folder(self, path, folder_precheck=True, **kwargs):
@@ -218,8 +231,7 @@ class WEKOProvider(provider.BaseProvider):
         assert len([d for d in draft_path if d == '..']) == 0
         dname = path.path.split('/')[-2]
         dest_file = os.path.join(draft_dir, parent_index, draft_path, dname)
-        if not os.path.exists(dest_file):
-            os.makedirs(dest_file)
+        await fileio.run(os.makedirs, dest_file, exist_ok=True)
 
         return WEKODraftFolderMetadata({'path': path.path,
                                         'filepath': dest_file},
@@ -241,25 +253,26 @@ class WEKOProvider(provider.BaseProvider):
             if not os.path.exists(file_path):
                 raise exceptions.DeleteError('Draft not found', code=404)
             if os.path.isdir(file_path):
-                shutil.rmtree(file_path)
+                await fileio.run(shutil.rmtree, file_path)
             else:
-                os.remove(file_path)
+                await fileio.run(os.remove, file_path)
         else:
             assert index_path.split('/')[-1][len(ITEM_PREFIX):].startswith('item')
             parent = index_path.split('/')[-2][len(ITEM_PREFIX):]
             item_id = index_path.split('/')[-1][len(ITEM_PREFIX) + 4:]
 
-            indices = client.get_all_indices(self.connection)
+            indices = await client.get_all_indices(self.connection)
             index = [index
                      for index in indices if str(index.identifier) == parent][0]
+            items = await client.get_items(self.connection, index)
             delitem = [item
-                       for item in client.get_items(self.connection, index)
+                       for item in items
                        if client.itemId(item.about) == item_id][0]
 
             scheme, netloc, path, params, oai_query, fragment = urlparse(delitem.about)
             sword_query = 'action=repository_uri&item_id={}'.format(item_id)
             sword_url = urlunparse((scheme, netloc, path, params, sword_query, fragment))
-            client.delete(self.connection, sword_url)
+            await client.delete(self.connection, sword_url)
 
     async def metadata(self, path, version=None, **kwargs):
         """
@@ -269,7 +282,7 @@ class WEKOProvider(provider.BaseProvider):
             - 'latest-published' for published files
             - None for all data
         """
-        indices = client.get_all_indices(self.connection)
+        indices = await client.get_all_indices(self.connection)
 
         index_path, draft_path = split_path(path.path)
 
@@ -297,11 +310,8 @@ class WEKOProvider(provider.BaseProvider):
             if not os.path.exists(file_path):
                 raise exceptions.MetadataError('Draft not found', code=404)
             if os.path.isdir(file_path):
-                drafts = [self._get_draft_metadata(draft_path,
-                                                   os.path.join(file_path, d),
-                                                   index_path)
-                          for d in os.listdir(file_path)]
-                return drafts
+                return await fileio.run(self._list_draft_metadata, draft_path, file_path,
+                                        index_path)
             else:
                 return self._get_draft_metadata(os.path.split(draft_path)[0],
                                                 file_path,
@@ -309,16 +319,15 @@ class WEKOProvider(provider.BaseProvider):
         else:
             # WEKO index
             index_urls = set([index.about for index in indices if str(index.parentIdentifier) == parent])
+            items = await client.get_items(self.connection, index)
             ritems = [WEKOItemMetadata(item, index, indices)
-                      for item in client.get_items(self.connection, index)
+                      for item in items
                       if item.about not in index_urls]
             rindices = [WEKOIndexMetadata(index, indices)
                         for index in indices if str(index.parentIdentifier) == parent]
             if os.path.exists(draft_root):
-                drafts = [self._get_draft_metadata(draft_path,
-                                                   os.path.join(draft_root, d),
-                                                   index_path)
-                          for d in os.listdir(draft_root)]
+                drafts = await fileio.run(self._list_draft_metadata, draft_path, draft_root,
+                                          index_path)
             else:
                 drafts = []
             return rindices + ritems + drafts
@@ -332,7 +341,7 @@ class WEKOProvider(provider.BaseProvider):
 
     async def intra_move(self, dest_provider, src_path, dest_path):
         logger.debug('Moved: {}->{}'.format(src_path, dest_path))
-        indices = client.get_all_indices(self.connection)
+        indices = await client.get_all_indices(self.connection)
 
         if src_path.is_root:
             src_path_id = str(self.index_id)
@@ -353,10 +362,10 @@ class WEKOProvider(provider.BaseProvider):
                         if str(index.identifier) == dest_path_id][0]
         logger.info('Moving: Index {} to {}'.format(target_index.identifier,
                                                     parent_index.identifier))
-        client.update_index(self.connection, target_index.identifier,
-                            relation=parent_index.identifier)
+        await client.update_index(self.connection, target_index.identifier,
+                                  relation=parent_index.identifier)
 
-        indices = client.get_all_indices(self.connection)
+        indices = await client.get_all_indices(self.connection)
         target_index = [index
                         for index in indices
                         if str(index.identifier) == src_path_id][0]
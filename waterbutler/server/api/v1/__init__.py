@@ -1,6 +1,8 @@
+from waterbutler.server.api.v1 import tasks
 from waterbutler.server.api.v1 import provider
 PREFIX = 'v1'
 
 HANDLERS = [
-    provider.ProviderHandler.as_entry()
+    provider.ProviderHandler.as_entry(),
+    tasks.TaskHandler.as_entry(),
 ]
@@ -1,3 +1,5 @@
+from urllib import parse
+
 import tornado.web
 import tornado.gen
 import tornado.iostream
@@ -6,6 +8,19 @@ from raven.contrib.tornado import SentryMixin
 from waterbutler import tasks
 from waterbutler.server import utils
 from waterbutler.core import exceptions
+from waterbutler.core.utils import signer
+
+
+def task_url(task_id, origin):
+    """Where the state of a running copy or move task can be followed.  ``origin`` is a dict of the
+    ``resource``, ``provider`` and ``path`` of the request that started the task.  It is signed
+    into the url so that the task can only be followed with permission to that resource.
+    """
+    message, signature = signer.sign_payload(dict(origin, task_id=task_id))
+    return '/v1/tasks/{}?{}'.format(task_id, parse.urlencode([
+        ('origin', message.decode()),
+        ('signature', signature),
+    ]))
 
 
 class BaseHandler(utils.CORsMixin, utils.UtilMixin, tornado.web.RequestHandler, SentryMixin):
@@ -25,6 +40,16 @@ class BaseHandler(utils.CORsMixin, utils.UtilMixin, tornado.web.RequestHandler,
         elif issubclass(etype, tasks.WaitTimeOutError):
             self.set_status(202)
             exception_kwargs = {'data': {'level': 'info'}}
+            if exc.task_id is not None:
+                # the task is still running; tell the client where to follow it
+                url = task_url(exc.task_id, {
+                    'resource': self.path_kwargs['resource'],
+                    'provider': self.path_kwargs['provider'],
+                    'path': self.path_kwargs['path'],
+                })
+                self.set_header('Location', url)
+                finish_args = [{'data': {'id': exc.task_id, 'type': 'tasks',
+                                         'links': {'self': url}}}]
         else:
             finish_args = [{'code': status_code, 'message': self._reason}]
 
@@ -1,5 +1,4 @@
 import uuid
-import socket
 import asyncio
 import logging
 from http import HTTPStatus
@@ -12,7 +11,7 @@ from waterbutler.server.api.v1 import core
 from waterbutler.core import remote_logging
 from waterbutler.server.auth import AuthHandler
 from waterbutler.core.log_payload import LogPayload
-from waterbutler.core.streams import RequestStreamReader
+from waterbutler.core.streams import PipeStream
 from waterbutler.server.api.v1.provider.create import CreateMixin
 from waterbutler.server.api.v1.provider.metadata import MetadataMixin
 from waterbutler.server.api.v1.provider.movecopy import MoveCopyMixin
@@ -132,22 +131,20 @@ class ProviderHandler(core.BaseHandler, CreateMixin, MetadataMixin, MoveCopyMixi
         """Note: Only called during uploads."""
         self.bytes_uploaded += len(chunk)
         if self.stream:
-            self.writer.write(chunk)
-            await self.writer.drain()
+            await self.stream.write(chunk)
         else:
             self.body += chunk
 
     async def prepare_stream(self):
-        """Sets up an asyncio pipe from client to server
+        """Sets up an in-process pipe from client to provider
         Only called on PUT when path is to a file
         """
-        self.rsock, self.wsock = socket.socketpair()
-
-        self.reader, _ = await asyncio.open_unix_connection(sock=self.rsock)
-        _, self.writer = await asyncio.open_unix_connection(sock=self.wsock)
-
-        self.stream = RequestStreamReader(self.request, self.reader)
+        size = self.request.headers.get('Content-Length')
+        self.stream = PipeStream(size=None if size is None else int(size),
+                                 max_buffer=settings.UPLOAD_BUFFER_SIZE)
         self.uploader = asyncio.ensure_future(self.provider.upload(self.stream, self.target_path))
+        # If the upload fails or finishes early, stop holding the rest of the body in memory
+        self.uploader.add_done_callback(lambda _: self.stream.close())
 
     def on_finish(self):
         status, method = self.get_status(), self.request.method.upper()
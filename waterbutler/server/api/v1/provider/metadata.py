@@ -9,6 +9,7 @@ from dateutil.parser import parse as datetime_parser
 from waterbutler.server import utils
 from waterbutler.core import mime_types
 from waterbutler.core.utils import make_disposition
+from waterbutler.core.streams import ParallelRangeStream
 from waterbutler.core.streams import ResponseStreamReader
 
 logger = logging.getLogger(__name__)
@@ -103,7 +104,12 @@ class MetadataMixin:
         if ext in mime_types:
             self.set_header('Content-Type', mime_types[ext])
 
-        await self.write_stream(stream)
+        try:
+            await self.write_stream(stream)
+        finally:
+            if isinstance(stream, ParallelRangeStream):
+                # stop fetching segments if the client went away before the end
+                stream.close()
 
         if getattr(stream, 'partial', False) and isinstance(stream, ResponseStreamReader):
             await stream.response.release()
@@ -131,6 +137,27 @@ class MetadataMixin:
         self.set_header('Content-Type', 'application/zip')
         self.set_header('Content-Disposition', make_disposition(zipfile_name + '.zip'))
 
-        result = await self.provider.zip(self.path)
+        if 'Range' not in self.request.headers:
+            request_range = None
+        else:
+            request_range = utils.parse_request_range(self.request.headers['Range'])
+
+        # ``?zip=stored`` asks for an uncompressed archive, whose size is known up front
+        stored = self.get_query_argument('zip', default='') == 'stored'
+        result = await self.provider.zip(self.path, range=request_range, stored=stored)
+
+        # Stored archives and archives served from the zip archive cache have a known size and
+        # honor ranges
+        if getattr(result, 'partial', None):
+            self.set_status(206)
+            self.set_header('Content-Range', result.content_range)
+
+        size = getattr(result, 'size', None)
+        if size is not None:
+            self.set_header('Accept-Ranges', 'bytes')
+            self.set_header('Content-Length', str(size))
 
-        await self.write_stream(result)
+        try:
+            await self.write_stream(result)
+        finally:
+            result.close()
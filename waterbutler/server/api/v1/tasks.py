@@ -0,0 +1,66 @@
+from http import HTTPStatus
+
+from waterbutler import tasks
+from waterbutler.core import signing
+from waterbutler.core import exceptions
+from waterbutler.server import settings
+from waterbutler.core.utils import signer
+from waterbutler.server.api.v1 import core
+from waterbutler.server.auth import AuthHandler
+
+auth_handler = AuthHandler(settings.AUTH_HANDLERS)
+
+
+class TaskHandler(core.BaseHandler):
+    """Reports the state of a copy or move that outlasted ``WAIT_TIMEOUT``, whose url is given in
+    the 202 response to the request that started it.  While the task runs, ``progress`` holds
+    the counters of a `FolderOpProgress`.  Unknown task ids are reported as ``PENDING``.
+
+    The url is signed with the resource, provider and path of the originating request, and the
+    caller must be allowed to download that path to follow the task.
+    """
+
+    PATTERN = r'/tasks/(?P<task_id>[\w-]+)/?'
+
+    async def get(self, task_id):
+        origin = self._verified_origin(task_id)
+        await auth_handler.get(origin['resource'], origin['provider'], self.request,
+                               path=origin['path'])
+
+        status = await tasks.backgrounded(tasks.get_task_status, task_id)
+
+        error = status['error']
+        if isinstance(error, exceptions.WaterButlerError):
+            error = {'code': error.code, 'message': error.message}
+        elif error is not None:
+            error = {'code': 500, 'message': 'The task failed unexpectedly'}
+
+        self.set_header('Cache-Control', 'no-store')
+        self.write({
+            'data': {
+                'id': task_id,
+                'type': 'tasks',
+                'attributes': {
+                    'state': status['state'],
+                    'progress': status['progress'],
+                    'error': error,
+                },
+                'links': {
+                    'self': core.task_url(task_id, origin),
+                },
+            },
+        })
+
+    def _verified_origin(self, task_id):
+        """The resource, provider and path signed into the task url."""
+        message = self.get_query_argument('origin', default='').encode()
+        signature = self.get_query_argument('signature', default='')
+        if not message or not signer.verify_message(signature, message):
+            raise exceptions.AuthError('Invalid or missing task signature',
+                                       code=HTTPStatus.FORBIDDEN)
+
+        origin = dict(signing.unserialize_payload(message))
+        if origin.pop('task_id', None) != task_id:
+            raise exceptions.AuthError('Invalid or missing task signature',
+                                       code=HTTPStatus.FORBIDDEN)
+        return origin
@@ -12,6 +12,7 @@ from waterbutler import settings
 from waterbutler.server.api import v0
 from waterbutler.server.api import v1
 from waterbutler.server import handlers
+from waterbutler.core import connections
 from waterbutler.version import __version__
 from waterbutler.server import settings as server_settings
 
@@ -23,6 +24,7 @@ def sig_handler(sig, frame):
 
     def stop_loop():
         if len(asyncio.Task.all_tasks(io_loop)) == 0:
+            connections.close_all()
             io_loop.stop()
         else:
             io_loop.call_later(1, stop_loop)
@@ -1,5 +1,7 @@
 import tornado.web
 
+from waterbutler.core import ratelimit
+from waterbutler.core import provider
 from waterbutler.version import __version__
 
 
@@ -9,5 +11,7 @@ class StatusHandler(tornado.web.RequestHandler):
         """List information about waterbutler status"""
         self.write({
             'status': 'up',
-            'version': __version__
+            'version': __version__,
+            'rate_limits': ratelimit.stats(),
+            'single_flight': provider.single_flight.stats(),
         })
@@ -18,7 +18,16 @@ XHEADERS = config.get_bool('XHEADERS', False)
 CORS_ALLOW_ORIGIN = config.get('CORS_ALLOW_ORIGIN', '*')
 
 CHUNK_SIZE = int(config.get('CHUNK_SIZE', 65536))  # 64KB
+# Downloads start reading CHUNK_SIZE bytes at a time and double the read size, up to
+# MAX_CHUNK_SIZE, while the provider keeps filling whole reads.  Chunks are buffered and flushed to
+# the client once FLUSH_WATERMARK bytes are waiting, when the provider falls behind, or after
+# FLUSH_INTERVAL seconds without a flush.
+MAX_CHUNK_SIZE = int(config.get('MAX_CHUNK_SIZE', 1024 ** 2))  # 1 MB
+FLUSH_WATERMARK = int(config.get('FLUSH_WATERMARK', 1024 ** 2))  # 1 MB
+FLUSH_INTERVAL = float(config.get('FLUSH_INTERVAL', 0.1))
 MAX_BODY_SIZE = int(config.get('MAX_BODY_SIZE', int(4.9 * (1024 ** 3))))  # 4.9 GB
+# Bytes of an upload buffered in memory before Tornado stops reading from the client
+UPLOAD_BUFFER_SIZE = int(config.get('UPLOAD_BUFFER_SIZE', 1024 ** 2))  # 1 MB
 
 AUTH_HANDLERS = config.get('AUTH_HANDLERS', [
     'osf',
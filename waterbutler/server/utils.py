@@ -1,3 +1,5 @@
+import time
+
 import tornado.iostream
 
 from waterbutler.server import settings
@@ -17,6 +19,7 @@ CORS_EXPOSE_HEADERS = [
     'Content-Range',
     'Content-Length',
     'Content-Encoding',
+    'Location',
 ]
 
 HTTP_REASONS = {
@@ -122,19 +125,61 @@ class UtilMixin:
         return super().set_status(code, reason or HTTP_REASONS.get(code))
 
     async def write_stream(self, stream):
+        """Send ``stream`` to the client.  Reads start at ``CHUNK_SIZE`` bytes and double, up to
+        ``MAX_CHUNK_SIZE``, each time the stream fills one, shrinking again when it returns much
+        less.  Chunks are buffered and written out together once ``FLUSH_WATERMARK`` bytes are
+        waiting, when a read returns less than a quarter of what was asked for (the stream is
+        falling behind, so waiting for more would only delay the client), at the end of the
+        stream, or when ``FLUSH_INTERVAL`` seconds have passed since the last flush.  Reading carries on while a
+        flush is in progress, but a new flush waits for the last one to finish.
+
+        Tornado only writes ``bytes``, so buffered chunks are joined into one ``bytes`` object per
+        flush, rather than each bytearray being copied as it arrives.
+        """
+        read_size = settings.CHUNK_SIZE
+        buffered, buffered_size = [], 0
+        flushing = None
+        last_flush = time.monotonic()
         try:
             while True:
-                chunk = await stream.read(settings.CHUNK_SIZE)
-                if not chunk:
+                chunk = await stream.read(read_size)
+                received = len(chunk) if chunk else 0
+                if received:
+                    buffered.append(chunk)
+                    buffered_size += received
+                    self.bytes_downloaded += received
+
+                now = time.monotonic()
+                if buffered and (
+                    received < read_size // 4 or
+                    buffered_size >= settings.FLUSH_WATERMARK or
+                    now - last_flush >= settings.FLUSH_INTERVAL
+                ):
+                    if flushing is not None:
+                        await flushing
+                    self.write(b''.join(buffered))
+                    buffered, buffered_size = [], 0
+                    flushing = self.flush()
+                    last_flush = now
+
+                if not received:
                     break
-                # Temp fix, write does not accept bytearrays currently
-                if isinstance(chunk, bytearray):
-                    chunk = bytes(chunk)
-                self.write(chunk)
-                self.bytes_downloaded += len(chunk)
+                read_size = _next_read_size(read_size, received)
                 del chunk
-                await self.flush()
+
+            if flushing is not None:
+                await flushing
         except tornado.iostream.StreamClosedError:
             # Client has disconnected early.
             # No need for any exception to be raised
             return
+
+
+def _next_read_size(read_size, received):
+    """Double ``read_size`` if the stream filled it and halve it if the stream returned less than a
+    quarter of it, staying between ``CHUNK_SIZE`` and ``MAX_CHUNK_SIZE``."""
+    if received >= read_size:
+        return min(read_size * 2, max(settings.MAX_CHUNK_SIZE, settings.CHUNK_SIZE))
+    if received < read_size // 4:
+        return max(read_size // 2, settings.CHUNK_SIZE)
+    return read_size
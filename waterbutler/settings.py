@@ -1,6 +1,7 @@
 import os
 import json
 import logging
+import tempfile
 import logging.config
 
 
@@ -155,7 +156,105 @@ def child(key):
 
 
 DEBUG = config.get_bool('DEBUG', True)
+
+# Folder copies and moves work on up to ``OP_CONCURRENCY`` files and folders at once, across the
+# whole folder tree.  Steps failing with a server or connection error are retried up to
+# ``OP_RETRIES`` times, waiting ``OP_RETRY_BACKOFF`` seconds longer before each retry.
 OP_CONCURRENCY = int(config.get('OP_CONCURRENCY', 5))
+OP_RETRIES = int(config.get('OP_RETRIES', 2))
+OP_RETRY_BACKOFF = float(config.get('OP_RETRY_BACKOFF', 1))
+
+# Collapse concurrent, identical ``metadata`` and ``validate_v1_path`` calls (same provider,
+# credentials, path and arguments) into a single upstream request.
+PROVIDER_SINGLE_FLIGHT = config.get_bool('PROVIDER_SINGLE_FLIGHT', True)
+
+# Opt-in cache of provider metadata responses, invalidated by writes through WaterButler.
+# ``BACKEND`` is ``memory`` (per process LRU) or ``redis`` (shared, requires aioredis).
+# ``PROVIDER_TTLS`` maps provider names to a ttl in seconds overriding ``TTL``; a ttl of 0
+# disables caching for that provider.
+metadata_cache_config = config.child('METADATA_CACHE')
+METADATA_CACHE_ENABLED = metadata_cache_config.get_bool('ENABLED', False)
+METADATA_CACHE_BACKEND = metadata_cache_config.get('BACKEND', 'memory')
+METADATA_CACHE_TTL = float(metadata_cache_config.get('TTL', 30))
+METADATA_CACHE_PROVIDER_TTLS = metadata_cache_config.get_object('PROVIDER_TTLS', {})
+METADATA_CACHE_MAX_SIZE = int(metadata_cache_config.get('MAX_SIZE', 10000))
+METADATA_CACHE_REDIS_URL = metadata_cache_config.get('REDIS_URL', 'redis://localhost:6379/0')
+
+# Providers that look files up by id (Google Drive, IQB-RIMS) remember the id of each path segment
+# they resolve, by parent folder id and name, for ``TTL`` seconds; a ttl of 0 disables this.
+# Writes through WaterButler drop the entries they affect, but only from the cache of the process
+# that made them, and changes made outside WaterButler are not seen until entries expire.  So the
+# cache is off unless ``BACKEND`` is ``redis`` (shared, requires aioredis) or a ``TTL`` is set;
+# ``memory`` is a per process LRU.
+path_id_cache_config = config.child('PATH_ID_CACHE')
+PATH_ID_CACHE_BACKEND = path_id_cache_config.get('BACKEND', 'memory')
+PATH_ID_CACHE_TTL = float(path_id_cache_config.get(
+    'TTL', 60 if PATH_ID_CACHE_BACKEND == 'redis' else 0
+))
+PATH_ID_CACHE_MAX_SIZE = int(path_id_cache_config.get('MAX_SIZE', 10000))
+PATH_ID_CACHE_REDIS_URL = path_id_cache_config.get('REDIS_URL', 'redis://localhost:6379/0')
+
+# When WaterButler reads a file itself (copies, moves and zips), providers that support ``Range``
+# fetch files larger than ``CHUNK_SIZE`` as ``CONCURRENCY`` concurrent range requests of
+# ``CHUNK_SIZE`` bytes each.  Up to ``CHUNK_SIZE * CONCURRENCY`` bytes per download are buffered in
+# memory.  Downloads sent to a client are always a single request.
+parallel_download_config = config.child('PARALLEL_DOWNLOAD')
+PARALLEL_DOWNLOAD_ENABLED = parallel_download_config.get_bool('ENABLED', True)
+PARALLEL_DOWNLOAD_CHUNK_SIZE = int(parallel_download_config.get('CHUNK_SIZE', 16 * 1024 ** 2))
+PARALLEL_DOWNLOAD_CONCURRENCY = int(parallel_download_config.get('CONCURRENCY', 4))
+
+# Folder zip downloads list up to ``LIST_CONCURRENCY`` folders at once and open up to ``DOWNLOADS``
+# files ahead of the one being zipped, as long as the files opened ahead add up to no more than
+# ``MAX_BYTES`` by their reported size.  Set ``DOWNLOADS`` to 0 to zip one file at a time.
+zip_prefetch_config = config.child('ZIP_PREFETCH')
+ZIP_PREFETCH_DOWNLOADS = int(zip_prefetch_config.get('DOWNLOADS', 4))
+ZIP_PREFETCH_MAX_BYTES = int(zip_prefetch_config.get('MAX_BYTES', 64 * 1024 ** 2))
+ZIP_PREFETCH_LIST_CONCURRENCY = int(zip_prefetch_config.get('LIST_CONCURRENCY', 4))
+
+# Opt-in cache of built folder zip archives on local disk.  Archives are keyed by a fingerprint of
+# the folder's contents and served from ``DIRECTORY`` while unchanged; the least recently served
+# are removed once the cache grows beyond ``MAX_BYTES``.
+zip_archive_cache_config = config.child('ZIP_ARCHIVE_CACHE')
+ZIP_ARCHIVE_CACHE_ENABLED = zip_archive_cache_config.get_bool('ENABLED', False)
+ZIP_ARCHIVE_CACHE_DIRECTORY = zip_archive_cache_config.get(
+    'DIRECTORY', os.path.join(tempfile.gettempdir(), 'waterbutler-zip-cache')
+)
+ZIP_ARCHIVE_CACHE_MAX_BYTES = int(zip_archive_cache_config.get('MAX_BYTES', 10 * 1024 ** 3))
+
+# Folders downloaded with ``?zip=stored`` are archived without compression, which lets the exact
+# archive size be sent up front and ranges of the archive be served.  Checksums of up to
+# ``CRC_CACHE_SIZE`` file versions are remembered for ``CRC_CACHE_TTL`` seconds, so that resuming
+# such a download doesn't mean reading the files before the resumed range again.
+zip_stored_config = config.child('ZIP_STORED')
+ZIP_STORED_CRC_CACHE_SIZE = int(zip_stored_config.get('CRC_CACHE_SIZE', 100000))
+ZIP_STORED_CRC_CACHE_TTL = float(zip_stored_config.get('CRC_CACHE_TTL', 24 * 60 * 60))
+
+# Number of threads used for blocking filesystem calls, see ``waterbutler.core.fileio``
+FILE_IO_THREADS = int(config.get('FILE_IO_THREADS', 8))
+
+# Outgoing HTTP connections are pooled per (scheme, host, port, TLS settings).  ``LIMIT`` caps the
+# number of simultaneous connections to a single host, ``KEEPALIVE_TIMEOUT`` is the number of
+# seconds an idle connection is kept open for reuse.
+connection_pool_config = config.child('CONNECTION_POOL')
+CONNECTION_POOL_ENABLED = connection_pool_config.get_bool('ENABLED', True)
+CONNECTION_POOL_LIMIT = int(connection_pool_config.get('LIMIT', 20))
+CONNECTION_POOL_KEEPALIVE_TIMEOUT = float(connection_pool_config.get('KEEPALIVE_TIMEOUT', 30))
+CONNECTION_POOL_CONN_TIMEOUT = connection_pool_config.get_nullable('CONN_TIMEOUT', None)
+
+# Outgoing requests are rate limited per (provider, host) with a token bucket: ``RATE`` requests
+# per second, bursting up to ``BURST``, with at most ``CONCURRENCY`` in flight (0 for no cap).
+# ``OVERRIDES`` maps a provider name or hostname to a dict of any of ``rate``, ``burst`` and
+# ``concurrency``, e.g. ``{"box": {"rate": 4}, "api.github.com": {"concurrency": 5}}``.  Upstream
+# ``Retry-After`` responses delay the retry of the limited request only; waits longer than
+# ``MAX_RETRY_AFTER`` seconds are not retried.
+rate_limit_config = config.child('RATE_LIMIT')
+RATE_LIMIT_DEFAULT = {
+    'rate': float(rate_limit_config.get('RATE', 10)),
+    'burst': int(rate_limit_config.get('BURST', 10)),
+    'concurrency': int(rate_limit_config.get('CONCURRENCY', 0)),
+}
+RATE_LIMITS = rate_limit_config.get_object('OVERRIDES', {})
+RATE_LIMIT_MAX_RETRY_AFTER = float(rate_limit_config.get('MAX_RETRY_AFTER', 60))
 
 logging_config = config.get('LOGGING', DEFAULT_LOGGING_CONFIG)
 logging.config.dictConfig(logging_config)
@@ -4,6 +4,7 @@ from waterbutler.tasks.move import move
 from waterbutler.tasks.core import celery_task
 from waterbutler.tasks.core import backgrounded
 from waterbutler.tasks.core import wait_on_celery
+from waterbutler.tasks.core import get_task_status
 from waterbutler.tasks.exceptions import WaitTimeOutError
 
 __all__ = [
@@ -13,5 +14,6 @@ __all__ = [
     'celery_task',
     'backgrounded',
     'wait_on_celery',
+    'get_task_status',
     'WaitTimeOutError',
 ]
@@ -3,6 +3,7 @@ import logging
 
 from waterbutler.core import utils
 from waterbutler.tasks import core
+from waterbutler.tasks import journal
 from waterbutler.core import remote_logging
 from waterbutler.core.path import WaterButlerPath
 from waterbutler.core.log_payload import LogPayload
@@ -21,6 +22,12 @@ async def copy(src_bundle, dest_bundle, request={}, start_time=None, **kwargs):
     logger.info('Starting copying {!r}, {!r} to {!r}, {!r}'
                 .format(src_path, src_provider, dest_path, dest_provider))
 
+    progress, publisher = core.track_progress(src_provider, src_path)
+    checkpoints = await journal.open_task_journal()
+    if checkpoints is not None:
+        checkpoints.track(progress)
+        kwargs = await checkpoints.resume(src_provider, src_path, kwargs)
+
     metadata, errors = None, []
     try:
         metadata, created = await src_provider.copy(dest_provider, src_path, dest_path, **kwargs)
@@ -32,6 +39,11 @@ async def copy(src_bundle, dest_bundle, request={}, start_time=None, **kwargs):
         logger.info('Copy succeeded')
         dest_path = WaterButlerPath.from_metadata(metadata)
     finally:
+        if publisher is not None:
+            await publisher.close()
+        if checkpoints is not None:
+            await checkpoints.discard()
+
         source = LogPayload(src_bundle['nid'], src_provider, path=src_path)
         destination = LogPayload(
             dest_bundle['nid'], dest_provider, path=dest_path, metadata=metadata
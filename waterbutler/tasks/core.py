@@ -1,13 +1,27 @@
 import os
+import json
+import time
 import pickle
 import asyncio
+import logging
 import functools
+import concurrent.futures
 
+from celery import states
+from celery import current_task
 from celery.backends.base import DisabledBackend
+from celery.backends.base import KeyValueStoreBackend
+from celery.exceptions import TimeoutError as CeleryTimeoutError
 
 from waterbutler.tasks import app
 from waterbutler.tasks import settings
 from waterbutler.tasks import exceptions
+from waterbutler.core.folder_ops import FolderOpProgress
+
+
+logger = logging.getLogger(__name__)
+
+PROGRESS_STATE = 'PROGRESS'
 
 
 def ensure_event_loop():
@@ -98,31 +112,264 @@ def celery_task(func, *args, **kwargs):
     return task
 
 
-@backgroundify
+class _Waiting:
+    __slots__ = ('interval', 'basepath', 'futures')
+
+    def __init__(self, interval, basepath):
+        self.interval = interval
+        self.basepath = basepath
+        self.futures = []  # type: list
+
+
+class ResultWaiter:
+    """Waits for the results of Celery tasks on behalf of any number of coroutines.  A single
+    watcher collects the results of every task being waited on, so a waiting request costs a
+    future rather than a thread.
+
+    Key-value backends, such as Redis, are asked for all the pending results at once with
+    ``get_many`` from one dedicated thread.  Other backends are polled for each pending result with
+    ``get_task_meta`` every ``interval`` seconds, as is the directory of the ad-hoc file backend.
+    The AMQP backend's ``get_many`` consumes every message it reads, so it would throw away the
+    progress published by running tasks and the results of tasks no one is waiting on anymore;
+    ``get_task_meta`` puts the latest message back for `get_task_status` to find.
+    """
+
+    def __init__(self, loop=None):
+        self.loop = loop or asyncio.get_event_loop()
+        self._waiting = {}  # type: dict
+        self._watcher = None  # type: asyncio.Future
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+
+    async def wait(self, task_id, timeout, interval, basepath):
+        future = self.loop.create_future()
+        waiting = self._waiting.setdefault(task_id, _Waiting(interval, basepath))
+        waiting.interval = min(waiting.interval, interval)
+        waiting.futures.append(future)
+        if self._watcher is None or self._watcher.done():
+            self._watcher = asyncio.ensure_future(self._watch(), loop=self.loop)
+
+        try:
+            return await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            raise exceptions.WaitTimeOutError(task_id=task_id)
+        finally:
+            waiting = self._waiting.get(task_id)
+            if waiting is not None and future in waiting.futures:
+                waiting.futures.remove(future)
+                if not waiting.futures:
+                    del self._waiting[task_id]
+
+    async def _watch(self):
+        while self._waiting:
+            interval = min(waiting.interval for waiting in self._waiting.values())
+            backend = app.backend
+            try:
+                if isinstance(backend, DisabledBackend):
+                    pending = [(task_id, waiting.basepath)
+                               for task_id, waiting in self._waiting.items()]
+                    await self.loop.run_in_executor(self._executor, self._read_files, pending)
+                    await asyncio.sleep(interval)
+                elif isinstance(backend, KeyValueStoreBackend):
+                    await self.loop.run_in_executor(self._executor, self._get_many, backend,
+                                                    list(self._waiting), interval)
+                else:
+                    await self.loop.run_in_executor(self._executor, self._get_each, backend,
+                                                    list(self._waiting))
+                    await asyncio.sleep(interval)
+            except Exception:
+                logger.exception('Unable to collect task results')
+                await asyncio.sleep(interval)
+
+    def _deliver(self, task_id, succeeded, value):
+        self.loop.call_soon_threadsafe(self._resolve, task_id, succeeded, value)
+
+    def _resolve(self, task_id, succeeded, value):
+        waiting = self._waiting.pop(task_id, None)
+        if waiting is None:
+            return
+        for future in waiting.futures:
+            if future.done():
+                continue
+            if succeeded:
+                future.set_result(value)
+            else:
+                future.set_exception(value)
+
+    def _deliver_meta(self, task_id, meta):
+        if meta['status'] in states.PROPAGATE_STATES:
+            error = meta['result']
+            if not isinstance(error, BaseException):
+                error = exceptions.WaterButlerTaskError(error)
+            self._deliver(task_id, False, error)
+        elif meta['status'] in states.READY_STATES:
+            self._deliver(task_id, True, meta['result'])
+
+    def _read_files(self, pending):
+        for task_id, basepath in pending:
+            try:
+                data = _load_adhoc_result(task_id, basepath)
+            except FileNotFoundError:
+                continue
+            self._deliver(task_id, not isinstance(data, Exception), data)
+
+    def _get_many(self, backend, task_ids, timeout):
+        try:
+            for task_id, meta in backend.get_many(task_ids, timeout=timeout):
+                self._deliver_meta(task_id, meta)
+        except CeleryTimeoutError:
+            pass
+
+    def _get_each(self, backend, task_ids):
+        for task_id in task_ids:
+            self._deliver_meta(task_id, backend.get_task_meta(task_id))
+
+
+_RESULT_WAITER = None
+
+
+def get_result_waiter():
+    """Return the `ResultWaiter` of the running event loop."""
+    global _RESULT_WAITER
+    if _RESULT_WAITER is None or _RESULT_WAITER.loop is not asyncio.get_event_loop():
+        _RESULT_WAITER = ResultWaiter()
+    return _RESULT_WAITER
+
+
+def _load_adhoc_result(task_id, basepath):
+    with open(os.path.join(basepath, task_id), 'rb') as result_file:
+        return pickle.load(result_file)
+
+
 async def wait_on_celery(result, interval=None, timeout=None, basepath=None):
-    timeout = timeout or settings.WAIT_TIMEOUT
-    interval = interval or settings.WAIT_INTERVAL
+    """Wait up to ``timeout`` seconds for the Celery task ``result`` to finish, and return what it
+    returned or raise what it raised.  Raises `WaitTimeOutError` if it is still running.
+    ``interval`` is how often results are polled for, on backends that must be polled.
+    """
+    return await get_result_waiter().wait(
+        result.id,
+        timeout or settings.WAIT_TIMEOUT,
+        interval or settings.WAIT_INTERVAL,
+        basepath or settings.ADHOC_BACKEND_PATH,
+    )
+
+
+def current_task_id():
+    """The id of the Celery task being run, or `None` outside of a task."""
+    return getattr(getattr(current_task, 'request', None), 'id', None)
+
+
+def _progress_path(task_id, basepath):
+    return os.path.join(basepath, '{}.progress'.format(task_id))
+
+
+def store_progress(task_id, progress, basepath=None):
+    """Publish ``progress``, a dict, as the state of the running task ``task_id``."""
+    if isinstance(app.backend, DisabledBackend):
+        path = _progress_path(task_id, basepath or settings.ADHOC_BACKEND_PATH)
+        with open(path + '.tmp', 'w') as progress_file:
+            json.dump(progress, progress_file)
+        os.replace(path + '.tmp', path)
+    else:
+        app.backend.store_result(task_id, progress, PROGRESS_STATE)
+
+
+def get_task_status(task_id, basepath=None):
+    """Return the state of the task ``task_id`` as a dict of ``state``, which is one of
+    ``PENDING``, ``PROGRESS``, ``SUCCESS`` or ``FAILURE``, the latest ``progress`` published by a
+    running task, and the ``error`` a failed task raised.  Tasks that are unknown, or whose results
+    have expired, are ``PENDING``.  Blocks, so call it with `backgrounded`.
+    """
     basepath = basepath or settings.ADHOC_BACKEND_PATH
+    status = {'state': 'PENDING', 'progress': None, 'error': None}
+
+    if isinstance(app.backend, DisabledBackend):
+        try:
+            data = _load_adhoc_result(task_id, basepath)
+        except FileNotFoundError:
+            pass
+        else:
+            if isinstance(data, Exception):
+                status.update(state='FAILURE', error=data)
+            else:
+                status['state'] = 'SUCCESS'
+            return status
 
-    waited = 0
+        try:
+            with open(_progress_path(task_id, basepath)) as progress_file:
+                status.update(state=PROGRESS_STATE, progress=json.load(progress_file))
+        except FileNotFoundError:
+            pass
+        return status
+
+    result = app.AsyncResult(task_id)
+    state = result.state
+    if state == PROGRESS_STATE:
+        status.update(state=state, progress=result.info)
+    elif state == 'FAILURE':
+        status.update(state=state, error=result.result)
+    elif state == 'SUCCESS':
+        status['state'] = state
+    return status
+
+
+class ProgressPublisher:
+    """Publishes the progress of a copy or move to the result backend as the state of the
+    running task, at most once every ``PROGRESS_INTERVAL`` seconds.  Append it to the
+    ``listeners`` of a `FolderOpProgress`, and ``close`` it before the task returns, so that a
+    late update can't overwrite the task's result.
+    """
+
+    def __init__(self, task_id, basepath=None):
+        self.task_id = task_id
+        self.basepath = basepath
+        self._published = None  # type: float
+        self._publishing = None  # type: asyncio.Future
+        self._closed = False
 
-    while True:
+    def __call__(self, progress):
+        now = time.monotonic()
+        if self._closed or (self._published is not None and
+                            now - self._published < settings.PROGRESS_INTERVAL):
+            return
+        if self._publishing is not None and not self._publishing.done():
+            return
+        self._published = now
+        self._publishing = asyncio.ensure_future(self._publish(progress.serialize()))
+
+    async def _publish(self, progress):
+        try:
+            await backgrounded(store_progress, self.task_id, progress, basepath=self.basepath)
+        except Exception:
+            logger.exception('Unable to publish progress of task {}'.format(self.task_id))
+
+    async def close(self):
+        self._closed = True
+        if self._publishing is not None:
+            await self._publishing
         if isinstance(app.backend, DisabledBackend):
             try:
-                with open(os.path.join(basepath, result.id), 'rb') as result_file:
-                    data = pickle.load(result_file)
-                if isinstance(data, Exception):
-                    raise data
-                return data
+                os.remove(_progress_path(self.task_id,
+                                         self.basepath or settings.ADHOC_BACKEND_PATH))
             except FileNotFoundError:
                 pass
-        else:
-            if result.ready():
-                if result.failed():
-                    raise result.result
-                return result.result
-
-        if waited > timeout:
-            raise exceptions.WaitTimeOutError
-        await asyncio.sleep(interval)
-        waited += interval
+
+
+def track_progress(provider, src_path):
+    """Give ``provider`` a `FolderOpProgress` for the copy or move of ``src_path`` it is about
+    to start, published by a `ProgressPublisher` if a task is running.  Returns the progress and
+    the publisher, which is `None` outside of a task.
+    """
+    progress = FolderOpProgress()
+    progress.current = src_path.materialized_path
+    if not src_path.is_dir:
+        progress.files_total = 1
+    provider.folder_op_progress = progress
+
+    task_id = current_task_id()
+    if task_id is None:
+        return progress, None
+
+    publisher = ProgressPublisher(task_id)
+    progress.listeners.append(publisher)
+    publisher(progress)
+    return progress, publisher
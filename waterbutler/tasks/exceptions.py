@@ -3,4 +3,9 @@ class WaterButlerTaskError(Exception):
 
 
 class WaitTimeOutError(WaterButlerTaskError):
-    pass
+    """The task ``task_id`` is still running, and may be followed at its signed
+    ``/v1/tasks/<task_id>`` url."""
+
+    def __init__(self, *args, task_id=None):
+        super().__init__(*args)
+        self.task_id = task_id
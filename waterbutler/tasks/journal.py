@@ -0,0 +1,148 @@
+import os
+import json
+import time
+import sqlite3
+import asyncio
+import logging
+import threading
+
+from celery import current_task
+
+from waterbutler.core import fileio
+from waterbutler.tasks import settings
+
+
+logger = logging.getLogger(__name__)
+
+PROGRESS_KEY = 'progress'
+
+
+class CopyJournal:
+    """A checkpoint journal for a folder copy or move, kept in a sqlite file so that it survives
+    the worker.  It maps the materialized path of each source file or folder to what has been done
+    with it, as recorded by :class:`waterbutler.core.folder_ops.FolderOpExecutor`, and also holds
+    the latest progress of the operation under ``PROGRESS_KEY``.
+
+    A journal that can't be read or written is logged and then ignored, so the operation carries
+    on without checkpoints rather than failing.
+
+    :param str path: the sqlite file; created if missing
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._connection = None  # type: sqlite3.Connection
+        self._broken = False
+        self._progress_saved = 0.0
+
+    def _execute(self, sql, params=()):
+        with self._lock:
+            if self._connection is None:
+                self._connection = sqlite3.connect(self.path, check_same_thread=False)
+                self._connection.execute(
+                    'CREATE TABLE IF NOT EXISTS journal (key TEXT PRIMARY KEY, value TEXT)'
+                )
+            with self._connection:
+                return self._connection.execute(sql, params).fetchall()
+
+    async def _run(self, sql, params=()):
+        if self._broken:
+            return []
+        try:
+            return await fileio.run(self._execute, sql, params)
+        except (OSError, sqlite3.Error):
+            logger.exception('Unable to use checkpoint journal {}'.format(self.path))
+            self._broken = True
+            return []
+
+    async def entries(self):
+        """Everything recorded for source paths, as a dict of path to entry."""
+        rows = await self._run('SELECT key, value FROM journal WHERE key LIKE \'/%\'')
+        return {key: json.loads(value) for key, value in rows}
+
+    async def get(self, key):
+        rows = await self._run('SELECT value FROM journal WHERE key = ?', (key, ))
+        return json.loads(rows[0][0]) if rows else None
+
+    async def record(self, key, entry):
+        await self._run('INSERT OR REPLACE INTO journal (key, value) VALUES (?, ?)',
+                        (key, json.dumps(entry)))
+
+    async def progress(self):
+        """The last progress saved by a tracked `FolderOpProgress`, or `None`."""
+        return await self.get(PROGRESS_KEY)
+
+    def track(self, progress):
+        """Save ``progress`` to the journal as it changes, at most once every
+        ``CHECKPOINT_PROGRESS_INTERVAL`` seconds."""
+        def changed(progress):
+            now = time.monotonic()
+            if now - self._progress_saved < settings.CHECKPOINT_PROGRESS_INTERVAL:
+                return
+            self._progress_saved = now
+            asyncio.ensure_future(self.record(PROGRESS_KEY, progress.serialize()))
+        progress.listeners.append(changed)
+
+    async def resume(self, provider, src_path, kwargs):
+        """Have ``provider`` keep this journal while copying or moving ``src_path``.  Returns the
+        ``kwargs`` to call ``copy`` or ``move`` with, changed to reuse the destination folder of an
+        interrupted run if there was one, rather than naming a new one.
+        """
+        provider.folder_op_journal = self
+        entry = await self.get(src_path.materialized_path)
+        if entry is None:
+            return kwargs
+        logger.info('Resuming from checkpoint journal {}'.format(self.path))
+        return dict(kwargs, rename=entry['name'], conflict='replace')
+
+    async def discard(self):
+        """Close and remove the journal once the operation no longer needs it."""
+        def remove():
+            with self._lock:
+                if self._connection is not None:
+                    self._connection.close()
+                    self._connection = None
+                try:
+                    os.remove(self.path)
+                except FileNotFoundError:
+                    pass
+        self._broken = True
+        try:
+            await fileio.run(remove)
+        except OSError:
+            logger.exception('Unable to remove checkpoint journal {}'.format(self.path))
+
+
+def journal_path(task_id):
+    return os.path.join(settings.CHECKPOINT_PATH, '{}.sqlite'.format(task_id))
+
+
+def _prune(directory, ttl):
+    os.makedirs(directory, exist_ok=True)
+    expired = time.time() - ttl
+    for entry in os.scandir(directory):
+        try:
+            if entry.stat().st_mtime < expired:
+                os.remove(entry.path)
+        except FileNotFoundError:
+            pass
+
+
+async def open_task_journal():
+    """Return the `CopyJournal` of the Celery task being run, or `None` if checkpoints are
+    disabled or no task is running.  Journals are keyed by task id, which is kept when a task is
+    redelivered after its worker dies.  Expired journals are removed on the way.
+    """
+    if not settings.CHECKPOINT_ENABLED:
+        return None
+    task_id = getattr(getattr(current_task, 'request', None), 'id', None)
+    if task_id is None:
+        return None
+    try:
+        await fileio.run(_prune, settings.CHECKPOINT_PATH, settings.CHECKPOINT_TTL)
+    except OSError:
+        logger.exception('Unable to prepare checkpoint journals in {}'
+                         .format(settings.CHECKPOINT_PATH))
+        return None
+    return CopyJournal(journal_path(task_id))
@@ -3,6 +3,7 @@ import logging
 
 from waterbutler.core import utils
 from waterbutler.tasks import core
+from waterbutler.tasks import journal
 from waterbutler.core import remote_logging
 from waterbutler.core.path import WaterButlerPath
 from waterbutler.core.log_payload import LogPayload
@@ -22,6 +23,12 @@ async def move(src_bundle, dest_bundle, request: dict=None, start_time=None, **k
     logger.info('Starting moving {!r}, {!r} to {!r}, {!r}'
                 .format(src_path, src_provider, dest_path, dest_provider))
 
+    progress, publisher = core.track_progress(src_provider, src_path)
+    checkpoints = await journal.open_task_journal()
+    if checkpoints is not None:
+        checkpoints.track(progress)
+        kwargs = await checkpoints.resume(src_provider, src_path, kwargs)
+
     metadata, errors = None, []  # type: ignore
     try:
         metadata, created = await src_provider.move(dest_provider, src_path, dest_path, **kwargs)
@@ -33,6 +40,11 @@ async def move(src_bundle, dest_bundle, request: dict=None, start_time=None, **k
         logger.info('Move succeeded')
         dest_path = WaterButlerPath.from_metadata(metadata)
     finally:
+        if publisher is not None:
+            await publisher.close()
+        if checkpoints is not None:
+            await checkpoints.discard()
+
         source = LogPayload(src_bundle['nid'], src_provider, path=src_path)
         destination = LogPayload(
             dest_bundle['nid'], dest_provider, path=dest_path, metadata=metadata
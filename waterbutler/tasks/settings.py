@@ -20,6 +20,19 @@ WAIT_TIMEOUT = int(config.get('WAIT_TIMEOUT', 20))
 WAIT_INTERVAL = float(config.get('WAIT_INTERVAL', 0.5))
 ADHOC_BACKEND_PATH = config.get('ADHOC_BACKEND_PATH', '/tmp')
 
+# Running copy and move tasks publish their progress to the result backend at most once every
+# PROGRESS_INTERVAL seconds, for the /v1/tasks/<task_id> endpoint to report.
+PROGRESS_INTERVAL = float(config.get('PROGRESS_INTERVAL', 2))
+
+# Copy and move tasks journal their progress through folders so that a task redelivered after
+# its worker died picks up where it left off.  Journals are sqlite files kept in CHECKPOINT_PATH,
+# which must outlive the worker, and are removed when the task ends or CHECKPOINT_TTL seconds
+# after they were last written.
+CHECKPOINT_ENABLED = config.get_bool('CHECKPOINT_ENABLED', True)
+CHECKPOINT_PATH = config.get('CHECKPOINT_PATH', os.path.join(ADHOC_BACKEND_PATH, 'wb-checkpoints'))
+CHECKPOINT_TTL = int(config.get('CHECKPOINT_TTL', 7 * 24 * 60 * 60))
+CHECKPOINT_PROGRESS_INTERVAL = float(config.get('CHECKPOINT_PROGRESS_INTERVAL', 2))
+
 CELERY_CREATE_MISSING_QUEUES = config.get_bool('CELERY_CREATE_MISSING_QUEUES', False)
 CELERY_DEFAULT_QUEUE = config.get('CELERY_DEFAULT_QUEUE', 'waterbutler')
 CELERY_QUEUES = (